@@ -0,0 +1,86 @@
+"""sla_*: rollups de tiempos por área y estado desde factura_movimientos
+
+Revision ID: 0a1b2c3d4e5f
+Revises: f9a0b1c2d3e4
+Create Date: 2026-10-19 23:30:00.000000
+
+GET /dashboard/sla muestra permanencia por (área, estado), tiempo de ciclo
+hasta pagada, backlog por antigüedad y flujo diario. Recalcularlo desde
+factura_movimientos en cada carga recorre toda la bitácora, así que
+modules/dashboard/sla.py lo va sumando por lotes en estas tablas desde el
+último movimiento procesado (sla_cursor) y el endpoint solo las lee.
+
+Las tablas quedan vacías: el primer refresco suma toda la historia.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0a1b2c3d4e5f'
+down_revision: Union[str, Sequence[str], None] = 'f9a0b1c2d3e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "sla_cursor",
+        sa.Column("clave", sa.String(length=40), nullable=False),
+        sa.Column("ultimo_creado", postgresql.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column("ultimo_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("actualizado_en", postgresql.TIMESTAMP(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("clave"),
+    )
+    op.create_table(
+        "sla_permanencias",
+        sa.Column("dia", sa.Date(), nullable=False),
+        sa.Column("area_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("estado_id", sa.SmallInteger(), nullable=False),
+        sa.Column("rango", sa.SmallInteger(), nullable=False),
+        sa.Column("n", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("segundos", sa.Numeric(20, 2), nullable=False, server_default="0"),
+        sa.ForeignKeyConstraint(["area_id"], ["areas.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["estado_id"], ["estados.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("dia", "area_id", "estado_id", "rango"),
+    )
+    op.create_table(
+        "sla_ciclos",
+        sa.Column("dia", sa.Date(), nullable=False),
+        sa.Column("rango", sa.SmallInteger(), nullable=False),
+        sa.Column("n", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("segundos", sa.Numeric(20, 2), nullable=False, server_default="0"),
+        sa.PrimaryKeyConstraint("dia", "rango"),
+    )
+    op.create_table(
+        "sla_flujo_diario",
+        sa.Column("dia", sa.Date(), nullable=False),
+        sa.Column("area_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("entradas", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("salidas", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("cerradas", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.ForeignKeyConstraint(["area_id"], ["areas.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("dia", "area_id"),
+    )
+    op.create_table(
+        "sla_backlog",
+        sa.Column("id", sa.BigInteger(), sa.Identity(), nullable=False),
+        sa.Column("area_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("estado_id", sa.SmallInteger(), nullable=False),
+        sa.Column("rango", sa.SmallInteger(), nullable=False),
+        sa.Column("n", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.ForeignKeyConstraint(["area_id"], ["areas.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["estado_id"], ["estados.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("sla_backlog")
+    op.drop_table("sla_flujo_diario")
+    op.drop_table("sla_ciclos")
+    op.drop_table("sla_permanencias")
+    op.drop_table("sla_cursor")
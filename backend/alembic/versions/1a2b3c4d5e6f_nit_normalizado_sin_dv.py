@@ -0,0 +1,62 @@
+"""uq_facturas_nit_numero_norm: NIT sin puntos ni dígito de verificación
+
+Revision ID: 1a2b3c4d5e6f
+Revises: 0a1b2c3d4e5f
+Create Date: 2026-10-20 00:00:00.000000
+
+El flujo de correos PDF guarda el NIT como viene ("900.080.634-1") y el XML
+DIAN lo trae sin DV ("900080634"). Con la normalización de b8c9d0e1f2a3 (solo
+quitaba guiones y espacios) eran NITs distintos y la ingesta XML duplicaba la
+factura. Ahora el índice toma lo que va antes del guion, sin puntos ni
+espacios; modules/facturas/ingesta.py repite la misma expresión.
+
+Como en b8c9d0e1f2a3, si ya hay duplicados con la nueva normalización la
+migración se detiene y los lista para depurarlos a mano.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1a2b3c4d5e6f'
+down_revision: Union[str, Sequence[str], None] = '0a1b2c3d4e5f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+NIT_NORM = "upper(replace(replace(split_part(btrim(nit_proveedor), '-', 1), '.', ''), ' ', ''))"
+NIT_NORM_ANTERIOR = "upper(replace(replace(btrim(nit_proveedor), '-', ''), ' ', ''))"
+NUMERO_NORM = "upper(btrim(numero_factura))"
+
+
+def upgrade() -> None:
+    duplicados = op.get_bind().execute(sa.text(f"""
+        SELECT {NIT_NORM} AS nit, {NUMERO_NORM} AS numero, count(*) AS n
+        FROM facturas
+        WHERE nit_proveedor IS NOT NULL
+        GROUP BY 1, 2
+        HAVING count(*) > 1
+        ORDER BY 3 DESC
+        LIMIT 50
+    """)).all()
+    if duplicados:
+        detalle = ", ".join(f"{d.nit}/{d.numero} (x{d.n})" for d in duplicados)
+        raise RuntimeError(
+            "Hay facturas duplicadas por (NIT sin DV, número) normalizados; depúrelas antes "
+            f"de recrear uq_facturas_nit_numero_norm: {detalle}"
+        )
+
+    op.execute("DROP INDEX IF EXISTS uq_facturas_nit_numero_norm")
+    op.execute(
+        f"CREATE UNIQUE INDEX uq_facturas_nit_numero_norm ON facturas "
+        f"({NIT_NORM}, {NUMERO_NORM}) WHERE nit_proveedor IS NOT NULL"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS uq_facturas_nit_numero_norm")
+    op.execute(
+        f"CREATE UNIQUE INDEX uq_facturas_nit_numero_norm ON facturas "
+        f"({NIT_NORM_ANTERIOR}, {NUMERO_NORM}) WHERE nit_proveedor IS NOT NULL"
+    )
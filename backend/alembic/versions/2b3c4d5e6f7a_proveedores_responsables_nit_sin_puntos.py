@@ -0,0 +1,52 @@
+"""proveedores_responsables.nit con la normalización única (sin puntos)
+
+Revision ID: 2b3c4d5e6f7a
+Revises: 1a2b3c4d5e6f
+Create Date: 2026-10-21 00:00:00.000000
+
+El índice NIT→responsable y la tabla usaban su propia normalización (solo
+quitaba guiones y espacios), distinta de la de la ingesta: "900.080.634"
+quedaba guardado con puntos. Ahora las dos usan core.nit_responsable.normalizar_nit
+y esta migración quita los puntos de los NITs guardados.
+
+Un NIT guardado con el DV pegado (el guion ya se había quitado al guardarlo)
+no se puede separar a ciegas: hay que corregirlo a mano. Si dos filas quedan
+con el mismo NIT, la migración se detiene y las lista.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2b3c4d5e6f7a'
+down_revision: Union[str, Sequence[str], None] = '1a2b3c4d5e6f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+NIT_NORM = "upper(replace(split_part(nit, '-', 1), '.', ''))"
+
+
+def upgrade() -> None:
+    duplicados = op.get_bind().execute(sa.text(f"""
+        SELECT {NIT_NORM} AS nit, count(*) AS n
+        FROM proveedores_responsables
+        GROUP BY 1
+        HAVING count(*) > 1
+        ORDER BY 2 DESC
+        LIMIT 50
+    """)).all()
+    if duplicados:
+        detalle = ", ".join(f"{d.nit} (x{d.n})" for d in duplicados)
+        raise RuntimeError(
+            "Hay proveedores_responsables con el mismo NIT sin puntos; depúrelos antes "
+            f"de normalizar: {detalle}"
+        )
+    # El trigger de la tabla avisa y los workers recargan su índice
+    op.execute(f"UPDATE proveedores_responsables SET nit = {NIT_NORM} WHERE nit <> {NIT_NORM}")
+
+
+def downgrade() -> None:
+    # Los puntos quitados no se pueden recuperar; los NITs normalizados siguen siendo válidos
+    pass
@@ -0,0 +1,70 @@
+"""versiones_datos: contador de cambios por tabla para ETag / 304
+
+Revision ID: a4b5c6d7e8f9
+Revises: f2a3b4c5d6e7
+Create Date: 2026-10-19 18:00:00.000000
+
+Los catálogos (áreas, estados, centros, unidades, cuentas auxiliares,
+aprobadores) y los listados de facturas se piden en cada pantalla y casi nunca
+cambian entre dos pedidos. core/versionado.py responde 304 si el ETag del
+cliente coincide con la versión actual de las tablas del endpoint, sin correr
+la query principal. La versión la mantiene este trigger por sentencia (no por
+fila: un UPDATE masivo suma 1), repartido en 8 filas por tabla según el
+backend para no serializar a los que escriben facturas en paralelo.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4b5c6d7e8f9'
+down_revision: Union[str, Sequence[str], None] = 'f2a3b4c5d6e7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLAS_VERSIONADAS = (
+    "areas",
+    "estados",
+    "centros_costo",
+    "centros_operacion",
+    "unidades_negocio",
+    "cuentas_auxiliares",
+    "aprobadores_gerencia",
+    "facturas",
+)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "versiones_datos",
+        sa.Column("tabla", sa.String(length=63), nullable=False),
+        sa.Column("particion", sa.SmallInteger(), nullable=False),
+        sa.Column("version", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.PrimaryKeyConstraint("tabla", "particion"),
+    )
+    op.execute("""
+        CREATE OR REPLACE FUNCTION incrementar_version_datos() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO versiones_datos (tabla, particion, version)
+            VALUES (TG_TABLE_NAME, pg_backend_pid() % 8, 1)
+            ON CONFLICT (tabla, particion)
+            DO UPDATE SET version = versiones_datos.version + 1;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    for tabla in TABLAS_VERSIONADAS:
+        op.execute(f"""
+            CREATE TRIGGER trg_{tabla}_version_datos
+            AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {tabla}
+            FOR EACH STATEMENT EXECUTE FUNCTION incrementar_version_datos()
+        """)
+
+
+def downgrade() -> None:
+    for tabla in TABLAS_VERSIONADAS:
+        op.execute(f"DROP TRIGGER IF EXISTS trg_{tabla}_version_datos ON {tabla}")
+    op.execute("DROP FUNCTION IF EXISTS incrementar_version_datos()")
+    op.drop_table("versiones_datos")
@@ -0,0 +1,131 @@
+"""tabla proveedores_responsables (enrutamiento NIT de la ingesta XML)
+
+Revision ID: a7b8c9d0e1f2
+Revises: a6b7c8d9e0f1
+Create Date: 2026-10-19 09:00:00.000000
+
+El enrutamiento NIT → responsable de la ingesta XML era un dict en código
+(core/nit_responsable._NIT_RESPONSABLE): agregar un proveedor exigía un deploy.
+
+1. `proveedores_responsables`: NIT normalizado (clave única), razón social,
+   keywords de responsable en JSONB (en orden de preferencia) y `activo`.
+   Se siembra con las 47 filas que tenía el dict, así el comportamiento de la
+   ingesta no cambia al desplegar.
+
+2. Trigger `trg_proveedores_responsables_notify` (FOR EACH STATEMENT): hace
+   `pg_notify('proveedores_responsables_cambio', TG_OP)` tras cualquier
+   INSERT/UPDATE/DELETE. Cada worker escucha el canal y recarga su índice en
+   memoria; un import masivo dispara UNA sola notificación.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7b8c9d0e1f2'
+down_revision: Union[str, Sequence[str], None] = 'a6b7c8d9e0f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Copia fiel del dict que vivía en core/nit_responsable.py
+SEED_NIT_RESPONSABLE: dict[str, list[str]] = {
+    "901761363":    ["cedi"],
+    "901373083":    ["cedi"],
+    "890928257":    ["cedi"],
+    "860000996":    ["cedi"],
+    "900080634":    ["cedi", "marketing"],
+    "900040299":    ["tiendas", "cedi"],
+    "900718257":    ["cedi"],
+    "900277192":    ["cedi"],
+    "901731328":    ["cedi"],
+    "860530547":    ["cedi"],
+    "860016767":    ["cedi"],
+    "91440300MA5EM":["cedi"],
+    "900083863":    ["cedi"],
+    "800245795":    ["cedi"],
+    "890904478":    ["cedi", "tiendas"],
+    "890800718":    ["cedi"],
+    "800045797":    ["cedi"],
+    "901037119":    ["cedi"],
+    "LU24640654":   ["cedi"],
+    "860028580":    ["cedi"],
+    "800250778":    ["cedi"],
+    "860006127":    ["cedi"],
+    "890900608":    ["cedi", "tiendas", "comercial"],
+    "805016704":    ["cedi"],
+    "901534331":    ["cedi"],
+    "900529276":    ["cedi"],
+    "860007538":    ["cedi"],
+    "860002063":    ["cedi"],
+    "900438907":    ["tiendas"],
+    "890900424":    ["cedi"],
+    "891300241":    ["cedi"],
+    "901026869":    ["cedi", "tiendas"],
+    "901235670":    ["cedi", "tiendas"],
+    "860007955":    ["cedi"],
+    "900833934":    ["cedi", "tiendas"],
+    "890916575":    ["cedi", "tiendas"],
+    "900618834":    ["cedi"],
+    "860004922":    ["cedi"],
+    "1193389919":   ["cedi"],
+    "900973989":    ["cedi"],
+    "891903392":    ["cedi"],
+    "900813998":    ["mantenimiento", "compras", "cedi"],
+    "860524896":    ["cedi"],
+    "900208583":    ["cedi", "tiendas"],
+    "811006722":    ["cedi"],
+    "901597547":    ["cedi", "tiendas"],
+    "901554982":    ["cedi", "tiendas"],
+}
+
+
+def upgrade() -> None:
+    op.create_table(
+        'proveedores_responsables',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True,
+                  server_default=sa.text('gen_random_uuid()')),
+        sa.Column('nit', sa.Text(), nullable=False),
+        sa.Column('razon_social', sa.Text(), nullable=True),
+        sa.Column('responsables', postgresql.JSONB(), nullable=False),
+        sa.Column('activo', sa.Boolean(), nullable=False, server_default=sa.text('true')),
+        sa.Column('created_at', postgresql.TIMESTAMP(timezone=True),
+                  server_default=sa.func.now(), nullable=False),
+        sa.Column('updated_at', postgresql.TIMESTAMP(timezone=True),
+                  server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index('ix_proveedores_responsables_nit', 'proveedores_responsables', ['nit'], unique=True)
+
+    tabla = sa.table(
+        'proveedores_responsables',
+        sa.column('nit', sa.Text()),
+        sa.column('responsables', postgresql.JSONB()),
+    )
+    op.bulk_insert(tabla, [
+        {"nit": nit, "responsables": responsables}
+        for nit, responsables in SEED_NIT_RESPONSABLE.items()
+    ])
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION notify_proveedores_responsables() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('proveedores_responsables_cambio', TG_OP);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER trg_proveedores_responsables_notify
+        AFTER INSERT OR UPDATE OR DELETE ON proveedores_responsables
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_proveedores_responsables()
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS trg_proveedores_responsables_notify ON proveedores_responsables")
+    op.execute("DROP FUNCTION IF EXISTS notify_proveedores_responsables()")
+    op.drop_index('ix_proveedores_responsables_nit', table_name='proveedores_responsables')
+    op.drop_table('proveedores_responsables')
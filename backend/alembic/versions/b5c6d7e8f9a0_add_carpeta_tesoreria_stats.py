@@ -0,0 +1,103 @@
+"""carpeta_tesoreria_stats: agregados por carpeta de tesorería mantenidos por trigger
+
+Revision ID: b5c6d7e8f9a0
+Revises: a4b5c6d7e8f9
+Create Date: 2026-10-19 19:00:00.000000
+
+La grilla de carpetas de Tesorería armaba cantidad, total y pagadas/pendientes
+recorriendo todas las facturas de cada carpeta (bandeja_tesoreria y
+_carpeta_to_dict). Ahora cada carpeta tiene una fila con esos agregados que
+el trigger de facturas ajusta por deltas (resta de la carpeta vieja, suma en
+la nueva) en la misma transacción que mueve, edita, paga o borra la factura.
+Pagada = estado_id 5 (el mismo que fija close_tesoreria).
+
+La migración llena la tabla con lo que hay hoy.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5c6d7e8f9a0'
+down_revision: Union[str, Sequence[str], None] = 'a4b5c6d7e8f9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "carpeta_tesoreria_stats",
+        sa.Column("carpeta_tesoreria_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("n_facturas", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("total", sa.Numeric(16, 2), nullable=False, server_default="0"),
+        sa.Column("n_pagadas", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("n_pendientes", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("ultima_actividad", postgresql.TIMESTAMP(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["carpeta_tesoreria_id"], ["carpetas_tesoreria.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("carpeta_tesoreria_id"),
+    )
+    op.execute("""
+        INSERT INTO carpeta_tesoreria_stats
+            (carpeta_tesoreria_id, n_facturas, total, n_pagadas, n_pendientes, ultima_actividad)
+        SELECT carpeta_tesoreria_id,
+               count(*),
+               coalesce(sum(total), 0),
+               count(*) FILTER (WHERE estado_id = 5),
+               count(*) FILTER (WHERE estado_id <> 5),
+               max(updated_at)
+        FROM facturas
+        WHERE carpeta_tesoreria_id IS NOT NULL
+        GROUP BY carpeta_tesoreria_id
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION actualizar_carpeta_tesoreria_stats() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE'
+               AND OLD.carpeta_tesoreria_id IS NOT DISTINCT FROM NEW.carpeta_tesoreria_id
+               AND OLD.total = NEW.total
+               AND OLD.estado_id = NEW.estado_id THEN
+                RETURN NULL;
+            END IF;
+
+            IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.carpeta_tesoreria_id IS NOT NULL THEN
+                UPDATE carpeta_tesoreria_stats SET
+                    n_facturas = n_facturas - 1,
+                    total = total - OLD.total,
+                    n_pagadas = n_pagadas - (OLD.estado_id = 5)::int,
+                    n_pendientes = n_pendientes - (OLD.estado_id <> 5)::int,
+                    ultima_actividad = now()
+                WHERE carpeta_tesoreria_id = OLD.carpeta_tesoreria_id;
+            END IF;
+
+            IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.carpeta_tesoreria_id IS NOT NULL THEN
+                INSERT INTO carpeta_tesoreria_stats AS s
+                    (carpeta_tesoreria_id, n_facturas, total, n_pagadas, n_pendientes, ultima_actividad)
+                VALUES (
+                    NEW.carpeta_tesoreria_id, 1, NEW.total,
+                    (NEW.estado_id = 5)::int, (NEW.estado_id <> 5)::int, now()
+                )
+                ON CONFLICT (carpeta_tesoreria_id) DO UPDATE SET
+                    n_facturas = s.n_facturas + 1,
+                    total = s.total + EXCLUDED.total,
+                    n_pagadas = s.n_pagadas + EXCLUDED.n_pagadas,
+                    n_pendientes = s.n_pendientes + EXCLUDED.n_pendientes,
+                    ultima_actividad = EXCLUDED.ultima_actividad;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER trg_facturas_carpeta_tesoreria_stats
+        AFTER INSERT OR DELETE OR UPDATE OF carpeta_tesoreria_id, total, estado_id ON facturas
+        FOR EACH ROW EXECUTE FUNCTION actualizar_carpeta_tesoreria_stats()
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS trg_facturas_carpeta_tesoreria_stats ON facturas")
+    op.execute("DROP FUNCTION IF EXISTS actualizar_carpeta_tesoreria_stats()")
+    op.drop_table("carpeta_tesoreria_stats")
@@ -0,0 +1,71 @@
+"""ingesta XML idempotente: tabla de respuestas + índice único (NIT, número)
+
+Revision ID: b8c9d0e1f2a3
+Revises: a7b8c9d0e1f2
+Create Date: 2026-10-19 11:00:00.000000
+
+1. `ingesta_idempotencia`: respuesta de cada ingesta exitosa bajo la clave
+   `Idempotency-Key` (o hash del XML) con vencimiento. Los reintentos de N8N
+   la reproducen sin volver a parsear ni subir el PDF.
+
+2. `uq_facturas_nit_numero_norm`: índice único parcial sobre
+   (NIT normalizado, número normalizado) de las facturas CON NIT. Es el árbitro
+   del `INSERT ... ON CONFLICT` de la ingesta. Si ya existen duplicados con esa
+   normalización la migración se detiene y los lista: hay que depurarlos a mano
+   (decidir cuál conservar) antes de reintentar.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8c9d0e1f2a3'
+down_revision: Union[str, Sequence[str], None] = 'a7b8c9d0e1f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+NIT_NORM = "upper(replace(replace(btrim(nit_proveedor), '-', ''), ' ', ''))"
+NUMERO_NORM = "upper(btrim(numero_factura))"
+
+
+def upgrade() -> None:
+    op.create_table(
+        'ingesta_idempotencia',
+        sa.Column('clave', sa.String(length=128), nullable=False),
+        sa.Column('respuesta', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('expires_at', postgresql.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column('created_at', postgresql.TIMESTAMP(timezone=True),
+                  server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('clave'),
+    )
+    op.create_index('ix_ingesta_idempotencia_expires_at', 'ingesta_idempotencia', ['expires_at'])
+
+    duplicados = op.get_bind().execute(sa.text(f"""
+        SELECT {NIT_NORM} AS nit, {NUMERO_NORM} AS numero, count(*) AS n
+        FROM facturas
+        WHERE nit_proveedor IS NOT NULL
+        GROUP BY 1, 2
+        HAVING count(*) > 1
+        ORDER BY 3 DESC
+        LIMIT 50
+    """)).all()
+    if duplicados:
+        detalle = ", ".join(f"{d.nit}/{d.numero} (x{d.n})" for d in duplicados)
+        raise RuntimeError(
+            "Hay facturas duplicadas por (NIT, número) normalizados; depúrelas antes "
+            f"de crear uq_facturas_nit_numero_norm: {detalle}"
+        )
+
+    op.execute(
+        f"CREATE UNIQUE INDEX uq_facturas_nit_numero_norm ON facturas "
+        f"({NIT_NORM}, {NUMERO_NORM}) WHERE nit_proveedor IS NOT NULL"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS uq_facturas_nit_numero_norm")
+    op.drop_index('ix_ingesta_idempotencia_expires_at', table_name='ingesta_idempotencia')
+    op.drop_table('ingesta_idempotencia')
@@ -0,0 +1,46 @@
+"""folio_contadores: folios consecutivos por (prefijo, año) sin max() ni choques
+
+Revision ID: c6d7e8f9a0b1
+Revises: b5c6d7e8f9a0
+Create Date: 2026-10-19 20:00:00.000000
+
+Los folios de paquetes (PKG-) y anticipos (ANT-) se calculaban con max() sobre
+el sufijo de la tabla. Ahora salen de esta tabla de contadores
+(core/folios.py). Se siembra con el último número usado por prefijo y año para
+que los siguientes continúen la serie.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6d7e8f9a0b1'
+down_revision: Union[str, Sequence[str], None] = 'b5c6d7e8f9a0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "folio_contadores",
+        sa.Column("prefijo", sa.String(length=10), nullable=False),
+        sa.Column("anio", sa.SmallInteger(), nullable=False),
+        sa.Column("ultimo", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.PrimaryKeyConstraint("prefijo", "anio"),
+    )
+    for tabla, prefijo in (("paquetes_gastos", "PKG"), ("anticipos", "ANT")):
+        op.execute(f"""
+            INSERT INTO folio_contadores (prefijo, anio, ultimo)
+            SELECT '{prefijo}',
+                   split_part(folio, '-', 2)::smallint,
+                   max(split_part(folio, '-', 3)::bigint)
+            FROM {tabla}
+            WHERE folio ~ '^{prefijo}-[0-9]{{4}}-[0-9]+$'
+            GROUP BY 2
+        """)
+
+
+def downgrade() -> None:
+    op.drop_table("folio_contadores")
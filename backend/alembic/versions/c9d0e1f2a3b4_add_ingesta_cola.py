@@ -0,0 +1,56 @@
+"""cola de la ingesta XML asíncrona (POST /facturas/ingesta-xml/async)
+
+Revision ID: c9d0e1f2a3b4
+Revises: b8c9d0e1f2a3
+Create Date: 2026-10-19 13:00:00.000000
+
+`ingesta_cola`: payload crudo que manda N8N + estado del procesamiento
+(pendiente | procesando | completada | error), intentos, resultado y error.
+`clave` es la misma clave de idempotencia de la ingesta síncrona (única): un
+reenvío no encola dos veces. Índice parcial sobre lo pendiente para que el
+reclamo de los workers siga siendo barato cuando la tabla crezca.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9d0e1f2a3b4'
+down_revision: Union[str, Sequence[str], None] = 'b8c9d0e1f2a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'ingesta_cola',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('clave', sa.String(length=128), nullable=False),
+        sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('estado', sa.String(length=20), server_default='pendiente', nullable=False),
+        sa.Column('intentos', sa.SmallInteger(), server_default='0', nullable=False),
+        sa.Column('resultado', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('tomado_at', postgresql.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column('procesado_at', postgresql.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('clave', name='uq_ingesta_cola_clave'),
+        sa.CheckConstraint(
+            "estado IN ('pendiente', 'procesando', 'completada', 'error')",
+            name='check_ingesta_cola_estado',
+        ),
+    )
+    op.create_index(
+        'ix_ingesta_cola_pendientes', 'ingesta_cola', ['created_at'],
+        postgresql_where=sa.text("estado IN ('pendiente', 'procesando')"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ingesta_cola_pendientes', table_name='ingesta_cola')
+    op.drop_table('ingesta_cola')
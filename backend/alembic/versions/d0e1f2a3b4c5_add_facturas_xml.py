@@ -0,0 +1,43 @@
+"""tabla facturas_xml (XML DIAN original comprimido con zstd)
+
+Revision ID: d0e1f2a3b4c5
+Revises: c9d0e1f2a3b4
+Create Date: 2026-10-19 15:00:00.000000
+
+La ingesta guarda el XML original de cada factura (zstd, bytea) para poder
+re-extraer campos nuevos del parser sobre todas las facturas con
+scripts/reparsear_xml_facturas.py. Una fila por factura (la primera que llega);
+se borra en cascada con la factura.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd0e1f2a3b4c5'
+down_revision: Union[str, Sequence[str], None] = 'c9d0e1f2a3b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'facturas_xml',
+        sa.Column('factura_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('xml_zstd', sa.LargeBinary(), nullable=False),
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('size_bytes', sa.BigInteger(), nullable=False),
+        sa.Column('created_at', postgresql.TIMESTAMP(timezone=True),
+                  server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['factura_id'], ['facturas.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('factura_id'),
+    )
+    # El XML ya viene comprimido: que TOAST no intente comprimirlo otra vez
+    op.execute("ALTER TABLE facturas_xml ALTER COLUMN xml_zstd SET STORAGE EXTERNAL")
+
+
+def downgrade() -> None:
+    op.drop_table('facturas_xml')
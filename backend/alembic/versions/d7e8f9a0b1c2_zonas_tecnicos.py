@@ -0,0 +1,49 @@
+"""zonas_tecnicos: zona de cada técnico como tabla para el informe por zona
+
+Revision ID: d7e8f9a0b1c2
+Revises: c6d7e8f9a0b1
+Create Date: 2026-10-19 21:00:00.000000
+
+El informe de gastos de técnicos por zona traía la zona de un diccionario en
+código (local-part del email → zona) y agrupaba en Python. Ahora la zona es una
+tabla que el informe une en SQL para agrupar con GROUP BY; se siembra con el
+mismo mapeo que tenía el diccionario.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7e8f9a0b1c2'
+down_revision: Union[str, Sequence[str], None] = 'c6d7e8f9a0b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ZONAS = {
+    "tecnicomedellin": "Medellín",
+    "tecnicotiendascentro": "Centro",
+    "tecnicotiendascentro2": "Centro",
+    "tecnicotiendascentro3": "Centro",
+    "tecnicotiendascosta": "Costa",
+    "tecnicotiendascosta2": "Costa",
+    "tecnicotiendasquindio": "Quindío",
+    "tecnicotiendasejecafetero": "Eje Cafetero",
+    "tecnicotiendasejecafetero2": "Eje Cafetero",
+    "supervisortecnicotiendas": "Supervisión Tiendas",
+}
+
+
+def upgrade() -> None:
+    tabla = op.create_table(
+        "zonas_tecnicos",
+        sa.Column("email_local", sa.String(length=120), nullable=False),
+        sa.Column("zona", sa.String(length=80), nullable=False),
+        sa.PrimaryKeyConstraint("email_local"),
+    )
+    op.bulk_insert(tabla, [{"email_local": k, "zona": v} for k, v in ZONAS.items()])
+
+
+def downgrade() -> None:
+    op.drop_table("zonas_tecnicos")
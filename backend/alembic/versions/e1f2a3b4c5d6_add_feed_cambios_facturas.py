@@ -0,0 +1,39 @@
+"""feed de cambios de facturas: índice en updated_at y tabla facturas_eliminadas
+
+Revision ID: e1f2a3b4c5d6
+Revises: d0e1f2a3b4c5
+Create Date: 2026-10-19 16:00:00.000000
+
+GET /facturas/changes?since=<cursor> devuelve solo lo que cambió desde el
+cursor: busca por facturas.updated_at (índice nuevo) y factura_movimientos, y
+los borrados por las lápidas de facturas_eliminadas.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1f2a3b4c5d6'
+down_revision: Union[str, Sequence[str], None] = 'd0e1f2a3b4c5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_facturas_updated_at', 'facturas', ['updated_at'])
+    op.create_table(
+        'facturas_eliminadas',
+        sa.Column('factura_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('eliminada_at', postgresql.TIMESTAMP(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('factura_id'),
+    )
+    op.create_index('ix_facturas_eliminadas_eliminada_at', 'facturas_eliminadas', ['eliminada_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_facturas_eliminadas_eliminada_at', table_name='facturas_eliminadas')
+    op.drop_table('facturas_eliminadas')
+    op.drop_index('ix_facturas_updated_at', table_name='facturas')
@@ -0,0 +1,159 @@
+"""informes_gastos_semanas/filas: cortes semanales de los informes de gastos
+
+Revision ID: e8f9a0b1c2d3
+Revises: d7e8f9a0b1c2
+Create Date: 2026-10-19 22:00:00.000000
+
+Los informes de técnicos por zona y de cajas menores se recalculaban desde
+cero en cada exportación. Ahora las semanas cerradas quedan agregadas en
+informes_gastos_filas (una fila por grupo, persona y estado) y el informe solo
+agrega en vivo la semana abierta (modules/gastos/cortes_informes.py).
+
+Los triggers invalidan una semana guardada, borrándola con sus filas, cuando
+cambia algo que la afecta:
+- un paquete de esa semana (alta, baja, estado, montos, dueño, área, flujo);
+- el nombre, email o rol de un usuario con paquetes en ella;
+- cualquier cambio de zonas_tecnicos (solo el informe 'zonas');
+- el nombre de un área con paquetes en ella (solo 'cajas_menores').
+La semana se recalcula en vivo hasta el próximo corte nocturno.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8f9a0b1c2d3'
+down_revision: Union[str, Sequence[str], None] = 'd7e8f9a0b1c2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "informes_gastos_semanas",
+        sa.Column("semana", sa.String(length=10), nullable=False),
+        sa.Column("informe", sa.String(length=30), nullable=False),
+        sa.Column("generado_en", sa.TIMESTAMP(timezone=True), nullable=False, server_default=sa.text("now()")),
+        sa.PrimaryKeyConstraint("semana", "informe"),
+    )
+    op.create_table(
+        "informes_gastos_filas",
+        sa.Column("semana", sa.String(length=10), nullable=False),
+        sa.Column("informe", sa.String(length=30), nullable=False),
+        sa.Column("fecha_inicio", sa.Date(), nullable=False),
+        sa.Column("grupo", sa.Text(), nullable=False),
+        sa.Column("email", sa.Text(), nullable=False),
+        sa.Column("estado", sa.String(length=30), nullable=False),
+        sa.Column("persona", sa.Text(), nullable=True),
+        sa.Column("paquetes", sa.BigInteger(), nullable=False),
+        sa.Column("documentos", sa.BigInteger(), nullable=False),
+        sa.Column("monto", sa.Numeric(16, 2), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["semana", "informe"],
+            ["informes_gastos_semanas.semana", "informes_gastos_semanas.informe"],
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint("semana", "informe", "fecha_inicio", "grupo", "email", "estado"),
+    )
+    op.create_index(
+        "ix_informes_gastos_filas_informe_fecha", "informes_gastos_filas", ["informe", "fecha_inicio"]
+    )
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION invalidar_cortes_paquete() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE'
+               AND OLD.semana = NEW.semana
+               AND OLD.fecha_inicio = NEW.fecha_inicio
+               AND OLD.fecha_fin = NEW.fecha_fin
+               AND OLD.estado = NEW.estado
+               AND OLD.monto_total = NEW.monto_total
+               AND OLD.total_documentos = NEW.total_documentos
+               AND OLD.user_id = NEW.user_id
+               AND OLD.area_id IS NOT DISTINCT FROM NEW.area_id
+               AND OLD.tipo_flujo IS NOT DISTINCT FROM NEW.tipo_flujo THEN
+                RETURN NULL;
+            END IF;
+
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                DELETE FROM informes_gastos_semanas WHERE semana = OLD.semana;
+            END IF;
+            IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND NEW.semana <> OLD.semana) THEN
+                DELETE FROM informes_gastos_semanas WHERE semana = NEW.semana;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER trg_paquetes_gastos_cortes
+        AFTER INSERT OR DELETE OR UPDATE ON paquetes_gastos
+        FOR EACH ROW EXECUTE FUNCTION invalidar_cortes_paquete()
+    """)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION invalidar_cortes_usuario() RETURNS trigger AS $$
+        BEGIN
+            DELETE FROM informes_gastos_semanas
+            WHERE semana IN (SELECT semana FROM paquetes_gastos WHERE user_id = NEW.id);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER trg_users_cortes
+        AFTER UPDATE OF nombre, email, role_id ON users
+        FOR EACH ROW
+        WHEN (OLD.nombre IS DISTINCT FROM NEW.nombre
+              OR OLD.email IS DISTINCT FROM NEW.email
+              OR OLD.role_id IS DISTINCT FROM NEW.role_id)
+        EXECUTE FUNCTION invalidar_cortes_usuario()
+    """)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION invalidar_cortes_zonas() RETURNS trigger AS $$
+        BEGIN
+            DELETE FROM informes_gastos_semanas WHERE informe = 'zonas';
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER trg_zonas_tecnicos_cortes
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON zonas_tecnicos
+        FOR EACH STATEMENT EXECUTE FUNCTION invalidar_cortes_zonas()
+    """)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION invalidar_cortes_area() RETURNS trigger AS $$
+        BEGIN
+            DELETE FROM informes_gastos_semanas
+            WHERE informe = 'cajas_menores'
+              AND semana IN (SELECT semana FROM paquetes_gastos WHERE area_id = NEW.id);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER trg_areas_cortes
+        AFTER UPDATE OF nombre ON areas
+        FOR EACH ROW
+        WHEN (OLD.nombre IS DISTINCT FROM NEW.nombre)
+        EXECUTE FUNCTION invalidar_cortes_area()
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS trg_areas_cortes ON areas")
+    op.execute("DROP FUNCTION IF EXISTS invalidar_cortes_area()")
+    op.execute("DROP TRIGGER IF EXISTS trg_zonas_tecnicos_cortes ON zonas_tecnicos")
+    op.execute("DROP FUNCTION IF EXISTS invalidar_cortes_zonas()")
+    op.execute("DROP TRIGGER IF EXISTS trg_users_cortes ON users")
+    op.execute("DROP FUNCTION IF EXISTS invalidar_cortes_usuario()")
+    op.execute("DROP TRIGGER IF EXISTS trg_paquetes_gastos_cortes ON paquetes_gastos")
+    op.execute("DROP FUNCTION IF EXISTS invalidar_cortes_paquete()")
+    op.drop_index("ix_informes_gastos_filas_informe_fecha", table_name="informes_gastos_filas")
+    op.drop_table("informes_gastos_filas")
+    op.drop_table("informes_gastos_semanas")
@@ -0,0 +1,49 @@
+"""trigger NOTIFY en factura_movimientos (push de bandejas por SSE)
+
+Revision ID: f2a3b4c5d6e7
+Revises: e1f2a3b4c5d6
+Create Date: 2026-10-19 17:00:00.000000
+
+Cada movimiento registrado (pase de área, envío a Contabilidad/Tesorería,
+devolución, cierre…) hace `pg_notify('factura_movimientos_push', json)` con la
+factura y las áreas desde/hasta. El NOTIFY sale al hacer COMMIT de la misma
+transacción que mueve la factura: si se revierte, no se publica nada. Cada
+worker escucha el canal (modules/facturas/push_bandejas.py) y empuja la fila
+a las bandejas suscritas por GET /facturas/stream.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a3b4c5d6e7'
+down_revision: Union[str, Sequence[str], None] = 'e1f2a3b4c5d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE OR REPLACE FUNCTION notify_factura_movimiento() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('factura_movimientos_push', json_build_object(
+                'factura_id', NEW.factura_id,
+                'tipo', NEW.tipo,
+                'area_desde_id', NEW.area_desde_id,
+                'area_hasta_id', NEW.area_hasta_id
+            )::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER trg_factura_movimientos_notify
+        AFTER INSERT ON factura_movimientos
+        FOR EACH ROW EXECUTE FUNCTION notify_factura_movimiento()
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS trg_factura_movimientos_notify ON factura_movimientos")
+    op.execute("DROP FUNCTION IF EXISTS notify_factura_movimiento()")
@@ -0,0 +1,121 @@
+"""factura_counters: conteos de facturas por (área, estado) mantenidos por trigger
+
+Revision ID: f9a0b1c2d3e4
+Revises: e8f9a0b1c2d3
+Create Date: 2026-10-19 23:00:00.000000
+
+Las métricas del dashboard, el conteo por área y las represadas por tienda
+recorrían todas las facturas en cada carga. Ahora cada (área, estado) tiene
+una fila con cantidad, suma de total y created_at más antiguo que el trigger
+de facturas ajusta por deltas en la misma transacción del cambio. El más
+antiguo solo se recalcula cuando sale del grupo justo la factura más antigua,
+con el índice (estado_id, area_id, created_at) que reemplaza a
+ix_facturas_estado_area.
+
+La migración llena la tabla con lo que hay hoy.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f9a0b1c2d3e4'
+down_revision: Union[str, Sequence[str], None] = 'e8f9a0b1c2d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SIN_AREA = "'00000000-0000-0000-0000-000000000000'::uuid"
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_facturas_estado_area_creada", "facturas", ["estado_id", "area_id", "created_at"]
+    )
+    op.drop_index("ix_facturas_estado_area", table_name="facturas")
+
+    op.create_table(
+        "factura_counters",
+        sa.Column("id", sa.BigInteger(), sa.Identity(), nullable=False),
+        sa.Column("area_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("estado_id", sa.SmallInteger(), nullable=False),
+        sa.Column("n_facturas", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("total", sa.Numeric(16, 2), nullable=False, server_default="0"),
+        sa.Column("mas_antigua", postgresql.TIMESTAMP(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["area_id"], ["areas.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["estado_id"], ["estados.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.execute(f"""
+        CREATE UNIQUE INDEX uq_factura_counters_estado_area
+        ON factura_counters (estado_id, coalesce(area_id, {SIN_AREA}))
+    """)
+    op.execute("""
+        INSERT INTO factura_counters (area_id, estado_id, n_facturas, total, mas_antigua)
+        SELECT area_id, estado_id, count(*), sum(total), min(created_at)
+        FROM facturas
+        GROUP BY area_id, estado_id
+    """)
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION actualizar_factura_counters() RETURNS trigger AS $$
+        DECLARE
+            antigua timestamptz;
+        BEGIN
+            IF TG_OP = 'UPDATE'
+               AND OLD.area_id IS NOT DISTINCT FROM NEW.area_id
+               AND OLD.estado_id = NEW.estado_id
+               AND OLD.total = NEW.total
+               AND OLD.created_at = NEW.created_at THEN
+                RETURN NULL;
+            END IF;
+
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                UPDATE factura_counters SET
+                    n_facturas = n_facturas - 1,
+                    total = total - OLD.total
+                WHERE estado_id = OLD.estado_id
+                  AND coalesce(area_id, {SIN_AREA}) = coalesce(OLD.area_id, {SIN_AREA})
+                RETURNING mas_antigua INTO antigua;
+
+                -- Salió la más antigua del grupo: buscar la siguiente por índice
+                IF antigua >= OLD.created_at THEN
+                    IF OLD.area_id IS NULL THEN
+                        SELECT min(created_at) INTO antigua FROM facturas
+                        WHERE estado_id = OLD.estado_id AND area_id IS NULL;
+                    ELSE
+                        SELECT min(created_at) INTO antigua FROM facturas
+                        WHERE estado_id = OLD.estado_id AND area_id = OLD.area_id;
+                    END IF;
+                    UPDATE factura_counters SET mas_antigua = antigua
+                    WHERE estado_id = OLD.estado_id
+                      AND coalesce(area_id, {SIN_AREA}) = coalesce(OLD.area_id, {SIN_AREA});
+                END IF;
+            END IF;
+
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO factura_counters AS c (area_id, estado_id, n_facturas, total, mas_antigua)
+                VALUES (NEW.area_id, NEW.estado_id, 1, NEW.total, NEW.created_at)
+                ON CONFLICT (estado_id, coalesce(area_id, {SIN_AREA})) DO UPDATE SET
+                    n_facturas = c.n_facturas + 1,
+                    total = c.total + EXCLUDED.total,
+                    mas_antigua = LEAST(c.mas_antigua, EXCLUDED.mas_antigua);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER trg_facturas_counters
+        AFTER INSERT OR DELETE OR UPDATE OF area_id, estado_id, total, created_at ON facturas
+        FOR EACH ROW EXECUTE FUNCTION actualizar_factura_counters()
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS trg_facturas_counters ON facturas")
+    op.execute("DROP FUNCTION IF EXISTS actualizar_factura_counters()")
+    op.drop_table("factura_counters")
+    op.create_index("ix_facturas_estado_area", "facturas", ["estado_id", "area_id"])
+    op.drop_index("ix_facturas_estado_area_creada", table_name="facturas")
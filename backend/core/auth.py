@@ -1,6 +1,8 @@
 """
 Middleware y dependencias de autenticación por API Key y JWT.
 """
+import secrets
+
 from fastapi import Header, HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from core.config import settings
@@ -120,3 +122,24 @@ async def require_api_key(x_api_key: str = Header(..., description="API Key para
     
     logger.info("API Key validada exitosamente")
     return received_key
+
+
+async def require_metrics_token(authorization: str = Header(None, alias="Authorization")):
+    """
+    Dependencia que protege /metrics con settings.metrics_token (Bearer).
+
+    Raises:
+        HTTPException 404: Si no hay token configurado (métricas deshabilitadas)
+        HTTPException 401: Si el token falta o es incorrecto
+    """
+    esperado = settings.metrics_token.strip()
+    if not esperado:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    esquema, _, recibido = (authorization or "").partition(" ")
+    if esquema.lower() != "bearer" or not secrets.compare_digest(recibido.strip().encode(), esperado.encode()):
+        logger.warning("Acceso a /metrics sin token válido")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
@@ -7,6 +7,8 @@ import asyncio
 import time
 from typing import Any, Optional
 
+from core.metricas import contar_cache
+
 _cache: dict[str, tuple[Any, float]] = {}
 _TTL = 300  # segundos
 
@@ -14,7 +16,9 @@ _TTL = 300  # segundos
 def get_cached(key: str) -> Optional[Any]:
     entry = _cache.get(key)
     if entry and (time.monotonic() - entry[1]) < _TTL:
+        contar_cache("catalogos", True)
         return entry[0]
+    contar_cache("catalogos", False)
     return None
 
 
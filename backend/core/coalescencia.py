@@ -0,0 +1,154 @@
+"""
+Lecturas coalescidas (single-flight) para los GET pesados de las bandejas.
+
+Al empezar el turno decenas de usuarios del mismo área abren la misma bandeja
+en pocos segundos y list_facturas, counts-by-area, represadas-tiendas y las
+métricas del dashboard corren N veces la misma query a la vez. Con
+respuesta_compartida los pedidos idénticos de un worker comparten UNA
+ejecución y su JSON ya serializado:
+
+- Clave: ruta + query string normalizado (ordenado, sin vacíos) + alcance de
+  autorización + ETag que ya calculó respuesta_condicional (si la ruta lo
+  usa): un cuerpo guardado antes de una escritura de otro worker no puede
+  salir con el ETag nuevo, que después convertiría en 304 datos viejos. Los endpoints de hoy no filtran por usuario (el alcance va en
+  los parámetros: area_id, solo_tiendas…); uno que sí lo haga debe pasar su
+  alcance (rol/área) para no mezclar respuestas.
+- Mientras una ejecución está en vuelo, los pedidos iguales la esperan. Si el
+  pedido que la lanzó se cancela (cliente que cierra la pestaña), el
+  siguiente la relanza; si falla, todos reciben el error.
+- Al terminar, el resultado se reparte por coalescencia_ttl_segundos (1 s).
+  Cada inserción descarta lo vencido y, pasadas MAX_RECIENTES claves, las
+  más viejas: las claves incluyen query strings arbitrarios.
+- Escrituras: cualquier commit de este worker que haya escrito algo (flush o
+  insert/update/delete ORM) invalida todo lo guardado y en vuelo; los pedidos
+  que ya esperaban reciben lo calculado, los nuevos vuelven a consultar. Las
+  escrituras de otros workers se ven a más tardar al vencer el TTL.
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.metricas import contar_cache
+
+MAX_RECIENTES = 256
+
+_en_vuelo: dict[tuple, asyncio.Future] = {}
+_recientes: dict[tuple, tuple[bytes, float]] = {}
+
+
+def invalidar() -> None:
+    """Descarta lo guardado y lo que está en vuelo (los que ya esperan no se ven afectados)."""
+    _recientes.clear()
+    _en_vuelo.clear()
+
+
+def _guardar_reciente(clave: tuple, cuerpo: bytes) -> None:
+    ahora = time.monotonic()
+    for vieja in [k for k, (_, vence) in _recientes.items() if vence <= ahora]:
+        del _recientes[vieja]
+    _recientes.pop(clave, None)
+    while len(_recientes) >= MAX_RECIENTES:
+        del _recientes[next(iter(_recientes))]  # orden de inserción: la más vieja
+    _recientes[clave] = (cuerpo, ahora + settings.coalescencia_ttl_segundos)
+
+
+async def compartida(clave: tuple, calcular: Callable[[], Awaitable[bytes]]) -> bytes:
+    """Ejecuta `calcular` una sola vez para los pedidos concurrentes con la misma clave."""
+    while True:
+        reciente = _recientes.get(clave)
+        if reciente is not None and reciente[1] > time.monotonic():
+            contar_cache("coalescencia", True)
+            return reciente[0]
+        futuro = _en_vuelo.get(clave)
+        if futuro is None:
+            break
+        contar_cache("coalescencia", True)
+        try:
+            return await asyncio.shield(futuro)
+        except asyncio.CancelledError:
+            # Cancelaron al que calculaba, no a este pedido: calcular de nuevo
+            if not futuro.cancelled() or asyncio.current_task().cancelling():
+                raise
+
+    contar_cache("coalescencia", False)
+    futuro = asyncio.get_running_loop().create_future()
+    _en_vuelo[clave] = futuro
+    try:
+        cuerpo = await calcular()
+    except asyncio.CancelledError:
+        futuro.cancel()
+        raise
+    except Exception as e:
+        futuro.set_exception(e)
+        futuro.exception()  # recuperada: sin "exception was never retrieved" si nadie esperaba
+        raise
+    finally:
+        # Si hubo una escritura en el medio, la clave ya no es de este futuro
+        vigente = _en_vuelo.get(clave) is futuro
+        if vigente:
+            del _en_vuelo[clave]
+    futuro.set_result(cuerpo)
+    if vigente:
+        _guardar_reciente(clave, cuerpo)
+    return cuerpo
+
+
+def _serializar(valor: Any) -> bytes:
+    if isinstance(valor, BaseModel):
+        return valor.model_dump_json(by_alias=True).encode()
+    return JSONResponse(jsonable_encoder(valor)).body
+
+
+async def respuesta_compartida(
+    request: Request,
+    response: Response,
+    calcular: Callable[[], Awaitable[Any]],
+    alcance: Optional[str] = None,
+) -> Response:
+    """JSON de `calcular()` compartido entre pedidos idénticos (ver docstring del módulo).
+
+    `response` es el Response del endpoint: se copian sus headers (ETag y
+    Cache-Control de core/versionado.py) y el ETag entra en la clave.
+    """
+    params = tuple(sorted((k, v) for k, v in request.query_params.multi_items() if v != ""))
+    clave = (request.url.path, params, alcance, response.headers.get("etag"))
+
+    async def _calcular_serializado() -> bytes:
+        return _serializar(await calcular())
+
+    cuerpo = await compartida(clave, _calcular_serializado)
+    return Response(cuerpo, media_type="application/json", headers=dict(response.headers))
+
+
+def _marcar_escritura(session) -> None:
+    session.info["coalescencia_escribio"] = True
+
+
+@event.listens_for(Session, "after_flush")
+def _tras_flush(session, flush_context) -> None:
+    _marcar_escritura(session)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _tras_execute(orm_execute_state) -> None:
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _marcar_escritura(orm_execute_state.session)
+
+
+@event.listens_for(Session, "after_commit")
+def _tras_commit(session) -> None:
+    if session.info.pop("coalescencia_escribio", False):
+        invalidar()
+
+
+@event.listens_for(Session, "after_rollback")
+def _tras_rollback(session) -> None:
+    session.info.pop("coalescencia_escribio", None)
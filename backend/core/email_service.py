@@ -4,6 +4,7 @@ from typing import Optional
 from core.logging import logger
 from core.config import settings
 from core.s3_service import s3_service
+from core.instrumentacion import TransporteMedido
 
 # Vigencia de los enlaces a soportes en el correo de aprobación (igual al token: 72 horas)
 SOPORTE_URL_EXPIRES_IN = 72 * 3600
@@ -23,7 +24,7 @@ class EmailService:
             "client_secret": settings.azure_client_secret,
             "scope": "https://graph.microsoft.com/.default",
         }
-        async with httpx.AsyncClient(timeout=15) as client:
+        async with httpx.AsyncClient(timeout=15, transport=TransporteMedido("graph")) as client:
             resp = await client.post(url, data=payload)
             resp.raise_for_status()
             return resp.json()["access_token"]
@@ -64,7 +65,7 @@ class EmailService:
             "Authorization": f"Bearer {token}",
             "Content-Type": "application/json",
         }
-        async with httpx.AsyncClient(timeout=30) as client:
+        async with httpx.AsyncClient(timeout=30, transport=TransporteMedido("graph")) as client:
             resp = await client.post(url, json=payload, headers=headers)
             resp.raise_for_status()
 
@@ -0,0 +1,88 @@
+"""
+Escucha LISTEN/NOTIFY con una conexión asyncpg dedicada que detecta su caída.
+
+Una conexión que se cae (failover de RDS, corte de red) no hace fallar al que
+solo espera notificaciones: sin este módulo la escucha quedaba muda para
+siempre. escuchar_canal se entera de dos maneras:
+
+- add_termination_listener: asyncpg avisa en cuanto ve cerrarse el socket.
+- Ping: si pasan INTERVALO_PING_S sin notificaciones, un `SELECT 1` con
+  TIMEOUT_PING_S; un corte silencioso (sin RST) no cierra el socket y solo así
+  se nota.
+
+En ambos casos cierra, espera ESPERA_RECONEXION_S, reconecta y vuelve a llamar
+a `al_conectar(reconexion=True)` para que el consumidor se ponga al día con lo
+que pasó mientras estuvo caída.
+"""
+import asyncio
+from typing import Awaitable, Callable
+
+from core.logging import logger
+
+ESPERA_RECONEXION_S = 30
+INTERVALO_PING_S = 60
+TIMEOUT_PING_S = 10
+
+# Marca en la cola de notificaciones: la conexión se cerró
+_CAIDA = object()
+
+
+async def _siguientes(conn, cola: asyncio.Queue) -> list[str]:
+    """Espera notificaciones y devuelve todas las acumuladas (al menos una)."""
+    while True:
+        try:
+            payload = await asyncio.wait_for(cola.get(), timeout=INTERVALO_PING_S)
+            break
+        except asyncio.TimeoutError:
+            await asyncio.wait_for(conn.fetchval("SELECT 1"), timeout=TIMEOUT_PING_S)
+    payloads = [payload]
+    while not cola.empty():
+        payloads.append(cola.get_nowait())
+    if _CAIDA in payloads:
+        raise ConnectionError("la conexión de LISTEN se cerró")
+    return payloads
+
+
+async def escuchar_canal(
+    canal: str,
+    al_conectar: Callable[[bool], Awaitable[None]],
+    al_notificar: Callable[[list[str]], Awaitable[None]],
+    nombre: str,
+) -> None:
+    """LISTEN sobre `canal` hasta que cancelen la tarea, reconectando tras cada caída.
+
+    `al_notificar` recibe juntas las notificaciones que llegaron seguidas; sus
+    errores se loggean sin tirar la conexión.
+    """
+    import asyncpg
+    from core.config import settings
+
+    dsn = settings.database_url.replace("postgresql+asyncpg://", "postgresql://")
+    reconexion = False
+
+    while True:
+        conn = None
+        cola: asyncio.Queue = asyncio.Queue()
+        try:
+            conn = await asyncpg.connect(dsn)
+            conn.add_termination_listener(lambda c: cola.put_nowait(_CAIDA))
+            await conn.add_listener(canal, lambda c, pid, ch, payload: cola.put_nowait(payload))
+            logger.info(f"Escuchando {nombre} (canal {canal}).")
+            await al_conectar(reconexion)
+            while True:
+                payloads = await _siguientes(conn, cola)
+                try:
+                    await al_notificar(payloads)
+                except Exception as e:
+                    logger.error(f"No se pudo procesar {nombre} {payloads!r}: {e}")
+        except asyncio.CancelledError:
+            logger.info(f"Escucha de {nombre} detenida.")
+            raise
+        except Exception as e:
+            logger.error(f"Error en la escucha de {nombre}: {e}")
+            reconexion = True
+            await asyncio.sleep(ESPERA_RECONEXION_S)
+        finally:
+            # terminate y no close: close espera al servidor, que tras un corte no responde
+            if conn is not None and not conn.is_closed():
+                conn.terminate()
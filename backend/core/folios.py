@@ -0,0 +1,37 @@
+"""
+Folios consecutivos por prefijo y año (PKG-2026-00042, ANT-2026-00007).
+
+Antes cada módulo calculaba el siguiente con max(cast(substr(folio…))) sobre
+su tabla: un scan que crecía cada año y, con dos creaciones simultáneas, el
+mismo número para ambas (la segunda fallaba por el UNIQUE). Ahora el número
+sale de la fila (prefijo, año) de folio_contadores con una sola sentencia
+(ver FolioContador en db/models.py).
+
+Para un documento numerado nuevo basta con un prefijo propio; la fila del año
+se crea sola con el primer folio.
+"""
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import FolioContador
+
+
+async def siguiente_numero(db: AsyncSession, prefijo: str, anio: int) -> int:
+    """Reserva el siguiente número de (prefijo, año) dentro de la transacción de `db`.
+
+    El lock de la fila dura hasta el COMMIT o ROLLBACK: conviene pedirlo justo
+    antes de insertar el documento, no al principio de una transacción larga.
+    """
+    stmt = insert(FolioContador).values(prefijo=prefijo, anio=anio, ultimo=1)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[FolioContador.prefijo, FolioContador.anio],
+        set_={"ultimo": FolioContador.ultimo + 1},
+    ).returning(FolioContador.ultimo)
+    result = await db.execute(stmt)
+    return result.scalar_one()
+
+
+async def siguiente_folio(db: AsyncSession, prefijo: str, anio: int, digitos: int = 5) -> str:
+    """Folio con formato `{prefijo}-{año}-{número con ceros}`."""
+    numero = await siguiente_numero(db, prefijo, anio)
+    return f"{prefijo}-{anio}-{numero:0{digitos}d}"
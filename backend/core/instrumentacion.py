@@ -0,0 +1,209 @@
+"""
+Instrumentación por request: cuánto del tiempo de un request se fue en BD,
+S3, Microsoft Graph, Siesa o la IA.
+
+El middleware de main.py abre una Medicion en un ContextVar; los ganchos la
+encuentran desde donde corran (event loop, greenlet de SQLAlchemy o el hilo de
+asyncio.to_thread, que copian el contexto) y acumulan ahí:
+
+- BD: eventos before/after_cursor_execute del engine. Además de la suma y el
+  conteo guarda la sentencia más lenta y cuántas veces se repitió cada FORMA
+  de query (parámetros normalizados) para detectar N+1.
+- S3: eventos before-call/after-call de botocore (un presign no cuenta, no
+  sale a la red).
+- Graph, Siesa e IA: TransporteMedido envuelve el transporte httpx del
+  cliente.
+
+Las llamadas salientes van además a los histogramas de core/metricas.py,
+dentro o fuera de un request. Fuera de un request (tareas de fondo, scripts)
+no hay Medicion y lo de BD no se mide.
+"""
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Optional
+
+import httpx
+from sqlalchemy import event
+
+from core.metricas import observar_dependencia
+
+_medicion: ContextVar[Optional["Medicion"]] = ContextVar("medicion", default=None)
+
+# Placeholders de asyncpg ($1), psycopg (%(x)s) y sqlite (?) → "?"; una lista
+# de placeholders (IN de largo variable) cuenta como la misma forma
+_PARAMETRO = re.compile(r"\$\d+|%\(\w+\)s|\?")
+_LISTA_PARAMETROS = re.compile(r"\?(?:\s*,\s*\?)+")
+
+
+def forma_sql(sql: str) -> str:
+    """Sentencia sin valores concretos: dos queries con la misma forma son la misma query."""
+    sql = _PARAMETRO.sub("?", sql)
+    return " ".join(_LISTA_PARAMETROS.sub("?…", sql).split())
+
+
+class Medicion:
+    """Acumulado de un request. Los hilos de to_thread escriben a la vez: lock."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.componentes: dict[str, list] = {}  # nombre → [ms, llamadas]
+        self.sql_mas_lenta: tuple[float, str] = (0.0, "")
+        self.formas: Counter = Counter()
+
+    def registrar(self, componente: str, ms: float) -> None:
+        with self._lock:
+            acumulado = self.componentes.setdefault(componente, [0.0, 0])
+            acumulado[0] += ms
+            acumulado[1] += 1
+
+    def registrar_sql(self, sql: str, ms: float) -> None:
+        self.registrar("db", ms)
+        forma = forma_sql(sql)
+        with self._lock:
+            self.formas[forma] += 1
+            if ms > self.sql_mas_lenta[0]:
+                self.sql_mas_lenta = (ms, forma)
+
+    def repetidas(self, umbral: int) -> list[tuple[str, int]]:
+        """Formas de query ejecutadas MÁS de `umbral` veces (sospechosas de N+1)."""
+        return [(forma, n) for forma, n in self.formas.most_common() if n > umbral]
+
+    def server_timing(self, total_ms: float) -> str:
+        """Valor del header Server-Timing: db;dur=12.3;desc="23 queries", s3;dur=…, total;dur=…"""
+        partes = []
+        for nombre, (ms, llamadas) in self.componentes.items():
+            desc = f"{llamadas} queries" if nombre == "db" else f"{llamadas} llamadas"
+            partes.append(f'{nombre};dur={ms:.1f};desc="{desc}"')
+        partes.append(f"total;dur={total_ms:.1f}")
+        return ", ".join(partes)
+
+    def resumen(self) -> str:
+        """Desglose para el log SLOW: 'db=120ms/23 s3=300ms/2'."""
+        return " ".join(
+            f"{nombre}={ms:.0f}ms/{llamadas}" for nombre, (ms, llamadas) in self.componentes.items()
+        ) or "sin dependencias"
+
+
+def iniciar_medicion() -> tuple[Medicion, Token]:
+    medicion = Medicion()
+    return medicion, _medicion.set(medicion)
+
+
+def terminar_medicion(token: Token) -> None:
+    _medicion.reset(token)
+
+
+def medicion_actual() -> Optional[Medicion]:
+    return _medicion.get()
+
+
+def _registrar_dependencia(componente: str, inicio: float, error: bool) -> None:
+    segundos = time.perf_counter() - inicio
+    observar_dependencia(componente, segundos, error)
+    medicion = _medicion.get()
+    if medicion is not None:
+        medicion.registrar(componente, segundos * 1000)
+
+
+@contextmanager
+def medir(componente: str):
+    """Mide una llamada saliente: al request en curso y a las métricas."""
+    inicio = time.perf_counter()
+    error = False
+    try:
+        yield
+    except BaseException:
+        error = True
+        raise
+    finally:
+        _registrar_dependencia(componente, inicio, error)
+
+
+# ─── SQLAlchemy ──────────────────────────────────────────────────────────────
+
+def _antes_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    if _medicion.get() is not None:
+        context._inicio_medicion = time.perf_counter()
+
+
+def _despues_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    medicion = _medicion.get()
+    inicio = getattr(context, "_inicio_medicion", None)
+    if medicion is not None and inicio is not None:
+        medicion.registrar_sql(statement, (time.perf_counter() - inicio) * 1000)
+
+
+def instrumentar_engine(engine) -> None:
+    """Engancha el conteo de sentencias a un Engine o AsyncEngine."""
+    motor = getattr(engine, "sync_engine", engine)
+    event.listen(motor, "before_cursor_execute", _antes_de_ejecutar)
+    event.listen(motor, "after_cursor_execute", _despues_de_ejecutar)
+
+
+# ─── boto3 (S3) ──────────────────────────────────────────────────────────────
+
+def _antes_de_llamada_boto(context=None, **kwargs):
+    if context is not None:
+        context["_inicio_medicion"] = time.perf_counter()
+
+
+def _despues_de_llamada_boto(context=None, **kwargs):
+    inicio = (context or {}).pop("_inicio_medicion", None)
+    if inicio is not None:
+        _registrar_dependencia("s3", inicio, error=False)
+
+
+def _error_de_llamada_boto(context=None, **kwargs):
+    inicio = (context or {}).pop("_inicio_medicion", None)
+    if inicio is not None:
+        _registrar_dependencia("s3", inicio, error=True)
+
+
+def instrumentar_boto(cliente, servicio: str = "s3") -> None:
+    """Engancha la medición a las llamadas de red de un cliente boto3."""
+    eventos = cliente.meta.events
+    eventos.register(f"before-call.{servicio}", _antes_de_llamada_boto)
+    eventos.register(f"after-call.{servicio}", _despues_de_llamada_boto)
+    eventos.register(f"after-call-error.{servicio}", _error_de_llamada_boto)
+
+
+# ─── httpx (Graph, Siesa, IA) ────────────────────────────────────────────────
+
+class TransporteMedido(httpx.AsyncBaseTransport):
+    """Transporte httpx que suma cada ida y vuelta a `componente`.
+
+    Mide hasta recibir los headers; el cuerpo de una respuesta en streaming
+    (chat) se lee después y no cuenta.
+    """
+
+    def __init__(self, componente: str, transporte: Optional[httpx.AsyncBaseTransport] = None):
+        self.componente = componente
+        self._transporte = transporte or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        inicio = time.perf_counter()
+        try:
+            respuesta = await self._transporte.handle_async_request(request)
+        except BaseException:
+            _registrar_dependencia(self.componente, inicio, error=True)
+            raise
+        _registrar_dependencia(self.componente, inicio, error=respuesta.status_code >= 500)
+        return respuesta
+
+    async def aclose(self) -> None:
+        await self._transporte.aclose()
+
+
+def cliente_anthropic():
+    """AsyncAnthropic con el transporte medido como "ia"."""
+    from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient
+    from core.config import settings
+
+    return AsyncAnthropic(
+        api_key=settings.anthropic_api_key,
+        http_client=DefaultAsyncHttpxClient(transport=TransporteMedido("ia")),
+    )
@@ -0,0 +1,146 @@
+"""
+Métricas Prometheus expuestas en GET /metrics.
+
+- http_request_duration_seconds{metodo, ruta, status}: ruta es la PLANTILLA
+  (/api/v1/facturas/{factura_id}), no la URL, para no explotar las series.
+- db_pool_*{engine}: conexiones en uso, overflow, capacidad y espera por una
+  conexión de cada engine, primaria y réplica (pool_size=10, max_overflow=5 por
+  worker). Con esto se dimensiona
+  el pool y el número de workers: si db_pool_espera_seconds crece con el
+  pool lleno, faltan conexiones; si no, sobra pool.
+- dependencia_duracion_seconds / dependencia_errores_total{dependencia}:
+  s3, graph, siesa e ia; las alimenta core/instrumentacion.py.
+- cache_consultas_total{cache, resultado}: hit/miss de cada cache; el ratio
+  sale de la consulta en Prometheus.
+- event_loop_lag_*: retraso del event loop de cada worker (core/monitor_loop.py).
+
+Varios workers de uvicorn: si PROMETHEUS_MULTIPROC_DIR está definido ANTES de
+arrancar (ver deploy/contabilidadcq.service), cada worker escribe sus valores
+en ese directorio y /metrics los agrega con MultiProcessCollector, da igual
+qué worker atienda el scrape. Sin la variable (desarrollo) usa el registro del
+proceso.
+"""
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest,
+)
+from prometheus_client import multiprocess
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+DURACION_REQUEST = Histogram(
+    "http_request_duration_seconds",
+    "Duración de los requests por plantilla de ruta y status",
+    ["metodo", "ruta", "status"],
+)
+
+POOL_EN_USO = Gauge(
+    "db_pool_conexiones_en_uso", "Conexiones del pool prestadas a una sesión",
+    ["engine"],
+    multiprocess_mode="livesum",
+)
+POOL_OVERFLOW = Gauge(
+    "db_pool_overflow", "Conexiones abiertas por encima de pool_size",
+    ["engine"],
+    multiprocess_mode="livesum",
+)
+POOL_CAPACIDAD = Gauge(
+    "db_pool_capacidad", "pool_size + max_overflow de los workers vivos",
+    ["engine"],
+    multiprocess_mode="livesum",
+)
+POOL_ESPERA = Histogram(
+    "db_pool_espera_seconds", "Tiempo esperando una conexión libre del pool",
+    ["engine"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+POOL_TIMEOUTS = Counter(
+    "db_pool_timeouts_total", "Esperas por conexión que agotaron pool_timeout", ["engine"],
+)
+
+DURACION_DEPENDENCIA = Histogram(
+    "dependencia_duracion_seconds", "Latencia de las llamadas salientes",
+    ["dependencia"],
+)
+ERRORES_DEPENDENCIA = Counter(
+    "dependencia_errores_total", "Llamadas salientes fallidas (excepción o HTTP 5xx)",
+    ["dependencia"],
+)
+
+CONSULTAS_CACHE = Counter(
+    "cache_consultas_total", "Consultas a caches por resultado (hit/miss)",
+    ["cache", "resultado"],
+)
+
+LAG_LOOP = Histogram(
+    "event_loop_lag_seconds", "Retraso del event loop sobre el intervalo de muestreo",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+LAG_LOOP_PERCENTIL = Gauge(
+    "event_loop_lag_percentil_seconds", "Percentiles del lag en la ventana reciente (peor worker)",
+    ["percentil"],
+    multiprocess_mode="max",
+)
+BLOQUEOS_LOOP = Counter(
+    "event_loop_bloqueos_total", "Callbacks que bloquearon el loop más del umbral (modo debug)",
+)
+
+
+def observar_dependencia(dependencia: str, segundos: float, error: bool = False) -> None:
+    DURACION_DEPENDENCIA.labels(dependencia).observe(segundos)
+    if error:
+        ERRORES_DEPENDENCIA.labels(dependencia).inc()
+
+
+def contar_cache(cache: str, hit: bool) -> None:
+    CONSULTAS_CACHE.labels(cache, "hit" if hit else "miss").inc()
+
+
+class PoolMedido(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool que publica uso, overflow y espera por conexión.
+
+    El label `engine` sale de pool_logging_name (create_async_engine).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._engine = self._orig_logging_name or "primaria"
+        POOL_CAPACIDAD.labels(self._engine).set(self.size() + self._max_overflow)
+
+    def _publicar(self) -> None:
+        POOL_EN_USO.labels(self._engine).set(self.checkedout())
+        POOL_OVERFLOW.labels(self._engine).set(max(self.overflow(), 0))
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexion = super()._do_get()
+        except PoolTimeoutError:
+            POOL_TIMEOUTS.labels(self._engine).inc()
+            raise
+        finally:
+            POOL_ESPERA.labels(self._engine).observe(time.perf_counter() - inicio)
+        self._publicar()
+        return conexion
+
+    def _do_return_conn(self, record) -> None:
+        super()._do_return_conn(record)
+        self._publicar()
+
+
+def exportar() -> tuple[bytes, str]:
+    """Cuerpo y content-type de /metrics; agrega los workers si hay directorio multiproceso."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registro = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+    else:
+        registro = REGISTRY
+    return generate_latest(registro), CONTENT_TYPE_LATEST
+
+
+def marcar_worker_terminado() -> None:
+    """Al apagar un worker: sus gauges livesum dejan de sumar."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(os.getpid())
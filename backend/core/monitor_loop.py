@@ -0,0 +1,122 @@
+"""
+Monitor del event loop: lag y detector de llamadas bloqueantes.
+
+Hay trabajo síncrono que corre en el event loop (presigns de boto3, bcrypt en
+el login, openpyxl en exportar_plano_xlsx, base64 de PDFs grandes para la IA).
+Mientras corre, ningún otro request del worker avanza, y solo se notaba como
+lentitud en requests que no tenían nada que ver.
+
+- Lag: la tarea duerme `intervalo` y mide cuánto tarde despierta. Cada
+  muestra va al histograma event_loop_lag_seconds y, cada tanto, los
+  percentiles p50/p90/p99 de la ventana reciente a event_loop_lag_percentil_seconds.
+- Bloqueos (solo con DEBUG): un hilo vigía revisa el latido de la tarea; si el
+  loop lleva más de `umbral` sin latir, toma el stack del hilo del loop en ese
+  momento (la llamada culpable sigue ahí) y lo loggea con la ruta del request
+  que la está ejecutando. Un bloqueo se reporta una sola vez.
+"""
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Optional
+
+from core.config import settings
+from core.logging import logger
+from core.metricas import BLOQUEOS_LOOP, LAG_LOOP, LAG_LOOP_PERCENTIL
+
+PERCENTILES = (50, 90, 99)
+VENTANA_MUESTRAS = 1200          # ~2 min con el intervalo por defecto
+MUESTRAS_ENTRE_PERCENTILES = 50
+PROFUNDIDAD_STACK = 15
+
+
+def percentiles(muestras, cuales=PERCENTILES) -> dict[int, float]:
+    """Percentiles por rango más cercano de una ventana de muestras."""
+    ordenadas = sorted(muestras)
+    if not ordenadas:
+        return {p: 0.0 for p in cuales}
+    n = len(ordenadas)
+    return {p: ordenadas[min(n - 1, max(0, -(-p * n // 100) - 1))] for p in cuales}
+
+
+def ruta_en_stack(frame) -> Optional[str]:
+    """Ruta del request dueño del stack: el primer `scope` HTTP de ASGI hacia arriba."""
+    while frame is not None:
+        scope = frame.f_locals.get("scope")
+        if isinstance(scope, dict) and scope.get("type") == "http":
+            plantilla = getattr(scope.get("route"), "path", None) or scope.get("path", "?")
+            return f"{scope.get('method', '')} {plantilla}".strip()
+        frame = frame.f_back
+    return None
+
+
+class _Vigia(threading.Thread):
+    """Hilo que detecta cuándo el loop deja de latir y captura su stack."""
+
+    def __init__(self, hilo_loop: int, intervalo: float, umbral: float):
+        super().__init__(name="vigia-event-loop", daemon=True)
+        self.hilo_loop = hilo_loop
+        self.intervalo = intervalo
+        self.umbral = umbral
+        self.latido = time.perf_counter()
+        self.detener = threading.Event()
+        self._reportado: Optional[float] = None
+
+    def run(self) -> None:
+        while not self.detener.wait(self.umbral / 2):
+            latido = self.latido
+            # El latido llega cada `intervalo`: lo que pase de ahí es bloqueo
+            bloqueado = time.perf_counter() - latido - self.intervalo
+            if bloqueado < self.umbral or self._reportado == latido:
+                continue
+            self._reportado = latido
+            frame = sys._current_frames().get(self.hilo_loop)
+            if frame is None:
+                continue
+            BLOQUEOS_LOOP.inc()
+            stack = "".join(traceback.format_stack(frame)[-PROFUNDIDAD_STACK:])
+            logger.warning(
+                f"Event loop bloqueado ≥{bloqueado * 1000:.0f}ms en "
+                f"{ruta_en_stack(frame) or 'tarea de fondo'}:\n{stack}"
+            )
+
+
+async def ciclo_monitor_loop(
+    intervalo: Optional[float] = None,
+    umbral_bloqueo: Optional[float] = None,
+    detectar_bloqueos: Optional[bool] = None,
+) -> None:
+    """Tarea de fondo por worker: muestrea el lag y, en debug, vigila bloqueos."""
+    intervalo = intervalo or settings.loop_lag_intervalo_ms / 1000
+    umbral_bloqueo = umbral_bloqueo or settings.loop_bloqueo_umbral_ms / 1000
+    if detectar_bloqueos is None:
+        detectar_bloqueos = settings.debug
+
+    vigia = None
+    if detectar_bloqueos:
+        vigia = _Vigia(threading.get_ident(), intervalo, umbral_bloqueo)
+        vigia.start()
+    ventana: deque = deque(maxlen=VENTANA_MUESTRAS)
+    muestras = 0
+    try:
+        while True:
+            esperado = time.perf_counter() + intervalo
+            await asyncio.sleep(intervalo)
+            ahora = time.perf_counter()
+            if vigia is not None:
+                vigia.latido = ahora
+            lag = max(0.0, ahora - esperado)
+            LAG_LOOP.observe(lag)
+            ventana.append(lag)
+            muestras += 1
+            if muestras % MUESTRAS_ENTRE_PERCENTILES == 0:
+                for p, valor in percentiles(ventana).items():
+                    LAG_LOOP_PERCENTIL.labels(f"p{p}").set(valor)
+    except asyncio.CancelledError:
+        logger.info("Monitor del event loop detenido.")
+        raise
+    finally:
+        if vigia is not None:
+            vigia.detener.set()
@@ -6,82 +6,117 @@ Valores de keyword: "cedi", "tiendas", "marketing", "mantenimiento", "compras",
 - Lista de un elemento  → asignación directa (confianza alta si el área existe)
 - Lista de múltiples   → requiere confirmación humana (confianza media)
 - "tiendas"            → se intenta resolver por ciudad/dirección del XML
+
+La tabla vive en Postgres (`proveedores_responsables`, CRUD en
+/proveedores-responsables) y NO se consulta en cada ingesta: cada worker de
+uvicorn la mantiene en un índice en memoria con clave = NIT normalizado. Un
+trigger de la tabla hace `pg_notify` en cada cambio y `escuchar_cambios` (tarea
+de fondo del startup) recarga el índice sin reiniciar el worker. Así agregar un
+proveedor ya no exige un deploy y la consulta en la ingesta sigue siendo O(1).
 """
 from typing import Optional
 
-# NIT → lista de keywords de responsable (en orden de preferencia)
-_NIT_RESPONSABLE: dict[str, list[str]] = {
-    "901761363":    ["cedi"],
-    "901373083":    ["cedi"],
-    "890928257":    ["cedi"],
-    "860000996":    ["cedi"],
-    "900080634":    ["cedi", "marketing"],
-    "900040299":    ["tiendas", "cedi"],
-    "900718257":    ["cedi"],
-    "900277192":    ["cedi"],
-    "901731328":    ["cedi"],
-    "860530547":    ["cedi"],
-    "860016767":    ["cedi"],
-    "91440300MA5EM":["cedi"],
-    "900083863":    ["cedi"],
-    "800245795":    ["cedi"],
-    "890904478":    ["cedi", "tiendas"],
-    "890800718":    ["cedi"],
-    "800045797":    ["cedi"],
-    "901037119":    ["cedi"],
-    "LU24640654":   ["cedi"],
-    "860028580":    ["cedi"],
-    "800250778":    ["cedi"],
-    "860006127":    ["cedi"],
-    "890900608":    ["cedi", "tiendas", "comercial"],
-    "805016704":    ["cedi"],
-    "901534331":    ["cedi"],
-    "900529276":    ["cedi"],
-    "860007538":    ["cedi"],
-    "860002063":    ["cedi"],
-    "900438907":    ["tiendas"],
-    "890900424":    ["cedi"],
-    "891300241":    ["cedi"],
-    "901026869":    ["cedi", "tiendas"],
-    "901235670":    ["cedi", "tiendas"],
-    "860007955":    ["cedi"],
-    "900833934":    ["cedi", "tiendas"],
-    "890916575":    ["cedi", "tiendas"],
-    "900618834":    ["cedi"],
-    "860004922":    ["cedi"],
-    "1193389919":   ["cedi"],
-    "900973989":    ["cedi"],
-    "891903392":    ["cedi"],
-    "900813998":    ["mantenimiento", "compras", "cedi"],
-    "860524896":    ["cedi"],
-    "900208583":    ["cedi", "tiendas"],
-    "811006722":    ["cedi"],
-    "901597547":    ["cedi", "tiendas"],
-    "901554982":    ["cedi", "tiendas"],
-}
-
-# Set de NITs para consulta rápida de pertenencia
-NITS_CONOCIDOS: frozenset[str] = frozenset(_NIT_RESPONSABLE.keys())
-
-
-def _normalizar_nit(nit: str) -> str:
-    return nit.strip().replace("-", "").replace(" ", "").upper()
+from core.logging import logger
+
+# Canal de LISTEN/NOTIFY (lo emite el trigger de la migración a7b8c9d0e1f2)
+CANAL_CAMBIOS = "proveedores_responsables_cambio"
+
+# Keywords que sabe resolver _resolver_responsables_nit (modules/facturas/ingesta.py)
+KEYWORDS_VALIDOS: frozenset[str] = frozenset({
+    "cedi", "tiendas", "marketing", "mantenimiento", "compras", "comercial", "restaurante",
+})
+
+# NIT normalizado → lista de keywords de responsable (en orden de preferencia).
+# Se REEMPLAZA completo en cada recarga (nunca se muta en sitio): una ingesta
+# concurrente ve el índice viejo o el nuevo, jamás uno a medio construir.
+_indice: dict[str, list[str]] = {}
+
+
+def normalizar_nit(nit: str) -> str:
+    """NIT sin DV (lo que va antes del guion), sin puntos ni espacios.
+
+    Única normalización de NIT del backend: la usan este índice, la tabla
+    proveedores_responsables y la ingesta (ver NIT_NORMALIZADO_SQL en
+    modules/facturas/ingesta.py, que la repite en SQL).
+    """
+    return nit.strip().split("-")[0].replace(".", "").replace(" ", "").upper()
+
+
+def construir_indice(filas) -> dict[str, list[str]]:
+    """Arma el índice desde filas (nit, responsables). Normaliza una sola vez, al cargar."""
+    indice: dict[str, list[str]] = {}
+    for nit, responsables in filas:
+        if not nit or not responsables:
+            continue
+        indice[normalizar_nit(nit)] = list(responsables)
+    return indice
+
+
+def reemplazar_indice(indice: dict[str, list[str]]) -> None:
+    """Publica un índice nuevo de forma atómica (una sola asignación)."""
+    global _indice
+    _indice = indice
+
+
+async def cargar_indice(db=None) -> int:
+    """Recarga el índice desde la tabla (solo filas activas). Devuelve cuántos NITs quedaron."""
+    from sqlalchemy import select
+    from db.models import ProveedorResponsable
+
+    async def _leer(session):
+        result = await session.execute(
+            select(ProveedorResponsable.nit, ProveedorResponsable.responsables)
+            .where(ProveedorResponsable.activo.is_(True))
+        )
+        return result.all()
+
+    if db is not None:
+        filas = await _leer(db)
+    else:
+        from db.session import AsyncSessionLocal
+        async with AsyncSessionLocal() as session:
+            filas = await _leer(session)
+
+    reemplazar_indice(construir_indice(filas))
+    logger.info(f"Índice NIT→responsable cargado: {len(_indice)} proveedores.")
+    return len(_indice)
+
+
+async def escuchar_cambios() -> None:
+    """Tarea de fondo: LISTEN sobre el canal del trigger y recarga ante cada cambio.
+
+    Conexión dedicada de core/escucha_pg.py (fuera del pool: LISTEN necesita la
+    conexión viva todo el tiempo; detecta caídas y reconecta). Al (re)conectar
+    siempre recarga, para no perder cambios ocurridos mientras la escucha estuvo
+    caída. Varias notificaciones seguidas (p. ej. un import masivo) se funden en
+    una sola recarga.
+    """
+    from core.escucha_pg import escuchar_canal
+
+    async def _recargar(*_):
+        await cargar_indice()
+
+    await escuchar_canal(CANAL_CAMBIOS, _recargar, _recargar, "cambios de proveedores_responsables")
+
+
+def nits_conocidos() -> frozenset[str]:
+    """NITs (normalizados) presentes hoy en el índice."""
+    return frozenset(_indice.keys())
 
 
 def get_responsables_por_nit(nit: str) -> Optional[list[str]]:
     """
     Retorna la lista de keywords de responsable para el NIT dado, o None si no está en la tabla.
-    Normaliza el NIT removiendo guiones/espacios antes de buscar.
+    Normaliza el NIT (normalizar_nit) antes de buscar.
     """
     if not nit:
         return None
-    nit_norm = _normalizar_nit(nit)
-    # Intentar con el NIT tal cual (ya normalizado) y también sin ceros a la izquierda
-    resultado = _NIT_RESPONSABLE.get(nit_norm)
+    nit_norm = normalizar_nit(nit)
+    indice = _indice
+    resultado = indice.get(nit_norm)
     if resultado is None:
-        # Algunos NITs en BD pueden venir con formato distinto (ej. con dígito verificación)
-        # Intentar sin el último dígito si es un NIT colombiano largo
-        resultado = _NIT_RESPONSABLE.get(nit_norm.lstrip("0"))
+        # Algunos NITs pueden venir con formato distinto (ceros a la izquierda)
+        resultado = indice.get(nit_norm.lstrip("0"))
     return resultado
 
 
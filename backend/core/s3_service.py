@@ -8,6 +8,7 @@ from botocore.exceptions import ClientError, NoCredentialsError
 from typing import BinaryIO, Optional
 from core.config import settings
 from core.logging import logger
+from core.instrumentacion import instrumentar_boto
 from fastapi import HTTPException, status
 
 
@@ -30,6 +31,7 @@ class S3Service:
                 region_name=settings.aws_region,
                 config=s3_config
             )
+            instrumentar_boto(self.s3_client)
             self.bucket = settings.s3_bucket
             logger.info(f"S3Service inicializado: bucket={self.bucket}, region={settings.aws_region}")
         except NoCredentialsError:
@@ -0,0 +1,106 @@
+"""
+Tareas de fondo programadas y su versión a demanda desde backend/scripts.
+
+Cada worker de uvicorn corre sus tareas (startup de main.py). Las que son "un
+trabajo sobre la BD cada cierto tiempo" comparten este esqueleto:
+
+- ciclo_diario: todos los días a una hora local (Colombia).
+- ciclo_periodico: cada N minutos.
+
+Las dos corren `trabajo(db)` en una sesión propia (rollback si falla), loggean
+el resumen y, ante un error, lo loggean y esperan ESPERA_ERROR_S antes de
+recalcular, para no ciclar en caliente. Corren en los dos workers: cada trabajo
+debe tolerar correr dos veces (ver el docstring de cada módulo).
+
+correr_script es el main() de los scripts que corren lo mismo a mano.
+"""
+import argparse
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.logging import logger
+
+# Colombia no tiene horario de verano: offset fijo UTC-5
+TZ_BOGOTA = timezone(timedelta(hours=-5))
+
+ESPERA_ERROR_S = 300
+
+Trabajo = Callable[[AsyncSession], Awaitable[Any]]
+Resumen = Callable[[Any], Optional[str]]
+
+
+def segundos_hasta(hora_local: int) -> float:
+    """Segundos hasta las próximas `hora_local`:00 en hora Colombia."""
+    ahora_local = datetime.now(tz=TZ_BOGOTA)
+    proxima = ahora_local.replace(hour=hora_local, minute=0, second=0, microsecond=0)
+    if proxima <= ahora_local:
+        proxima += timedelta(days=1)
+    return (proxima - ahora_local).total_seconds()
+
+
+async def _ciclo(espera: Callable[[], float], trabajo: Trabajo, nombre: str, resumen: Optional[Resumen]) -> None:
+    from db.session import AsyncSessionLocal
+
+    while True:
+        try:
+            await asyncio.sleep(espera())
+            async with AsyncSessionLocal() as db:
+                try:
+                    resultado = await trabajo(db)
+                except Exception:
+                    await db.rollback()
+                    raise
+            mensaje = resumen(resultado) if resumen else None
+            if mensaje:
+                logger.info(f"{nombre}: {mensaje}")
+        except asyncio.CancelledError:
+            logger.info(f"Tarea de fondo detenida: {nombre}.")
+            raise
+        except Exception as e:
+            logger.error(f"Error en {nombre}: {e}")
+            await asyncio.sleep(ESPERA_ERROR_S)
+
+
+async def ciclo_diario(hora_local: int, trabajo: Trabajo, nombre: str, resumen: Optional[Resumen] = None) -> None:
+    """Corre `trabajo` todos los días a las `hora_local`:00 (Colombia). `resumen(resultado)` va al log."""
+    logger.info(f"Tarea de fondo iniciada: {nombre} (diario {hora_local}:00 hora Colombia).")
+    await _ciclo(lambda: segundos_hasta(hora_local), trabajo, nombre, resumen)
+
+
+async def ciclo_periodico(minutos: float, trabajo: Trabajo, nombre: str, resumen: Optional[Resumen] = None) -> None:
+    """Corre `trabajo` cada `minutos` (el primero, `minutos` después del arranque)."""
+    logger.info(f"Tarea de fondo iniciada: {nombre} (cada {minutos} min).")
+    await _ciclo(lambda: minutos * 60, trabajo, nombre, resumen)
+
+
+def correr_script(
+    descripcion: str,
+    trabajo: Callable[[AsyncSession, argparse.Namespace], Awaitable[Any]],
+    mostrar: Callable[[Any, argparse.Namespace], None],
+    opciones: Optional[Callable[[argparse.ArgumentParser], None]] = None,
+    dry_run: bool = False,
+) -> None:
+    """main() de un script: parsea argumentos, corre `trabajo(db, args)` y muestra el resultado.
+
+    `opciones` agrega argumentos al parser; con `dry_run` se agrega --dry-run y
+    el aviso de que no se escribió nada.
+    """
+    parser = argparse.ArgumentParser(description=descripcion, formatter_class=argparse.RawDescriptionHelpFormatter)
+    if dry_run:
+        parser.add_argument("--dry-run", action="store_true", help="Reporta sin corregir")
+    if opciones:
+        opciones(parser)
+    args = parser.parse_args()
+
+    async def _correr():
+        from db.session import AsyncSessionLocal
+
+        async with AsyncSessionLocal() as db:
+            return await trabajo(db, args)
+
+    mostrar(asyncio.run(_correr()), args)
+    if dry_run and args.dry_run:
+        print("DRY RUN: no se escribió nada.")
@@ -0,0 +1,101 @@
+"""
+GET condicionales (ETag / If-None-Match → 304) para catálogos y listados.
+
+Los catálogos y las bandejas se piden en cada pantalla y casi nunca cambian
+entre dos pedidos del mismo navegador. Cada endpoint declara de qué tablas sale
+su respuesta:
+
+    @router.get("/", dependencies=[Depends(respuesta_condicional("areas"))])
+
+y la dependencia, ANTES de la query principal, lee la versión de esas tablas
+(versiones_datos, mantenida por trigger: ver VersionDatos en db/models.py) con
+una sola consulta por PK. El ETag es un hash de esa versión + ruta + query
+string + versión de la app. Si coincide con If-None-Match, se corta con
+NoModificado y main.py responde 304 sin cuerpo: no corre la query, ni la
+serialización, ni el gzip. Si no, la respuesta normal sale con el ETag y el
+Cache-Control.
+
+La versión se lee en la misma sesión (y réplica) que los datos y antes que
+ellos, y el contador es transaccional: en el peor caso el ETag queda más viejo
+que el cuerpo y el siguiente pedido trae un 200 de más, nunca un 304 con datos
+viejos.
+
+Solo para respuestas que no dependen del usuario: si un endpoint filtra por
+rol o área, su alcance tiene que entrar en la clave.
+"""
+import hashlib
+from typing import Optional
+
+from fastapi import Depends, Request, Response
+from sqlalchemy import bindparam, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from core.metricas import contar_cache
+from db.models import VersionDatos
+from db.session import get_read_db
+
+# Sin max-age: el navegador guarda la respuesta pero revalida siempre (barato con 304)
+CACHE_CONTROL = "private, no-cache"
+
+VERSIONES = (
+    select(VersionDatos.tabla, func.sum(VersionDatos.version))
+    .where(VersionDatos.tabla.in_(bindparam("tablas", expanding=True)))
+    .group_by(VersionDatos.tabla)
+)
+
+
+class NoModificado(Exception):
+    """El cliente ya tiene la versión actual; main.py la convierte en 304."""
+
+    def __init__(self, etag: str, cache_control: str):
+        self.etag = etag
+        self.cache_control = cache_control
+
+
+async def leer_versiones(db: AsyncSession, tablas: tuple[str, ...]) -> dict[str, int]:
+    """Versión de cada tabla (0 si nunca se escribió desde la migración)."""
+    result = await db.execute(VERSIONES, {"tablas": list(tablas)})
+    versiones = {tabla: int(version or 0) for tabla, version in result.all()}
+    return {tabla: versiones.get(tabla, 0) for tabla in tablas}
+
+
+def calcular_etag(request: Request, versiones: dict[str, int]) -> str:
+    """ETag débil: el mismo JSON puede salir con o sin gzip."""
+    query = "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+    tablas = ",".join(f"{tabla}:{version}" for tabla, version in sorted(versiones.items()))
+    clave = f"{settings.app_version}|{request.url.path}?{query}|{tablas}"
+    return f'W/"{hashlib.sha1(clave.encode()).hexdigest()[:20]}"'
+
+
+def etag_coincide(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match admite varios ETag separados por coma y '*'."""
+    if not if_none_match:
+        return False
+    candidatos = {c.strip() for c in if_none_match.split(",")}
+    # Comparación débil: W/"x" y "x" son el mismo
+    return "*" in candidatos or etag in candidatos or etag[2:] in candidatos
+
+
+def respuesta_condicional(*tablas: str, cache_control: str = CACHE_CONTROL):
+    """Dependencia de ruta para un GET cuya respuesta sale de `tablas`."""
+
+    async def _verificar(
+        request: Request,
+        response: Response,
+        db: AsyncSession = Depends(get_read_db),
+    ) -> str:
+        etag = calcular_etag(request, await leer_versiones(db, tablas))
+        if etag_coincide(request.headers.get("if-none-match"), etag):
+            contar_cache("etag", True)
+            raise NoModificado(etag, cache_control)
+        contar_cache("etag", False)
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = cache_control
+        return etag
+
+    return _verificar
+
+
+def responder_no_modificado(exc: NoModificado) -> Response:
+    return Response(status_code=304, headers={"ETag": exc.etag, "Cache-Control": exc.cache_control})
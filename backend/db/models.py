@@ -4,7 +4,8 @@ Incluye: Areas, Users, Estados, Facturas y Files.
 """
 from sqlalchemy import (
     String, Text, Boolean, Numeric, Date, BigInteger, SmallInteger,
-    ForeignKey, Index, UniqueConstraint, CheckConstraint, Enum
+    ForeignKey, ForeignKeyConstraint, Index, UniqueConstraint, CheckConstraint, Enum,
+    LargeBinary, text
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.dialects.postgresql import UUID, TIMESTAMP, JSONB
@@ -399,27 +400,28 @@ class Carpeta(Base, TimestampMixin):
     )
     
     # Relaciones
+    # raise_on_sql: el padre de una subcarpeta ya cargada sale del identity map
     parent: Mapped[Optional["Carpeta"]] = relationship(
         "Carpeta",
         remote_side="Carpeta.id",
         back_populates="children",
-        lazy="selectin"
+        lazy="raise_on_sql"
     )
     children: Mapped[List["Carpeta"]] = relationship(
         "Carpeta",
         back_populates="parent",
-        lazy="selectin",
+        lazy="raise",
         cascade="all, delete-orphan"
     )
     factura: Mapped[Optional["Factura"]] = relationship(
         "Factura",
         foreign_keys=[factura_id],
-        lazy="selectin"
+        lazy="raise"
     )
     facturas: Mapped[List["Factura"]] = relationship(
         "Factura",
         foreign_keys="Factura.carpeta_id",
-        lazy="selectin",
+        lazy="raise",
         viewonly=True
     )
     
@@ -466,27 +468,28 @@ class CarpetaTesoreria(Base, TimestampMixin):
     )
     
     # Relaciones
+    # raise_on_sql: el padre de una subcarpeta ya cargada sale del identity map
     parent: Mapped[Optional["CarpetaTesoreria"]] = relationship(
         "CarpetaTesoreria",
         remote_side="CarpetaTesoreria.id",
         back_populates="children",
-        lazy="selectin"
+        lazy="raise_on_sql"
     )
     children: Mapped[List["CarpetaTesoreria"]] = relationship(
         "CarpetaTesoreria",
         back_populates="parent",
-        lazy="selectin",
+        lazy="raise",
         cascade="all, delete-orphan"
     )
     factura: Mapped[Optional["Factura"]] = relationship(
         "Factura",
         foreign_keys=[factura_id],
-        lazy="selectin"
+        lazy="raise"
     )
     facturas: Mapped[List["Factura"]] = relationship(
         "Factura",
         foreign_keys="Factura.carpeta_tesoreria_id",
-        lazy="selectin",
+        lazy="raise",
         viewonly=True
     )
     
@@ -494,6 +497,87 @@ class CarpetaTesoreria(Base, TimestampMixin):
         return f"<CarpetaTesoreria(id={self.id}, nombre={self.nombre})>"
 
 
+class CarpetaTesoreriaStats(Base):
+    """
+    Agregados de las facturas archivadas DIRECTAMENTE en cada carpeta de tesorería.
+
+    Los mantiene por deltas el trigger de facturas de la migración b5c6d7e8f9a0
+    (INSERT, DELETE y UPDATE de carpeta_tesoreria_id, total o estado_id): lo
+    cubren asignar_carpeta_tesoreria(_masivo), close_tesoreria, la devolución
+    de un pago y cualquier otro cambio de estado, vengan del ORM o de un UPDATE
+    masivo. La grilla de carpetas se lee de aquí con un join por PK, sin
+    recorrer las facturas. Pagada = estado_id 5, como en close_tesoreria.
+    """
+    __tablename__ = "carpeta_tesoreria_stats"
+
+    carpeta_tesoreria_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("carpetas_tesoreria.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    n_facturas: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    total: Mapped[float] = mapped_column(Numeric(16, 2), nullable=False, default=0)
+    n_pagadas: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    n_pendientes: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    ultima_actividad: Mapped[Optional[datetime]] = mapped_column(
+        TIMESTAMP(timezone=True),
+        nullable=True
+    )
+
+    def __repr__(self):
+        return (
+            f"<CarpetaTesoreriaStats(carpeta_tesoreria_id={self.carpeta_tesoreria_id}, "
+            f"n_facturas={self.n_facturas}, total={self.total})>"
+        )
+
+
+class FacturaCounter(Base):
+    """
+    Cantidad, suma de total y created_at más antiguo de las facturas por
+    (área, estado). Área NULL = facturas sin área.
+
+    La mantiene el trigger de facturas de la migración f9a0b1c2d3e4 por deltas
+    (resta de la clave vieja, suma en la nueva) en la misma transacción de cada
+    alta, baja, cambio de estado o de área y edición del total, venga del ORM,
+    de un UPDATE masivo o de un script. Las métricas del dashboard, el conteo
+    por área y las represadas por tienda se leen de aquí en O(áreas × estados).
+    modules/dashboard/contadores.py la reconcilia cada noche contra facturas.
+    """
+    __tablename__ = "factura_counters"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    area_id: Mapped[Optional[uuid.UUID]] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("areas.id", ondelete="CASCADE"),
+        nullable=True
+    )
+    estado_id: Mapped[int] = mapped_column(
+        SmallInteger,
+        ForeignKey("estados.id", ondelete="CASCADE"),
+        nullable=False
+    )
+    n_facturas: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    total: Mapped[float] = mapped_column(Numeric(16, 2), nullable=False, default=0)
+    mas_antigua: Mapped[Optional[datetime]] = mapped_column(
+        TIMESTAMP(timezone=True),
+        nullable=True
+    )
+
+    __table_args__ = (
+        # Árbitro del INSERT ... ON CONFLICT del trigger: una fila por (estado, área)
+        # contando el área NULL como una más
+        Index(
+            "uq_factura_counters_estado_area",
+            "estado_id",
+            text("coalesce(area_id, '00000000-0000-0000-0000-000000000000'::uuid)"),
+            unique=True,
+        ),
+    )
+
+    def __repr__(self):
+        return f"<FacturaCounter(area_id={self.area_id}, estado_id={self.estado_id}, n_facturas={self.n_facturas})>"
+
+
 class Factura(Base, TimestampMixin):
     """Modelo de facturas del sistema."""
     __tablename__ = "facturas"
@@ -722,97 +806,97 @@ class Factura(Base, TimestampMixin):
     aprobado_calidad_nombre: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     aprobado_calidad_email: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
 
-    # Relaciones
+    # Relaciones: lazy="raise", se cargan con un perfil de db/perfiles_carga.py
     area: Mapped["Area"] = relationship(
         "Area",
         foreign_keys=[area_id],
         back_populates="facturas",
-        lazy="selectin"
+        lazy="raise"
     )
     area_origen: Mapped[Optional["Area"]] = relationship(
         "Area",
         foreign_keys=[area_origen_id],
-        lazy="selectin"
+        lazy="raise"
     )
     estado: Mapped["Estado"] = relationship(
         "Estado",
         back_populates="facturas",
-        lazy="selectin"
+        lazy="raise"
     )
     assigned_user: Mapped[Optional["User"]] = relationship(
         "User",
         back_populates="facturas_asignadas",
         foreign_keys=[assigned_to_user_id],
-        lazy="selectin"
+        lazy="raise"
     )
     files: Mapped[List["File"]] = relationship(
         "File",
         back_populates="factura",
         cascade="all, delete-orphan",
-        lazy="selectin"
+        lazy="raise"
     )
     asignaciones: Mapped[List["FacturaAsignacion"]] = relationship(
         "FacturaAsignacion",
         back_populates="factura",
         cascade="all, delete-orphan",
-        lazy="selectin"
+        lazy="raise"
     )
     centro_costo: Mapped[Optional["CentroCosto"]] = relationship(
         "CentroCosto",
         back_populates="facturas",
         foreign_keys=[centro_costo_id],
-        lazy="selectin"
+        lazy="raise"
     )
     centro_operacion: Mapped[Optional["CentroOperacion"]] = relationship(
         "CentroOperacion",
         back_populates="facturas",
         foreign_keys=[centro_operacion_id],
-        lazy="selectin"
+        lazy="raise"
     )
     inventario_codigos: Mapped[List["FacturaInventarioCodigo"]] = relationship(
         "FacturaInventarioCodigo",
         back_populates="factura",
         cascade="all, delete-orphan",
-        lazy="selectin"
+        lazy="raise"
     )
     distribucion_ccco: Mapped[List["FacturaDistribucionCCCO"]] = relationship(
         "FacturaDistribucionCCCO",
         back_populates="factura",
         cascade="all, delete-orphan",
-        lazy="selectin"
+        lazy="raise"
     )
     comentarios: Mapped[List["ComentarioFactura"]] = relationship(
         "ComentarioFactura",
         back_populates="factura",
         cascade="all, delete-orphan",
-        lazy="selectin",
+        lazy="raise",
         order_by="ComentarioFactura.created_at.desc()"
     )
     tokens_aprobacion: Mapped[List["TokenAprobacionFactura"]] = relationship(
         "TokenAprobacionFactura",
         back_populates="factura",
         cascade="all, delete-orphan",
-        lazy="selectin",
+        lazy="raise",
     )
     carpeta: Mapped[Optional["Carpeta"]] = relationship(
         "Carpeta",
         foreign_keys=[carpeta_id],
-        lazy="selectin"
+        lazy="raise"
     )
     carpeta_tesoreria: Mapped[Optional["CarpetaTesoreria"]] = relationship(
         "CarpetaTesoreria",
         foreign_keys=[carpeta_tesoreria_id],
-        lazy="selectin"
+        lazy="raise"
     )
     unidad_negocio: Mapped[Optional["UnidadNegocio"]] = relationship(
         "UnidadNegocio",
         foreign_keys=[unidad_negocio_id],
-        lazy="selectin"
+        lazy="raise"
     )
     cuenta_auxiliar: Mapped[Optional["CuentaAuxiliar"]] = relationship(
         "CuentaAuxiliar",
         foreign_keys=[cuenta_auxiliar_id],
-        lazy="selectin"
+        lazy="raise"
     )
     
     # Constraints e índices
@@ -822,7 +906,20 @@ class Factura(Base, TimestampMixin):
             "numero_factura",
             name="uq_factura_proveedor_numero"
         ),
-        Index("ix_facturas_estado_area", "estado_id", "area_id"),
+        # Árbitro del INSERT ... ON CONFLICT de la ingesta XML
+        # (modules/facturas/ingesta.py). Mismas expresiones, mismo orden.
+        Index(
+            "uq_facturas_nit_numero_norm",
+            text("upper(replace(replace(split_part(btrim(nit_proveedor), '-', 1), '.', ''), ' ', ''))"),
+            text("upper(btrim(numero_factura))"),
+            unique=True,
+            postgresql_where=text("nit_proveedor IS NOT NULL"),
+        ),
+        # También da el created_at más antiguo de un (estado, área) para
+        # factura_counters sin recorrer el grupo
+        Index("ix_facturas_estado_area_creada", "estado_id", "area_id", "created_at"),
+        # Feed de cambios de las bandejas (GET /facturas/changes)
+        Index("ix_facturas_updated_at", "updated_at"),
         CheckConstraint("total > 0", name="check_factura_total_positive"),
         CheckConstraint(
             "requiere_entrada_inventarios = false OR destino_inventarios IS NOT NULL",
@@ -881,11 +978,11 @@ class File(Base, TimestampMixin):
     factura: Mapped["Factura"] = relationship(
         "Factura",
         back_populates="files",
-        lazy="selectin"
+        lazy="raise"
     )
     uploaded_by: Mapped[Optional["User"]] = relationship(
         "User",
-        lazy="selectin"
+        lazy="raise"
     )
     
     # Constraints
@@ -1029,6 +1126,29 @@ class FacturaMovimiento(Base):
         )
 
 
+class FacturaEliminada(Base):
+    """Lápida de una factura borrada, para el feed de cambios de las bandejas.
+
+    GET /facturas/changes informa lo que cambió desde un cursor; una factura
+    borrada ya no tiene fila en `facturas` que lo diga. Se guarda solo el id y
+    cuándo; las lápidas más viejas que la retención del feed se purgan al
+    borrar (un cursor más viejo que eso recibe reset).
+    """
+    __tablename__ = "facturas_eliminadas"
+
+    # Sin FK: la factura ya no existe
+    factura_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    eliminada_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True),
+        default=datetime.utcnow,
+        nullable=False,
+        index=True
+    )
+
+    def __repr__(self):
+        return f"<FacturaEliminada(factura_id={self.factura_id}, eliminada_at={self.eliminada_at})>"
+
+
 class FacturaInventarioCodigo(Base):
     """Modelo para códigos de inventario asociados a facturas."""
     __tablename__ = "factura_inventario_codigos"
@@ -1129,23 +1249,23 @@ class FacturaDistribucionCCCO(Base, TimestampMixin):
     factura: Mapped["Factura"] = relationship(
         "Factura",
         back_populates="distribucion_ccco",
-        lazy="selectin"
+        lazy="raise"
     )
     centro_costo: Mapped["CentroCosto"] = relationship(
         "CentroCosto",
-        lazy="selectin"
+        lazy="raise"
     )
     centro_operacion: Mapped["CentroOperacion"] = relationship(
         "CentroOperacion",
-        lazy="selectin"
+        lazy="raise"
     )
     unidad_negocio: Mapped[Optional["UnidadNegocio"]] = relationship(
         "UnidadNegocio",
-        lazy="selectin"
+        lazy="raise"
     )
     cuenta_auxiliar: Mapped[Optional["CuentaAuxiliar"]] = relationship(
         "CuentaAuxiliar",
-        lazy="selectin"
+        lazy="raise"
     )
     
     # Constraints
@@ -1425,8 +1545,10 @@ class GastoLegalizacion(Base, TimestampMixin):
     )
 
     # Relaciones
+    # lazy="select": con selectin, cargar un gasto traía su paquete y con él
+    # (selectin) todos los gastos del paquete, y editar uno crecía con el tamaño.
     paquete: Mapped["PaqueteGasto"] = relationship(
-        "PaqueteGasto", back_populates="gastos", lazy="selectin"
+        "PaqueteGasto", back_populates="gastos", lazy="select"
     )
     centro_costo: Mapped[Optional["CentroCosto"]] = relationship("CentroCosto", lazy="selectin")
     centro_operacion: Mapped[Optional["CentroOperacion"]] = relationship("CentroOperacion", lazy="selectin")
@@ -1941,3 +2063,319 @@ class SiesaCausacion(Base, TimestampMixin):
 
     def __repr__(self):
         return f"<SiesaCausacion(factura={self.factura_id}, estado={self.estado}, fsp={self.numero_fsp})>"
+
+
+# =============================================================================
+# ENRUTAMIENTO DE INGESTA XML — NIT → responsable
+# =============================================================================
+
+class ProveedorResponsable(Base, TimestampMixin):
+    """
+    Tabla de enrutamiento de la ingesta XML: a qué responsable(s) va cada NIT.
+
+    Antes era el dict `_NIT_RESPONSABLE` en core/nit_responsable.py y agregar un
+    proveedor exigía un deploy. La ingesta NO la consulta en cada factura: lee
+    el índice en memoria del worker, que se recarga por LISTEN/NOTIFY cuando el
+    trigger de esta tabla avisa un cambio.
+    """
+    __tablename__ = "proveedores_responsables"
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
+    )
+    # NIT normalizado (sin guiones ni espacios, en mayúsculas): es la clave del índice
+    nit: Mapped[str] = mapped_column(Text, nullable=False, unique=True, index=True)
+    razon_social: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    # Keywords en orden de preferencia (ver KEYWORDS_VALIDOS en core/nit_responsable.py)
+    responsables: Mapped[list] = mapped_column(JSONB, nullable=False)
+    activo: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True)
+
+    def __repr__(self):
+        return f"<ProveedorResponsable(nit={self.nit}, responsables={self.responsables})>"
+
+
+class IngestaIdempotencia(Base):
+    """
+    Respuestas de la ingesta XML guardadas para reproducirlas en los reintentos
+    de N8N. Clave = header `Idempotency-Key` o hash del XML; vencen a las
+    `ingesta_idempotencia_ttl_horas` y se purgan en la siguiente ingesta.
+    """
+    __tablename__ = "ingesta_idempotencia"
+
+    clave: Mapped[str] = mapped_column(String(128), primary_key=True)
+    respuesta: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=False, index=True
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True),
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc)
+    )
+
+    def __repr__(self):
+        return f"<IngestaIdempotencia(clave={self.clave}, expires_at={self.expires_at})>"
+
+
+class IngestaCola(Base, TimestampMixin):
+    """
+    Cola de la ingesta XML asíncrona (POST /facturas/ingesta-xml/async).
+
+    El endpoint solo guarda el payload crudo y responde 202; los workers de
+    modules/facturas/ingesta_cola.py lo reclaman con FOR UPDATE SKIP LOCKED y
+    hacen el parseo, el enrutamiento, el INSERT y la subida del PDF.
+    estado: pendiente | procesando | completada | error
+    """
+    __tablename__ = "ingesta_cola"
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
+    )
+    # Misma clave que ingesta_idempotencia: un reenvío de N8N no encola dos veces
+    clave: Mapped[str] = mapped_column(String(128), nullable=False, unique=True)
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    estado: Mapped[str] = mapped_column(String(20), nullable=False, default="pendiente")
+    intentos: Mapped[int] = mapped_column(SmallInteger, nullable=False, default=0)
+    resultado: Mapped[Optional[dict]] = mapped_column(JSONB, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    tomado_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=True), nullable=True)
+    procesado_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # Solo las filas por procesar: el índice queda chico aunque la tabla crezca
+        Index(
+            "ix_ingesta_cola_pendientes", "created_at",
+            postgresql_where=text("estado IN ('pendiente', 'procesando')"),
+        ),
+        CheckConstraint(
+            "estado IN ('pendiente', 'procesando', 'completada', 'error')",
+            name="check_ingesta_cola_estado",
+        ),
+    )
+
+    def __repr__(self):
+        return f"<IngestaCola(id={self.id}, estado={self.estado}, intentos={self.intentos})>"
+
+
+class FacturaXML(Base):
+    """
+    XML DIAN original de cada factura ingerida, comprimido con zstd.
+
+    Permite re-extraer campos nuevos del parser (p. ej. base/IVA/retenciones
+    para Siesa) sobre TODAS las facturas con scripts/reparsear_xml_facturas.py,
+    sin esperar a que N8N reenvíe el XML. Se guarda el primero que llega.
+    """
+    __tablename__ = "facturas_xml"
+
+    factura_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("facturas.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    xml_zstd: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    sha256: Mapped[str] = mapped_column(String(64), nullable=False)
+    size_bytes: Mapped[int] = mapped_column(BigInteger, nullable=False)  # sin comprimir
+    created_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True),
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc)
+    )
+
+    def __repr__(self):
+        return f"<FacturaXML(factura_id={self.factura_id}, size_bytes={self.size_bytes})>"
+
+
+class VersionDatos(Base):
+    """
+    Contador de cambios por tabla para los ETag de GET (core/versionado.py).
+
+    Lo incrementa un trigger FOR EACH STATEMENT (migración a4b5c6d7e8f9) en
+    cada INSERT/UPDATE/DELETE/TRUNCATE de las tablas versionadas, así que cubre
+    cualquier escritura: API, scripts y workers. La versión de una tabla es la
+    SUMA de sus filas: el trigger escribe en la fila `pg_backend_pid() % 8`
+    para que dos transacciones que tocan facturas a la vez no se esperen por la
+    misma fila. Es transaccional: la versión nueva se ve con el COMMIT, ni antes
+    ni después que los datos.
+    """
+    __tablename__ = "versiones_datos"
+
+    tabla: Mapped[str] = mapped_column(String(63), primary_key=True)
+    particion: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<VersionDatos(tabla={self.tabla}, particion={self.particion}, version={self.version})>"
+
+
+class FolioContador(Base):
+    """
+    Último número asignado por (prefijo, año) para los folios consecutivos:
+    PKG-2026-00042 (paquetes de gastos), ANT-2026-00007 (anticipos).
+
+    Lo usa core/folios.siguiente_folio con un INSERT … ON CONFLICT DO UPDATE …
+    RETURNING: O(1) y sin choques entre dos usuarios que crean a la vez (el
+    segundo espera el lock de la fila hasta el COMMIT del primero). Sin huecos:
+    si la creación se revierte, el número vuelve con ella.
+    """
+    __tablename__ = "folio_contadores"
+
+    prefijo: Mapped[str] = mapped_column(String(10), primary_key=True)
+    anio: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    ultimo: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<FolioContador(prefijo={self.prefijo}, anio={self.anio}, ultimo={self.ultimo})>"
+
+
+class ZonaTecnico(Base):
+    """
+    Zona de cada técnico de mantenimiento para el informe de gastos por zona
+    (modules/gastos/informe_zonas.py).
+
+    La zona no es un dato del usuario: se asigna por el local-part de su email
+    (tecnicomedellin@… → Medellín). El informe la une en SQL por
+    lower(split_part(email, '@', 1)); un técnico sin fila aquí sale como
+    "Sin zona (<local-part>)" hasta que se le agregue.
+    """
+    __tablename__ = "zonas_tecnicos"
+
+    email_local: Mapped[str] = mapped_column(String(120), primary_key=True)
+    zona: Mapped[str] = mapped_column(String(80), nullable=False)
+
+    def __repr__(self):
+        return f"<ZonaTecnico(email_local={self.email_local}, zona={self.zona})>"
+
+
+class InformeGastosSemana(Base):
+    """
+    Semana cerrada de un informe de gastos ('zonas', 'cajas_menores') cuyos
+    agregados están guardados en informes_gastos_filas.
+
+    La llena cada noche modules/gastos/cortes_informes.py con las semanas ya
+    terminadas. Los triggers de la migración e8f9a0b1c2d3 borran la semana (y
+    sus filas, en cascada) cuando cambia algo que la afecta: un paquete de esa
+    semana, el nombre o email de su dueño, una zona o el nombre de un área. Una
+    semana sin fila aquí se calcula en vivo al exportar.
+    """
+    __tablename__ = "informes_gastos_semanas"
+
+    semana: Mapped[str] = mapped_column(String(10), primary_key=True)
+    informe: Mapped[str] = mapped_column(String(30), primary_key=True)
+    generado_en: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True),
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc)
+    )
+
+    def __repr__(self):
+        return f"<InformeGastosSemana(informe={self.informe}, semana={self.semana})>"
+
+
+class InformeGastosFila(Base):
+    """
+    Paquetes reportados (sin borradores) de una semana cerrada de un informe,
+    agregados por grupo (zona/caja), persona y estado. Los resúmenes del
+    informe se arman sumando estas filas más las de las semanas en vivo
+    (modules/gastos/informes.py).
+    """
+    __tablename__ = "informes_gastos_filas"
+
+    semana: Mapped[str] = mapped_column(String(10), primary_key=True)
+    informe: Mapped[str] = mapped_column(String(30), primary_key=True)
+    fecha_inicio: Mapped[date] = mapped_column(Date, primary_key=True)
+    grupo: Mapped[str] = mapped_column(Text, primary_key=True)
+    email: Mapped[str] = mapped_column(Text, primary_key=True)
+    estado: Mapped[str] = mapped_column(String(30), primary_key=True)
+    persona: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    paquetes: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    documentos: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    monto: Mapped[float] = mapped_column(Numeric(16, 2), nullable=False)
+
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ["semana", "informe"],
+            ["informes_gastos_semanas.semana", "informes_gastos_semanas.informe"],
+            ondelete="CASCADE",
+        ),
+        Index("ix_informes_gastos_filas_informe_fecha", "informe", "fecha_inicio"),
+    )
+
+    def __repr__(self):
+        return f"<InformeGastosFila(informe={self.informe}, semana={self.semana}, grupo={self.grupo})>"
+
+
+class SlaCursor(Base):
+    """
+    Hasta dónde van los rollups de SLA (modules/dashboard/sla.py): el último
+    movimiento de factura_movimientos ya sumado, por (created_at, id).
+    """
+    __tablename__ = "sla_cursor"
+
+    clave: Mapped[str] = mapped_column(String(40), primary_key=True)
+    ultimo_creado: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=True), nullable=True)
+    ultimo_id: Mapped[Optional[uuid.UUID]] = mapped_column(UUID(as_uuid=True), nullable=True)
+    actualizado_en: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<SlaCursor(clave={self.clave}, ultimo_creado={self.ultimo_creado})>"
+
+
+class SlaPermanencia(Base):
+    """
+    Permanencias de facturas en un (área, estado) que terminaron en `dia`
+    (hora Colombia), por rango de duración: cantidad y segundos sumados.
+    Los rangos permiten estimar percentiles sin guardar cada duración.
+    """
+    __tablename__ = "sla_permanencias"
+
+    dia: Mapped[date] = mapped_column(Date, primary_key=True)
+    area_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("areas.id", ondelete="CASCADE"), primary_key=True
+    )
+    estado_id: Mapped[int] = mapped_column(
+        SmallInteger, ForeignKey("estados.id", ondelete="CASCADE"), primary_key=True
+    )
+    rango: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    n: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    segundos: Mapped[float] = mapped_column(Numeric(20, 2), nullable=False, default=0)
+
+
+class SlaCiclo(Base):
+    """Facturas pagadas en `dia` por rango de tiempo de ciclo (creación → pagada)."""
+    __tablename__ = "sla_ciclos"
+
+    dia: Mapped[date] = mapped_column(Date, primary_key=True)
+    rango: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    n: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    segundos: Mapped[float] = mapped_column(Numeric(20, 2), nullable=False, default=0)
+
+
+class SlaFlujoDiario(Base):
+    """Facturas que entraron a, salieron de y se pagaron desde cada área por día."""
+    __tablename__ = "sla_flujo_diario"
+
+    dia: Mapped[date] = mapped_column(Date, primary_key=True)
+    area_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("areas.id", ondelete="CASCADE"), primary_key=True
+    )
+    entradas: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    salidas: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    cerradas: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+
+class SlaBacklog(Base):
+    """
+    Facturas abiertas (no pagadas) por (área, estado) y rango de antigüedad
+    en ese lugar. Es una foto: cada refresco de SLA la reemplaza entera.
+    """
+    __tablename__ = "sla_backlog"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    area_id: Mapped[Optional[uuid.UUID]] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("areas.id", ondelete="CASCADE"), nullable=True
+    )
+    estado_id: Mapped[int] = mapped_column(
+        SmallInteger, ForeignKey("estados.id", ondelete="CASCADE"), nullable=False
+    )
+    rango: Mapped[int] = mapped_column(SmallInteger, nullable=False)
+    n: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
@@ -0,0 +1,103 @@
+"""
+Perfiles de carga de relaciones para Factura.
+
+Las relaciones de Factura, Carpeta, CarpetaTesoreria, File y
+FacturaDistribucionCCCO son lazy="raise" en el modelo: un select(Factura) trae
+solo columnas y tocar una relación no cargada lanza InvalidRequestError en vez
+de disparar una query (que en async, además, revienta con MissingGreenlet).
+
+Antes eran lazy="selectin": cualquier select(Factura) plano (get_by_id,
+submit_responsable, update_estado, historial_area) abría una docena de queries
+en cascada, y el listado tenía que frenarlas con una lista larga de noload.
+Ahora cada método de repositorio dice qué perfil necesita:
+
+- LIST: item del listado/bandejas (FacturaListItem).
+- DETAIL: ficha de la factura (FacturaResponse).
+- TRANSITION: pase de área/estado; solo área y estado.
+- EXPORT: archivo plano; catálogos de la factura y la distribución CC/CO con
+  los suyos.
+
+Las relaciones a uno (catálogos, carpeta) van con joinedload en el MISMO
+SELECT; las colecciones, con un selectin cada una. El número de queries no
+depende de cuántas facturas traiga la página. En todas se corta la cascada
+con raiseload("*"): Area.users, User.role, etc. no viajan con la factura.
+"""
+from enum import Enum
+
+from sqlalchemy.orm import joinedload, noload, selectinload
+
+from db.models import Factura, FacturaDistribucionCCCO
+
+
+class PerfilCarga(str, Enum):
+    LIST = "list"
+    DETAIL = "detail"
+    TRANSITION = "transition"
+    EXPORT = "export"
+
+
+PERFILES: dict[PerfilCarga, tuple] = {
+    PerfilCarga.TRANSITION: (
+        Factura.area,
+        Factura.estado,
+    ),
+    PerfilCarga.DETAIL: (
+        Factura.area,
+        Factura.estado,
+        Factura.centro_costo,
+        Factura.centro_operacion,
+        Factura.unidad_negocio,
+    ),
+    PerfilCarga.LIST: (
+        Factura.area,
+        Factura.estado,
+        Factura.centro_costo,
+        Factura.centro_operacion,
+        Factura.unidad_negocio,
+        Factura.cuenta_auxiliar,
+        # carpeta/carpeta_tesoreria solo aportan id/nombre/parent_id al listado
+        Factura.carpeta,
+        Factura.carpeta_tesoreria,
+        Factura.files,
+        Factura.inventario_codigos,
+    ),
+    PerfilCarga.EXPORT: (
+        Factura.centro_costo,
+        Factura.centro_operacion,
+        Factura.unidad_negocio,
+        Factura.cuenta_auxiliar,
+        Factura.distribucion_ccco,
+    ),
+}
+
+# Relaciones de segundo nivel que viajan con la colección (por key)
+_ANIDADAS: dict[str, tuple] = {
+    "distribucion_ccco": (
+        FacturaDistribucionCCCO.centro_costo,
+        FacturaDistribucionCCCO.centro_operacion,
+        FacturaDistribucionCCCO.unidad_negocio,
+        FacturaDistribucionCCCO.cuenta_auxiliar,
+    ),
+}
+
+
+def _cargador(relacion):
+    """joinedload para relaciones a uno, selectinload para colecciones."""
+    carga = selectinload(relacion) if relacion.property.uselist else joinedload(relacion)
+    anidadas = _ANIDADAS.get(relacion.key)
+    if anidadas:
+        return carga.options(*[_cargador(r) for r in anidadas])
+    return carga.raiseload("*")
+
+
+def opciones_factura(perfil: PerfilCarga, omitir: tuple = ()) -> list:
+    """Loader options del perfil para un select(Factura).
+
+    `omitir`: relaciones del perfil que el caller no muestra; quedan vacías
+    (noload) en vez de cargarse, así el mapeo compartido no tiene que distinguir.
+    """
+    omitidas = {r.key for r in omitir}
+    return [
+        noload(relacion) if relacion.key in omitidas else _cargador(relacion)
+        for relacion in PERFILES[perfil]
+    ]
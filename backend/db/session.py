@@ -1,13 +1,31 @@
 """
 Gestión de sesiones de base de datos asíncronas con SQLAlchemy.
+
+- get_db: transacción de lectura/escritura contra la primaria, COMMIT al final.
+- get_read_db: para endpoints GET. Transacción READ ONLY (Postgres rechaza
+  cualquier escritura accidental) y sin COMMIT. Si DATABASE_READ_URL está
+  configurada va a la réplica, salvo que su lag supere replica_lag_max_segundos
+  o no responda: entonces cae a la primaria hasta que se recupere
+  (vigilar_replica revisa el lag en segundo plano).
+- con_sesion: la misma dependencia de servicio/usuario sobre la sesión que
+  elija la ruta (get_read_db en los GET).
 """
+import asyncio
+import functools
+import inspect
+
+from fastapi import Depends
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import (
     create_async_engine,
     async_sessionmaker,
     AsyncSession
 )
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Callable, Optional
 from core.config import settings
+from core.logging import logger
+from core.instrumentacion import instrumentar_engine
+from core.metricas import PoolMedido
 
 
 # Motor de base de datos asíncrono
@@ -15,11 +33,17 @@ engine = create_async_engine(
     settings.database_url,
     echo=settings.debug,
     future=True,
+    poolclass=PoolMedido,  # publica uso/overflow/espera del pool en /metrics
+    pool_logging_name="primaria",
     pool_size=10,       # conexiones persistentes en el pool
     max_overflow=5,     # conexiones extra bajo pico de carga
     pool_recycle=1800,  # recicla conexiones cada 30 min (evita cortes del servidor)
     pool_pre_ping=True, # valida conexión antes de usarla (evita errores tras inactividad)
+    # LRU de sentencias preparadas de asyncpg por conexión (ver core/config.py)
+    connect_args={"prepared_statement_cache_size": settings.db_prepared_statement_cache_size},
 )
+# Conteo/tiempo de sentencias por request (Server-Timing, log SLOW, N+1)
+instrumentar_engine(engine)
 
 # Fábrica de sesiones asíncronas
 AsyncSessionLocal = async_sessionmaker(
@@ -30,6 +54,38 @@ AsyncSessionLocal = async_sessionmaker(
     autoflush=False
 )
 
+# Réplica de lectura (opcional). Mismo tamaño de pool: absorbe los GET.
+read_engine = create_async_engine(
+    settings.database_read_url,
+    echo=settings.debug,
+    poolclass=PoolMedido,
+    pool_logging_name="replica",
+    pool_size=10,
+    max_overflow=5,
+    pool_recycle=1800,
+    pool_pre_ping=True,
+    connect_args={"prepared_statement_cache_size": settings.db_prepared_statement_cache_size},
+) if settings.database_read_url else None
+if read_engine is not None:
+    instrumentar_engine(read_engine)
+
+AsyncReadSessionLocal = async_sessionmaker(
+    read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+    autoflush=False,
+) if read_engine is not None else None
+
+# Estado de la réplica según el último chequeo de vigilar_replica
+_replica_sana = True
+
+# Lag de una réplica en streaming. Sin escrituras recientes el último replay
+# envejece aunque la réplica esté al día: si ya aplicó todo lo recibido, lag 0.
+SQL_LAG_REPLICA = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """
@@ -45,3 +101,73 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             raise
         finally:
             await session.close()
+
+
+def _fabrica_lectura() -> async_sessionmaker:
+    if AsyncReadSessionLocal is not None and _replica_sana:
+        return AsyncReadSessionLocal
+    return AsyncSessionLocal
+
+
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency para endpoints de solo lectura (GET).
+    Uso: db: AsyncSession = Depends(get_read_db)
+
+    La transacción arranca READ ONLY (asyncpg lo pide en el mismo BEGIN, sin
+    round-trip extra) y al cerrar se descarta: no hay COMMIT.
+    """
+    async with _fabrica_lectura()() as session:
+        await session.connection(execution_options={"postgresql_readonly": True})
+        yield session
+
+
+@functools.cache
+def con_sesion(dependencia: Callable, sesion: Callable) -> Callable:
+    """`dependencia` (servicio o usuario que recibe la sesión en `db`) sobre `sesion`.
+
+    Uso en los GET: Depends(con_sesion(get_factura_service, get_read_db)). La
+    dependencia se declara una vez, con get_db; la elección de la sesión queda
+    en la ruta. Cacheada: la misma pareja es la misma dependencia, y FastAPI la
+    resuelve una sola vez por request.
+    """
+    firma = inspect.signature(dependencia)
+    if inspect.iscoroutinefunction(dependencia):
+        async def _sobre_sesion(*args, **kwargs):
+            return await dependencia(*args, **kwargs)
+    else:
+        def _sobre_sesion(*args, **kwargs):
+            return dependencia(*args, **kwargs)
+    _sobre_sesion.__name__ = f"{dependencia.__name__}__{sesion.__name__}"
+    _sobre_sesion.__signature__ = firma.replace(parameters=[
+        p.replace(default=Depends(sesion)) if p.name == "db" else p
+        for p in firma.parameters.values()
+    ])
+    return _sobre_sesion
+
+
+async def medir_lag_replica() -> Optional[float]:
+    """Segundos de atraso de la réplica, o None si no responde."""
+    try:
+        async with read_engine.connect() as conn:
+            return float((await conn.execute(SQL_LAG_REPLICA)).scalar_one())
+    except Exception as e:
+        logger.warning(f"Réplica de lectura sin respuesta: {e}")
+        return None
+
+
+async def vigilar_replica() -> None:
+    """Tarea de fondo: marca la réplica como no apta mientras su lag supere el máximo."""
+    global _replica_sana
+    if read_engine is None:
+        return
+    while True:
+        lag = await medir_lag_replica()
+        sana = lag is not None and lag <= settings.replica_lag_max_segundos
+        if sana != _replica_sana:
+            if sana:
+                logger.info(f"Réplica de lectura al día (lag {lag:.1f}s): GET vuelven a la réplica.")
+            else:
+                logger.warning(f"Réplica de lectura no apta (lag {lag}s): GET van a la primaria.")
+        _replica_sana = sana
+        await asyncio.sleep(settings.replica_lag_chequeo_segundos)
@@ -11,6 +11,7 @@ from sqlalchemy import text
 
 from core.config import settings
 from core.logging import logger
+from core.auth import require_metrics_token
 from db.session import get_db
 
 # Importar routers de todos los módulos
@@ -36,6 +37,7 @@ from modules.aprobadores_gerencia.router import router as aprobadores_gerencia_r
 from modules.anticipos.router import router as anticipos_router
 from modules.chat.router import router as chat_router
 from modules.siesa.router import router as siesa_router
+from modules.proveedores_responsables.router import router as proveedores_responsables_router
 
 # Configuración central.
 # Aquí deshabilitas los docs por defecto para crear tus endpoints personalizados.
@@ -57,21 +59,39 @@ app.add_middleware(GZipMiddleware, minimum_size=500)
 
 
 # Middleware de timing: mide el tiempo de procesamiento del servidor (sin red) y
-# registra las requests lentas. Expone X-Process-Time para inspeccionar desde el navegador.
+# registra las requests lentas. Expone X-Process-Time y Server-Timing (desglose
+# BD/S3/Graph/Siesa/IA, visible en la pestaña Timing de DevTools).
 import time as _time
 from starlette.requests import Request as _Request
+from starlette.responses import Response as _Response
+from core.instrumentacion import iniciar_medicion, terminar_medicion
+from core import metricas
 
 
 @app.middleware("http")
 async def medir_tiempo_procesamiento(request: _Request, call_next):
     inicio = _time.perf_counter()
-    response = await call_next(request)
+    medicion, token = iniciar_medicion()
+    try:
+        response = await call_next(request)
+    finally:
+        terminar_medicion(token)
     duracion = _time.perf_counter() - inicio
+    # Plantilla de la ruta (la pone el router en el scope); 404 sin ruta → una sola serie
+    plantilla = getattr(request.scope.get("route"), "path", "sin_ruta")
+    metricas.DURACION_REQUEST.labels(request.method, plantilla, str(response.status_code)).observe(duracion)
     response.headers["X-Process-Time"] = f"{duracion:.3f}"
-    if duracion > 1.0:  # log solo lo realmente lento
+    response.headers["Server-Timing"] = medicion.server_timing(duracion * 1000)
+    ruta = f"{request.method} {request.url.path}"
+    for forma, veces in medicion.repetidas(settings.n_mas_uno_umbral):
+        logger.warning(f"N+1 {ruta}: {veces}x {forma[:300]}")
+    if duracion > settings.slow_request_segundos:  # log solo lo realmente lento
+        ms_lenta, sql_lenta = medicion.sql_mas_lenta
         logger.warning(
-            f"SLOW {duracion:.2f}s  {request.method} {request.url.path}"
+            f"SLOW {duracion:.2f}s  {ruta}"
             f"{('?' + request.url.query) if request.url.query else ''}"
+            f"  [{medicion.resumen()}]"
+            + (f"  sql más lenta {ms_lenta:.0f}ms: {sql_lenta[:300]}" if sql_lenta else "")
         )
     return response
 
@@ -116,6 +136,16 @@ app.include_router(aprobadores_gerencia_router, prefix="/api/v1")
 app.include_router(anticipos_router, prefix="/api/v1")
 app.include_router(chat_router, prefix="/api/v1")
 app.include_router(siesa_router, prefix="/api/v1")
+app.include_router(proveedores_responsables_router, prefix="/api/v1")
+
+
+# GET condicionales: respuesta_condicional corta con NoModificado → 304 sin cuerpo
+from core.versionado import NoModificado, responder_no_modificado
+
+
+@app.exception_handler(NoModificado)
+async def no_modificado(request: _Request, exc: NoModificado):
+    return responder_no_modificado(exc)
 
 
 # Endpoints personalizados para documentación con CORS habilitado
@@ -186,6 +216,16 @@ async def health_check(db: AsyncSession = Depends(get_db)):
     return health_status
 
 
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(require_metrics_token)])
+async def metrics_endpoint():
+    """Métricas Prometheus (rutas, pool, dependencias, caches) de todos los workers.
+
+    Solo con "Authorization: Bearer <settings.metrics_token>"; sin token configurado, 404.
+    """
+    contenido, content_type = metricas.exportar()
+    return _Response(content=contenido, media_type=content_type)
+
+
 @app.on_event("startup")
 async def startup_event():
     """Evento ejecutado al iniciar la aplicación."""
@@ -196,12 +236,51 @@ async def startup_event():
     import asyncio
     from modules.facturas.recordatorios import ciclo_recordatorios_aprobacion
     app.state.tarea_recordatorios = asyncio.create_task(ciclo_recordatorios_aprobacion())
+    # Índice NIT→responsable de la ingesta XML: se carga al arrancar y se recarga
+    # por LISTEN/NOTIFY cuando cambia la tabla (sin reiniciar el worker).
+    from core.nit_responsable import escuchar_cambios
+    app.state.tarea_nit_responsable = asyncio.create_task(escuchar_cambios())
+    # Workers de la ingesta XML asíncrona (POST /facturas/ingesta-xml/async).
+    # FOR UPDATE SKIP LOCKED: los workers de uvicorn se reparten la cola sin duplicar.
+    from modules.facturas.ingesta_cola import ciclo_ingesta_cola
+    app.state.tarea_ingesta_cola = asyncio.create_task(ciclo_ingesta_cola())
+    # Lag del event loop a /metrics; con DEBUG, stack + ruta de cada callback que lo bloquee
+    from core.monitor_loop import ciclo_monitor_loop
+    app.state.tarea_monitor_loop = asyncio.create_task(ciclo_monitor_loop())
+    # Lag de la réplica de lectura (si hay DATABASE_READ_URL): decide a dónde van los GET
+    from db.session import vigilar_replica
+    app.state.tarea_replica = asyncio.create_task(vigilar_replica())
+    # Push de las bandejas (GET /facturas/stream): LISTEN del trigger de factura_movimientos
+    from modules.facturas.push_bandejas import escuchar_movimientos
+    app.state.tarea_push_bandejas = asyncio.create_task(escuchar_movimientos())
+    # Verificación nocturna de monto_total/total_documentos de los paquetes de gastos
+    from modules.gastos.totales import ciclo_reparacion_totales
+    app.state.tarea_totales_paquetes = asyncio.create_task(ciclo_reparacion_totales())
+    # Correos de "paquete pagado" del pago masivo (después del commit, por lotes)
+    from modules.gastos.avisos_pago import ciclo_avisos_pago
+    app.state.tarea_avisos_pago = asyncio.create_task(ciclo_avisos_pago())
+    # Corte nocturno de las semanas cerradas de los informes de gastos
+    from modules.gastos.cortes_informes import ciclo_cortes_informes
+    app.state.tarea_cortes_informes = asyncio.create_task(ciclo_cortes_informes())
+    # Reconciliación nocturna de factura_counters (métricas del dashboard)
+    from modules.dashboard.contadores import ciclo_reconciliacion_contadores
+    app.state.tarea_factura_counters = asyncio.create_task(ciclo_reconciliacion_contadores())
+    # Rollups de SLA sobre factura_movimientos (GET /dashboard/sla)
+    from modules.dashboard.sla import ciclo_sla
+    app.state.tarea_sla = asyncio.create_task(ciclo_sla())
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Evento ejecutado al detener la aplicación."""
-    tarea = getattr(app.state, "tarea_recordatorios", None)
-    if tarea:
-        tarea.cancel()
+    for nombre in (
+        "tarea_recordatorios", "tarea_nit_responsable", "tarea_ingesta_cola",
+        "tarea_monitor_loop", "tarea_replica", "tarea_push_bandejas",
+        "tarea_totales_paquetes", "tarea_avisos_pago", "tarea_cortes_informes",
+        "tarea_factura_counters", "tarea_sla",
+    ):
+        tarea = getattr(app.state, nombre, None)
+        if tarea:
+            tarea.cancel()
+    metricas.marcar_worker_terminado()
     logger.info(f"Deteniendo {settings.app_name}")
@@ -1,6 +1,6 @@
 """Repositorio de acceso a datos para anticipos."""
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, cast, Integer
+from sqlalchemy import select, func
 from typing import Optional, Tuple, List
 from uuid import UUID
 
@@ -52,21 +52,6 @@ class AnticipioRepository:
         result = await self.db.execute(q.offset(skip).limit(limit))
         return list(result.scalars().all()), total
 
-    async def max_folio_number_by_year(self, year: int) -> int:
-        prefix = f"ANT-{year}-"
-        result = await self.db.execute(
-            select(func.max(
-                cast(func.substr(Anticipo.folio, len(prefix) + 1), Integer)
-            )).where(Anticipo.folio.like(f"{prefix}%"))
-        )
-        raw = result.scalar_one_or_none()
-        if raw is None:
-            return 0
-        try:
-            return int(raw)
-        except Exception:
-            return 0
-
     async def list_by_user(
         self, user_id: UUID, estado: Optional[str] = None
     ) -> List[Anticipo]:
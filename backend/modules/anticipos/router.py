@@ -1,15 +1,14 @@
 """Router FastAPI para el módulo de anticipos."""
 from fastapi import APIRouter, Depends, Query, status, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
 from uuid import UUID
 from typing import Optional
 
-from db.session import get_db
+from db.session import con_sesion, get_db, get_read_db
 from core.auth import get_current_user
 from db.models import User
 from modules.anticipos.service import AnticipioService
+from modules.users.repository import UserRepository
 from modules.anticipos.schemas import (
     AnticipioCreate, AnticipioDesembolsar, AnticipioRechazar,
     AnticipioOut, AnticipioListResponse,
@@ -25,12 +24,7 @@ async def _get_user_db(
     db: AsyncSession = Depends(get_db),
 ) -> User:
     user_id = UUID(current_user["user_id"])
-    result = await db.execute(
-        select(User)
-        .options(selectinload(User.role), selectinload(User.area))
-        .where(User.id == user_id)
-    )
-    user = result.scalar_one_or_none()
+    user = await UserRepository(db).get_con_permisos(user_id)
     if not user:
         raise HTTPException(status_code=401, detail="Usuario no encontrado.")
     return user
@@ -65,8 +59,8 @@ async def crear_anticipo(
 )
 async def mis_anticipos(
     estado: Optional[str] = Query(None),
-    svc: AnticipioService = Depends(_svc),
-    user: User = Depends(_get_user_db),
+    svc: AnticipioService = Depends(con_sesion(_svc, get_read_db)),
+    user: User = Depends(con_sesion(_get_user_db, get_read_db)),
 ):
     return await svc.listar_mis(user.id, estado)
 
@@ -113,8 +107,8 @@ async def listar_anticipos(
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=200),
     estado: Optional[str] = Query(None),
-    svc: AnticipioService = Depends(_svc),
-    user: User = Depends(_get_user_db),
+    svc: AnticipioService = Depends(con_sesion(_svc, get_read_db)),
+    user: User = Depends(con_sesion(_get_user_db, get_read_db)),
 ):
     role = user.role.code.lower() if user.role else ""
     if role not in ROLES_TESORERIA:
@@ -146,8 +140,8 @@ async def desembolsar_anticipo(
 )
 async def get_anticipo(
     anticipo_id: UUID,
-    svc: AnticipioService = Depends(_svc),
-    user: User = Depends(_get_user_db),
+    svc: AnticipioService = Depends(con_sesion(_svc, get_read_db)),
+    user: User = Depends(con_sesion(_get_user_db, get_read_db)),
 ):
     role = user.role.code.lower() if user.role else ""
     is_tesoreria = role in ROLES_TESORERIA
@@ -21,6 +21,7 @@ from modules.gastos.service import GastosService
 from modules.gastos.schemas import PaqueteCreate
 from core.email_service import EmailService
 from core.logging import logger
+from core.folios import siguiente_folio
 
 email_service = EmailService()
 
@@ -47,8 +48,7 @@ class AnticipioService:
             raise HTTPException(status_code=400, detail="El aprobador seleccionado no es válido.")
 
         year = datetime.now(tz=timezone.utc).year
-        max_num = await self.repo.max_folio_number_by_year(year)
-        folio = f"ANT-{year}-{max_num + 1:05d}"
+        folio = await siguiente_folio(self.db, "ANT", year)
 
         anticipo = Anticipo(
             folio=folio,
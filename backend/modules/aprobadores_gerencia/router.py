@@ -4,7 +4,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from uuid import UUID
 
-from db.session import get_db
+from db.session import con_sesion, get_db, get_read_db
+from core.versionado import respuesta_condicional
 from core.auth import get_current_user
 from modules.aprobadores_gerencia.service import AprobadorGerenciaService
 from modules.aprobadores_gerencia.schemas import (
@@ -20,19 +21,27 @@ def _svc(db: AsyncSession = Depends(get_db)) -> AprobadorGerenciaService:
     return AprobadorGerenciaService(db)
 
 
-@router.get("/", response_model=List[AprobadorGerenciaOut])
+@router.get(
+    "/",
+    response_model=List[AprobadorGerenciaOut],
+    dependencies=[Depends(respuesta_condicional("aprobadores_gerencia"))],
+)
 async def listar_todos(
-    svc: AprobadorGerenciaService = Depends(_svc),
+    svc: AprobadorGerenciaService = Depends(con_sesion(_svc, get_read_db)),
     _: dict = Depends(get_current_user),
 ):
     """Lista todos los aprobadores (activos e inactivos). Solo usuarios autenticados."""
     return await svc.listar_todos()
 
 
-@router.get("/activos", response_model=List[AprobadorGerenciaOut])
+@router.get(
+    "/activos",
+    response_model=List[AprobadorGerenciaOut],
+    dependencies=[Depends(respuesta_condicional("aprobadores_gerencia"))],
+)
 async def listar_activos(
     categoria: Optional[str] = Query(None, description="Filtrar por categoría: 'general' | 'comercial'"),
-    svc: AprobadorGerenciaService = Depends(_svc),
+    svc: AprobadorGerenciaService = Depends(con_sesion(_svc, get_read_db)),
     _: dict = Depends(get_current_user),
 ):
     """Lista solo los aprobadores activos (para el selector al enviar correo)."""
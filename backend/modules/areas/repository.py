@@ -28,9 +28,8 @@ class AreaRepository:
         return area
     
     async def get_by_id(self, area_id: UUID) -> Area:
-        """Obtiene un área por su ID."""
-        result = await self.db.execute(select(Area).where(Area.id == area_id))
-        return result.scalar_one_or_none()
+        """Obtiene un área por su ID (mapa de identidad primero: sin query si ya está en la sesión)."""
+        return await self.db.get(Area, area_id)
     
     async def delete(self, area_id: UUID) -> bool:
         """Elimina un área por su ID."""
@@ -6,7 +6,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from uuid import UUID
 
-from db.session import get_db
+from db.session import con_sesion, get_db, get_read_db
+from core.versionado import respuesta_condicional
 from modules.areas.repository import AreaRepository
 from modules.areas.service import AreaService
 from modules.areas.schemas import AreaResponse, AreaCreate, AreaUpdate
@@ -21,8 +22,12 @@ def get_area_service(db: AsyncSession = Depends(get_db)) -> AreaService:
     return AreaService(repository)
 
 
-@router.get("/", response_model=List[AreaResponse])
-async def list_areas(service: AreaService = Depends(get_area_service)):
+@router.get(
+    "/",
+    response_model=List[AreaResponse],
+    dependencies=[Depends(respuesta_condicional("areas"))],
+)
+async def list_areas(service: AreaService = Depends(con_sesion(get_area_service, get_read_db))):
     """Lista todas las áreas disponibles."""
     return await service.list_areas()
 
@@ -6,7 +6,7 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
 
-from db.session import get_db
+from db.session import con_sesion, get_db, get_read_db
 from modules.auth.repository import AuthRepository
 from modules.auth.service import AuthService
 from modules.auth.schemas import (
@@ -83,7 +83,7 @@ async def logout(
 @router.get("/me", response_model=UserMeResponse)
 async def get_me(
     user_id: UUID = Depends(get_current_user_id),
-    service: AuthService = Depends(get_auth_service)
+    service: AuthService = Depends(con_sesion(get_auth_service, get_read_db))
 ):
     """Obtener información del usuario autenticado."""
     return await service.get_current_user(user_id)
@@ -2,37 +2,43 @@
 Repositorio para operaciones de carpetas.
 """
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import Integer, case, delete, exists, func, literal, select, update
 from sqlalchemy.orm import selectinload, noload
 from typing import List, Optional
 from uuid import UUID
 from db.models import Carpeta, Factura, Estado
 
 
+def _subarbol(semilla):
+    """CTE recursiva (id, raiz_id, nivel): cada carpeta que cumple `semilla`
+    (raiz_id = ella misma, nivel 0) y todas sus descendientes, a cualquier
+    profundidad, con la raíz de la que cuelgan.
+
+    Recorre parent_id (indexado) dentro de Postgres: las operaciones sobre un
+    subárbol son UNA sentencia, no una query por nivel.
+    """
+    arbol = (
+        select(Carpeta.id.label("id"), Carpeta.id.label("raiz_id"), literal(0, Integer).label("nivel"))
+        .where(semilla)
+        .cte("subarbol", recursive=True)
+    )
+    return arbol.union_all(
+        select(Carpeta.id, arbol.c.raiz_id, arbol.c.nivel + 1)
+        .join(arbol, Carpeta.parent_id == arbol.c.id)
+    )
+
+
 class CarpetaRepository:
     """Repositorio para gestionar operaciones de carpetas."""
     
     def __init__(self, db: AsyncSession):
         self.db = db
     
-    async def get_all(self) -> List[Carpeta]:
-        """Obtiene todas las carpetas."""
-        result = await self.db.execute(
-            select(Carpeta)
-            .options(
-                selectinload(Carpeta.parent),
-                selectinload(Carpeta.children)
-            )
-            .order_by(Carpeta.nombre)
-        )
-        return list(result.scalars().all())
-    
     async def get_tree_data(self) -> tuple[List[Carpeta], list]:
         """Devuelve los datos crudos para armar el árbol de carpetas en el service.
 
-        En lugar de recorrer relaciones ORM (que disparan cascada: el modelo tiene
-        Carpeta.parent/children/factura/facturas en lazy="selectin", y cada Factura
-        arrastra sus 16 relaciones selectin), hace solo DOS queries planas:
+        En lugar de recorrer relaciones ORM (una query por nivel del árbol), hace
+        solo DOS queries planas:
           1. Todas las carpetas, SIN relaciones (noload '*'), solo columnas.
           2. Todas las facturas que están en alguna carpeta, solo las columnas que
              el response (FacturaEnCarpeta) usa + el label del estado vía join.
@@ -62,47 +68,163 @@ class CarpetaRepository:
 
         return carpetas, facturas
     
-    async def get_by_id(self, carpeta_id: UUID) -> Optional[Carpeta]:
-        """Obtiene una carpeta por su ID con toda la jerarquía."""
-        result = await self.db.execute(
-            select(Carpeta)
-            .options(
-                selectinload(Carpeta.parent),
-                selectinload(Carpeta.children).selectinload(Carpeta.children).selectinload(Carpeta.children)
+    async def get_nodos(self, parent_id: Optional[UUID] = None, carpeta_id: Optional[UUID] = None) -> list:
+        """Nodos del árbol con los agregados de su subárbol, en una sola query.
+
+        Hijas de `parent_id` (raíces si es None), o solo `carpeta_id`. Por nodo:
+        hijas directas, subcarpetas a cualquier profundidad, y facturas y
+        total del subárbol completo. Sin facturas embebidas: se piden por nodo
+        con get_facturas_pagina.
+        """
+        if carpeta_id is not None:
+            semilla = Carpeta.id == carpeta_id
+        elif parent_id is not None:
+            semilla = Carpeta.parent_id == parent_id
+        else:
+            semilla = Carpeta.parent_id.is_(None)
+        arbol = _subarbol(semilla)
+
+        subcarpetas = (
+            select(
+                arbol.c.raiz_id,
+                func.count(case((arbol.c.nivel == 1, 1))).label("n_hijas"),
+                (func.count() - 1).label("n_subcarpetas"),
             )
-            .where(Carpeta.id == carpeta_id)
+            .group_by(arbol.c.raiz_id)
+            .subquery()
+        )
+        facturas = (
+            select(
+                arbol.c.raiz_id,
+                func.count(Factura.id).label("n_facturas"),
+                func.sum(Factura.total).label("total"),
+            )
+            .join(Factura, Factura.carpeta_id == arbol.c.id)
+            .group_by(arbol.c.raiz_id)
+            .subquery()
         )
-        return result.scalar_one_or_none()
-    
-    async def get_by_parent_id(self, parent_id: UUID) -> List[Carpeta]:
-        """Obtiene las carpetas hijas de una carpeta padre."""
         result = await self.db.execute(
-            select(Carpeta)
-            .options(
-                selectinload(Carpeta.parent),
-                selectinload(Carpeta.children)
+            select(
+                Carpeta.id,
+                Carpeta.nombre,
+                Carpeta.parent_id,
+                Carpeta.factura_id,
+                Carpeta.created_at,
+                Carpeta.updated_at,
+                subcarpetas.c.n_hijas,
+                subcarpetas.c.n_subcarpetas,
+                func.coalesce(facturas.c.n_facturas, 0).label("n_facturas"),
+                func.coalesce(facturas.c.total, 0).label("total"),
             )
-            .where(Carpeta.parent_id == parent_id)
+            .join(subcarpetas, subcarpetas.c.raiz_id == Carpeta.id)
+            .outerjoin(facturas, facturas.c.raiz_id == Carpeta.id)
             .order_by(Carpeta.nombre)
         )
-        return list(result.scalars().all())
-    
-    async def get_by_factura_id(self, factura_id: UUID) -> List[Carpeta]:
-        """Obtiene las carpetas asociadas a una factura."""
+        return result.all()
+
+    async def get_facturas_pagina(self, carpeta_id: UUID, skip: int, limit: int) -> tuple[list, int]:
+        """Facturas que están directamente en la carpeta (página + total)."""
+        total_result = await self.db.execute(
+            select(func.count(Factura.id)).where(Factura.carpeta_id == carpeta_id)
+        )
         result = await self.db.execute(
+            select(
+                Factura.id,
+                Factura.numero_factura,
+                Factura.proveedor,
+                Factura.total,
+                Estado.label.label("estado"),
+            )
+            .outerjoin(Estado, Factura.estado_id == Estado.id)
+            .where(Factura.carpeta_id == carpeta_id)
+            .order_by(Factura.created_at.desc(), Factura.id)
+            .offset(skip)
+            .limit(limit)
+        )
+        return result.all(), total_result.scalar_one()
+
+    async def get_subarbol_data(self, carpeta_id: UUID) -> tuple[List[Carpeta], list]:
+        """Como get_tree_data, pero solo el subárbol de `carpeta_id` (a cualquier profundidad)."""
+        ids = select(_subarbol(Carpeta.id == carpeta_id).c.id)
+        carpetas_result = await self.db.execute(
             select(Carpeta)
-            .where(Carpeta.factura_id == factura_id)
+            .options(noload("*"))
+            .where(Carpeta.id.in_(ids))
             .order_by(Carpeta.nombre)
         )
-        return list(result.scalars().all())
+        facturas_result = await self.db.execute(
+            select(
+                Factura.id,
+                Factura.numero_factura,
+                Factura.proveedor,
+                Factura.total,
+                Factura.carpeta_id,
+                Estado.label.label("estado"),
+            )
+            .outerjoin(Estado, Factura.estado_id == Estado.id)
+            .where(Factura.carpeta_id.in_(ids))
+        )
+        return list(carpetas_result.scalars().all()), facturas_result.all()
+
+    async def es_del_subarbol(self, carpeta_id: UUID, otra_id: UUID) -> bool:
+        """True si `otra_id` es `carpeta_id` o cuelga de ella (a cualquier profundidad)."""
+        arbol = _subarbol(Carpeta.id == carpeta_id)
+        result = await self.db.execute(select(exists().where(arbol.c.id == otra_id)))
+        return bool(result.scalar())
+
+    async def get_arboles_data(self, semilla) -> tuple[List[UUID], List[Carpeta], list]:
+        """Como get_subarbol_data, para todas las carpetas que cumplen `semilla`.
+
+        Devuelve los ids de esas raíces (por nombre), las carpetas de sus
+        subárboles con su padre cargado (selectin) y sus facturas en columnas.
+        Cuatro queries a cualquier profundidad; CarpetaResponse se arma en el
+        service, sin recorrer relaciones lazy="raise".
+        """
+        raices_result = await self.db.execute(
+            select(Carpeta.id).where(semilla).order_by(Carpeta.nombre)
+        )
+        ids = select(_subarbol(semilla).c.id)
+        carpetas_result = await self.db.execute(
+            select(Carpeta)
+            .options(selectinload(Carpeta.parent).noload("*"), noload("*"))
+            .where(Carpeta.id.in_(ids))
+            .order_by(Carpeta.nombre),
+            # Una carpeta ya cargada con noload (get_by_id/update) tiene el padre en None
+            execution_options={"populate_existing": True},
+        )
+        facturas_result = await self.db.execute(
+            select(
+                Factura.id,
+                Factura.numero_factura,
+                Factura.proveedor,
+                Factura.total,
+                Factura.carpeta_id,
+                Estado.label.label("estado"),
+            )
+            .outerjoin(Estado, Factura.estado_id == Estado.id)
+            .where(Factura.carpeta_id.in_(ids))
+        )
+        return (
+            list(raices_result.scalars().all()),
+            list(carpetas_result.scalars().all()),
+            facturas_result.all(),
+        )
+
+    async def get_by_id(self, carpeta_id: UUID) -> Optional[Carpeta]:
+        """Obtiene una carpeta por su ID, solo sus columnas (el árbol sale de get_arboles_data)."""
+        result = await self.db.execute(
+            select(Carpeta)
+            .options(noload("*"))
+            .where(Carpeta.id == carpeta_id)
+        )
+        return result.scalar_one_or_none()
     
     async def create(self, carpeta_data: dict) -> Carpeta:
         """Crea una nueva carpeta."""
         carpeta = Carpeta(**carpeta_data)
         self.db.add(carpeta)
         await self.db.commit()
-        await self.db.refresh(carpeta)
-        return carpeta
+        return await self.get_by_id(carpeta.id)
     
     async def update(self, carpeta_id: UUID, carpeta_data: dict) -> Optional[Carpeta]:
         """Actualiza una carpeta existente."""
@@ -112,14 +234,35 @@ class CarpetaRepository:
                 if value is not None:
                     setattr(carpeta, key, value)
             await self.db.commit()
-            await self.db.refresh(carpeta)
+            # Columnas frescas tras el commit (sin refresh, que tocaría las relaciones)
+            result = await self.db.execute(
+                select(Carpeta).options(noload("*")).where(Carpeta.id == carpeta_id),
+                execution_options={"populate_existing": True},
+            )
+            carpeta = result.scalar_one()
         return carpeta
     
     async def delete(self, carpeta_id: UUID) -> bool:
-        """Elimina una carpeta por su ID."""
-        carpeta = await self.get_by_id(carpeta_id)
-        if carpeta:
-            await self.db.delete(carpeta)
-            await self.db.commit()
-            return True
-        return False
+        """Elimina una carpeta y todo su subárbol.
+
+        Dos sentencias sobre el subárbol, a cualquier profundidad: sacar sus
+        facturas de la carpeta (el SET NULL de la FK, explícito para que
+        updated_at las lleve al feed de cambios) y borrar las carpetas. El
+        cascade ORM de `children` solo alcanzaba los niveles cargados.
+        """
+        ids = select(_subarbol(Carpeta.id == carpeta_id).c.id)
+        await self.db.execute(
+            update(Factura)
+            .where(Factura.carpeta_id.in_(ids))
+            .values(carpeta_id=None)
+            .execution_options(synchronize_session=False)
+        )
+        result = await self.db.execute(
+            delete(Carpeta)
+            .where(Carpeta.id.in_(ids))
+            .returning(Carpeta.id)
+            .execution_options(synchronize_session=False)
+        )
+        eliminadas = result.scalars().all()
+        await self.db.commit()
+        return len(eliminadas) > 0
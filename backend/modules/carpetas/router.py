@@ -1,12 +1,12 @@
 """
 Router de FastAPI para el módulo de carpetas.
 """
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 
-from db.session import get_db
+from db.session import con_sesion, get_db, get_read_db
 from modules.carpetas.repository import CarpetaRepository
 from modules.carpetas.service import CarpetaService
 from modules.carpetas.schemas import (
@@ -14,7 +14,9 @@ from modules.carpetas.schemas import (
     CarpetaCreate,
     CarpetaUpdate,
     CarpetaWithChildren,
-    CarpetaSimple
+    CarpetaSimple,
+    CarpetaNodo,
+    CarpetaFacturasPage,
 )
 
 
@@ -28,7 +30,7 @@ def get_carpeta_service(db: AsyncSession = Depends(get_db)) -> CarpetaService:
 
 
 @router.get("/", response_model=List[CarpetaResponse])
-async def list_carpetas(service: CarpetaService = Depends(get_carpeta_service)):
+async def list_carpetas(service: CarpetaService = Depends(con_sesion(get_carpeta_service, get_read_db))):
     """
     Lista solo las carpetas raíz con su jerarquía completa anidada.
     
@@ -39,7 +41,7 @@ async def list_carpetas(service: CarpetaService = Depends(get_carpeta_service)):
 
 
 @router.get("/root", response_model=List[CarpetaWithChildren])
-async def list_root_folders(service: CarpetaService = Depends(get_carpeta_service)):
+async def list_root_folders(service: CarpetaService = Depends(con_sesion(get_carpeta_service, get_read_db))):
     """
     Lista las carpetas raíz con sus subcarpetas.
     
@@ -48,13 +50,48 @@ async def list_root_folders(service: CarpetaService = Depends(get_carpeta_servic
     return await service.list_root_folders()
 
 
+@router.get("/arbol", response_model=List[CarpetaNodo])
+async def list_nodos(
+    parent_id: Optional[UUID] = Query(None, description="Carpeta a expandir (vacío: carpetas raíz)"),
+    service: CarpetaService = Depends(con_sesion(get_carpeta_service, get_read_db))
+):
+    """
+    Un nivel del árbol de carpetas, para cargarlo por nodo.
+
+    Sin `parent_id` devuelve las raíces; con él, sus hijas directas. Cada nodo
+    trae `n_hijas` (si se puede expandir), `n_subcarpetas`, `n_facturas` y
+    `total` de TODO su subárbol, sin facturas embebidas: se piden con
+    GET /carpetas/{carpeta_id}/facturas al abrir el nodo.
+
+    **Errores**:
+    - 404: Carpeta padre no encontrada
+    """
+    return await service.list_nodos(parent_id)
+
+
+@router.get("/{carpeta_id}/facturas", response_model=CarpetaFacturasPage)
+async def get_facturas_carpeta(
+    carpeta_id: UUID,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    service: CarpetaService = Depends(con_sesion(get_carpeta_service, get_read_db))
+):
+    """
+    Facturas que están directamente en la carpeta, paginadas (más recientes primero).
+
+    **Errores**:
+    - 404: Carpeta no encontrada
+    """
+    return await service.get_facturas_pagina(carpeta_id, skip, limit)
+
+
 @router.get("/{carpeta_id}", response_model=CarpetaWithChildren)
 async def get_carpeta(
     carpeta_id: UUID,
-    service: CarpetaService = Depends(get_carpeta_service)
+    service: CarpetaService = Depends(con_sesion(get_carpeta_service, get_read_db))
 ):
     """
-    Obtiene una carpeta específica por su ID con sus subcarpetas.
+    Obtiene una carpeta específica por su ID con todo su subárbol.
     
     - **carpeta_id**: ID único de la carpeta
     
@@ -67,7 +104,7 @@ async def get_carpeta(
 @router.get("/parent/{parent_id}", response_model=List[CarpetaResponse])
 async def get_carpetas_by_parent(
     parent_id: UUID,
-    service: CarpetaService = Depends(get_carpeta_service)
+    service: CarpetaService = Depends(con_sesion(get_carpeta_service, get_read_db))
 ):
     """
     Obtiene las subcarpetas de una carpeta específica.
@@ -80,7 +117,7 @@ async def get_carpetas_by_parent(
 @router.get("/factura/{factura_id}", response_model=List[CarpetaResponse])
 async def get_carpetas_by_factura(
     factura_id: UUID,
-    service: CarpetaService = Depends(get_carpeta_service)
+    service: CarpetaService = Depends(con_sesion(get_carpeta_service, get_read_db))
 ):
     """
     Obtiene las carpetas asociadas a una factura específica.
@@ -143,7 +180,8 @@ async def delete_carpeta(
     
     - **carpeta_id**: ID de la carpeta a eliminar
     
-    NOTA: Si la carpeta tiene subcarpetas, también se eliminarán (CASCADE).
+    NOTA: Si la carpeta tiene subcarpetas, también se eliminarán, a cualquier
+    profundidad; sus facturas quedan sin carpeta.
     
     **Errores**:
     - 404: Carpeta no encontrada
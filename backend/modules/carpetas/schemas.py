@@ -85,3 +85,31 @@ class CarpetaWithChildren(BaseModel):
     facturas: List[FacturaEnCarpeta] = []
     
     model_config = {"from_attributes": True}
+
+
+class CarpetaNodo(BaseModel):
+    """Nodo del árbol lazy (GET /carpetas/arbol): sin hijas ni facturas embebidas.
+
+    Los agregados cubren el subárbol completo; n_hijas dice si el nodo se
+    puede expandir.
+    """
+    id: UUID
+    nombre: str
+    parent_id: Optional[UUID] = None
+    factura_id: Optional[UUID] = None
+    created_at: datetime
+    updated_at: datetime
+    n_hijas: int = 0
+    n_subcarpetas: int = 0
+    n_facturas: int = 0
+    total: float = 0
+
+    model_config = {"from_attributes": True}
+
+
+class CarpetaFacturasPage(BaseModel):
+    """Página de las facturas de UNA carpeta (GET /carpetas/{id}/facturas)."""
+    total: int
+    skip: int
+    limit: int
+    facturas: List[FacturaEnCarpeta] = []
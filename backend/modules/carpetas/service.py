@@ -7,8 +7,12 @@ from modules.carpetas.schemas import (
     CarpetaCreate,
     CarpetaUpdate,
     CarpetaWithChildren,
-    CarpetaSimple
+    CarpetaSimple,
+    CarpetaNodo,
+    CarpetaFacturasPage,
 )
+from db.models import Carpeta
+from sqlalchemy import true
 from typing import List, Optional
 from uuid import UUID
 from core.logging import logger
@@ -24,8 +28,7 @@ class CarpetaService:
     async def list_carpetas(self) -> List[CarpetaResponse]:
         """Lista todas las carpetas."""
         logger.info("Listando carpetas")
-        carpetas = await self.repository.get_all()
-        return [CarpetaResponse.model_validate(carpeta) for carpeta in carpetas]
+        return await self._arboles(true())
     
     async def list_root_folders(self) -> List[CarpetaWithChildren]:
         """Lista las carpetas raíz con sus hijos.
@@ -49,8 +52,77 @@ class CarpetaService:
         roots = hijos_por_padre.get(None, [])
         return [self._build_carpeta(c, facturas_por_carpeta, hijos_por_padre) for c in roots]
 
-    def _build_carpeta(self, carpeta, facturas_por_carpeta: dict, hijos_por_padre: dict) -> CarpetaWithChildren:
-        """Construye recursivamente una CarpetaWithChildren desde los mapas planos."""
+    async def list_nodos(self, parent_id: Optional[UUID] = None) -> List[CarpetaNodo]:
+        """Un nivel del árbol (raíces o hijas de `parent_id`) con los agregados de cada subárbol."""
+        logger.info(f"Listando nodos de carpetas bajo: {parent_id or 'raíz'}")
+        if parent_id is not None:
+            await self._nodo_o_404(parent_id)
+        return [CarpetaNodo.model_validate(n) for n in await self.repository.get_nodos(parent_id=parent_id)]
+
+    async def _nodo_o_404(self, carpeta_id: UUID) -> CarpetaNodo:
+        nodos = await self.repository.get_nodos(carpeta_id=carpeta_id)
+        if not nodos:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Carpeta con ID {carpeta_id} no encontrada"
+            )
+        return CarpetaNodo.model_validate(nodos[0])
+
+    async def get_facturas_pagina(self, carpeta_id: UUID, skip: int, limit: int) -> CarpetaFacturasPage:
+        """Facturas de una carpeta, paginadas, al expandir su nodo."""
+        from modules.carpetas.schemas import FacturaEnCarpeta
+
+        nodo = await self._nodo_o_404(carpeta_id)
+        filas, total = await self.repository.get_facturas_pagina(carpeta_id, skip, limit)
+        return CarpetaFacturasPage(
+            total=total,
+            skip=skip,
+            limit=limit,
+            facturas=[
+                FacturaEnCarpeta(
+                    id=f.id,
+                    numero_factura=f.numero_factura,
+                    proveedor=f.proveedor,
+                    total=float(f.total),
+                    estado=f.estado or '',
+                    carpeta_nombre=nodo.nombre,
+                )
+                for f in filas
+            ],
+        )
+
+    async def _arboles(self, semilla) -> List[CarpetaResponse]:
+        """CarpetaResponse de las carpetas que cumplen `semilla`, con sus subárboles completos.
+
+        Las relaciones de Carpeta son lazy="raise": el árbol se arma en memoria
+        desde repository.get_arboles_data, a cualquier profundidad.
+        """
+        raices, carpetas, facturas = await self.repository.get_arboles_data(semilla)
+        por_id = {c.id: c for c in carpetas}
+
+        facturas_por_carpeta: dict = {}
+        for f in facturas:
+            facturas_por_carpeta.setdefault(f.carpeta_id, []).append(f)
+        hijos_por_padre: dict = {}
+        for c in carpetas:
+            hijos_por_padre.setdefault(c.parent_id, []).append(c)
+
+        return [
+            self._build_carpeta(por_id[raiz_id], facturas_por_carpeta, hijos_por_padre, CarpetaResponse)
+            for raiz_id in raices
+        ]
+
+    async def _carpeta_o_404(self, carpeta_id: UUID) -> CarpetaResponse:
+        carpetas = await self._arboles(Carpeta.id == carpeta_id)
+        if not carpetas:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Carpeta con ID {carpeta_id} no encontrada"
+            )
+        return carpetas[0]
+
+    def _build_carpeta(self, carpeta, facturas_por_carpeta: dict, hijos_por_padre: dict, esquema=CarpetaWithChildren):
+        """Construye recursivamente la respuesta (`esquema`) de una carpeta desde los mapas planos."""
         from modules.carpetas.schemas import FacturaEnCarpeta
 
         facturas_out = [
@@ -66,11 +138,11 @@ class CarpetaService:
         ]
 
         children_out = [
-            self._build_carpeta(child, facturas_por_carpeta, hijos_por_padre)
+            self._build_carpeta(child, facturas_por_carpeta, hijos_por_padre, esquema)
             for child in hijos_por_padre.get(carpeta.id, [])
         ]
 
-        return CarpetaWithChildren(
+        datos = dict(
             id=carpeta.id,
             nombre=carpeta.nombre,
             parent_id=carpeta.parent_id,
@@ -80,40 +152,45 @@ class CarpetaService:
             facturas=facturas_out,
             children=children_out,
         )
+        if esquema is CarpetaResponse:
+            datos["parent"] = CarpetaSimple.model_validate(carpeta.parent) if carpeta.parent else None
+        return esquema(**datos)
 
     async def get_carpeta(self, carpeta_id: UUID) -> CarpetaResponse:
         """Obtiene una carpeta por su ID."""
         logger.info(f"Obteniendo carpeta: {carpeta_id}")
-        carpeta = await self.repository.get_by_id(carpeta_id)
-        if not carpeta:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Carpeta con ID {carpeta_id} no encontrada"
-            )
-        return CarpetaResponse.model_validate(carpeta)
+        return await self._carpeta_o_404(carpeta_id)
     
     async def get_carpeta_with_children(self, carpeta_id: UUID) -> CarpetaWithChildren:
         """Obtiene una carpeta con sus hijos por su ID."""
         logger.info(f"Obteniendo carpeta con hijos: {carpeta_id}")
-        carpeta = await self.repository.get_by_id(carpeta_id)
+        # Subárbol completo en dos queries planas (antes: tres niveles de selectin)
+        carpetas, facturas = await self.repository.get_subarbol_data(carpeta_id)
+        carpeta = next((c for c in carpetas if c.id == carpeta_id), None)
         if not carpeta:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Carpeta con ID {carpeta_id} no encontrada"
             )
-        return CarpetaWithChildren.model_validate(carpeta)
+
+        facturas_por_carpeta: dict = {}
+        for f in facturas:
+            facturas_por_carpeta.setdefault(f.carpeta_id, []).append(f)
+        hijos_por_padre: dict = {}
+        for c in carpetas:
+            hijos_por_padre.setdefault(c.parent_id, []).append(c)
+
+        return self._build_carpeta(carpeta, facturas_por_carpeta, hijos_por_padre)
     
     async def get_carpetas_by_parent(self, parent_id: UUID) -> List[CarpetaResponse]:
         """Obtiene las carpetas hijas de una carpeta padre."""
         logger.info(f"Obteniendo carpetas hijas de: {parent_id}")
-        carpetas = await self.repository.get_by_parent_id(parent_id)
-        return [CarpetaResponse.model_validate(carpeta) for carpeta in carpetas]
+        return await self._arboles(Carpeta.parent_id == parent_id)
     
     async def get_carpetas_by_factura(self, factura_id: UUID) -> List[CarpetaResponse]:
         """Obtiene las carpetas asociadas a una factura."""
         logger.info(f"Obteniendo carpetas de factura: {factura_id}")
-        carpetas = await self.repository.get_by_factura_id(factura_id)
-        return [CarpetaResponse.model_validate(carpeta) for carpeta in carpetas]
+        return await self._arboles(Carpeta.factura_id == factura_id)
     
     async def create_carpeta(self, carpeta_data: CarpetaCreate) -> CarpetaResponse:
         """Crea una nueva carpeta."""
@@ -131,7 +208,7 @@ class CarpetaService:
             
             carpeta = await self.repository.create(carpeta_data.model_dump())
             logger.info(f"Carpeta creada exitosamente: {carpeta.id}")
-            return CarpetaResponse.model_validate(carpeta)
+            return await self._carpeta_o_404(carpeta.id)
         except HTTPException:
             raise
         except Exception as e:
@@ -166,6 +243,12 @@ class CarpetaService:
                         status_code=status.HTTP_400_BAD_REQUEST,
                         detail="Una carpeta no puede ser su propio padre"
                     )
+                # Ni moverla dentro de su propio subárbol (a cualquier profundidad)
+                if await self.repository.es_del_subarbol(carpeta_id, carpeta_data.parent_id):
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail="Una carpeta no puede moverse dentro de una de sus subcarpetas"
+                    )
                 
                 parent = await self.repository.get_by_id(carpeta_data.parent_id)
                 if not parent:
@@ -178,7 +261,7 @@ class CarpetaService:
             update_data = carpeta_data.model_dump(exclude_unset=True)
             carpeta = await self.repository.update(carpeta_id, update_data)
             logger.info(f"Carpeta actualizada exitosamente: {carpeta_id}")
-            return CarpetaResponse.model_validate(carpeta)
+            return await self._carpeta_o_404(carpeta_id)
         except HTTPException:
             raise
         except Exception as e:
@@ -189,22 +272,20 @@ class CarpetaService:
             )
     
     async def delete_carpeta(self, carpeta_id: UUID) -> None:
-        """Elimina una carpeta por su ID."""
+        """Elimina una carpeta con todo su subárbol."""
         logger.info(f"Eliminando carpeta: {carpeta_id}")
         
-        carpeta = await self.repository.get_by_id(carpeta_id)
-        if not carpeta:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Carpeta con ID {carpeta_id} no encontrada"
-            )
-        
         try:
-            await self.repository.delete(carpeta_id)
-            logger.info(f"Carpeta eliminada exitosamente: {carpeta_id}")
+            eliminada = await self.repository.delete(carpeta_id)
         except Exception as e:
             logger.error(f"Error al eliminar carpeta: {str(e)}")
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error al eliminar carpeta: {str(e)}"
             )
+        if not eliminada:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Carpeta con ID {carpeta_id} no encontrada"
+            )
+        logger.info(f"Carpeta eliminada exitosamente: {carpeta_id}")
@@ -3,10 +3,30 @@ Repositorio para operaciones de base de datos de carpetas de tesorería.
 """
 from uuid import UUID
 from typing import Optional, List
-from sqlalchemy import select, or_
+from sqlalchemy import Integer, delete, select, func, literal, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload, noload
-from db.models import CarpetaTesoreria, Factura
+from sqlalchemy.orm import aliased, joinedload, selectinload, noload
+from db.models import CarpetaTesoreria, CarpetaTesoreriaStats, Factura
+
+
+def _subarbol(semilla):
+    """CTE recursiva (id, raiz_id, nivel): cada carpeta que cumple `semilla`
+    (raiz_id = ella misma, nivel 0) y todas sus descendientes, a cualquier
+    profundidad. Igual que en modules/carpetas/repository.py.
+    """
+    arbol = (
+        select(
+            CarpetaTesoreria.id.label("id"),
+            CarpetaTesoreria.id.label("raiz_id"),
+            literal(0, Integer).label("nivel"),
+        )
+        .where(semilla)
+        .cte("subarbol", recursive=True)
+    )
+    return arbol.union_all(
+        select(CarpetaTesoreria.id, arbol.c.raiz_id, arbol.c.nivel + 1)
+        .join(arbol, CarpetaTesoreria.parent_id == arbol.c.id)
+    )
 
 
 class CarpetaTesoreriaRepository:
@@ -16,58 +36,94 @@ class CarpetaTesoreriaRepository:
         self.db = db
     
     async def get_by_id(self, carpeta_id: UUID) -> Optional[CarpetaTesoreria]:
-        """Obtiene una carpeta por ID con sus relaciones cargadas."""
+        """Obtiene una carpeta por ID, solo sus columnas.
+
+        Las relaciones son lazy="raise": el árbol para las respuestas sale de
+        get_subarbol_data.
+        """
         stmt = (
             select(CarpetaTesoreria)
             .where(CarpetaTesoreria.id == carpeta_id)
-            .options(
-                selectinload(CarpetaTesoreria.parent),
-                selectinload(CarpetaTesoreria.children)
-                    .selectinload(CarpetaTesoreria.facturas).noload("*"),
-                selectinload(CarpetaTesoreria.facturas).noload("*")
-            )
+            .options(noload("*"))
         )
         result = await self.db.execute(stmt)
         return result.scalar_one_or_none()
-    
-    async def get_all(self, parent_id: Optional[UUID] = None) -> List[CarpetaTesoreria]:
-        """Obtiene todas las carpetas, opcionalmente filtradas por parent_id.
 
-        Las facturas de cada carpeta solo aportan id/numero_factura/proveedor/total
-        (ver FacturaEnCarpetaTesoreria). El modelo Factura tiene 16 relaciones
-        lazy="selectin", así que sin frenarlas cada factura del árbol arrastraría
-        files/asignaciones/comentarios/tokens/etc en cascada. Cargamos las facturas
-        en cada nivel del árbol con noload('*') para traer SOLO sus columnas.
+    async def get_subarbol_data(self, semilla) -> tuple[List[UUID], List[CarpetaTesoreria], list]:
+        """Datos planos de las carpetas que cumplen `semilla` y sus subárboles completos.
 
-        Antes esto se resolvía con `_load_children_recursive`, que hacía un
-        `db.refresh(child, [...])` por cada carpeta hija = N+1 de round-trips además
-        de la cascada. Al cargar el árbol con selectin explícito por nivel ya no hace
-        falta esa recursión.
+        Cuatro queries, sin importar la profundidad:
+          1. Los ids de las raíces (las que cumplen `semilla`), por nombre.
+          2-3. Las carpetas de los subárboles y sus padres (selectin), sin el
+             resto de relaciones.
+          4. Las facturas de esas carpetas, solo las columnas que usa
+             FacturaEnCarpetaTesoreria.
+        El árbol se arma en el service por parent_id / carpeta_tesoreria_id.
         """
-        stmt = (
+        raices_result = await self.db.execute(
+            select(CarpetaTesoreria.id).where(semilla).order_by(CarpetaTesoreria.nombre)
+        )
+        ids = select(_subarbol(semilla).c.id)
+        carpetas_result = await self.db.execute(
             select(CarpetaTesoreria)
-            .options(
-                selectinload(CarpetaTesoreria.facturas).noload("*"),
-                selectinload(CarpetaTesoreria.children)
-                    .selectinload(CarpetaTesoreria.facturas).noload("*"),
-                selectinload(CarpetaTesoreria.children)
-                    .selectinload(CarpetaTesoreria.children)
-                    .selectinload(CarpetaTesoreria.facturas).noload("*"),
-                selectinload(CarpetaTesoreria.children)
-                    .selectinload(CarpetaTesoreria.children)
-                    .selectinload(CarpetaTesoreria.children)
-                    .selectinload(CarpetaTesoreria.facturas).noload("*"),
+            .where(CarpetaTesoreria.id.in_(ids))
+            .options(selectinload(CarpetaTesoreria.parent).noload("*"), noload("*"))
+            .order_by(CarpetaTesoreria.nombre),
+            # Una carpeta ya cargada con noload (get_by_id/update) tiene el padre en None
+            execution_options={"populate_existing": True},
+        )
+        facturas_result = await self.db.execute(
+            select(
+                Factura.id,
+                Factura.numero_factura,
+                Factura.proveedor,
+                Factura.total,
+                Factura.carpeta_tesoreria_id,
             )
+            .where(Factura.carpeta_tesoreria_id.in_(ids))
         )
+        return (
+            list(raices_result.scalars().all()),
+            list(carpetas_result.scalars().all()),
+            facturas_result.all(),
+        )
+
+    async def get_grid(self, parent_id: Optional[UUID] = None) -> list:
+        """Carpetas de un nivel con sus agregados, en UNA query.
 
+        Los agregados salen de carpeta_tesoreria_stats (join por PK, mantenida
+        por trigger); n_hijas es un conteo sobre el índice de parent_id. No
+        toca las facturas.
+        """
+        hijas = aliased(CarpetaTesoreria)
+        stats = CarpetaTesoreriaStats
+        stmt = (
+            select(
+                CarpetaTesoreria.id,
+                CarpetaTesoreria.nombre,
+                CarpetaTesoreria.parent_id,
+                CarpetaTesoreria.archivo_egreso_url,
+                CarpetaTesoreria.created_at,
+                CarpetaTesoreria.updated_at,
+                select(func.count(hijas.id))
+                    .where(hijas.parent_id == CarpetaTesoreria.id)
+                    .scalar_subquery()
+                    .label("n_hijas"),
+                func.coalesce(stats.n_facturas, 0).label("n_facturas"),
+                func.coalesce(stats.total, 0).label("total"),
+                func.coalesce(stats.n_pagadas, 0).label("n_pagadas"),
+                func.coalesce(stats.n_pendientes, 0).label("n_pendientes"),
+                stats.ultima_actividad,
+            )
+            .outerjoin(stats, stats.carpeta_tesoreria_id == CarpetaTesoreria.id)
+            .order_by(CarpetaTesoreria.nombre)
+        )
         if parent_id is not None:
             stmt = stmt.where(CarpetaTesoreria.parent_id == parent_id)
         else:
-            # Solo carpetas raíz si no se especifica parent_id
             stmt = stmt.where(CarpetaTesoreria.parent_id.is_(None))
-
         result = await self.db.execute(stmt)
-        return list(result.scalars().all())
+        return result.all()
 
     async def create(
         self,
@@ -111,30 +167,48 @@ class CarpetaTesoreriaRepository:
             carpeta.archivo_egreso_url = archivo_egreso_url
         
         await self.db.commit()
-        await self.db.refresh(carpeta)
-        
-        # Retornar sin recargar relaciones completamente
-        return carpeta
+        # Columnas frescas tras el commit (sin refresh, que tocaría las relaciones)
+        result = await self.db.execute(
+            select(CarpetaTesoreria)
+            .where(CarpetaTesoreria.id == carpeta_id)
+            .options(noload("*")),
+            execution_options={"populate_existing": True},
+        )
+        return result.scalar_one()
     
     async def delete(self, carpeta_id: UUID) -> bool:
-        """Elimina una carpeta y sus hijos en cascada."""
-        carpeta = await self.get_by_id(carpeta_id)
-        if not carpeta:
-            return False
-        
-        await self.db.delete(carpeta)
+        """Elimina una carpeta y todo su subárbol.
+
+        Dos sentencias sobre el subárbol, a cualquier profundidad, como
+        CarpetaRepository.delete: sacar sus facturas de la carpeta (explícito,
+        para que updated_at y el trigger de carpeta_tesoreria_stats lo vean) y
+        borrar las carpetas. El cascade ORM de `children` tocaba relaciones
+        lazy="raise".
+        """
+        ids = select(_subarbol(CarpetaTesoreria.id == carpeta_id).c.id)
+        await self.db.execute(
+            update(Factura)
+            .where(Factura.carpeta_tesoreria_id.in_(ids))
+            .values(carpeta_tesoreria_id=None)
+            .execution_options(synchronize_session=False)
+        )
+        result = await self.db.execute(
+            delete(CarpetaTesoreria)
+            .where(CarpetaTesoreria.id.in_(ids))
+            .returning(CarpetaTesoreria.id)
+            .execution_options(synchronize_session=False)
+        )
+        eliminadas = result.scalars().all()
         await self.db.commit()
-        return True
+        return len(eliminadas) > 0
     
     async def get_facturas_by_carpeta(self, carpeta_id: UUID) -> List[Factura]:
         """Obtiene todas las facturas asignadas a una carpeta."""
         stmt = (
             select(Factura)
             .where(Factura.carpeta_tesoreria_id == carpeta_id)
-            .options(
-                selectinload(Factura.area),
-                selectinload(Factura.estado)
-            )
+            # La lista solo muestra el nombre de la carpeta (FacturaEnCarpetaTesoreria)
+            .options(joinedload(Factura.carpeta_tesoreria).raiseload("*"))
         )
         result = await self.db.execute(stmt)
         return list(result.scalars().all())
@@ -156,17 +230,3 @@ class CarpetaTesoreriaRepository:
         await self.db.commit()
         await self.db.refresh(factura)
         return factura
-    
-    async def search(self, query: str) -> List[CarpetaTesoreria]:
-        """Busca carpetas por nombre."""
-        stmt = (
-            select(CarpetaTesoreria)
-            .where(CarpetaTesoreria.nombre.ilike(f"%{query}%"))
-            .options(
-                selectinload(CarpetaTesoreria.children)
-                    .selectinload(CarpetaTesoreria.facturas).noload("*"),
-                selectinload(CarpetaTesoreria.facturas).noload("*")
-            )
-        )
-        result = await self.db.execute(stmt)
-        return list(result.scalars().all())
@@ -8,7 +8,7 @@ from typing import List, Optional
 from uuid import UUID
 from io import BytesIO
 
-from db.session import get_db
+from db.session import get_db, get_read_db
 from core.auth import get_current_user
 from .service import CarpetaTesoreriaService
 from .schemas import (
@@ -17,6 +17,7 @@ from .schemas import (
     CarpetaTesoreriaResponse,
     CarpetaTesoreriaSimple,
     CarpetaTesoreriaWithChildren,
+    CarpetaTesoreriaGridItem,
     FacturaEnCarpetaTesoreria
 )
 
@@ -26,7 +27,7 @@ router = APIRouter(prefix="/carpetas-tesoreria", tags=["carpetas_tesoreria"])
 @router.get("/", response_model=List[CarpetaTesoreriaWithChildren])
 async def get_carpetas(
     parent_id: Optional[UUID] = Query(None, description="ID de la carpeta padre"),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: dict = Depends(get_current_user)
 ):
     """Obtiene todas las carpetas de tesorería, opcionalmente filtradas por parent_id."""
@@ -34,10 +35,26 @@ async def get_carpetas(
     return await service.get_all_carpetas(parent_id=parent_id)
 
 
+@router.get("/grid", response_model=List[CarpetaTesoreriaGridItem])
+async def get_grid(
+    parent_id: Optional[UUID] = Query(None, description="ID de la carpeta padre (vacío: carpetas raíz)"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Grilla de carpetas de tesorería de un nivel, con sus agregados.
+
+    Por carpeta: facturas archivadas, suma de `total`, pagadas, pendientes y
+    última actividad, leídos de carpeta_tesoreria_stats en una sola query. Las
+    facturas de una carpeta se piden con GET /carpetas-tesoreria/{id}/facturas.
+    """
+    service = CarpetaTesoreriaService(db)
+    return await service.get_grid(parent_id=parent_id)
+
+
 @router.get("/search", response_model=List[CarpetaTesoreriaResponse])
 async def search_carpetas(
     q: str = Query(..., min_length=1, description="Término de búsqueda"),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: dict = Depends(get_current_user)
 ):
     """Busca carpetas de tesorería por nombre."""
@@ -48,7 +65,7 @@ async def search_carpetas(
 @router.get("/{carpeta_id}", response_model=CarpetaTesoreriaResponse)
 async def get_carpeta(
     carpeta_id: UUID,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: dict = Depends(get_current_user)
 ):
     """Obtiene una carpeta de tesorería por ID."""
@@ -107,7 +124,7 @@ async def delete_carpeta(
 @router.get("/{carpeta_id}/facturas", response_model=List[FacturaEnCarpetaTesoreria])
 async def get_facturas_by_carpeta(
     carpeta_id: UUID,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: dict = Depends(get_current_user)
 ):
     """Obtiene todas las facturas asignadas a una carpeta de tesorería."""
@@ -173,7 +190,7 @@ async def delete_archivo_egreso(
 @router.get("/{carpeta_id}/archivo-egreso-url")
 async def get_archivo_egreso_url(
     carpeta_id: UUID,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: dict = Depends(get_current_user)
 ):
     """Obtiene la URL prefirmada para descargar el archivo PDF de control de egresos."""
@@ -192,7 +209,7 @@ async def get_archivo_egreso_url(
 @router.get("/{carpeta_id}/archivo-egreso-download")
 async def download_archivo_egreso(
     carpeta_id: UUID,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: dict = Depends(get_current_user)
 ):
     """Descarga directamente el archivo PDF de control de egresos."""
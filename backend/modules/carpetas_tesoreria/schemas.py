@@ -82,3 +82,25 @@ class CarpetaTesoreriaWithChildren(BaseModel):
     facturas: List[FacturaEnCarpetaTesoreria] = []
     
     model_config = {"from_attributes": True}
+
+
+class CarpetaTesoreriaGridItem(BaseModel):
+    """Fila de la grilla de carpetas de Tesorería (GET /carpetas-tesoreria/grid).
+
+    Agregados de las facturas archivadas directamente en la carpeta, leídos de
+    carpeta_tesoreria_stats; sin facturas ni hijas embebidas.
+    """
+    id: UUID
+    nombre: str
+    parent_id: Optional[UUID] = None
+    archivo_egreso_url: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    n_hijas: int = 0
+    n_facturas: int = 0
+    total: float = 0
+    n_pagadas: int = 0
+    n_pendientes: int = 0
+    ultima_actividad: Optional[datetime] = None
+
+    model_config = {"from_attributes": True}
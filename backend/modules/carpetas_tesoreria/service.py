@@ -13,6 +13,7 @@ from .schemas import (
     CarpetaTesoreriaResponse,
     CarpetaTesoreriaSimple,
     CarpetaTesoreriaWithChildren,
+    CarpetaTesoreriaGridItem,
     FacturaEnCarpetaTesoreria
 )
 from db.models import CarpetaTesoreria, Factura
@@ -27,46 +28,53 @@ class CarpetaTesoreriaService:
         self.repository = CarpetaTesoreriaRepository(db)
     
     async def get_carpeta(self, carpeta_id: UUID) -> Optional[CarpetaTesoreriaResponse]:
-        """Obtiene una carpeta por ID."""
-        carpeta = await self.repository.get_by_id(carpeta_id)
-        if not carpeta:
-            return None
-        return CarpetaTesoreriaResponse.model_validate(carpeta)
+        """Obtiene una carpeta por ID con su subárbol completo."""
+        carpetas = await self._arboles(CarpetaTesoreria.id == carpeta_id, CarpetaTesoreriaResponse)
+        return carpetas[0] if carpetas else None
     
     async def get_all_carpetas(
         self,
         parent_id: Optional[UUID] = None
     ) -> List[CarpetaTesoreriaWithChildren]:
         """Obtiene todas las carpetas, opcionalmente filtradas por parent_id."""
-        carpetas = await self.repository.get_all(parent_id=parent_id)
-        
-        # Convertir a diccionarios para evitar problemas de lazy loading
-        result = []
-        for carpeta in carpetas:
-            carpeta_dict = await self._carpeta_to_dict(carpeta)
-            result.append(CarpetaTesoreriaWithChildren.model_validate(carpeta_dict))
-        
-        return result
+        if parent_id is not None:
+            semilla = CarpetaTesoreria.parent_id == parent_id
+        else:
+            # Solo carpetas raíz si no se especifica parent_id
+            semilla = CarpetaTesoreria.parent_id.is_(None)
+        return await self._arboles(semilla, CarpetaTesoreriaWithChildren)
     
-    async def _carpeta_to_dict(self, carpeta: CarpetaTesoreria) -> dict:
-        """Convierte una carpeta a diccionario cargando todas sus relaciones."""
-        children_list = []
-        if carpeta.children:
-            for child in carpeta.children:
-                children_list.append(await self._carpeta_to_dict(child))
-        
-        facturas_list = []
-        if carpeta.facturas:
-            for factura in carpeta.facturas:
-                facturas_list.append({
-                    'id': factura.id,
-                    'numero_factura': factura.numero_factura,
-                    'proveedor': factura.proveedor,
-                    'total': factura.total,
-                    'carpeta_nombre': carpeta.nombre
-                })
-        
-        return {
+    async def get_grid(self, parent_id: Optional[UUID] = None) -> List[CarpetaTesoreriaGridItem]:
+        """Grilla de carpetas con cantidad, total y pagadas/pendientes de cada una."""
+        filas = await self.repository.get_grid(parent_id=parent_id)
+        return [CarpetaTesoreriaGridItem.model_validate(f) for f in filas]
+    
+    async def _arboles(self, semilla, esquema) -> list:
+        """Carpetas que cumplen `semilla` con sus subárboles, armadas desde datos planos.
+
+        Las relaciones de CarpetaTesoreria son lazy="raise": en vez de que
+        model_validate las recorra, el árbol se construye en memoria desde
+        get_subarbol_data (cuatro queries a cualquier profundidad).
+        """
+        raices, carpetas, facturas = await self.repository.get_subarbol_data(semilla)
+        por_id = {c.id: c for c in carpetas}
+
+        facturas_por_carpeta: dict = {}
+        for f in facturas:
+            facturas_por_carpeta.setdefault(f.carpeta_tesoreria_id, []).append(f)
+        hijos_por_padre: dict = {}
+        for c in carpetas:
+            if c.parent_id is not None:
+                hijos_por_padre.setdefault(c.parent_id, []).append(c)
+
+        return [
+            self._build_carpeta(por_id[raiz_id], facturas_por_carpeta, hijos_por_padre, esquema)
+            for raiz_id in raices
+        ]
+    
+    def _build_carpeta(self, carpeta: CarpetaTesoreria, facturas_por_carpeta: dict, hijos_por_padre: dict, esquema):
+        """Construye recursivamente la respuesta (`esquema`) de una carpeta desde los mapas planos."""
+        datos = {
             'id': carpeta.id,
             'nombre': carpeta.nombre,
             'parent_id': carpeta.parent_id,
@@ -74,9 +82,24 @@ class CarpetaTesoreriaService:
             'archivo_egreso_url': carpeta.archivo_egreso_url,
             'created_at': carpeta.created_at,
             'updated_at': carpeta.updated_at,
-            'children': children_list,
-            'facturas': facturas_list
+            'children': [
+                self._build_carpeta(hijo, facturas_por_carpeta, hijos_por_padre, esquema)
+                for hijo in hijos_por_padre.get(carpeta.id, [])
+            ],
+            'facturas': [
+                FacturaEnCarpetaTesoreria(
+                    id=f.id,
+                    numero_factura=f.numero_factura,
+                    proveedor=f.proveedor,
+                    total=float(f.total),
+                    carpeta_nombre=carpeta.nombre,
+                )
+                for f in facturas_por_carpeta.get(carpeta.id, [])
+            ],
         }
+        if esquema is CarpetaTesoreriaResponse:
+            datos['parent'] = CarpetaTesoreriaSimple.model_validate(carpeta.parent) if carpeta.parent else None
+        return esquema(**datos)
     
     async def create_carpeta(
         self,
@@ -95,7 +118,7 @@ class CarpetaTesoreriaService:
             parent_id=data.parent_id,
             created_by=created_by
         )
-        return CarpetaTesoreriaResponse.model_validate(carpeta)
+        return await self.get_carpeta(carpeta.id)
     
     async def update_carpeta(
         self,
@@ -122,7 +145,7 @@ class CarpetaTesoreriaService:
         if not carpeta:
             return None
         
-        return CarpetaTesoreriaResponse.model_validate(carpeta)
+        return await self.get_carpeta(carpeta_id)
     
     async def delete_carpeta(self, carpeta_id: UUID) -> bool:
         """Elimina una carpeta y sus hijos en cascada."""
@@ -173,11 +196,7 @@ class CarpetaTesoreriaService:
     
     async def search_carpetas(self, query: str) -> List[CarpetaTesoreriaResponse]:
         """Busca carpetas por nombre."""
-        carpetas = await self.repository.search(query)
-        return [
-            CarpetaTesoreriaResponse.model_validate(c)
-            for c in carpetas
-        ]
+        return await self._arboles(CarpetaTesoreria.nombre.ilike(f"%{query}%"), CarpetaTesoreriaResponse)
     
     async def upload_archivo_egreso(
         self,
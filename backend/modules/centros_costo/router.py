@@ -6,7 +6,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from uuid import UUID
 
-from db.session import get_db
+from db.session import con_sesion, get_db, get_read_db
+from core.versionado import respuesta_condicional
 from modules.centros_costo.repository import CentroCostoRepository
 from modules.centros_costo.service import CentroCostoService
 from modules.centros_costo.schemas import (
@@ -25,10 +26,14 @@ def get_service(db: AsyncSession = Depends(get_db)) -> CentroCostoService:
     return CentroCostoService(repository)
 
 
-@router.get("/centros-costo", response_model=List[CentroCostoResponse])
+@router.get(
+    "/centros-costo",
+    response_model=List[CentroCostoResponse],
+    dependencies=[Depends(respuesta_condicional("centros_costo"))],
+)
 async def list_centros_costo(
     activos_only: bool = True,
-    service: CentroCostoService = Depends(get_service)
+    service: CentroCostoService = Depends(con_sesion(get_service, get_read_db))
 ):
     """
     Lista todos los centros de costo.
@@ -41,7 +46,7 @@ async def list_centros_costo(
 @router.get("/centros-costo/{centro_id}", response_model=CentroCostoResponse)
 async def get_centro_costo(
     centro_id: UUID,
-    service: CentroCostoService = Depends(get_service)
+    service: CentroCostoService = Depends(con_sesion(get_service, get_read_db))
 ):
     """Obtiene un centro de costo por ID."""
     return await service.get_by_id(centro_id)
@@ -5,7 +5,8 @@ from fastapi import APIRouter, Depends, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
-from db.session import get_db
+from db.session import con_sesion, get_db, get_read_db
+from core.versionado import respuesta_condicional
 from modules.centros_operacion.repository import CentroOperacionRepository
 from modules.centros_operacion.service import CentroOperacionService
 from modules.centros_operacion.schemas import (
@@ -23,10 +24,14 @@ def get_service(db: AsyncSession = Depends(get_db)) -> CentroOperacionService:
     return CentroOperacionService(CentroOperacionRepository(db))
 
 
-@router.get("/centros-operacion", response_model=List[CentroOperacionResponse])
+@router.get(
+    "/centros-operacion",
+    response_model=List[CentroOperacionResponse],
+    dependencies=[Depends(respuesta_condicional("centros_operacion"))],
+)
 async def list_centros_operacion(
     activos_only: bool = Query(True, description="Solo centros de operación activos"),
-    service: CentroOperacionService = Depends(get_service),
+    service: CentroOperacionService = Depends(con_sesion(get_service, get_read_db)),
 ):
     """Lista todos los centros de operación."""
     return await service.get_all(activos_only=activos_only)
@@ -35,7 +40,7 @@ async def list_centros_operacion(
 @router.get("/centros-operacion/{centro_id}", response_model=CentroOperacionResponse)
 async def get_centro_operacion(
     centro_id: UUID,
-    service: CentroOperacionService = Depends(get_service),
+    service: CentroOperacionService = Depends(con_sesion(get_service, get_read_db)),
 ):
     """Obtiene un centro de operación por ID."""
     return await service.get_by_id(centro_id)
@@ -51,13 +51,13 @@ class ChatRequest(BaseModel):
 
 async def stream_claude_response(messages: List[ChatMessage]):
     """Genera respuesta en streaming desde Claude."""
-    from anthropic import AsyncAnthropic
+    from core.instrumentacion import cliente_anthropic
 
     if not settings.anthropic_api_key:
         yield f"data: {json.dumps({'error': 'Anthropic API key no configurada'})}\n\n"
         return
 
-    client = AsyncAnthropic(api_key=settings.anthropic_api_key)
+    client = cliente_anthropic()
 
     anthropic_messages = [
         {"role": msg.role, "content": msg.content}
@@ -6,7 +6,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
 from typing import Annotated
 
-from db.session import get_db
+from db.session import get_db, get_read_db
 from core.auth import get_current_user
 
 from modules.comentarios.service import ComentarioService
@@ -30,7 +30,7 @@ async def get_comentarios(
     factura_id: UUID,
     skip: int = Query(0, ge=0, description="Número de registros a omitir"),
     limit: int = Query(100, ge=1, le=500, description="Número máximo de registros a retornar"),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: dict = Depends(get_current_user)
 ):
     """
@@ -6,7 +6,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from uuid import UUID
 
-from db.session import get_db
+from db.session import get_db, get_read_db
+from core.versionado import respuesta_condicional
 from core.auth import get_current_user
 from .service import CuentaAuxiliarService
 from .schemas import (
@@ -22,10 +23,14 @@ router = APIRouter(
 )
 
 
-@router.get("/cuentas-auxiliares", response_model=List[CuentaAuxiliarList])
+@router.get(
+    "/cuentas-auxiliares",
+    response_model=List[CuentaAuxiliarList],
+    dependencies=[Depends(respuesta_condicional("cuentas_auxiliares"))],
+)
 async def get_cuentas_auxiliares(
     activas_only: bool = Query(False, description="Filtrar solo cuentas activas"),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: dict = Depends(get_current_user)
 ):
     """
@@ -40,7 +45,7 @@ async def get_cuentas_auxiliares(
 @router.get("/cuentas-auxiliares/{cuenta_id}", response_model=CuentaAuxiliarResponse)
 async def get_cuenta_auxiliar(
     cuenta_id: UUID,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: dict = Depends(get_current_user)
 ):
     """Obtiene una cuenta auxiliar por su ID."""
@@ -0,0 +1,42 @@
+"""
+Reconciliación nocturna de factura_counters.
+
+El trigger de facturas (migración f9a0b1c2d3e4) mantiene los contadores por
+deltas en la misma transacción de cada cambio, así que no deberían desfasarse.
+Si algo los mueve por fuera (un ALTER TABLE … DISABLE TRIGGER, una restauración
+parcial), este módulo los compara contra facturas y, si no cuadran, los
+reescribe.
+
+- Nocturno: ciclo_reconciliacion_contadores corre a la HORA_RECONCILIACION_LOCAL.
+- A demanda: scripts/reconciliar_factura_counters.py (con --dry-run para solo ver).
+"""
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.logging import logger
+from core.tareas import ciclo_diario
+from modules.dashboard.repository import DashboardRepository
+
+HORA_RECONCILIACION_LOCAL = 4  # 4:00 a.m. hora Colombia, sin usuarios
+
+
+async def reconciliar_contadores(db: AsyncSession, dry_run: bool = False) -> list:
+    """Detecta (y salvo dry_run corrige) los contadores desfasados. Devuelve las claves encontradas."""
+    repo = DashboardRepository(db)
+    desfasados = await repo.get_contadores_desfasados()
+    for c in desfasados:
+        logger.warning(
+            f"factura_counters desfasado en área {c.area_id}, estado {c.estado_id}: "
+            f"{c.n_facturas} → {c.n_real} facturas, total {c.total} → {c.total_real}"
+        )
+    if desfasados and not dry_run:
+        await repo.reconstruir_contadores()
+        await db.commit()
+    return desfasados
+
+
+async def ciclo_reconciliacion_contadores() -> None:
+    """Tarea de fondo: reconcilia factura_counters cada noche."""
+    await ciclo_diario(
+        HORA_RECONCILIACION_LOCAL, reconciliar_contadores, "reconciliación de factura_counters",
+        lambda desfasados: f"{len(desfasados)} clave(s) corregida(s)",
+    )
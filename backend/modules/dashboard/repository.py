@@ -2,9 +2,13 @@
 Repositorio para operaciones del dashboard.
 """
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from typing import List, Dict
-from db.models import Factura, Area, User, Estado
+from sqlalchemy import BigInteger, cast, delete, func, insert, or_, select, text
+from typing import List, Dict, Optional
+from datetime import date, datetime
+from db.models import (
+    Factura, FacturaCounter, Area, User, Estado,
+    SlaBacklog, SlaCiclo, SlaCursor, SlaFlujoDiario, SlaPermanencia,
+)
 
 
 class DashboardRepository:
@@ -14,15 +18,17 @@ class DashboardRepository:
         self.db = db
     
     async def get_facturas_metrics(self) -> Dict[str, int]:
-        """Obtiene métricas de facturas con una sola query de agregación condicional."""
+        """Métricas de facturas sumando factura_counters por estado (sin recorrer facturas)."""
+        n = FacturaCounter.n_facturas
+        # sum(bigint) es numeric en Postgres: de vuelta a entero
         result = await self.db.execute(
             select(
-                func.count(Factura.id).label('total'),
-                func.count(Factura.id).filter(Estado.code != 'recibida').label('asignadas'),
-                func.count(Factura.id).filter(Estado.code == 'pagada').label('cerradas'),
-                func.count(Factura.id).filter(Estado.code == 'recibida').label('pendientes'),
+                cast(func.sum(n), BigInteger).label('total'),
+                cast(func.sum(n).filter(Estado.code != 'recibida'), BigInteger).label('asignadas'),
+                cast(func.sum(n).filter(Estado.code == 'pagada'), BigInteger).label('cerradas'),
+                cast(func.sum(n).filter(Estado.code == 'recibida'), BigInteger).label('pendientes'),
             )
-            .join(Estado, Factura.estado_id == Estado.id)
+            .join(Estado, FacturaCounter.estado_id == Estado.id)
         )
         row = result.one()
         return {
@@ -62,3 +68,151 @@ class DashboardRepository:
             })
         
         return asignaciones
+
+    def _contadores_reales(self):
+        """Lo que factura_counters debería tener, agregado desde facturas."""
+        return (
+            select(
+                Factura.area_id,
+                Factura.estado_id,
+                func.count().label('n_facturas'),
+                func.sum(Factura.total).label('total'),
+                func.min(Factura.created_at).label('mas_antigua'),
+            )
+            .group_by(Factura.area_id, Factura.estado_id)
+        )
+
+    async def get_contadores_desfasados(self) -> List:
+        """(area_id, estado_id) cuyos contadores no cuadran con facturas.
+
+        Filas (area_id, estado_id, n_facturas, total, mas_antigua, n_real,
+        total_real, mas_antigua_real); las columnas de un lado quedan NULL si
+        esa clave no existe en él.
+        """
+        r = self._contadores_reales().subquery()
+        c = FacturaCounter
+        result = await self.db.execute(
+            select(
+                func.coalesce(c.area_id, r.c.area_id).label('area_id'),
+                func.coalesce(c.estado_id, r.c.estado_id).label('estado_id'),
+                c.n_facturas, c.total, c.mas_antigua,
+                r.c.n_facturas.label('n_real'),
+                r.c.total.label('total_real'),
+                r.c.mas_antigua.label('mas_antigua_real'),
+            )
+            .select_from(c)
+            .join(
+                r,
+                (c.estado_id == r.c.estado_id) & c.area_id.is_not_distinct_from(r.c.area_id),
+                full=True,
+            )
+            .where(or_(
+                func.coalesce(c.n_facturas, 0) != func.coalesce(r.c.n_facturas, 0),
+                func.coalesce(c.total, 0) != func.coalesce(r.c.total, 0),
+                c.mas_antigua.is_distinct_from(r.c.mas_antigua),
+            ))
+        )
+        return result.all()
+
+    async def reconstruir_contadores(self) -> None:
+        """Reescribe factura_counters desde facturas.
+
+        Toma la tabla en SHARE ROW EXCLUSIVE: espera a las transacciones cuyo
+        trigger ya la tocó y frena las nuevas hasta el commit, así ningún delta
+        se pierde ni se cuenta dos veces.
+        """
+        await self.db.execute(text("LOCK TABLE factura_counters IN SHARE ROW EXCLUSIVE MODE"))
+        await self.db.execute(delete(FacturaCounter))
+        await self.db.execute(
+            insert(FacturaCounter).from_select(
+                ['area_id', 'estado_id', 'n_facturas', 'total', 'mas_antigua'],
+                self._contadores_reales(),
+            )
+        )
+
+    # --- SLA: solo lee los rollups de modules/dashboard/sla.py ---
+
+    async def get_sla_actualizado(self) -> Optional[datetime]:
+        """Cuándo se refrescaron los rollups por última vez."""
+        result = await self.db.execute(select(SlaCursor.actualizado_en))
+        return result.scalar_one_or_none()
+
+    async def get_sla_permanencias(self, desde: date) -> List:
+        """Rangos de permanencia por (área, estado) desde `desde`.
+
+        Cada fila trae su cantidad, segundos y el acumulado de su grupo hasta
+        ese rango (ventana sobre rango), para ubicar los percentiles.
+        """
+        P = SlaPermanencia
+        r = (
+            select(
+                P.area_id, P.estado_id, P.rango,
+                func.sum(P.n).label('n'), func.sum(P.segundos).label('segundos'),
+            )
+            .where(P.dia >= desde)
+            .group_by(P.area_id, P.estado_id, P.rango)
+        ).subquery()
+        grupo = (r.c.area_id, r.c.estado_id)
+        result = await self.db.execute(
+            select(
+                r.c.area_id, r.c.estado_id,
+                Area.nombre.label('area'), Estado.label.label('estado'),
+                r.c.rango, cast(r.c.n, BigInteger).label('n'), r.c.segundos,
+                cast(func.sum(r.c.n).over(partition_by=grupo, order_by=r.c.rango), BigInteger).label('acumulado'),
+                cast(func.sum(r.c.n).over(partition_by=grupo), BigInteger).label('total'),
+            )
+            .join(Area, r.c.area_id == Area.id)
+            .join(Estado, r.c.estado_id == Estado.id)
+            .order_by(Area.nombre, r.c.area_id, Estado.order, r.c.estado_id, r.c.rango)
+        )
+        return result.all()
+
+    async def get_sla_ciclos(self, desde: date) -> List:
+        """Rangos de tiempo de ciclo de las facturas pagadas desde `desde`, con su acumulado."""
+        C = SlaCiclo
+        r = (
+            select(C.rango, func.sum(C.n).label('n'), func.sum(C.segundos).label('segundos'))
+            .where(C.dia >= desde)
+            .group_by(C.rango)
+        ).subquery()
+        result = await self.db.execute(
+            select(
+                r.c.rango, cast(r.c.n, BigInteger).label('n'), r.c.segundos,
+                cast(func.sum(r.c.n).over(order_by=r.c.rango), BigInteger).label('acumulado'),
+                cast(func.sum(r.c.n).over(), BigInteger).label('total'),
+            )
+            .order_by(r.c.rango)
+        )
+        return result.all()
+
+    async def get_sla_backlog(self) -> List:
+        """Foto de facturas abiertas por (área, estado) y rango de antigüedad."""
+        B = SlaBacklog
+        result = await self.db.execute(
+            select(
+                Area.nombre.label('area'), Estado.label.label('estado'),
+                B.rango, B.n,
+            )
+            .outerjoin(Area, B.area_id == Area.id)
+            .join(Estado, B.estado_id == Estado.id)
+            .order_by(Area.nombre.nulls_last(), Estado.order, B.rango)
+        )
+        return result.all()
+
+    async def get_sla_flujo(self, desde: date) -> List:
+        """Entradas, salidas y pagadas por día, con la media móvil de 7 días de las pagadas."""
+        F = SlaFlujoDiario
+        cerradas = func.sum(F.cerradas)
+        result = await self.db.execute(
+            select(
+                F.dia,
+                cast(func.sum(F.entradas), BigInteger).label('entradas'),
+                cast(func.sum(F.salidas), BigInteger).label('salidas'),
+                cast(cerradas, BigInteger).label('cerradas'),
+                func.avg(cerradas).over(order_by=F.dia, rows=(-6, 0)).label('cerradas_media_7d'),
+            )
+            .where(F.dia >= desde)
+            .group_by(F.dia)
+            .order_by(F.dia)
+        )
+        return result.all()
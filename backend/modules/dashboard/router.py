@@ -1,20 +1,21 @@
 """
 Router de FastAPI para el módulo de dashboard.
 """
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
-from db.session import get_db
+from db.session import get_read_db
+from core.coalescencia import respuesta_compartida
 from modules.dashboard.repository import DashboardRepository
 from modules.dashboard.service import DashboardService
-from modules.dashboard.schemas import FacturasMetricsResponse, AsignacionRecienteResponse
+from modules.dashboard.schemas import FacturasMetricsResponse, AsignacionRecienteResponse, SlaResponse
 
 
 router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
 
 
-def get_dashboard_service(db: AsyncSession = Depends(get_db)) -> DashboardService:
+def get_dashboard_service(db: AsyncSession = Depends(get_read_db)) -> DashboardService:
     """Dependency para obtener el servicio de dashboard."""
     repository = DashboardRepository(db)
     return DashboardService(repository)
@@ -22,15 +23,30 @@ def get_dashboard_service(db: AsyncSession = Depends(get_db)) -> DashboardServic
 
 @router.get("/facturas/metrics", response_model=FacturasMetricsResponse)
 async def get_facturas_metrics(
+    request: Request,
+    response: Response,
     service: DashboardService = Depends(get_dashboard_service)
 ):
-    """Obtiene métricas de facturas por estado."""
-    return await service.get_facturas_metrics()
+    """Obtiene métricas de facturas por estado (coalescidas entre pedidos simultáneos)."""
+    return await respuesta_compartida(request, response, service.get_facturas_metrics)
 
 
 @router.get("/areas/recientes-asignadas", response_model=List[AsignacionRecienteResponse])
 async def get_recientes_asignadas(
+    request: Request,
+    response: Response,
     service: DashboardService = Depends(get_dashboard_service)
 ):
-    """Obtiene facturas recientemente asignadas por área."""
-    return await service.get_recientes_asignadas()
+    """Obtiene facturas recientemente asignadas por área (coalescidas entre pedidos simultáneos)."""
+    return await respuesta_compartida(request, response, service.get_recientes_asignadas)
+
+
+@router.get("/sla", response_model=SlaResponse)
+async def get_sla(
+    request: Request,
+    response: Response,
+    dias: int = Query(30, ge=1, le=365, description="Días hacia atrás (hora Colombia)"),
+    service: DashboardService = Depends(get_dashboard_service)
+):
+    """Tiempos de permanencia, ciclo, backlog y flujo diario desde los rollups de SLA."""
+    return await respuesta_compartida(request, response, lambda: service.get_sla(dias))
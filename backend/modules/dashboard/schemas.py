@@ -2,7 +2,8 @@
 Esquemas Pydantic para el módulo de dashboard.
 """
 from pydantic import BaseModel
-from datetime import datetime
+from datetime import date, datetime
+from typing import List, Optional
 
 
 class FacturasMetricsResponse(BaseModel):
@@ -21,3 +22,45 @@ class AsignacionRecienteResponse(BaseModel):
     quien_la_tiene: str
     fecha_asignacion: datetime
     estado: str
+
+
+class SlaTiempoResponse(BaseModel):
+    """Tiempos en horas; los percentiles son la media del rango donde caen."""
+    facturas: int
+    promedio_horas: Optional[float] = None
+    p50_horas: Optional[float] = None
+    p90_horas: Optional[float] = None
+
+
+class SlaPermanenciaResponse(SlaTiempoResponse):
+    """Permanencia de las facturas en un área y estado."""
+    area: str
+    estado: str
+
+
+class SlaBacklogResponse(BaseModel):
+    """Facturas abiertas en un área y estado con cierta antigüedad allí."""
+    area: Optional[str] = None
+    estado: str
+    desde_dias: int
+    hasta_dias: Optional[int] = None
+    facturas: int
+
+
+class SlaFlujoDiaResponse(BaseModel):
+    """Facturas que entraron a, salieron de y se pagaron desde las áreas en un día."""
+    dia: date
+    entradas: int
+    salidas: int
+    cerradas: int
+    cerradas_media_7d: float
+
+
+class SlaResponse(BaseModel):
+    """Tiempos de SLA desde `desde`, leídos de los rollups."""
+    desde: date
+    actualizado_en: Optional[datetime] = None
+    ciclo: SlaTiempoResponse
+    permanencias: List[SlaPermanenciaResponse]
+    backlog: List[SlaBacklogResponse]
+    flujo: List[SlaFlujoDiaResponse]
@@ -2,11 +2,36 @@
 Servicio para lógica de negocio del dashboard.
 """
 from modules.dashboard.repository import DashboardRepository
-from modules.dashboard.schemas import FacturasMetricsResponse, AsignacionRecienteResponse
-from typing import List
+from modules.dashboard.schemas import (
+    FacturasMetricsResponse, AsignacionRecienteResponse, SlaResponse, SlaTiempoResponse,
+    SlaPermanenciaResponse, SlaBacklogResponse, SlaFlujoDiaResponse,
+)
+from modules.dashboard.sla import RANGOS_BACKLOG_DIAS
+from core.tareas import TZ_BOGOTA
+from datetime import datetime, timedelta
+from itertools import groupby
+from typing import List, Optional
 from core.logging import logger
 
 
+def _horas(segundos, n) -> Optional[float]:
+    return round(float(segundos) / n / 3600, 2) if n else None
+
+
+def _tiempos(rangos: List) -> dict:
+    """Promedio y p50/p90 de filas de rango ordenadas, con acumulado y total.
+
+    Sin las duraciones individuales, el percentil q cae en el primer rango cuyo
+    acumulado llega a q del total y se estima con la media de ese rango.
+    """
+    n = sum(r.n for r in rangos)
+    tiempos = {"facturas": n, "promedio_horas": _horas(sum(r.segundos for r in rangos), n)}
+    for nombre, q in (("p50_horas", 0.5), ("p90_horas", 0.9)):
+        rango = next((r for r in rangos if r.acumulado >= q * r.total), None)
+        tiempos[nombre] = _horas(rango.segundos, rango.n) if rango else None
+    return tiempos
+
+
 class DashboardService:
     """Servicio que contiene la lógica de negocio del dashboard."""
     
@@ -24,3 +49,42 @@ class DashboardService:
         logger.info("Obteniendo asignaciones recientes")
         asignaciones = await self.repository.get_recientes_asignadas()
         return [AsignacionRecienteResponse(**a) for a in asignaciones]
+
+    async def get_sla(self, dias: int = 30) -> SlaResponse:
+        """Tiempos de SLA de los últimos `dias` días (hora Colombia), desde los rollups."""
+        logger.info(f"Obteniendo SLA de {dias} días")
+        desde = datetime.now(tz=TZ_BOGOTA).date() - timedelta(days=dias - 1)
+        permanencias = [
+            SlaPermanenciaResponse(area=filas[0].area, estado=filas[0].estado, **_tiempos(filas))
+            for filas in (
+                list(g) for _, g in groupby(
+                    await self.repository.get_sla_permanencias(desde),
+                    key=lambda r: (r.area_id, r.estado_id),
+                )
+            )
+        ]
+        backlog = [
+            SlaBacklogResponse(
+                area=b.area,
+                estado=b.estado,
+                desde_dias=RANGOS_BACKLOG_DIAS[b.rango - 1] if b.rango else 0,
+                hasta_dias=RANGOS_BACKLOG_DIAS[b.rango] if b.rango < len(RANGOS_BACKLOG_DIAS) else None,
+                facturas=b.n,
+            )
+            for b in await self.repository.get_sla_backlog()
+        ]
+        flujo = [
+            SlaFlujoDiaResponse(
+                dia=f.dia, entradas=f.entradas, salidas=f.salidas, cerradas=f.cerradas,
+                cerradas_media_7d=round(float(f.cerradas_media_7d), 2),
+            )
+            for f in await self.repository.get_sla_flujo(desde)
+        ]
+        return SlaResponse(
+            desde=desde,
+            actualizado_en=await self.repository.get_sla_actualizado(),
+            ciclo=SlaTiempoResponse(**_tiempos(await self.repository.get_sla_ciclos(desde))),
+            permanencias=permanencias,
+            backlog=backlog,
+            flujo=flujo,
+        )
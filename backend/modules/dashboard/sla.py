@@ -0,0 +1,231 @@
+"""
+Rollups de tiempos de SLA sobre factura_movimientos (GET /dashboard/sla).
+
+Cada movimiento que cambia el área o el estado de una factura cierra su
+permanencia en el (área, estado) anterior, que empezó en el cambio previo de
+esa factura (o en su creación). refrescar_sla suma esas permanencias por día
+y rango de duración en sla_permanencias, el tiempo de ciclo de las pagadas en
+sla_ciclos y las entradas/salidas/pagos por área en sla_flujo_diario, y
+rehace la foto de facturas abiertas por antigüedad en sla_backlog. El
+endpoint solo lee esas tablas.
+
+- Incremental: sla_cursor guarda el último movimiento sumado por
+  (created_at, id) —el id es un UUID aleatorio, no sirve de orden— y cada
+  pasada toma lotes de LOTE movimientos a partir de ahí.
+- Solo entran movimientos con más de MARGEN de antigüedad: created_at se fija
+  antes del commit, y uno que se confirma tarde no debe quedar detrás del
+  cursor.
+- Los percentiles se estiman desde los rangos (RANGOS_HORAS), sin guardar cada
+  duración: ver DashboardService.get_sla.
+- Periódico: ciclo_sla cada MINUTOS_REFRESCO. A demanda: scripts/refrescar_sla.py
+  (--rehacer borra los rollups y vuelve a sumar desde el primer movimiento).
+  Corren los dos workers de uvicorn: el FOR UPDATE sobre el cursor serializa
+  las pasadas.
+"""
+from datetime import timedelta
+
+from sqlalchemy import Date, case, cast, delete, extract, func, literal, or_, select, true, tuple_, union_all
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.tareas import ciclo_periodico
+from db.models import (
+    Estado, Factura, FacturaMovimiento, SlaBacklog, SlaCiclo, SlaCursor, SlaFlujoDiario,
+    SlaPermanencia,
+)
+
+CURSOR = "factura_movimientos"
+LOTE = 5000
+MARGEN = timedelta(minutes=5)
+MINUTOS_REFRESCO = 10
+
+# Límites superiores de cada rango: rango i = duración < RANGOS_HORAS[i]; el
+# último rango (len) es todo lo que supera 30 días.
+RANGOS_HORAS = (1, 4, 8, 24, 48, 72, 120, 168, 336, 720)
+RANGOS_BACKLOG_DIAS = (1, 3, 7, 15, 30)
+
+
+def _rango(segundos, limites_segundos) -> case:
+    """Índice del primer límite que la duración no alcanza."""
+    return case(
+        *[(segundos < limite, i) for i, limite in enumerate(limites_segundos)],
+        else_=len(limites_segundos),
+    )
+
+
+def _rango_horas(segundos):
+    return _rango(segundos, [h * 3600 for h in RANGOS_HORAS])
+
+
+def _dia(momento):
+    return cast(func.timezone("America/Bogota", momento), Date)
+
+
+def _es_cambio():
+    """Movimientos que sacan a la factura de su (área, estado)."""
+    M = FacturaMovimiento
+    return or_(
+        M.area_desde_id.is_distinct_from(M.area_hasta_id),
+        M.estado_desde_id.is_distinct_from(M.estado_hasta_id),
+    )
+
+
+async def _cursor(db: AsyncSession) -> SlaCursor:
+    await db.execute(insert(SlaCursor).values(clave=CURSOR).on_conflict_do_nothing())
+    return (await db.execute(
+        select(SlaCursor).where(SlaCursor.clave == CURSOR).with_for_update()
+    )).scalar_one()
+
+
+def _despues_del_cursor(cursor: SlaCursor):
+    M = FacturaMovimiento
+    if cursor.ultimo_creado is None:
+        return true()
+    return tuple_(M.created_at, M.id) > tuple_(
+        literal(cursor.ultimo_creado, M.created_at.type), literal(cursor.ultimo_id, M.id.type)
+    )
+
+
+async def _sumar_lote(db: AsyncSession, cursor: SlaCursor, pagada_id: int) -> int:
+    """Suma el siguiente lote de movimientos a los rollups y mueve el cursor. Devuelve cuántos tomó."""
+    M = FacturaMovimiento
+    lote = (await db.execute(
+        select(M.created_at, M.id)
+        .where(_despues_del_cursor(cursor), M.created_at < func.now() - MARGEN)
+        .order_by(M.created_at, M.id)
+        .limit(LOTE)
+    )).all()
+    if not lote:
+        return 0
+    fin_creado, fin_id = lote[-1]
+    en_lote = _despues_del_cursor(cursor) & (
+        tuple_(M.created_at, M.id) <= tuple_(literal(fin_creado, M.created_at.type), literal(fin_id, M.id.type))
+    )
+
+    # Historia de cambios de las facturas tocadas, con el cambio anterior de cada uno
+    tocadas = select(M.factura_id).where(en_lote).correlate(None)
+    h = (
+        select(
+            M.factura_id, M.area_desde_id, M.area_hasta_id, M.estado_desde_id, M.estado_hasta_id,
+            M.created_at,
+            en_lote.label("en_lote"),
+            func.lag(M.created_at).over(
+                partition_by=M.factura_id, order_by=(M.created_at, M.id)
+            ).label("previo"),
+        )
+        .where(M.factura_id.in_(tocadas), _es_cambio(), M.created_at <= fin_creado)
+    ).cte("h")
+    permanencia = extract("epoch", h.c.created_at - func.coalesce(h.c.previo, Factura.created_at))
+    ciclo = extract("epoch", h.c.created_at - Factura.created_at)
+    # Cada expresión con parámetros se arma una vez: GROUP BY debe repetir los mismos
+    dia = _dia(h.c.created_at)
+    rango_permanencia, rango_ciclo = _rango_horas(permanencia), _rango_horas(ciclo)
+    nuevos = select().select_from(h).join(Factura, Factura.id == h.c.factura_id).where(h.c.en_lote)
+
+    p = nuevos.add_columns(
+        dia.label("dia"), h.c.area_desde_id, h.c.estado_desde_id,
+        rango_permanencia.label("rango"),
+        func.count().label("n"), func.sum(permanencia).label("segundos"),
+    ).where(h.c.area_desde_id.isnot(None), h.c.estado_desde_id.isnot(None)).group_by(
+        dia, h.c.area_desde_id, h.c.estado_desde_id, rango_permanencia
+    )
+    stmt = insert(SlaPermanencia).from_select(
+        ["dia", "area_id", "estado_id", "rango", "n", "segundos"], p
+    )
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=["dia", "area_id", "estado_id", "rango"],
+        set_={"n": SlaPermanencia.n + stmt.excluded.n,
+              "segundos": SlaPermanencia.segundos + stmt.excluded.segundos},
+    ))
+
+    c = nuevos.add_columns(
+        dia.label("dia"), rango_ciclo.label("rango"),
+        func.count().label("n"), func.sum(ciclo).label("segundos"),
+    ).where(
+        h.c.estado_hasta_id == pagada_id, h.c.estado_desde_id.is_distinct_from(pagada_id)
+    ).group_by(dia, rango_ciclo)
+    stmt = insert(SlaCiclo).from_select(["dia", "rango", "n", "segundos"], c)
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=["dia", "rango"],
+        set_={"n": SlaCiclo.n + stmt.excluded.n, "segundos": SlaCiclo.segundos + stmt.excluded.segundos},
+    ))
+
+    pasa = h.c.area_desde_id.is_distinct_from(h.c.area_hasta_id)
+    cierra = (h.c.estado_hasta_id == pagada_id) & h.c.estado_desde_id.is_distinct_from(pagada_id)
+    uno, cero = literal(1), literal(0)
+    flujos = union_all(
+        nuevos.add_columns(dia.label("dia"), h.c.area_hasta_id.label("area_id"),
+                           uno.label("entradas"), cero.label("salidas"), cero.label("cerradas"))
+        .where(pasa, h.c.area_hasta_id.isnot(None)),
+        nuevos.add_columns(dia, h.c.area_desde_id, cero, uno, cero)
+        .where(pasa, h.c.area_desde_id.isnot(None)),
+        nuevos.add_columns(dia, func.coalesce(h.c.area_hasta_id, h.c.area_desde_id), cero, cero, uno)
+        .where(cierra, func.coalesce(h.c.area_hasta_id, h.c.area_desde_id).isnot(None)),
+    ).subquery("f")
+    stmt = insert(SlaFlujoDiario).from_select(
+        ["dia", "area_id", "entradas", "salidas", "cerradas"],
+        select(flujos.c.dia, flujos.c.area_id, func.sum(flujos.c.entradas),
+               func.sum(flujos.c.salidas), func.sum(flujos.c.cerradas))
+        .group_by(flujos.c.dia, flujos.c.area_id),
+    )
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=["dia", "area_id"],
+        set_={"entradas": SlaFlujoDiario.entradas + stmt.excluded.entradas,
+              "salidas": SlaFlujoDiario.salidas + stmt.excluded.salidas,
+              "cerradas": SlaFlujoDiario.cerradas + stmt.excluded.cerradas},
+    ))
+
+    cursor.ultimo_creado, cursor.ultimo_id = fin_creado, fin_id
+    return len(lote)
+
+
+async def _rehacer_backlog(db: AsyncSession, pagada_id: int) -> None:
+    """Foto de facturas sin pagar por (área, estado) y días desde que llegaron ahí."""
+    M = FacturaMovimiento
+    ultimo = (
+        select(M.factura_id, func.max(M.created_at).label("llegada"))
+        .where(_es_cambio())
+        .group_by(M.factura_id)
+    ).subquery("u")
+    edad = extract("epoch", func.now() - func.coalesce(ultimo.c.llegada, Factura.created_at))
+    r = _rango(edad, [d * 86400 for d in RANGOS_BACKLOG_DIAS])
+    await db.execute(delete(SlaBacklog))
+    await db.execute(insert(SlaBacklog).from_select(
+        ["area_id", "estado_id", "rango", "n"],
+        select(Factura.area_id, Factura.estado_id, r, func.count())
+        .outerjoin(ultimo, ultimo.c.factura_id == Factura.id)
+        .where(Factura.estado_id != pagada_id)
+        .group_by(Factura.area_id, Factura.estado_id, r),
+    ))
+
+
+async def refrescar_sla(db: AsyncSession, rehacer: bool = False) -> int:
+    """Suma los movimientos nuevos, rehace el backlog y confirma. Devuelve cuántos movimientos sumó.
+
+    rehacer borra los rollups y vuelve a sumar toda la historia (p. ej. tras
+    cambiar RANGOS_HORAS).
+    """
+    cursor = await _cursor(db)
+    if rehacer:
+        for tabla in (SlaPermanencia, SlaCiclo, SlaFlujoDiario):
+            await db.execute(delete(tabla))
+        cursor.ultimo_creado, cursor.ultimo_id = None, None
+    pagada_id = (await db.execute(select(Estado.id).where(Estado.code == "pagada"))).scalar_one()
+    sumados = 0
+    while True:
+        n = await _sumar_lote(db, cursor, pagada_id)
+        sumados += n
+        if n < LOTE:
+            break
+    await _rehacer_backlog(db, pagada_id)
+    cursor.actualizado_en = func.now()
+    await db.commit()
+    return sumados
+
+
+async def ciclo_sla() -> None:
+    """Tarea de fondo: refresca los rollups de SLA cada MINUTOS_REFRESCO."""
+    await ciclo_periodico(
+        MINUTOS_REFRESCO, refrescar_sla, "rollups de SLA",
+        lambda sumados: f"{sumados} movimiento(s) sumado(s)" if sumados else None,
+    )
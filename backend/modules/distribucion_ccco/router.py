@@ -3,7 +3,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Annotated
 from uuid import UUID
 
-from db.session import get_db
+from db.session import get_db, get_read_db
 from core.auth import get_current_user
 from db.models import User
 from modules.distribucion_ccco.service import DistribucionCCCOService
@@ -17,6 +17,7 @@ router = APIRouter()
 
 CurrentUser = Annotated[User, Depends(get_current_user)]
 DBSession = Annotated[AsyncSession, Depends(get_db)]
+DBSessionLectura = Annotated[AsyncSession, Depends(get_read_db)]
 
 
 @router.get(
@@ -26,7 +27,7 @@ DBSession = Annotated[AsyncSession, Depends(get_db)]
 )
 async def get_distribucion_by_factura(
     factura_id: UUID,
-    session: DBSession,
+    session: DBSessionLectura,
     current_user: CurrentUser
 ):
     """
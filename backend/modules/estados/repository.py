@@ -21,11 +21,8 @@ class EstadoRepository:
         return result.scalars().all()
     
     async def get_by_id(self, estado_id: int) -> Optional[Estado]:
-        """Busca un estado por su ID."""
-        result = await self.db.execute(
-            select(Estado).where(Estado.id == estado_id)
-        )
-        return result.scalar_one_or_none()
+        """Busca un estado por su ID (mapa de identidad primero: sin query si ya está en la sesión)."""
+        return await self.db.get(Estado, estado_id)
     
     async def get_by_code(self, code: str) -> Optional[Estado]:
         """Busca un estado por su código."""
@@ -5,7 +5,8 @@ from fastapi import APIRouter, Depends, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
-from db.session import get_db
+from db.session import con_sesion, get_db, get_read_db
+from core.versionado import respuesta_condicional
 from modules.estados.repository import EstadoRepository
 from modules.estados.service import EstadoService
 from modules.estados.schemas import EstadoResponse, EstadoCreate, EstadoUpdate
@@ -20,8 +21,12 @@ def get_estado_service(db: AsyncSession = Depends(get_db)) -> EstadoService:
     return EstadoService(repository)
 
 
-@router.get("/", response_model=List[EstadoResponse])
-async def list_estados(service: EstadoService = Depends(get_estado_service)):
+@router.get(
+    "/",
+    response_model=List[EstadoResponse],
+    dependencies=[Depends(respuesta_condicional("estados"))],
+)
+async def list_estados(service: EstadoService = Depends(con_sesion(get_estado_service, get_read_db))):
     """Lista todos los estados disponibles para facturas."""
     return await service.list_estados()
 
@@ -0,0 +1,608 @@
+"""
+Ingesta automática de facturas electrónicas desde XML DIAN (N8N → backend).
+
+N8N reintenta cuando no recibe respuesta a tiempo, y antes cada reintento
+volvía a parsear, consultar, hacer commit y decodificar/subir el PDF; además el
+"SELECT por numero_factura y luego INSERT" dejaba una carrera entre reintentos
+concurrentes. Ahora:
+
+- Idempotencia: la respuesta de cada ingesta exitosa se guarda en
+  `ingesta_idempotencia` con un TTL, bajo la clave del header
+  `Idempotency-Key` o, si N8N no lo manda, el hash del XML. Un reintento la
+  reproduce sin tocar nada más.
+- La factura se crea con un solo `INSERT ... ON CONFLICT` sobre el índice único
+  normalizado (NIT, número). Si ya existía, el mismo statement hace el backfill
+  de los campos vacíos; dos reintentos simultáneos no pueden duplicarla.
+- El NIT se normaliza sin puntos, espacios ni dígito de verificación: el flujo
+  de correos PDF lo guarda como viene ("900.080.634-1") y el XML lo trae sin
+  DV. Si hay otra factura con el mismo número y el NIT no cuadra (o no tiene),
+  se resuelve como siempre, por número.
+- El XML original queda en `facturas_xml` comprimido con zstd, para poder
+  re-extraer campos nuevos después (scripts/reparsear_xml_facturas.py).
+"""
+import hashlib
+from datetime import datetime, timedelta, timezone
+from typing import Any, BinaryIO, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import case, delete, exists, func, literal, literal_column, or_, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from core.metricas import contar_cache
+from core.nit_responsable import get_responsables_por_nit, normalizar_nit
+from core.xml_parser import FacturaDIAN, parse_xml_dian
+from db.models import Area, Factura, FacturaXML, IngestaIdempotencia
+from db.perfiles_carga import PerfilCarga, opciones_factura
+from modules.facturas.schemas import IngestaXMLIn, IngestaXMLResultOut
+
+# Expresiones del índice único uq_facturas_nit_numero_norm (migración 1a2b3c4d5e6f).
+# El ON CONFLICT debe repetirlas EXACTAMENTE para que Postgres infiera el índice.
+# NIT: core.nit_responsable.normalizar_nit (sin DV, sin puntos ni espacios).
+NIT_NORMALIZADO_SQL = (
+    "upper(replace(replace(split_part(btrim(nit_proveedor), '-', 1), '.', ''), ' ', ''))"
+)
+NUMERO_NORMALIZADO_SQL = "upper(btrim(numero_factura))"
+
+ESTADO_RECIBIDA_ID = 1
+
+# Tope de la parte de texto `xml` en la ingesta multipart (el PDF tiene su
+# propio tope: settings.ingesta_pdf_max_mb)
+XML_MAX_BYTES = 5 * 1024 * 1024
+
+
+# Nivel de zstd para el XML guardado: la ingesta no es un camino caliente y el
+# XML DIAN (texto muy repetitivo) baja a ~10% de su tamaño
+_ZSTD_NIVEL = 9
+
+
+def comprimir_xml(xml_content: str) -> bytes:
+    import zstandard
+    return zstandard.ZstdCompressor(level=_ZSTD_NIVEL).compress(xml_content.encode("utf-8"))
+
+
+def descomprimir_xml(xml_zstd: bytes) -> str:
+    import zstandard
+    return zstandard.ZstdDecompressor().decompress(xml_zstd).decode("utf-8")
+
+
+async def _guardar_xml(db: AsyncSession, factura_id: "uuid.UUID", xml_content: str) -> None:
+    """Guarda el XML original comprimido (solo el primero: reintentos no lo pisan)."""
+    crudo = xml_content.encode("utf-8")
+    stmt = insert(FacturaXML).values(
+        factura_id=factura_id,
+        xml_zstd=comprimir_xml(xml_content),
+        sha256=hashlib.sha256(crudo).hexdigest(),
+        size_bytes=len(crudo),
+        created_at=datetime.now(timezone.utc),
+    ).on_conflict_do_nothing(index_elements=[FacturaXML.factura_id])
+    await db.execute(stmt)
+
+
+def clave_idempotencia(header_key: Optional[str], xml_content: str, con_pdf: bool) -> str:
+    """Clave de idempotencia de una ingesta.
+
+    Si N8N manda `Idempotency-Key` se usa tal cual. Si no, el hash del XML; se
+    distingue si trae PDF para que un reenvío que agrega el PDF no reproduzca la
+    respuesta del envío anterior sin guardarlo.
+    """
+    if header_key and header_key.strip():
+        return f"key:{header_key.strip()[:100]}"
+    digest = hashlib.sha256(xml_content.encode("utf-8")).hexdigest()
+    return f"xml:{digest}{':pdf' if con_pdf else ''}"
+
+
+async def buscar_respuesta_idempotente(db: AsyncSession, clave: str) -> Optional[IngestaXMLResultOut]:
+    """Respuesta guardada de una ingesta previa con la misma clave (si no venció)."""
+    result = await db.execute(
+        select(IngestaIdempotencia.respuesta).where(
+            IngestaIdempotencia.clave == clave,
+            IngestaIdempotencia.expires_at > func.now(),
+        )
+    )
+    respuesta = result.scalar_one_or_none()
+    contar_cache("ingesta_idempotencia", respuesta is not None)
+    return IngestaXMLResultOut.model_validate(respuesta) if respuesta else None
+
+
+async def guardar_respuesta_idempotente(
+    db: AsyncSession, clave: str, resultado: IngestaXMLResultOut
+) -> None:
+    """Guarda la respuesta para reproducirla en los reintentos, y purga las vencidas."""
+    expira = datetime.now(timezone.utc) + timedelta(hours=settings.ingesta_idempotencia_ttl_horas)
+    stmt = insert(IngestaIdempotencia).values(
+        clave=clave,
+        respuesta=resultado.model_dump(mode="json"),
+        expires_at=expira,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[IngestaIdempotencia.clave],
+        set_={"respuesta": stmt.excluded.respuesta, "expires_at": stmt.excluded.expires_at},
+    )
+    await db.execute(stmt)
+    await db.execute(delete(IngestaIdempotencia).where(IngestaIdempotencia.expires_at <= func.now()))
+    await db.commit()
+
+
+def parsear_xml_ingesta(xml_content: str) -> FacturaDIAN:
+    """Parsea el XML y valida lo mínimo para crear la factura (422 si no sirve)."""
+    try:
+        datos: FacturaDIAN = parse_xml_dian(xml_content)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"XML inválido: {e}")
+
+    if datos.total is None or datos.total <= 0:
+        raise HTTPException(
+            status_code=422,
+            detail=f"No se pudo extraer el total de la factura '{datos.numero_factura}'.",
+        )
+    return datos
+
+
+async def procesar_ingesta_xml(
+    db: AsyncSession, payload: IngestaXMLIn, pdf: Optional[BinaryIO] = None
+) -> IngestaXMLResultOut:
+    """Parsea, enruta y crea (o completa) la factura. Guarda el PDF si viene.
+
+    El PDF llega como `payload.pdf_base64` (JSON) o como `pdf`, el archivo de la
+    parte multipart de POST /ingesta-xml/multipart.
+    """
+    datos = parsear_xml_ingesta(payload.xml_content)
+
+    areas = (await db.execute(select(Area))).scalars().all()
+    areas_por_id = {a.id: a for a in areas}
+
+    # Resolver área por tabla de NITs conocidos (índice en memoria, sin BD).
+    # NITs no conocidos: confianza "nula", area_id=None; se gestionan por Radicación.
+    area_asignada = None
+    confianza = "nula"
+    razonamiento = None
+    responsables_nit = get_responsables_por_nit(datos.nit_proveedor or "")
+    if responsables_nit:
+        area_asignada, confianza, razonamiento = _resolver_responsables_nit(
+            responsables_nit, areas, datos.ciudad_receptor, datos.direccion_receptor
+        )
+    pendiente = confianza not in ("alta",)
+
+    # El NIT puede venir explícito desde N8N (payload.nit) o extraído del XML
+    nit_final = payload.nit or datos.nit_proveedor
+
+    valores = {
+        "proveedor": datos.proveedor,
+        "nit_proveedor": nit_final,
+        "numero_factura": datos.numero_factura,
+        "fecha_emision": datos.fecha_emision,
+        "fecha_vencimiento": datos.fecha_vencimiento,
+        "total": datos.total,
+        "area_id": area_asignada.id if area_asignada else None,
+        "estado_id": ESTADO_RECIBIDA_ID,
+        "pendiente_confirmacion": pendiente,
+        "ai_area_confianza": confianza,
+        "ai_area_razonamiento": razonamiento,
+        # Enriquecimiento Siesa FSP (extracción defensiva: pueden venir None
+        # y la factura se crea igual). retenciones_xml es solo informativo.
+        "base_gravable": datos.base_gravable,
+        "valor_iva": datos.valor_iva,
+        "retenciones_xml": datos.retenciones_xml or None,
+    }
+
+    try:
+        fila = await _upsert_factura(db, valores)
+    except IntegrityError:
+        # Otra ingesta del mismo número ganó la carrera por un camino que el
+        # índice (NIT, número) no arbitra (XML sin NIT, o el mismo proveedor y
+        # número de uq_factura_proveedor_numero): la que quedó se resuelve por número.
+        await db.rollback()
+        existe = await db.execute(
+            select(exists().where(Factura.numero_factura == datos.numero_factura))
+        )
+        if not existe.scalar():
+            raise
+        fila = None
+    if fila is None:
+        # Ya hay una factura con ese número sin NIT o con otro NIT normalizado
+        # (flujo de correos PDF o histórica): el índice (NIT, número) no la ve,
+        # así que se resuelve como antes, por número.
+        return await _backfill_duplicado_por_numero(db, payload, datos, pdf)
+    await _guardar_xml(db, fila.id, payload.xml_content)
+    await db.commit()
+
+    await _guardar_pdf_recibido(db, fila.id, payload, pdf, datos.numero_factura)
+
+    area = areas_por_id.get(fila.area_id)
+    return IngestaXMLResultOut(
+        factura_id=fila.id,
+        numero_factura=fila.numero_factura,
+        proveedor=fila.proveedor,
+        nit_proveedor=fila.nit_proveedor,
+        total=float(fila.total),
+        fecha_emision=fila.fecha_emision,
+        area_id=fila.area_id,
+        area_nombre=area.nombre if area else None,
+        ai_area_confianza=fila.ai_area_confianza or "nula",
+        ai_area_razonamiento=fila.ai_area_razonamiento,
+        pendiente_confirmacion=fila.pendiente_confirmacion,
+        estado=_estado_label(fila),
+        duplicado=not fila.insertado,
+    )
+
+
+def fila_nueva(valores: dict):
+    """SELECT de `valores` como fila, vacío si el número ya está por fuera del índice (NIT, número).
+
+    Es la comprobación por número de siempre: solo deja pasar al ON CONFLICT
+    la factura nueva o la que ya existe con el mismo NIT normalizado.
+    """
+    tabla = Factura.__table__
+    if valores["nit_proveedor"]:
+        fuera_del_indice = or_(
+            tabla.c.nit_proveedor.is_(None),
+            literal_column(NIT_NORMALIZADO_SQL) != normalizar_nit(valores["nit_proveedor"]),
+        )
+    else:
+        fuera_del_indice = literal(True)
+    return select(*[
+        literal(valores[c], type_=tabla.c[c].type).label(c) for c in valores
+    ]).where(~exists().where(tabla.c.numero_factura == valores["numero_factura"], fuera_del_indice))
+
+
+async def _upsert_factura(db: AsyncSession, valores: dict) -> Any:
+    """INSERT ... ON CONFLICT (NIT, número normalizados) con backfill en el mismo statement.
+
+    - Nueva: se inserta tal cual.
+    - Existente: solo se completan los campos vacíos (base/IVA/retenciones) y,
+      si nunca se enrutó (ai_area_confianza NULL), se enruta con la tabla NIT.
+    - Si hay una factura con el mismo número y sin NIT o con otro NIT
+      normalizado (o la nueva no trae NIT), no se inserta nada y devuelve None:
+      la resuelve el camino por número.
+    """
+    tabla = Factura.__table__
+    columnas = list(valores)
+    stmt = insert(tabla).from_select(columnas, fila_nueva(valores))
+    excl = stmt.excluded
+    sin_enrutar = tabla.c.ai_area_confianza.is_(None)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[text(NIT_NORMALIZADO_SQL), text(NUMERO_NORMALIZADO_SQL)],
+        index_where=tabla.c.nit_proveedor.isnot(None),
+        set_={
+            "base_gravable": func.coalesce(tabla.c.base_gravable, excl.base_gravable),
+            "valor_iva": func.coalesce(tabla.c.valor_iva, excl.valor_iva),
+            "retenciones_xml": func.coalesce(tabla.c.retenciones_xml, excl.retenciones_xml),
+            "area_id": case((sin_enrutar, func.coalesce(excl.area_id, tabla.c.area_id)), else_=tabla.c.area_id),
+            "ai_area_confianza": func.coalesce(tabla.c.ai_area_confianza, excl.ai_area_confianza),
+            "ai_area_razonamiento": case(
+                (sin_enrutar, func.coalesce(
+                    excl.ai_area_razonamiento, "NIT no está en tabla de proveedores conocidos."
+                )),
+                else_=tabla.c.ai_area_razonamiento,
+            ),
+            "pendiente_confirmacion": case(
+                (sin_enrutar, excl.pendiente_confirmacion), else_=tabla.c.pendiente_confirmacion
+            ),
+        },
+    ).returning(
+        tabla.c.id, tabla.c.numero_factura, tabla.c.proveedor, tabla.c.nit_proveedor,
+        tabla.c.total, tabla.c.fecha_emision, tabla.c.area_id, tabla.c.ai_area_confianza,
+        tabla.c.ai_area_razonamiento, tabla.c.pendiente_confirmacion,
+        literal_column("(xmax = 0)").label("insertado"),
+    )
+    result = await db.execute(stmt)
+    return result.one_or_none()
+
+
+async def _backfill_duplicado_por_numero(
+    db: AsyncSession, payload: IngestaXMLIn, datos: FacturaDIAN, pdf: Optional[BinaryIO]
+) -> IngestaXMLResultOut:
+    """Duplicado por número (sin NIT o con otro NIT): completa lo que falte y la devuelve."""
+    dup = await db.execute(
+        select(Factura)
+        .options(*opciones_factura(PerfilCarga.TRANSITION))
+        .where(Factura.numero_factura == datos.numero_factura)
+        .order_by(Factura.nit_proveedor.is_(None).desc())
+        .limit(1)
+    )
+    existing = dup.scalar_one()
+
+    hubo_backfill = False
+    # Si N8N envía el NIT explícitamente y la factura existente no lo tiene, actualizarlo
+    if payload.nit and not existing.nit_proveedor:
+        existing.nit_proveedor = payload.nit
+        hubo_backfill = True
+    # Backfill Siesa FSP: si el XML trae base/IVA y la factura no los tiene
+    if existing.base_gravable is None and datos.base_gravable is not None:
+        existing.base_gravable = datos.base_gravable
+        hubo_backfill = True
+    if existing.valor_iva is None and datos.valor_iva is not None:
+        existing.valor_iva = datos.valor_iva
+        hubo_backfill = True
+    if existing.retenciones_xml is None and datos.retenciones_xml:
+        existing.retenciones_xml = datos.retenciones_xml
+        hubo_backfill = True
+    # Si es duplicado de un NIT conocido pero sin área asignada aún,
+    # intentar asignar usando la tabla NIT
+    if existing.ai_area_confianza is None:
+        responsables_dup = get_responsables_por_nit(existing.nit_proveedor or "")
+        if responsables_dup:
+            areas_dup = (await db.execute(select(Area))).scalars().all()
+            area_dup, conf_dup, razon_dup = _resolver_responsables_nit(
+                responsables_dup, areas_dup, datos.ciudad_receptor, datos.direccion_receptor
+            )
+            existing.area_id = area_dup.id if area_dup else existing.area_id
+            existing.ai_area_confianza = conf_dup
+            existing.ai_area_razonamiento = razon_dup
+            existing.pendiente_confirmacion = conf_dup not in ("alta",)
+        else:
+            existing.ai_area_confianza = "nula"
+            existing.pendiente_confirmacion = True
+            existing.ai_area_razonamiento = "NIT no está en tabla de proveedores conocidos."
+        hubo_backfill = True
+    await _guardar_xml(db, existing.id, payload.xml_content)
+    await db.commit()
+    if hubo_backfill:
+        await db.refresh(existing)
+
+    # Guardar PDF si N8N lo envió y la factura aún no tiene uno
+    await _guardar_pdf_recibido(db, existing.id, payload, pdf, existing.numero_factura)
+
+    return IngestaXMLResultOut(
+        factura_id=existing.id,
+        numero_factura=existing.numero_factura,
+        proveedor=existing.proveedor,
+        nit_proveedor=existing.nit_proveedor,
+        total=float(existing.total),
+        fecha_emision=existing.fecha_emision,
+        area_id=existing.area_id,
+        area_nombre=existing.area.nombre if existing.area else None,
+        ai_area_confianza=existing.ai_area_confianza or "nula",
+        ai_area_razonamiento=existing.ai_area_razonamiento,
+        pendiente_confirmacion=existing.pendiente_confirmacion,
+        estado=_estado_label(existing),
+        duplicado=True,
+    )
+
+
+def _estado_label(f: Any) -> str:
+    if not f.area_id:
+        return "sin_asignar"
+    if f.pendiente_confirmacion:
+        return "pendiente_confirmacion"
+    return "auto_asignada"
+
+
+async def _guardar_pdf_recibido(
+    db: AsyncSession,
+    factura_id: "uuid.UUID",
+    payload: IngestaXMLIn,
+    pdf: Optional[BinaryIO],
+    numero_factura: str,
+) -> None:
+    """Guarda el PDF que vino con la ingesta: como parte multipart (`pdf`) o en base64."""
+    nombre = payload.pdf_filename or f"{numero_factura}.pdf"
+    if pdf is not None:
+        await _guardar_pdf_archivo(db, factura_id, pdf, nombre)
+    elif payload.pdf_base64:
+        await _guardar_pdf_ingesta(db, factura_id, payload.pdf_base64, nombre)
+
+
+async def _guardar_pdf_ingesta(
+    db: "AsyncSession",
+    factura_id: "uuid.UUID",
+    pdf_base64: str,
+    pdf_filename: str,
+) -> None:
+    """PDF en base64 dentro del JSON (POST /ingesta-xml): decodifica y guarda."""
+    import base64
+    import io
+
+    try:
+        pdf_bytes = base64.b64decode(pdf_base64)
+    except Exception:
+        return  # base64 inválido, ignorar
+    await _guardar_pdf_archivo(db, factura_id, io.BytesIO(pdf_bytes), pdf_filename)
+
+
+async def _guardar_pdf_archivo(
+    db: "AsyncSession",
+    factura_id: "uuid.UUID",
+    pdf: BinaryIO,
+    pdf_filename: str,
+) -> None:
+    """Guarda el PDF de la ingesta como FacturaArchivo(doc_type='FACTURA_PDF').
+    Si ya existe un PDF para esta factura, no hace nada (idempotente).
+
+    `pdf` se copia por bloques (upload_fileobj de boto3 / copyfileobj): nunca se
+    arma en memoria una copia completa del archivo.
+    """
+    import asyncio
+    import shutil
+    from datetime import datetime, timezone
+    from pathlib import Path
+    from db.models import FacturaArchivo
+
+    # Idempotente: si ya existe FACTURA_PDF no crear otro
+    existing = await db.execute(
+        select(FacturaArchivo).where(
+            FacturaArchivo.factura_id == factura_id,
+            FacturaArchivo.doc_type == "FACTURA_PDF",
+        )
+    )
+    if existing.scalar_one_or_none():
+        return
+
+    safe_name = pdf_filename if pdf_filename else f"{factura_id}.pdf"
+    if not safe_name.lower().endswith(".pdf"):
+        safe_name += ".pdf"
+
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+    new_filename = f"{timestamp}_{safe_name}"
+
+    pdf.seek(0, 2)
+    size_bytes = pdf.tell()
+    pdf.seek(0)
+
+    use_s3 = bool(settings.aws_access_key_id and settings.s3_bucket)
+
+    if use_s3:
+        from core.s3_service import s3_service
+        s3_key = f"dev/facturas/{factura_id}/FACTURA_PDF/{new_filename}"
+        await asyncio.to_thread(
+            s3_service.upload_fileobj,
+            pdf,
+            s3_key,
+            "application/pdf",
+        )
+        archivo = FacturaArchivo(
+            factura_id=factura_id,
+            doc_type="FACTURA_PDF",
+            storage_provider="s3",
+            storage_path=s3_key,
+            filename=new_filename,
+            content_type="application/pdf",
+            size_bytes=size_bytes,
+        )
+    else:
+        base_path = Path("storage/facturas") / str(factura_id) / "FACTURA_PDF"
+        base_path.mkdir(parents=True, exist_ok=True)
+        file_path = base_path / new_filename
+
+        def _copiar():
+            with open(file_path, "wb") as destino:
+                shutil.copyfileobj(pdf, destino)
+
+        await asyncio.to_thread(_copiar)
+        archivo = FacturaArchivo(
+            factura_id=factura_id,
+            doc_type="FACTURA_PDF",
+            storage_provider="local",
+            storage_path=str(file_path),
+            filename=new_filename,
+            content_type="application/pdf",
+            size_bytes=size_bytes,
+        )
+
+    db.add(archivo)
+    await db.commit()
+
+
+# ---------------------------------------------------------------------------
+# Helpers para resolución de área basada en tabla NIT
+# ---------------------------------------------------------------------------
+
+_KEYWORD_MATCHERS = {
+    "cedi":           lambda n: "CEDI" in n,
+    "marketing":      lambda n: "MARKETING" in n,
+    "mantenimiento":  lambda n: "MANTENIMIENTO" in n,
+    "compras":        lambda n: "COMPRA" in n,
+    "comercial":      lambda n: "COMERCIAL" in n,
+    "restaurante":    lambda n: "RESTAURANTE" in n or "RESTAURANT" in n,
+}
+
+_AREAS_GENERICAS = frozenset({
+    "FACTURACION", "FACTURACIÓN", "CONTABILIDAD",
+    "TESORERIA", "TESORERÍA", "ADMINISTRATIVO",
+})
+
+
+def _find_area_by_keyword(keyword: str, areas: list) -> "Any | None":
+    """Busca el primer área cuyo nombre coincide con el keyword dado."""
+    check = _KEYWORD_MATCHERS.get(keyword.lower())
+    if not check:
+        return None
+    for a in areas:
+        if check(a.nombre.upper()):
+            return a
+    return None
+
+
+def _find_tienda_by_location(areas: list, ciudad: "str | None", direccion: "str | None") -> "Any | None":
+    """
+    Busca un área de tienda cuyo nombre contenga la ciudad/dirección del XML.
+    Excluye áreas genéricas (contabilidad, tesorería, cedi, etc.).
+    """
+    ciudad_up = (ciudad or "").upper().strip()
+    dir_up = (direccion or "").upper().strip()
+
+    if not ciudad_up and not dir_up:
+        return None
+
+    candidatas = [
+        a for a in areas
+        if not any(g in a.nombre.upper() for g in _AREAS_GENERICAS)
+        and not any(check(a.nombre.upper()) for check in _KEYWORD_MATCHERS.values())
+    ]
+
+    if ciudad_up:
+        for a in candidatas:
+            if ciudad_up in a.nombre.upper():
+                return a
+
+    if dir_up:
+        palabras = [p for p in dir_up.split() if len(p) > 3]
+        for a in candidatas:
+            if any(p in a.nombre.upper() for p in palabras):
+                return a
+
+    return None
+
+
+def _resolver_responsables_nit(
+    responsables: list,
+    areas: list,
+    ciudad_receptor: "str | None",
+    direccion_receptor: "str | None",
+) -> tuple:
+    """
+    Dado el listado de keywords responsables para un NIT conocido, devuelve
+    (area | None, confianza: str, razonamiento: str).
+
+    - 1 keyword → intenta resolver directamente; confianza="alta" si se encuentra.
+    - N keywords → intenta el más específico; confianza="media", pendiente=True.
+    - "tiendas"  → usa ciudad/dirección del XML para identificar la tienda exacta.
+    """
+    opciones_str = " o ".join(r.capitalize() for r in responsables)
+
+    if len(responsables) == 1:
+        kw = responsables[0]
+        if kw == "tiendas":
+            tienda = _find_tienda_by_location(areas, ciudad_receptor, direccion_receptor)
+            if tienda:
+                return (tienda, "alta",
+                        f"NIT conocido → Tienda identificada: {tienda.nombre} "
+                        f"(ciudad receptor: {ciudad_receptor or 'N/A'}).")
+            return (None, "baja",
+                    f"NIT conocido → Responsable: Tiendas, pero no se identificó la tienda "
+                    f"para la ciudad '{ciudad_receptor or 'N/A'}'. Requiere asignación manual.")
+        area = _find_area_by_keyword(kw, areas)
+        if area:
+            return (area, "alta", f"NIT conocido → Área responsable: {area.nombre}.")
+        return (None, "baja",
+                f"NIT conocido → Responsable '{kw}', pero no se encontró el área en el sistema.")
+
+    # Múltiples opciones → siempre pendiente
+    best_area = None
+
+    # Prioridad: tiendas (más específico cuando hay ciudad)
+    if "tiendas" in responsables:
+        tienda = _find_tienda_by_location(areas, ciudad_receptor, direccion_receptor)
+        if tienda:
+            best_area = tienda
+            return (best_area, "media",
+                    f"NIT conocido → Múltiples responsables ({opciones_str}). "
+                    f"Tienda identificada: {tienda.nombre}. Requiere confirmación.")
+
+    # Fallback: primer keyword no-tiendas que exista en el sistema
+    for kw in responsables:
+        if kw == "tiendas":
+            continue
+        area = _find_area_by_keyword(kw, areas)
+        if area:
+            best_area = area
+            return (best_area, "media",
+                    f"NIT conocido → Múltiples responsables ({opciones_str}). "
+                    f"Asignado preliminarmente a {area.nombre}. Requiere confirmación.")
+
+    return (None, "baja",
+            f"NIT conocido → Múltiples responsables ({opciones_str}), "
+            "ningún área encontrada en el sistema. Requiere asignación manual.")
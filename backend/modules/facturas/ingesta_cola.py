@@ -0,0 +1,202 @@
+"""
+Ingesta XML asíncrona: N8N encola y recibe 202; los workers hacen el resto.
+
+Con POST /facturas/ingesta-xml N8N espera el parseo, el enrutamiento, el
+commit y la decodificación + subida del PDF a S3 (con un segundo commit). Con
+POST /facturas/ingesta-xml/async el endpoint solo escribe el payload crudo en
+`ingesta_cola` y responde 202 con el id; el ritmo de N8N queda limitado por esa
+escritura y no por S3.
+
+Cada worker de uvicorn corre `ciclo_ingesta_cola` (tarea de fondo del startup):
+reclama filas pendientes con `FOR UPDATE SKIP LOCKED` (dos workers nunca toman
+la misma) y las procesa con a lo sumo `settings.ingesta_concurrencia` a la vez,
+reutilizando `procesar_ingesta_xml`. Un encolado despierta al worker que lo
+recibió; los demás revisan la cola cada INTERVALO_S.
+
+Reintentos: un rechazo 4xx (XML inválido, 422) queda en "error" de una vez; un
+fallo transitorio (S3, BD, o un HTTPException 5xx que lo envuelve) vuelve a
+"pendiente" hasta `settings.ingesta_max_intentos`.
+Una fila que quedó "procesando" porque su worker murió se reclama de nuevo
+pasados PROCESANDO_VENCE_MIN minutos.
+"""
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import and_, case, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from core.logging import logger
+from db.models import IngestaCola
+from modules.facturas.ingesta import (
+    buscar_respuesta_idempotente,
+    guardar_respuesta_idempotente,
+    procesar_ingesta_xml,
+)
+from modules.facturas.schemas import IngestaXMLIn
+
+INTERVALO_S = 5
+PROCESANDO_VENCE_MIN = 10
+
+# Lo activa encolar_ingesta para que el worker local no espere al sondeo
+_despertar = asyncio.Event()
+
+
+async def encolar_ingesta(db: AsyncSession, clave: str, payload: IngestaXMLIn) -> Any:
+    """Guarda el payload en la cola y devuelve (id, estado).
+
+    Un reenvío con la misma clave no crea otra fila: devuelve la existente. Si
+    esa había terminado en "error", se vuelve a encolar con el payload nuevo.
+    """
+    ahora = datetime.now(timezone.utc)
+    tabla = IngestaCola.__table__
+    stmt = insert(tabla).values(
+        id=uuid.uuid4(),
+        clave=clave,
+        payload=payload.model_dump(mode="json"),
+        estado="pendiente",
+        intentos=0,
+        created_at=ahora,
+        updated_at=ahora,
+    )
+    fallida = tabla.c.estado == "error"
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[tabla.c.clave],
+        set_={
+            "estado": case((fallida, "pendiente"), else_=tabla.c.estado),
+            "intentos": case((fallida, 0), else_=tabla.c.intentos),
+            "payload": case((fallida, stmt.excluded.payload), else_=tabla.c.payload),
+            "error": case((fallida, None), else_=tabla.c.error),
+            "updated_at": ahora,
+        },
+    ).returning(tabla.c.id, tabla.c.estado)
+    fila = (await db.execute(stmt)).one()
+    await db.commit()
+    _despertar.set()
+    return fila
+
+
+async def _reclamar(db: AsyncSession, limite: int) -> list:
+    """Toma hasta `limite` filas pendientes (o "procesando" vencidas) y las marca."""
+    vencidas = datetime.now(timezone.utc) - timedelta(minutes=PROCESANDO_VENCE_MIN)
+    candidatas = (
+        select(IngestaCola.id)
+        .where(or_(
+            IngestaCola.estado == "pendiente",
+            and_(IngestaCola.estado == "procesando", IngestaCola.tomado_at < vencidas),
+        ))
+        .order_by(IngestaCola.created_at)
+        .limit(limite)
+        .with_for_update(skip_locked=True)
+    )
+    result = await db.execute(
+        update(IngestaCola)
+        .where(IngestaCola.id.in_(candidatas.scalar_subquery()))
+        .values(
+            estado="procesando",
+            tomado_at=datetime.now(timezone.utc),
+            intentos=IngestaCola.intentos + 1,
+        )
+        .returning(IngestaCola.id, IngestaCola.clave, IngestaCola.payload, IngestaCola.intentos)
+    )
+    filas = result.all()
+    await db.commit()
+    return filas
+
+
+async def _finalizar(
+    db: AsyncSession,
+    ingesta_id: uuid.UUID,
+    estado: str,
+    *,
+    resultado: Optional[dict] = None,
+    error: Optional[str] = None,
+    payload: Optional[dict] = None,
+) -> None:
+    valores: dict = {"estado": estado, "resultado": resultado, "error": error}
+    if estado in ("completada", "error"):
+        valores["procesado_at"] = datetime.now(timezone.utc)
+    if payload is not None:
+        valores["payload"] = payload
+    await db.execute(update(IngestaCola).where(IngestaCola.id == ingesta_id).values(**valores))
+    await db.commit()
+
+
+async def procesar_trabajo(trabajo: Any) -> None:
+    """Procesa una fila reclamada en su propia sesión y deja el estado final."""
+    from db.session import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as db:
+        try:
+            payload = IngestaXMLIn.model_validate(trabajo.payload)
+            # Si la misma clave ya se procesó por el endpoint síncrono, reutilizar
+            resultado = await buscar_respuesta_idempotente(db, trabajo.clave)
+            if resultado is None:
+                resultado = await procesar_ingesta_xml(db, payload)
+                await guardar_respuesta_idempotente(db, trabajo.clave, resultado)
+            # El PDF ya quedó en S3/disco: no guardar el base64 en la cola para siempre
+            sin_pdf = {k: v for k, v in trabajo.payload.items() if k != "pdf_base64"}
+            await _finalizar(
+                db, trabajo.id, "completada",
+                resultado=resultado.model_dump(mode="json"), payload=sin_pdf,
+            )
+        except HTTPException as e:
+            await db.rollback()
+            if e.status_code < 500:
+                # XML inválido o sin total: reintentar no lo arregla
+                await _finalizar(db, trabajo.id, "error", error=str(e.detail))
+                logger.warning(f"Ingesta encolada {trabajo.id} rechazada: {e.detail}")
+            else:
+                # 5xx envuelve un fallo transitorio (p. ej. la subida a S3)
+                await _fallo_transitorio(db, trabajo, e.detail)
+        except Exception as e:
+            await db.rollback()
+            await _fallo_transitorio(db, trabajo, e)
+
+
+async def _fallo_transitorio(db: AsyncSession, trabajo: Any, error: Any) -> None:
+    """Devuelve el trabajo a "pendiente", o lo deja en "error" si agotó los intentos."""
+    definitivo = trabajo.intentos >= settings.ingesta_max_intentos
+    await _finalizar(db, trabajo.id, "error" if definitivo else "pendiente", error=str(error))
+    logger.error(
+        f"Ingesta encolada {trabajo.id} falló (intento {trabajo.intentos}"
+        f"/{settings.ingesta_max_intentos}): {error}"
+    )
+
+
+async def ciclo_ingesta_cola() -> None:
+    """Tarea de fondo: reclama trabajos mientras haya cupo y espera cupo o trabajo nuevo."""
+    from db.session import AsyncSessionLocal
+
+    en_curso: set[asyncio.Task] = set()
+    logger.info(f"Cola de ingesta XML activa (concurrencia {settings.ingesta_concurrencia}).")
+    try:
+        while True:
+            _despertar.clear()
+            cupo = settings.ingesta_concurrencia - len(en_curso)
+            if cupo > 0:
+                try:
+                    async with AsyncSessionLocal() as db:
+                        trabajos = await _reclamar(db, cupo)
+                except Exception as e:
+                    logger.error(f"Error reclamando ingestas de la cola: {e}")
+                    trabajos = []
+                for trabajo in trabajos:
+                    tarea = asyncio.create_task(procesar_trabajo(trabajo))
+                    en_curso.add(tarea)
+                    tarea.add_done_callback(en_curso.discard)
+
+            # Esperar a que se libere cupo, llegue un encolado local o venza el sondeo
+            aviso = asyncio.create_task(_despertar.wait())
+            await asyncio.wait({aviso, *en_curso}, timeout=INTERVALO_S, return_when=asyncio.FIRST_COMPLETED)
+            aviso.cancel()
+    except asyncio.CancelledError:
+        # Lo que quede "procesando" se reclama tras PROCESANDO_VENCE_MIN
+        for tarea in en_curso:
+            tarea.cancel()
+        logger.info("Cola de ingesta XML detenida.")
+        raise
@@ -0,0 +1,187 @@
+"""
+Push de las bandejas por SSE (GET /facturas/stream).
+
+Las bandejas quedan abiertas todo el día y se refrescaban a mano: lista
+completa + serialización en cada F5. Ahora cada movimiento de factura
+(registrar_movimiento → fila en factura_movimientos) dispara un NOTIFY desde un
+trigger (migración f2a3b4c5d6e7). Cada worker de uvicorn lo escucha con una
+conexión asyncpg dedicada (escuchar_movimientos, tarea de fondo del startup) y
+lo reparte a SUS clientes SSE:
+
+- Cada suscripción tiene un alcance de áreas que sale del usuario, no del
+  cliente (alcance_usuario): su área; además las tiendas para
+  responsable_tiendas y jefe_zona; todas para admin, fact y direccion.
+- Por movimiento se relee la factura UNA vez (perfil LIST) y se manda
+  `factura` con el item completo a quien la tiene en su alcance, y `removida`
+  con el id a quien la tenía (área desde).
+- El `id` de cada evento es un cursor de GET /facturas/changes: al conectar o
+  reconectar, el frontend se pone al día con ese feed. Lo que no es un pase
+  (una edición) solo llega por el feed.
+- Un cliente lento no frena a los demás: su cola es acotada y, si se llena,
+  recibe `reset` (recargar con /changes) y se cierra.
+"""
+import asyncio
+import json
+from datetime import datetime
+from typing import Awaitable, Callable, Optional
+from uuid import UUID
+
+from core.logging import logger
+
+# Canal de LISTEN/NOTIFY (lo emite el trigger de la migración f2a3b4c5d6e7)
+CANAL_MOVIMIENTOS = "factura_movimientos_push"
+
+# Eventos pendientes por cliente antes de darlo por perdido
+_COLA_MAX = 100
+
+# Comentario SSE periódico: que nginx/el balanceador no corten la conexión ociosa
+LATIDO_S = 25
+
+ROLES_TODAS_LAS_AREAS = frozenset({"admin", "fact", "direccion"})
+ROLES_TIENDAS = frozenset({"responsable_tiendas", "jefe_zona"})
+
+
+class Suscripcion:
+    """Un cliente SSE conectado a este worker."""
+
+    def __init__(self, areas: Optional[frozenset]):
+        self.areas = areas  # None = todas
+        self.cola: asyncio.Queue = asyncio.Queue(maxsize=_COLA_MAX)
+        self.desbordada = False
+
+    def ve(self, area_id: Optional[UUID]) -> bool:
+        return area_id is not None and (self.areas is None or area_id in self.areas)
+
+    def enviar(self, evento: str) -> None:
+        if self.desbordada:
+            return
+        try:
+            self.cola.put_nowait(evento)
+        except asyncio.QueueFull:
+            # Lo encolado ya no sirve: el cliente recarga con /changes
+            while not self.cola.empty():
+                self.cola.get_nowait()
+            self.cola.put_nowait(evento_sse("reset", "{}", _cursor()))
+            self.desbordada = True
+
+
+_suscripciones: set[Suscripcion] = set()
+
+
+def suscribir(areas: Optional[frozenset]) -> Suscripcion:
+    suscripcion = Suscripcion(areas)
+    _suscripciones.add(suscripcion)
+    return suscripcion
+
+
+def desuscribir(suscripcion: Suscripcion) -> None:
+    _suscripciones.discard(suscripcion)
+
+
+def _cursor() -> str:
+    """Mismo formato que el cursor de GET /facturas/changes."""
+    return datetime.utcnow().isoformat()
+
+
+def evento_sse(tipo: str, datos: str, cursor: Optional[str] = None) -> str:
+    lineas = [f"id: {cursor}"] if cursor else []
+    lineas += [f"event: {tipo}", f"data: {datos}"]
+    return "\n".join(lineas) + "\n\n"
+
+
+async def alcance_usuario(db, user) -> Optional[frozenset]:
+    """Áreas cuyas facturas le llegan al usuario por push (None = todas)."""
+    from sqlalchemy import select
+    from db.models import Area
+
+    role = user.role.code.lower() if user.role else ""
+    if role in ROLES_TODAS_LAS_AREAS:
+        return None
+    areas = {user.area_id} if user.area_id else set()
+    if role in ROLES_TIENDAS:
+        result = await db.execute(select(Area.id).where(Area.es_tienda.is_(True)))
+        areas.update(result.scalars().all())
+    return frozenset(areas)
+
+
+async def eventos(suscripcion: Suscripcion):
+    """Generador del StreamingResponse. Al desconectarse el cliente, Starlette
+    lo cancela y la suscripción se da de baja."""
+    try:
+        yield evento_sse("conectado", "{}", _cursor())
+        while True:
+            try:
+                evento = await asyncio.wait_for(suscripcion.cola.get(), timeout=LATIDO_S)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            yield evento
+            if suscripcion.desbordada and suscripcion.cola.empty():
+                return
+    finally:
+        desuscribir(suscripcion)
+
+
+async def _cargar_item(factura_id: UUID):
+    """Item de bandeja de la factura, o None si ya no existe. Contra la primaria:
+    el NOTIFY llega al hacer commit y la réplica puede no tenerlo aún."""
+    from db.session import AsyncSessionLocal
+    from modules.facturas.repository import FacturaRepository
+    from modules.facturas.service import FacturaService
+
+    async with AsyncSessionLocal() as session:
+        facturas, _ = await FacturaRepository(session).get_all(factura_id=factura_id)
+        return FacturaService._list_item(facturas[0]) if facturas else None
+
+
+def _a_uuid(valor) -> Optional[UUID]:
+    return UUID(valor) if valor else None
+
+
+async def repartir(
+    payload: str, cargar: Callable[[UUID], Awaitable] = _cargar_item
+) -> None:
+    """Reparte un NOTIFY del canal entre las suscripciones de este worker."""
+    if not _suscripciones:
+        return
+    try:
+        datos = json.loads(payload)
+        factura_id = UUID(datos["factura_id"])
+        area_desde = _a_uuid(datos.get("area_desde_id"))
+    except (ValueError, KeyError, TypeError) as e:
+        logger.warning(f"Payload inválido en {CANAL_MOVIMIENTOS}: {payload!r} ({e})")
+        return
+
+    item = await cargar(factura_id)
+    cursor = _cursor()
+    factura = evento_sse("factura", item.model_dump_json(), cursor) if item is not None else None
+    removida = evento_sse("removida", json.dumps({"id": str(factura_id)}), cursor)
+    for suscripcion in list(_suscripciones):
+        if item is not None and suscripcion.ve(item.area_id):
+            suscripcion.enviar(factura)
+        elif item is None or suscripcion.ve(area_desde):
+            suscripcion.enviar(removida)
+
+
+async def escuchar_movimientos() -> None:
+    """Tarea de fondo: LISTEN sobre el canal del trigger y reparte cada movimiento.
+
+    Conexión dedicada de core/escucha_pg.py, como core/nit_responsable.escuchar_cambios.
+    Tras una caída (que escucha_pg detecta y reconecta) avisa `resync` a los
+    clientes conectados: lo ocurrido mientras tanto lo recuperan con /changes.
+    """
+    from core.escucha_pg import escuchar_canal
+
+    async def _al_conectar(reconexion: bool) -> None:
+        if reconexion:
+            for suscripcion in list(_suscripciones):
+                suscripcion.enviar(evento_sse("resync", "{}", _cursor()))
+
+    async def _al_notificar(payloads: list[str]) -> None:
+        for payload in payloads:
+            try:
+                await repartir(payload)
+            except Exception as e:
+                logger.error(f"No se pudo repartir el movimiento {payload!r}: {e}")
+
+    await escuchar_canal(CANAL_MOVIMIENTOS, _al_conectar, _al_notificar, "movimientos de facturas")
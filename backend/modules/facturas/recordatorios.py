@@ -18,7 +18,6 @@ Reglas para recordar un token:
 Con el ciclo diario a las 7:00 a.m. Colombia esto produce como máximo 2
 recordatorios por enlace dentro de sus 72 horas de vida.
 """
-import asyncio
 from datetime import datetime, timedelta, timezone
 
 from sqlalchemy import select, update, or_
@@ -26,11 +25,10 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from core.logging import logger
 from core.config import settings
+from core.tareas import TZ_BOGOTA, ciclo_diario
 from core.email_service import email_service
 from db.models import Factura, TokenAprobacionFactura
 
-# Colombia no tiene horario de verano: offset fijo UTC-5
-TZ_BOGOTA = timezone(timedelta(hours=-5))
 HORA_ENVIO_LOCAL = 7  # 7:00 a.m. hora Colombia
 
 EDAD_MINIMA_HORAS = 12       # no recordar tokens con menos de 12h de emitidos
@@ -174,15 +172,6 @@ async def enviar_recordatorios_aprobacion(db: AsyncSession) -> dict:
     return {"aprobadores": len(detalle), "facturas": total_facturas, "detalle": detalle}
 
 
-def _segundos_hasta_proximo_envio() -> float:
-    """Segundos hasta las próximas HORA_ENVIO_LOCAL en hora Colombia."""
-    ahora_local = datetime.now(tz=TZ_BOGOTA)
-    proximo = ahora_local.replace(hour=HORA_ENVIO_LOCAL, minute=0, second=0, microsecond=0)
-    if proximo <= ahora_local:
-        proximo += timedelta(days=1)
-    return (proximo - ahora_local).total_seconds()
-
-
 async def ciclo_recordatorios_aprobacion() -> None:
     """Tarea de fondo: corre los recordatorios todos los días a las 7:00 a.m. Colombia.
 
@@ -190,25 +179,4 @@ async def ciclo_recordatorios_aprobacion() -> None:
     correos porque enviar_recordatorios_aprobacion reserva los tokens con un
     UPDATE atómico antes de enviar: solo un worker gana cada envío.
     """
-    from db.session import AsyncSessionLocal
-
-    logger.info(
-        f"Ciclo de recordatorios de aprobación iniciado "
-        f"(diario {HORA_ENVIO_LOCAL}:00 hora Colombia)."
-    )
-    while True:
-        try:
-            await asyncio.sleep(_segundos_hasta_proximo_envio())
-            async with AsyncSessionLocal() as db:
-                try:
-                    await enviar_recordatorios_aprobacion(db)
-                except Exception:
-                    await db.rollback()
-                    raise
-        except asyncio.CancelledError:
-            logger.info("Ciclo de recordatorios de aprobación detenido.")
-            raise
-        except Exception as e:
-            logger.error(f"Error en ciclo de recordatorios de aprobación: {e}")
-            # Espera corta antes de recalcular, para no ciclar en caliente ante un error
-            await asyncio.sleep(300)
+    await ciclo_diario(HORA_ENVIO_LOCAL, enviar_recordatorios_aprobacion, "recordatorios de aprobación")
@@ -0,0 +1,166 @@
+"""
+Re-extracción masiva de campos desde el XML DIAN guardado (`facturas_xml`).
+
+Cuando el parser aprende a sacar un campo nuevo (como base/IVA/retenciones para
+Siesa FSP), las facturas viejas solo lo recibían si N8N reenviaba el XML y caía
+en el backfill del duplicado. Este motor recorre todos los XML guardados:
+
+- Lee por lotes en orden de factura_id (keyset, sin OFFSET).
+- Descomprime y parsea `procesos` lotes a la vez en un ProcessPoolExecutor (el
+  parseo XML es CPU puro: en el event loop o en hilos no escala por el GIL).
+- Aplica los valores con UN UPDATE por tanda (FROM jsonb_to_recordset con
+  RETURNING id: "con cambios" cuenta las filas que de verdad cambiaron).
+  Por defecto solo completa columnas vacías; con `sobrescribir` pisa las que
+  el XML trae.
+- Tras cada commit escribe un checkpoint JSON (último factura_id y
+  contadores): si se interrumpe, se relanza y sigue donde iba.
+
+Punto de entrada: scripts/reparsear_xml_facturas.py
+"""
+import asyncio
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Optional
+
+from sqlalchemy import String, bindparam, cast, column, func, or_, select, update
+from sqlalchemy.dialects.postgresql import JSONB
+
+from core.xml_parser import parse_xml_dian
+from db.models import Factura, FacturaXML
+from modules.facturas.ingesta import descomprimir_xml
+
+# Columna de facturas → atributo de FacturaDIAN que se puede re-extraer
+CAMPOS_REPARSEABLES = ("base_gravable", "valor_iva", "retenciones_xml", "fecha_vencimiento")
+
+
+def reparsear_lote(filas: list, campos: tuple) -> tuple[list[dict], int]:
+    """Corre en un proceso del pool: (factura_id, xml_zstd) → parámetros del UPDATE.
+
+    Devuelve (cambios, errores). Un XML que no parsea cuenta como error y se
+    salta; un campo que el XML no trae va como None (el COALESCE lo ignora).
+    """
+    cambios: list[dict] = []
+    errores = 0
+    for factura_id, xml_zstd in filas:
+        try:
+            datos = parse_xml_dian(descomprimir_xml(xml_zstd))
+        except Exception:
+            errores += 1
+            continue
+        valores = {f"n_{c}": getattr(datos, c) for c in campos}
+        if "n_retenciones_xml" in valores:
+            valores["n_retenciones_xml"] = valores["n_retenciones_xml"] or None
+        if any(v is not None for v in valores.values()):
+            cambios.append({"b_id": factura_id, **valores})
+    return cambios, errores
+
+
+def sentencia_update(campos: tuple, sobrescribir: bool):
+    """UPDATE ... FROM jsonb_to_recordset(:cambios) RETURNING id: una sentencia por tanda.
+
+    Solo toca (y devuelve) las filas en que algún campo cambia de verdad, así
+    que las filas de RETURNING son las facturas con cambios.
+    """
+    tabla = Factura.__table__
+    n = func.jsonb_to_recordset(cast(bindparam("cambios", type_=String), JSONB)).table_valued(
+        column("b_id", tabla.c.id.type), *[column(f"n_{c}", tabla.c[c].type) for c in campos]
+    ).render_derived(name="n", with_types=True)
+    valores = {}
+    for c in campos:
+        nuevo = n.c[f"n_{c}"]
+        valores[c] = func.coalesce(nuevo, tabla.c[c]) if sobrescribir else func.coalesce(tabla.c[c], nuevo)
+    return (
+        update(tabla)
+        .where(tabla.c.id == n.c.b_id)
+        # Sin escrituras inútiles: algún campo debe quedar distinto
+        .where(or_(*[valores[c].is_distinct_from(tabla.c[c]) for c in campos]))
+        .values(**valores)
+        .returning(tabla.c.id)
+    )
+
+
+def leer_checkpoint(ruta: Path) -> dict:
+    if ruta.exists():
+        return json.loads(ruta.read_text(encoding="utf-8"))
+    return {"ultimo_id": None, "procesadas": 0, "con_cambios": 0, "errores": 0}
+
+
+def _escribir_checkpoint(ruta: Path, estado: dict) -> None:
+    # Escritura atómica: un corte a mitad no deja un JSON roto
+    temporal = ruta.with_suffix(ruta.suffix + ".tmp")
+    temporal.write_text(json.dumps(estado), encoding="utf-8")
+    temporal.replace(ruta)
+
+
+async def reparsear_facturas(
+    campos: tuple,
+    checkpoint: Path,
+    *,
+    lote: int = 500,
+    procesos: Optional[int] = None,
+    sobrescribir: bool = False,
+    dry_run: bool = False,
+    progreso: Callable[[str], None] = print,
+) -> dict:
+    """Recorre facturas_xml desde el checkpoint y aplica los campos re-extraídos."""
+    from db.session import AsyncSessionLocal
+
+    invalidos = set(campos) - set(CAMPOS_REPARSEABLES)
+    if invalidos:
+        raise ValueError(f"Campos no re-extraíbles: {', '.join(sorted(invalidos))}")
+
+    estado = leer_checkpoint(checkpoint)
+    stmt = sentencia_update(campos, sobrescribir)
+    loop = asyncio.get_running_loop()
+    inicio = time.monotonic()
+    procesadas_al_inicio = estado["procesadas"]
+
+    procesos = procesos or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        async with AsyncSessionLocal() as db:
+            total = (await db.execute(select(func.count()).select_from(FacturaXML))).scalar_one()
+            while True:
+                lotes = []
+                ultimo = estado["ultimo_id"]
+                for _ in range(procesos):  # un lote por proceso en cada vuelta
+                    q = select(FacturaXML.factura_id, FacturaXML.xml_zstd).order_by(FacturaXML.factura_id).limit(lote)
+                    if ultimo:
+                        q = q.where(FacturaXML.factura_id > uuid.UUID(ultimo))
+                    filas = [(f.factura_id, f.xml_zstd) for f in (await db.execute(q)).all()]
+                    if not filas:
+                        break
+                    lotes.append(filas)
+                    ultimo = str(filas[-1][0])
+                if not lotes:
+                    break
+
+                resultados = await asyncio.gather(*[
+                    loop.run_in_executor(pool, reparsear_lote, filas, campos) for filas in lotes
+                ])
+                cambios = [c for lote_cambios, _ in resultados for c in lote_cambios]
+                actualizadas = 0
+                if cambios:
+                    params = {"cambios": json.dumps(cambios, default=str)}
+                    actualizadas = len((await db.execute(stmt, params)).all())
+                if dry_run:
+                    await db.rollback()
+                else:
+                    await db.commit()
+
+                estado["ultimo_id"] = ultimo
+                estado["procesadas"] += sum(len(filas) for filas in lotes)
+                estado["con_cambios"] += actualizadas
+                estado["errores"] += sum(err for _, err in resultados)
+                if not dry_run:
+                    _escribir_checkpoint(checkpoint, estado)
+
+                ritmo = (estado["procesadas"] - procesadas_al_inicio) / max(time.monotonic() - inicio, 1e-6)
+                progreso(
+                    f"{estado['procesadas']}/{total} XML | con cambios {estado['con_cambios']} | "
+                    f"errores {estado['errores']} | {ritmo:.0f} XML/s"
+                )
+    return estado
@@ -2,12 +2,129 @@
 Repositorio para operaciones de base de datos del módulo facturas.
 """
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, or_
-from sqlalchemy.orm import selectinload, noload
+from sqlalchemy import BigInteger, and_, bindparam, cast, delete, select, func, or_, true
+from functools import lru_cache
 from typing import Optional, List, Tuple, Dict
 from uuid import UUID
-from db.models import Factura, Area, Estado
-from datetime import datetime
+from db.models import Factura, Area, Estado, FacturaCounter, FacturaEliminada, FacturaMovimiento
+from db.perfiles_carga import PerfilCarga, opciones_factura
+from datetime import datetime, timedelta
+
+
+# ─── Sentencias precompiladas ────────────────────────────────────────────────
+# get_all y get_by_id corren en casi todos los requests. Armar el select con
+# sus loader options, y que SQLAlchemy le calcule la clave del cache de
+# compilación, cuesta más que la query misma en los listados cortos. Las
+# plantillas se construyen UNA vez por combinación de filtros/perfil con
+# bindparam y se ejecutan con los valores como parámetros; la clave de cache
+# queda memorizada en el objeto. scripts/bench_queries_calientes.py mide la
+# diferencia. El feed de cambios (get_cambios), que las bandejas consultan
+# cada pocos segundos, sigue el mismo esquema.
+
+@lru_cache(maxsize=None)
+def _plantilla_por_id(perfil: PerfilCarga):
+    """select(Factura) por id con las relaciones del perfil."""
+    return (
+        select(Factura)
+        .options(*opciones_factura(perfil))
+        .where(Factura.id == bindparam("factura_id"))
+    )
+
+
+def _alcance_listado(filtros: frozenset) -> Tuple[list, tuple]:
+    """(condiciones WHERE, relaciones a omitir) de un conjunto de filtros del listado.
+
+    Los nombres de `filtros` son los parámetros que esperan las condiciones
+    (más solo_tiendas y only_in_carpeta, que no llevan valor). Las de estado
+    piden el JOIN con Estado (ver _con_estado).
+    """
+    omitir = ()
+    if "only_in_carpeta" in filtros:
+        # Bandeja de Tesorería (único caller de only_in_carpeta): la lista NO muestra
+        # archivos ni nombres de centro, y el detalle los re-obtiene por id. Omitir
+        # 'files' (el selectin más pesado y el grueso del payload) + los centros
+        # recorta drásticamente la respuesta. Se mantienen inventario_codigos,
+        # unidad_negocio y cuenta_auxiliar porque el detalle SÍ los lee del item.
+        omitir = (Factura.files, Factura.centro_costo, Factura.centro_operacion)
+
+    condiciones = []
+    # Traer UNA factura completa por id (usado al abrir el detalle desde la bandeja
+    # slim, que solo tiene columnas mínimas). Reutiliza todo el mapeo de FacturaListItem.
+    if "factura_id" in filtros:
+        condiciones.append(Factura.id == bindparam("factura_id"))
+    if "area_id" in filtros:
+        condiciones.append(Factura.area_id == bindparam("area_id"))
+    # Bandeja multi-tienda: facturas de TODAS las áreas marcadas como tienda.
+    # Usado por el rol responsable_tiendas (subquery sobre areas.es_tienda).
+    if "solo_tiendas" in filtros:
+        condiciones.append(Factura.area_id.in_(select(Area.id).where(Area.es_tienda.is_(True))))
+    if "area_origen_id" in filtros:
+        condiciones.append(Factura.area_origen_id == bindparam("area_origen_id"))
+    if "estado" in filtros:
+        condiciones.append(Estado.label == bindparam("estado"))
+    # Filtro por CÓDIGO de estado (estable, no depende del label que puede tener
+    # acentos/espacios). Usado por la vista de represadas del jefe de zona.
+    if "estado_code" in filtros:
+        condiciones.append(Estado.code == bindparam("estado_code"))
+    if "patron" in filtros:
+        patron = bindparam("patron")
+        condiciones.append(or_(Factura.numero_factura.ilike(patron), Factura.proveedor.ilike(patron)))
+    if "only_in_carpeta" in filtros:
+        condiciones.append(Factura.carpeta_id.isnot(None))
+    return condiciones, omitir
+
+
+def _con_estado(query, filtros: frozenset):
+    """JOIN con Estado si algún filtro es por estado."""
+    if filtros & {"estado", "estado_code"}:
+        return query.join(Estado, Factura.estado_id == Estado.id)
+    return query
+
+
+@lru_cache(maxsize=256)
+def _plantillas_listado(filtros: frozenset, paginado: bool):
+    """(query, count_query) de get_all para un conjunto de filtros.
+
+    Hay a lo sumo 2^8 combinaciones y en la práctica una docena.
+    """
+    condiciones, omitir = _alcance_listado(filtros)
+    query = _con_estado(select(Factura).options(*opciones_factura(PerfilCarga.LIST, omitir)), filtros)
+    query = query.where(*condiciones).order_by(Factura.created_at.desc()).offset(bindparam("skip"))
+    if paginado:
+        query = query.limit(bindparam("limit"))
+    count_query = _con_estado(select(func.count(Factura.id)), filtros).where(*condiciones)
+    return query, count_query
+
+
+@lru_cache(maxsize=256)
+def _plantillas_cambios(filtros: frozenset):
+    """(cambiadas, fuera_de_alcance) del feed de cambios para un alcance.
+
+    "Tocada" desde el cursor: updated_at posterior, o un movimiento posterior
+    (los pases quedan en factura_movimientos aunque el UPDATE no cambie nada
+    visible). De las tocadas, las que cumplen el alcance viajan completas con
+    el perfil LIST; del resto basta el id: si el frontend la tenía, ya no le
+    corresponde.
+    """
+    desde = bindparam("desde")
+    tocadas = or_(
+        Factura.updated_at > desde,
+        Factura.id.in_(select(FacturaMovimiento.factura_id).where(FacturaMovimiento.created_at > desde)),
+    )
+    condiciones, omitir = _alcance_listado(filtros)
+    cambiadas = (
+        _con_estado(select(Factura).options(*opciones_factura(PerfilCarga.LIST, omitir)), filtros)
+        .where(tocadas, *condiciones)
+        .order_by(Factura.updated_at)
+        # una de más para saber si se pasó del máximo
+        .limit(bindparam("max_items"))
+    )
+    fuera = None
+    if condiciones:
+        fuera = select(Factura.id).where(tocadas, and_(*condiciones).is_not(true()))
+        if filtros & {"estado", "estado_code"}:
+            fuera = fuera.outerjoin(Estado, Factura.estado_id == Estado.id)
+    return cambiadas, fuera
 
 
 class FacturaRepository:
@@ -46,108 +163,96 @@ class FacturaRepository:
     async def get_all(self, skip: int = 0, limit: int = 0, area_id: Optional[UUID] = None, area_origen_id: Optional[UUID] = None, estado: Optional[str] = None, search: Optional[str] = None, only_in_carpeta: bool = False, solo_tiendas: bool = False, estado_code: Optional[str] = None, factura_id: Optional[UUID] = None) -> Tuple[List[Factura], int]:
         """Obtiene todas las facturas con paginación y filtros opcionales.
 
-        Optimización: el modelo Factura define 16 relaciones con lazy="selectin",
-        por lo que TODAS se cargan en cada factura aunque el listado no las use.
-        Aquí solo cargamos lo que el mapeo de FacturaListItem realmente necesita y
-        anulamos (noload) las relaciones pesadas no usadas en el listado. Esto elimina
-        las queries de asignaciones, comentarios, tokens y distribución (≈40% del
-        tiempo de BD según pg_stat_statements) que antes se ejecutaban sin necesidad.
+        Perfil LIST: catálogos del item en el mismo SELECT y un selectin para
+        archivos y otro para códigos de inventario, sin importar el tamaño de la
+        página (ver db/perfiles_carga.py). Las sentencias salen de
+        _plantillas_listado según QUÉ filtros vienen; los valores van como
+        parámetros.
         """
-        opciones = [
-            selectinload(Factura.inventario_codigos),
-            selectinload(Factura.unidad_negocio),
-            selectinload(Factura.cuenta_auxiliar),
-            # carpeta/carpeta_tesoreria solo aportan id/nombre/parent_id al listado.
-            # noload('*') evita que cada Carpeta (lazy="selectin" en parent/children/
-            # facturas) arrastre todas SUS facturas y subcarpetas en cascada, y que
-            # cada una de esas facturas re-dispare sus 16 relaciones selectin.
-            selectinload(Factura.carpeta).noload("*"),
-            selectinload(Factura.carpeta_tesoreria).noload("*"),
-            # Relaciones NO usadas en el listado -> no cargarlas (anulan el selectin del modelo)
-            noload(Factura.asignaciones),
-            noload(Factura.comentarios),
-            noload(Factura.tokens_aprobacion),
-            noload(Factura.distribucion_ccco),
-            noload(Factura.area_origen),
-            noload(Factura.assigned_user),
-        ]
-        if only_in_carpeta:
-            # Bandeja de Tesorería (único caller de only_in_carpeta): la lista NO muestra
-            # archivos ni nombres de centro, y el detalle los re-obtiene por id. Anular
-            # 'files' (el selectin más pesado y el grueso del payload) + los centros
-            # recorta drásticamente la respuesta. Se mantienen inventario_codigos,
-            # unidad_negocio y cuenta_auxiliar porque el detalle SÍ los lee del item.
-            opciones += [
-                noload(Factura.files),
-                noload(Factura.centro_costo),
-                noload(Factura.centro_operacion),
-            ]
-        else:
-            opciones.append(selectinload(Factura.files))
-
-        query = select(Factura).options(*opciones)
-        count_query = select(func.count(Factura.id))
-
-        # Traer UNA factura completa por id (usado al abrir el detalle desde la bandeja
-        # slim, que solo tiene columnas mínimas). Reutiliza todo el mapeo de FacturaListItem.
-        if factura_id:
-            query = query.where(Factura.id == factura_id)
-            count_query = count_query.where(Factura.id == factura_id)
-
-        if area_id:
-            query = query.where(Factura.area_id == area_id)
-            count_query = count_query.where(Factura.area_id == area_id)
-
-        # Bandeja multi-tienda: facturas de TODAS las áreas marcadas como tienda.
-        # Usado por el rol responsable_tiendas (subquery sobre areas.es_tienda).
+        params = {
+            "factura_id": factura_id,
+            "area_id": area_id,
+            "area_origen_id": area_origen_id,
+            "estado": estado,
+            "estado_code": estado_code,
+            "patron": f"%{search}%" if search else None,
+        }
+        filtros = frozenset(nombre for nombre, valor in params.items() if valor)
         if solo_tiendas:
-            tiendas_subq = select(Area.id).where(Area.es_tienda.is_(True))
-            query = query.where(Factura.area_id.in_(tiendas_subq))
-            count_query = count_query.where(Factura.area_id.in_(tiendas_subq))
-
-        if area_origen_id:
-            query = query.where(Factura.area_origen_id == area_origen_id)
-            count_query = count_query.where(Factura.area_origen_id == area_origen_id)
-
-        if estado:
-            query = query.join(Estado, Factura.estado_id == Estado.id).where(Estado.label == estado)
-            count_query = count_query.join(Estado, Factura.estado_id == Estado.id).where(Estado.label == estado)
-
-        # Filtro por CÓDIGO de estado (estable, no depende del label que puede tener
-        # acentos/espacios). Usado por la vista de represadas del jefe de zona.
-        if estado_code:
-            query = query.join(Estado, Factura.estado_id == Estado.id).where(Estado.code == estado_code)
-            count_query = count_query.join(Estado, Factura.estado_id == Estado.id).where(Estado.code == estado_code)
-
-        if search:
-            pattern = f"%{search}%"
-            search_filter = or_(
-                Factura.numero_factura.ilike(pattern),
-                Factura.proveedor.ilike(pattern)
-            )
-            query = query.where(search_filter)
-            count_query = count_query.where(search_filter)
-
+            filtros |= {"solo_tiendas"}
         if only_in_carpeta:
-            query = query.where(Factura.carpeta_id.isnot(None))
-            count_query = count_query.where(Factura.carpeta_id.isnot(None))
+            filtros |= {"only_in_carpeta"}
+        params = {nombre: valor for nombre, valor in params.items() if nombre in filtros}
 
-        count_result = await self.db.execute(count_query)
+        query, count_query = _plantillas_listado(filtros, limit > 0)
+
+        count_result = await self.db.execute(count_query, params)
         total = count_result.scalar()
 
-        query = query.order_by(Factura.created_at.desc()).offset(skip)
+        params["skip"] = skip
         if limit > 0:
-            query = query.limit(limit)
-        result = await self.db.execute(query)
+            params["limit"] = limit
+        result = await self.db.execute(query, params)
         facturas = result.scalars().all()
 
         return facturas, total
 
+    async def get_cambios(
+        self,
+        desde: datetime,
+        max_items: int,
+        area_id: Optional[UUID] = None,
+        area_origen_id: Optional[UUID] = None,
+        estado: Optional[str] = None,
+        only_in_carpeta: bool = False,
+        solo_tiendas: bool = False,
+        estado_code: Optional[str] = None,
+    ) -> Tuple[List[Factura], List[UUID], List[UUID]]:
+        """Cambios desde `desde` dentro del alcance de una bandeja.
+
+        Devuelve (cambiadas en el alcance con perfil LIST, ids que salieron del
+        alcance, ids eliminadas). Si hay más de `max_items` cambiadas devuelve
+        max_items + 1 y el caller decide (reset). Mismos filtros que get_all
+        menos búsqueda y paginación: el feed sincroniza la bandeja, no una
+        búsqueda.
+        """
+        params = {
+            "area_id": area_id,
+            "area_origen_id": area_origen_id,
+            "estado": estado,
+            "estado_code": estado_code,
+        }
+        filtros = frozenset(nombre for nombre, valor in params.items() if valor)
+        if solo_tiendas:
+            filtros |= {"solo_tiendas"}
+        if only_in_carpeta:
+            filtros |= {"only_in_carpeta"}
+        params = {nombre: valor for nombre, valor in params.items() if nombre in filtros}
+        params["desde"] = desde
+
+        cambiadas_query, fuera_query = _plantillas_cambios(filtros)
+        result = await self.db.execute(cambiadas_query, {**params, "max_items": max_items + 1})
+        cambiadas = result.scalars().all()
+
+        fuera = []
+        if fuera_query is not None:
+            result = await self.db.execute(fuera_query, params)
+            fuera = result.scalars().all()
+
+        result = await self.db.execute(
+            select(FacturaEliminada.factura_id).where(FacturaEliminada.eliminada_at > desde)
+        )
+        return cambiadas, fuera, result.scalars().all()
+
     async def get_counts_by_area(self) -> List[Dict]:
-        """Cuenta facturas agrupadas por área en una sola query."""
+        """Cuenta facturas por área sumando factura_counters (sin recorrer facturas)."""
         result = await self.db.execute(
-            select(Area.id, Area.nombre, func.count(Factura.id).label('count'))
-            .outerjoin(Factura, Factura.area_id == Area.id)
+            select(
+                Area.id,
+                Area.nombre,
+                cast(func.coalesce(func.sum(FacturaCounter.n_facturas), 0), BigInteger).label('count'),
+            )
+            .outerjoin(FacturaCounter, FacturaCounter.area_id == Area.id)
             .group_by(Area.id, Area.nombre)
             .order_by(Area.nombre)
         )
@@ -158,26 +263,27 @@ class FacturaRepository:
 
         Una factura está "represada" cuando sigue en estado 'asignada' (asignada al
         responsable y aún no enviada a Contabilidad). Solo se consideran las áreas
-        marcadas como tienda (areas.es_tienda). Se agrupa por área en una sola query.
+        marcadas como tienda (areas.es_tienda). Cantidad, monto y la más antigua
+        salen de la fila (tienda, 'asignada') de factura_counters.
 
-        El INNER JOIN hace que solo aparezcan tiendas que TIENEN represadas (las que
-        están al día no ensucian el reporte).
+        Solo aparecen tiendas que TIENEN represadas (las que están al día no
+        ensucian el reporte).
         """
         result = await self.db.execute(
             select(
                 Area.id,
                 Area.nombre,
-                func.count(Factura.id).label('count'),
-                func.coalesce(func.sum(Factura.total), 0).label('monto'),
-                func.min(Factura.created_at).label('mas_antigua'),
+                FacturaCounter.n_facturas.label('count'),
+                FacturaCounter.total.label('monto'),
+                FacturaCounter.mas_antigua,
             )
             .select_from(Area)
-            .join(Factura, Factura.area_id == Area.id)
-            .join(Estado, Factura.estado_id == Estado.id)
+            .join(FacturaCounter, FacturaCounter.area_id == Area.id)
+            .join(Estado, FacturaCounter.estado_id == Estado.id)
             .where(Area.es_tienda.is_(True))
             .where(Estado.code == 'asignada')
-            .group_by(Area.id, Area.nombre)
-            .order_by(func.count(Factura.id).desc())
+            .where(FacturaCounter.n_facturas > 0)
+            .order_by(FacturaCounter.n_facturas.desc())
         )
 
         areas: List[Dict] = []
@@ -202,12 +308,25 @@ class FacturaRepository:
             'areas': areas,
         }
 
-    async def get_by_id(self, factura_id: UUID) -> Optional[Factura]:
-        """Obtiene una factura por ID."""
+    async def get_by_id(
+        self, factura_id: UUID, perfil: PerfilCarga = PerfilCarga.DETAIL
+    ) -> Optional[Factura]:
+        """Obtiene una factura por ID con las relaciones del perfil indicado."""
+        result = await self.db.execute(_plantilla_por_id(perfil), {"factura_id": factura_id})
+        return result.scalar_one_or_none()
+
+    async def _recargar(self, factura: Factura, perfil: PerfilCarga) -> Factura:
+        """Relee la factura tras un flush con las relaciones del perfil.
+
+        Reemplaza a db.refresh(): refresh expira también las relaciones y solo
+        las vuelve a cargar si el objeto salió de una query con ese perfil.
+        """
         result = await self.db.execute(
-            select(Factura).where(Factura.id == factura_id)
+            _plantilla_por_id(perfil),
+            {"factura_id": factura.id},
+            execution_options={"populate_existing": True},
         )
-        return result.scalar_one_or_none()
+        return result.scalar_one()
     
     async def get_by_numero(self, numero_factura: str) -> Optional[Factura]:
         """Obtiene una factura por número."""
@@ -238,9 +357,11 @@ class FacturaRepository:
         await self.db.refresh(factura)
         return factura
     
-    async def update_estado(self, factura_id: UUID, estado_id: int) -> Optional[Factura]:
+    async def update_estado(
+        self, factura_id: UUID, estado_id: int, perfil: PerfilCarga = PerfilCarga.TRANSITION
+    ) -> Optional[Factura]:
         """Actualiza el estado de una factura."""
-        factura = await self.get_by_id(factura_id)
+        factura = await self.get_by_id(factura_id, perfil)
         if factura:
             factura.estado_id = estado_id
             factura.updated_at = datetime.utcnow()
@@ -248,22 +369,38 @@ class FacturaRepository:
             if estado_id == 5:
                 factura.fecha_cierre = datetime.utcnow()
             await self.db.flush()
-            await self.db.refresh(factura)
+            factura = await self._recargar(factura, perfil)
         return factura
     
-    async def update(self, factura_id: UUID, factura_data: dict) -> Optional[Factura]:
+    async def update(
+        self, factura_id: UUID, factura_data: dict, perfil: PerfilCarga = PerfilCarga.TRANSITION
+    ) -> Optional[Factura]:
         """Actualiza una factura completa."""
-        factura = await self.get_by_id(factura_id)
+        factura = await self.get_by_id(factura_id, perfil)
         if factura:
             for key, value in factura_data.items():
                 if hasattr(factura, key):
                     setattr(factura, key, value)
             factura.updated_at = datetime.utcnow()
             await self.db.flush()
-            await self.db.refresh(factura)
+            factura = await self._recargar(factura, perfil)
         return factura
 
     async def delete(self, factura: Factura) -> None:
-        """Elimina una factura y sus registros relacionados (cascade)."""
+        """Elimina una factura y sus registros relacionados (cascade).
+
+        Deja la lápida para el feed de cambios y, de paso, purga las que ya
+        superaron la retención del feed (los borrados son raros: no amerita una
+        tarea aparte).
+        """
+        from core.config import settings
+
         await self.db.delete(factura)
+        await self.db.execute(
+            delete(FacturaEliminada).where(
+                FacturaEliminada.eliminada_at
+                < datetime.utcnow() - timedelta(days=settings.cambios_retencion_dias)
+            )
+        )
+        self.db.add(FacturaEliminada(factura_id=factura.id))
         await self.db.flush()
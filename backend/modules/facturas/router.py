@@ -1,14 +1,16 @@
 """
 Router de FastAPI para el módulo de facturas.
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi import APIRouter, Depends, Header, HTTPException, status, Query, Request, Response
 from fastapi.responses import StreamingResponse
 import io
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Any, List, Optional
 from uuid import UUID
 
-from db.session import get_db
+from db.session import con_sesion, get_db, get_read_db
+from core.versionado import respuesta_condicional
+from core.coalescencia import respuesta_compartida
 from modules.facturas.repository import FacturaRepository
 from modules.facturas.service import FacturaService
 from modules.facturas.schemas import (
@@ -16,6 +18,7 @@ from modules.facturas.schemas import (
     FacturaUpdate,
     FacturaResponse,
     FacturasPaginatedResponse,
+    FacturasCambiosOut,
     FacturaBandejaItem,
     EstadoUpdateRequest,
     EstadoUpdateResponse,
@@ -41,12 +44,15 @@ from modules.facturas.schemas import (
     AprobacionEmailOut,
     IngestaXMLIn,
     IngestaXMLResultOut,
+    IngestaEncoladaOut,
+    IngestaColaEstadoOut,
     HistorialFacturaOut,
     RechazoEmailIn,
     RechazoEmailOut,
 )
 from fastapi import UploadFile, File
 from core.auth import require_api_key, get_current_user, get_current_user_optional, user_id_de
+from core.logging import logger
 
 
 router = APIRouter(prefix="/facturas", tags=["Facturas"])
@@ -61,7 +67,7 @@ def get_factura_service(db: AsyncSession = Depends(get_db)) -> FacturaService:
 @router.get("/historial-area", response_model=list)
 async def historial_area(
     current_user: dict = Depends(get_current_user),
-    service: FacturaService = Depends(get_factura_service),
+    service: FacturaService = Depends(con_sesion(get_factura_service, get_read_db)),
 ):
     """Historial de facturas que han pasado por el área del usuario responsable."""
     from uuid import UUID as _UUID
@@ -69,30 +75,42 @@ async def historial_area(
     return await service.historial_area(user_id)
 
 
-@router.get("/counts-by-area")
+@router.get("/counts-by-area", dependencies=[Depends(respuesta_condicional("facturas", "areas"))])
 async def get_counts_by_area(
-    service: FacturaService = Depends(get_factura_service)
+    request: Request,
+    response: Response,
+    service: FacturaService = Depends(con_sesion(get_factura_service, get_read_db))
 ):
-    """Conteo de facturas agrupado por área (una sola query)."""
-    return await service.get_area_counts()
+    """Conteo de facturas agrupado por área (una sola query, coalescida)."""
+    return await respuesta_compartida(request, response, service.get_area_counts)
 
 
-@router.get("/represadas-tiendas")
+@router.get(
+    "/represadas-tiendas",
+    dependencies=[Depends(respuesta_condicional("facturas", "areas", "estados"))],
+)
 async def get_represadas_tiendas(
+    request: Request,
+    response: Response,
     _: dict = Depends(get_current_user),
-    service: FacturaService = Depends(get_factura_service),
+    service: FacturaService = Depends(con_sesion(get_factura_service, get_read_db)),
 ):
     """Resumen de facturas represadas (estado 'asignada') por tienda.
 
     Informe de monitoreo para el rol jefe_zona: total represadas, monto acumulado
     y desglose por cada tienda (areas.es_tienda) con la factura más antigua.
+    Los pedidos simultáneos comparten la query (core/coalescencia.py).
     """
-    return await service.represadas_tiendas()
+    return await respuesta_compartida(request, response, service.represadas_tiendas)
 
 
-@router.get("/bandeja-tesoreria", response_model=List[FacturaBandejaItem])
+@router.get(
+    "/bandeja-tesoreria",
+    response_model=List[FacturaBandejaItem],
+    dependencies=[Depends(respuesta_condicional("facturas", "areas", "estados"))],
+)
 async def bandeja_tesoreria(
-    service: FacturaService = Depends(get_factura_service)
+    service: FacturaService = Depends(con_sesion(get_factura_service, get_read_db))
 ):
     """Bandeja de Tesorería: facturas en carpeta con SOLO las columnas de la lista.
 
@@ -129,6 +147,8 @@ async def asignar_carpeta_tesoreria_masivo(
 
 @router.get("/", response_model=FacturasPaginatedResponse)
 async def list_facturas(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 0,
     area_id: Optional[UUID] = Query(None, description="Filtrar por ID de área"),
@@ -139,10 +159,75 @@ async def list_facturas(
     solo_tiendas: bool = Query(False, description="Facturas de TODAS las áreas marcadas como tienda (rol responsable_tiendas)"),
     estado_code: Optional[str] = Query(None, description="Filtrar por CÓDIGO de estado (estable, p.ej. 'asignada')"),
     factura_id: Optional[UUID] = Query(None, description="Traer UNA factura completa por id (para el detalle de la bandeja)"),
-    service: FacturaService = Depends(get_factura_service)
+    service: FacturaService = Depends(con_sesion(get_factura_service, get_read_db))
+):
+    """Lista todas las facturas con paginación y filtros opcionales.
+
+    Los pedidos idénticos simultáneos (misma bandeja al abrir el turno)
+    comparten la query y el JSON (core/coalescencia.py).
+    """
+    return await respuesta_compartida(
+        request, response,
+        lambda: service.list_facturas(skip=skip, limit=limit, area_id=area_id, area_origen_id=area_origen_id, estado=estado, search=search, only_in_carpeta=only_in_carpeta, solo_tiendas=solo_tiendas, estado_code=estado_code, factura_id=factura_id),
+    )
+
+
+@router.get("/changes", response_model=FacturasCambiosOut)
+async def cambios_facturas(
+    since: Optional[str] = Query(None, description="Cursor devuelto por la consulta anterior (vacío: solo entrega el cursor)"),
+    area_id: Optional[UUID] = Query(None, description="Filtrar por ID de área"),
+    area_origen_id: Optional[UUID] = Query(None, description="Filtrar por ID de área de origen"),
+    estado: Optional[str] = Query(None, description="Filtrar por estado de la factura"),
+    only_in_carpeta: bool = Query(False, description="Solo facturas asignadas a una carpeta"),
+    solo_tiendas: bool = Query(False, description="Facturas de TODAS las áreas marcadas como tienda"),
+    estado_code: Optional[str] = Query(None, description="Filtrar por CÓDIGO de estado"),
+    service: FacturaService = Depends(con_sesion(get_factura_service, get_read_db)),
+):
+    """Feed de cambios de una bandeja: solo lo creado, modificado o sacado del
+    alcance desde `since`, incluidas las facturas eliminadas.
+
+    Mismos filtros de alcance que GET /facturas/. Las bandejas lo consultan
+    tras cada acción o cada pocos segundos en vez de volver a bajar la lista
+    completa (la de Tesorería va con limit=0).
+    """
+    return await service.cambios_facturas(
+        since=since, area_id=area_id, area_origen_id=area_origen_id, estado=estado,
+        only_in_carpeta=only_in_carpeta, solo_tiendas=solo_tiendas, estado_code=estado_code,
+    )
+
+
+@router.get("/stream")
+async def stream_bandejas(
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    """Lista todas las facturas con paginación y filtros opcionales."""
-    return await service.list_facturas(skip=skip, limit=limit, area_id=area_id, area_origen_id=area_origen_id, estado=estado, search=search, only_in_carpeta=only_in_carpeta, solo_tiendas=solo_tiendas, estado_code=estado_code, factura_id=factura_id)
+    """Push de las bandejas por SSE: un evento por cada pase de factura.
+
+    - `factura`: item completo (FacturaListItem) de una factura que entró o
+      cambió dentro del alcance del usuario (su área, las tiendas o todas
+      según el rol).
+    - `removida`: {"id"} de una factura que salió de ese alcance o se eliminó.
+    - `resync` / `reset`: ponerse al día con GET /facturas/changes (reset
+      además cierra el stream).
+
+    El `id` de cada evento es un cursor para GET /facturas/changes. Detalle en
+    modules/facturas/push_bandejas.py.
+    """
+    from modules.facturas.push_bandejas import alcance_usuario, eventos, suscribir
+    from modules.users.repository import UserRepository
+
+    user = await UserRepository(db).get_con_permisos(UUID(current_user["user_id"]))
+    if not user:
+        raise HTTPException(status_code=401, detail="Usuario no encontrado.")
+    suscripcion = suscribir(await alcance_usuario(db, user))
+    return StreamingResponse(
+        eventos(suscripcion),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        },
+    )
 
 
 @router.get(
@@ -255,18 +340,15 @@ async def enviar_recordatorios_aprobacion_endpoint(
 async def exportar_plano_xlsx(
     area_id: Optional[UUID] = Query(None),
     estado: Optional[str] = Query(None),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: dict = Depends(get_current_user),
 ):
     try:
         import openpyxl
         from sqlalchemy import select
         from sqlalchemy.orm import selectinload
-        from db.models import (
-            Factura, FacturaDistribucionCCCO,
-            CentroCosto, CentroOperacion, UnidadNegocio, CuentaAuxiliar,
-            User as UserModel,
-        )
+        from db.models import Factura, User as UserModel
+        from db.perfiles_carga import PerfilCarga, opciones_factura
 
         # Determinar UN de fallback desde el usuario que exporta
         user_obj = await db.execute(
@@ -285,16 +367,7 @@ async def exportar_plano_xlsx(
 
         q = (
             select(Factura)
-            .options(
-                selectinload(Factura.centro_costo),
-                selectinload(Factura.centro_operacion),
-                selectinload(Factura.unidad_negocio),
-                selectinload(Factura.cuenta_auxiliar),
-                selectinload(Factura.distribucion_ccco).selectinload(FacturaDistribucionCCCO.centro_costo),
-                selectinload(Factura.distribucion_ccco).selectinload(FacturaDistribucionCCCO.centro_operacion),
-                selectinload(Factura.distribucion_ccco).selectinload(FacturaDistribucionCCCO.unidad_negocio),
-                selectinload(Factura.distribucion_ccco).selectinload(FacturaDistribucionCCCO.cuenta_auxiliar),
-            )
+            .options(*opciones_factura(PerfilCarga.EXPORT))
             .order_by(Factura.created_at.asc())
         )
         if area_id:
@@ -386,7 +459,7 @@ async def exportar_plano_xlsx(
 @router.get("/{factura_id}", response_model=FacturaResponse)
 async def get_factura(
     factura_id: UUID,
-    service: FacturaService = Depends(get_factura_service)
+    service: FacturaService = Depends(con_sesion(get_factura_service, get_read_db))
 ):
     """Obtiene una factura por ID."""
     return await service.get_factura(factura_id)
@@ -400,7 +473,7 @@ async def get_factura(
 async def get_historial_factura(
     factura_id: UUID,
     _: dict = Depends(get_current_user),
-    service: FacturaService = Depends(get_factura_service),
+    service: FacturaService = Depends(con_sesion(get_factura_service, get_read_db)),
 ):
     """
     Devuelve el historial cronológico de una factura: recepción, asignaciones
@@ -416,7 +489,7 @@ async def get_historial_factura(
 @router.get("/by-number/{numero_factura}", response_model=FacturaResponse)
 async def get_factura_by_numero(
     numero_factura: str,
-    service: FacturaService = Depends(get_factura_service)
+    service: FacturaService = Depends(con_sesion(get_factura_service, get_read_db))
 ):
     """Obtiene una factura por número de factura."""
     return await service.get_factura_by_numero(numero_factura)
@@ -556,7 +629,7 @@ async def asignar_factura_a_carpeta_tesoreria(
 @router.get("/{factura_id}/inventarios", response_model=InventariosOut)
 async def get_factura_inventarios(
     factura_id: UUID,
-    service: FacturaService = Depends(get_factura_service)
+    service: FacturaService = Depends(con_sesion(get_factura_service, get_read_db))
 ):
     """
     Obtiene los inventarios de una factura.
@@ -611,7 +684,7 @@ async def update_factura_inventarios(
 @router.get("/{factura_id}/anticipo", response_model=AnticipoOut)
 async def get_factura_anticipo(
     factura_id: UUID,
-    service: FacturaService = Depends(get_factura_service)
+    service: FacturaService = Depends(con_sesion(get_factura_service, get_read_db))
 ):
     """
     Obtiene los campos de anticipo de una factura.
@@ -1184,7 +1257,7 @@ async def extraer_datos_factura_pdf(
     """
     import base64
     import json
-    from anthropic import AsyncAnthropic
+    from core.instrumentacion import cliente_anthropic
     from core.config import settings
 
     if not settings.anthropic_api_key:
@@ -1252,7 +1325,7 @@ CAMPOS A EXTRAER:
 Respuesta esperada (ejemplo):
 {"proveedor":"CLARO S.A.","numero_factura":"FE-2025-001234","fecha_emision":"2025-03-15","fecha_vencimiento":"2025-04-14","total":"3450000","confianza":"alta","campos_detectados":["proveedor","numero_factura","fecha_emision","fecha_vencimiento","total"]}"""
 
-    client = AsyncAnthropic(api_key=settings.anthropic_api_key)
+    client = cliente_anthropic()
 
     message = await client.messages.create(
         model="claude-sonnet-4-6",
@@ -1316,395 +1389,174 @@ Respuesta esperada (ejemplo):
 )
 async def ingesta_xml(
     payload: IngestaXMLIn,
+    idempotency_key: Optional[str] = Header(
+        None, alias="Idempotency-Key",
+        description="Clave de reintento de N8N; si falta se usa el hash del XML",
+    ),
     db: AsyncSession = Depends(get_db),
     _: str = Depends(require_api_key),
 ):
     """
     Recibe el XML AttachedDocument de una factura electrónica DIAN enviado por N8N.
-    - Parsea el XML y extrae todos los campos.
-    - Intenta asignar el área automáticamente por texto (ciudad, descripción).
-    - Si no hay match claro, llama a Claude para razonar la asignación.
-    - Si Claude tampoco puede determinarlo, la factura queda sin área (buzón).
+    - Si es un reintento (mismo Idempotency-Key o mismo XML dentro del TTL),
+      devuelve la respuesta guardada sin reprocesar nada.
+    - Parsea el XML y asigna el área por la tabla de NITs conocidos.
+    - Crea la factura (o completa la existente) con un solo INSERT ... ON CONFLICT.
     - Retorna el resultado para que N8N pueda registrarlo.
     """
-    import json
-    from sqlalchemy import select, func
-    from anthropic import AsyncAnthropic
-    from core.config import settings
-    from core.xml_parser import parse_xml_dian, FacturaDIAN
-    from db.models import Factura, Area, Estado
-
-    # 1. Parsear XML
-    try:
-        datos: FacturaDIAN = parse_xml_dian(payload.xml_content)
-    except ValueError as e:
-        raise HTTPException(status_code=422, detail=f"XML inválido: {e}")
-
-    if datos.total is None or datos.total <= 0:
-        raise HTTPException(
-            status_code=422,
-            detail=f"No se pudo extraer el total de la factura '{datos.numero_factura}'.",
-        )
-
-    # 2. Verificar duplicado por numero_factura (el proveedor puede venir con nombre
-    #    distinto entre el flujo XML y el flujo de correos PDF, por eso no se usa)
-    dup = await db.execute(
-        select(Factura).where(
-            Factura.numero_factura == datos.numero_factura,
-        )
+    from modules.facturas.ingesta import (
+        buscar_respuesta_idempotente,
+        clave_idempotencia,
+        guardar_respuesta_idempotente,
+        procesar_ingesta_xml,
     )
-    existing = dup.scalar_one_or_none()
-    if existing:
-        # Si N8N envía el NIT explícitamente y la factura existente no lo tiene, actualizarlo
-        hubo_backfill = False
-        if payload.nit and not existing.nit_proveedor:
-            existing.nit_proveedor = payload.nit
-            hubo_backfill = True
-        # Backfill Siesa FSP: si el XML trae base/IVA y la factura no los tiene
-        if existing.base_gravable is None and datos.base_gravable is not None:
-            existing.base_gravable = datos.base_gravable
-            hubo_backfill = True
-        if existing.valor_iva is None and datos.valor_iva is not None:
-            existing.valor_iva = datos.valor_iva
-            hubo_backfill = True
-        if existing.retenciones_xml is None and datos.retenciones_xml:
-            existing.retenciones_xml = datos.retenciones_xml
-            hubo_backfill = True
-        # Si es duplicado de un NIT conocido pero sin área asignada aún,
-        # intentar asignar usando la tabla NIT
-        if existing.ai_area_confianza is None:
-            from core.nit_responsable import get_responsables_por_nit as _grpn
-            responsables_dup = _grpn(existing.nit_proveedor or "")
-            if responsables_dup:
-                areas_dup = (await db.execute(select(Area))).scalars().all()
-                area_dup, conf_dup, razon_dup = _resolver_responsables_nit(
-                    responsables_dup, areas_dup, datos.ciudad_receptor, datos.direccion_receptor
-                )
-                existing.area_id = area_dup.id if area_dup else existing.area_id
-                existing.ai_area_confianza = conf_dup
-                existing.ai_area_razonamiento = razon_dup
-                existing.pendiente_confirmacion = conf_dup not in ("alta",)
-            else:
-                existing.ai_area_confianza = "nula"
-                existing.pendiente_confirmacion = True
-                existing.ai_area_razonamiento = "NIT no está en tabla de proveedores conocidos."
-            await db.commit()
-            await db.refresh(existing)
-        elif hubo_backfill:
-            await db.commit()
-            await db.refresh(existing)
-
-        # Guardar PDF si N8N lo envió y la factura aún no tiene uno
-        if payload.pdf_base64:
-            await _guardar_pdf_ingesta(
-                db, existing.id,
-                payload.pdf_base64,
-                payload.pdf_filename or f"{existing.numero_factura}.pdf",
-            )
 
-        area_nombre = existing.area.nombre if existing.area else None
-        return IngestaXMLResultOut(
-            factura_id=existing.id,
-            numero_factura=existing.numero_factura,
-            proveedor=existing.proveedor,
-            nit_proveedor=existing.nit_proveedor,
-            total=float(existing.total),
-            fecha_emision=existing.fecha_emision,
-            area_id=existing.area_id,
-            area_nombre=area_nombre,
-            ai_area_confianza=existing.ai_area_confianza or "nula",
-            ai_area_razonamiento=existing.ai_area_razonamiento,
-            pendiente_confirmacion=existing.pendiente_confirmacion,
-            estado=_estado_label(existing),
-            duplicado=True,
-        )
-
-    # 3. Cargar todas las áreas activas
-    areas_result = await db.execute(select(Area))
-    areas = areas_result.scalars().all()
+    clave = clave_idempotencia(idempotency_key, payload.xml_content, bool(payload.pdf_base64))
+    previa = await buscar_respuesta_idempotente(db, clave)
+    if previa:
+        logger.info(f"Ingesta XML repetida ({clave[:20]}…): se devuelve la respuesta guardada")
+        return previa
 
-    # 4. Resolver área por tabla de NITs conocidos
-    from core.nit_responsable import get_responsables_por_nit
+    resultado = await procesar_ingesta_xml(db, payload)
+    await guardar_respuesta_idempotente(db, clave, resultado)
+    return resultado
 
-    area_asignada = None
-    confianza = "nula"
-    razonamiento = None
-
-    responsables_nit = get_responsables_por_nit(datos.nit_proveedor or "")
-    if responsables_nit:
-        area_asignada, confianza, razonamiento = _resolver_responsables_nit(
-            responsables_nit, areas, datos.ciudad_receptor, datos.direccion_receptor
-        )
-    # NITs no conocidos: confianza permanece "nula", area_id=None.
-    # La factura no aparecerá en el buzón XML; se gestionará por Radicación.
-
-    # 6. Determinar estado de confirmación
-    pendiente = confianza not in ("alta",)
-
-    # 7. Obtener estado_id RECIBIDA (id=1)
-    estado_result = await db.execute(select(Estado).where(Estado.id == 1))
-    estado_recibida = estado_result.scalar_one_or_none()
-    if not estado_recibida:
-        raise HTTPException(status_code=500, detail="Estado RECIBIDA (id=1) no encontrado en BD.")
-
-    # 8. Crear la factura
-    # El NIT puede venir explícito desde N8N (payload.nit) o extraído del XML (datos.nit_proveedor)
-    nit_final = payload.nit or datos.nit_proveedor
-    nueva = Factura(
-        proveedor=datos.proveedor,
-        nit_proveedor=nit_final,
-        numero_factura=datos.numero_factura,
-        fecha_emision=datos.fecha_emision,
-        fecha_vencimiento=datos.fecha_vencimiento,
-        total=datos.total,
-        area_id=area_asignada.id if area_asignada else None,
-        estado_id=estado_recibida.id,
-        pendiente_confirmacion=pendiente,
-        ai_area_confianza=confianza,
-        ai_area_razonamiento=razonamiento,
-        # Enriquecimiento Siesa FSP (extracción defensiva: pueden venir None
-        # y la factura se crea igual). retenciones_xml es solo informativo.
-        base_gravable=datos.base_gravable,
-        valor_iva=datos.valor_iva,
-        retenciones_xml=datos.retenciones_xml or None,
-    )
-    db.add(nueva)
-    await db.commit()
-    await db.refresh(nueva)
-
-    # Guardar PDF si N8N lo envió junto al XML
-    if payload.pdf_base64:
-        await _guardar_pdf_ingesta(
-            db, nueva.id,
-            payload.pdf_base64,
-            payload.pdf_filename or f"{datos.numero_factura}.pdf",
-        )
 
-    return IngestaXMLResultOut(
-        factura_id=nueva.id,
-        numero_factura=nueva.numero_factura,
-        proveedor=nueva.proveedor,
-        nit_proveedor=nueva.nit_proveedor,
-        total=float(nueva.total),
-        fecha_emision=nueva.fecha_emision,
-        area_id=nueva.area_id,
-        area_nombre=area_asignada.nombre if area_asignada else None,
-        ai_area_confianza=confianza,
-        ai_area_razonamiento=razonamiento,
-        pendiente_confirmacion=pendiente,
-        estado=_estado_label(nueva),
-        duplicado=False,
+@router.post(
+    "/ingesta-xml/multipart",
+    response_model=IngestaXMLResultOut,
+    summary="Ingestar factura electrónica XML DIAN con el PDF como archivo (multipart)",
+)
+async def ingesta_xml_multipart(
+    request: Request,
+    idempotency_key: Optional[str] = Header(
+        None, alias="Idempotency-Key",
+        description="Clave de reintento de N8N; si falta se usa el hash del XML",
+    ),
+    db: AsyncSession = Depends(get_db),
+    _: str = Depends(require_api_key),
+):
+    """
+    Variante de /ingesta-xml sin base64: `multipart/form-data` con
+    - `xml` (texto, obligatorio): contenido del AttachedDocument
+    - `pdf` (archivo, opcional): PDF de la factura
+    - `nit` (texto, opcional): NIT explícito del proveedor
+
+    El PDF no pasa por pydantic ni se decodifica: el parser lo vuelca por
+    bloques a un temporal (en disco pasado 1 MB) y de ahí se sube a S3 por
+    bloques. Se rechaza con 413 si supera `INGESTA_PDF_MAX_MB`, antes de leer
+    el cuerpo cuando lo dice el Content-Length.
+    """
+    from starlette.datastructures import UploadFile as _ParteArchivo
+    from core.config import settings
+    from modules.facturas.ingesta import (
+        XML_MAX_BYTES,
+        buscar_respuesta_idempotente,
+        clave_idempotencia,
+        guardar_respuesta_idempotente,
+        procesar_ingesta_xml,
     )
 
+    limite_pdf = settings.ingesta_pdf_max_mb * 1024 * 1024
+    largo = request.headers.get("content-length")
+    if not largo or not largo.isdigit():
+        raise HTTPException(status_code=status.HTTP_411_LENGTH_REQUIRED, detail="Falta Content-Length")
+    if int(largo) > limite_pdf + XML_MAX_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"El PDF supera el máximo de {settings.ingesta_pdf_max_mb} MB",
+        )
 
-def _estado_label(f: "Factura") -> str:
-    if not f.area_id:
-        return "sin_asignar"
-    if f.pendiente_confirmacion:
-        return "pendiente_confirmacion"
-    return "auto_asignada"
-
-
-# ---------------------------------------------------------------------------
-# Helpers para resolución de área basada en tabla NIT
-# ---------------------------------------------------------------------------
-
-_KEYWORD_MATCHERS = {
-    "cedi":           lambda n: "CEDI" in n,
-    "marketing":      lambda n: "MARKETING" in n,
-    "mantenimiento":  lambda n: "MANTENIMIENTO" in n,
-    "compras":        lambda n: "COMPRA" in n,
-    "comercial":      lambda n: "COMERCIAL" in n,
-    "restaurante":    lambda n: "RESTAURANTE" in n or "RESTAURANT" in n,
-}
-
-_AREAS_GENERICAS = frozenset({
-    "FACTURACION", "FACTURACIÓN", "CONTABILIDAD",
-    "TESORERIA", "TESORERÍA", "ADMINISTRATIVO",
-})
-
+    async with request.form(max_files=1, max_fields=3, max_part_size=XML_MAX_BYTES) as form:
+        xml_content = form.get("xml")
+        pdf = form.get("pdf")
+        if not isinstance(xml_content, str) or not xml_content.strip():
+            raise HTTPException(status_code=422, detail="Falta la parte de texto 'xml'")
+        if pdf is not None and not isinstance(pdf, _ParteArchivo):
+            raise HTTPException(status_code=422, detail="La parte 'pdf' debe ser un archivo")
+        if pdf is not None and (pdf.size or 0) > limite_pdf:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"El PDF supera el máximo de {settings.ingesta_pdf_max_mb} MB",
+            )
 
-def _find_area_by_keyword(keyword: str, areas: list) -> "Any | None":
-    """Busca el primer área cuyo nombre coincide con el keyword dado."""
-    check = _KEYWORD_MATCHERS.get(keyword.lower())
-    if not check:
-        return None
-    for a in areas:
-        if check(a.nombre.upper()):
-            return a
-    return None
+        nit = form.get("nit")
+        payload = IngestaXMLIn(
+            xml_content=xml_content,
+            nit=nit.strip() if isinstance(nit, str) and nit.strip() else None,
+            pdf_filename=pdf.filename if pdf is not None else None,
+        )
+        clave = clave_idempotencia(idempotency_key, xml_content, pdf is not None)
+        previa = await buscar_respuesta_idempotente(db, clave)
+        if previa:
+            logger.info(f"Ingesta XML repetida ({clave[:20]}…): se devuelve la respuesta guardada")
+            return previa
 
+        resultado = await procesar_ingesta_xml(db, payload, pdf=pdf.file if pdf is not None else None)
+        await guardar_respuesta_idempotente(db, clave, resultado)
+        return resultado
 
-def _find_tienda_by_location(areas: list, ciudad: "str | None", direccion: "str | None") -> "Any | None":
-    """
-    Busca un área de tienda cuyo nombre contenga la ciudad/dirección del XML.
-    Excluye áreas genéricas (contabilidad, tesorería, cedi, etc.).
-    """
-    ciudad_up = (ciudad or "").upper().strip()
-    dir_up = (direccion or "").upper().strip()
-
-    if not ciudad_up and not dir_up:
-        return None
-
-    candidatas = [
-        a for a in areas
-        if not any(g in a.nombre.upper() for g in _AREAS_GENERICAS)
-        and not any(check(a.nombre.upper()) for check in _KEYWORD_MATCHERS.values())
-    ]
-
-    if ciudad_up:
-        for a in candidatas:
-            if ciudad_up in a.nombre.upper():
-                return a
-
-    if dir_up:
-        palabras = [p for p in dir_up.split() if len(p) > 3]
-        for a in candidatas:
-            if any(p in a.nombre.upper() for p in palabras):
-                return a
-
-    return None
-
-
-def _resolver_responsables_nit(
-    responsables: list,
-    areas: list,
-    ciudad_receptor: "str | None",
-    direccion_receptor: "str | None",
-) -> tuple:
-    """
-    Dado el listado de keywords responsables para un NIT conocido, devuelve
-    (area | None, confianza: str, razonamiento: str).
 
-    - 1 keyword → intenta resolver directamente; confianza="alta" si se encuentra.
-    - N keywords → intenta el más específico; confianza="media", pendiente=True.
-    - "tiendas"  → usa ciudad/dirección del XML para identificar la tienda exacta.
+@router.post(
+    "/ingesta-xml/async",
+    response_model=IngestaEncoladaOut,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Encolar factura electrónica XML DIAN (202, procesamiento en segundo plano)",
+)
+async def ingesta_xml_async(
+    payload: IngestaXMLIn,
+    request: Request,
+    idempotency_key: Optional[str] = Header(
+        None, alias="Idempotency-Key",
+        description="Clave de reintento de N8N; si falta se usa el hash del XML",
+    ),
+    db: AsyncSession = Depends(get_db),
+    _: str = Depends(require_api_key),
+):
     """
-    opciones_str = " o ".join(r.capitalize() for r in responsables)
-
-    if len(responsables) == 1:
-        kw = responsables[0]
-        if kw == "tiendas":
-            tienda = _find_tienda_by_location(areas, ciudad_receptor, direccion_receptor)
-            if tienda:
-                return (tienda, "alta",
-                        f"NIT conocido → Tienda identificada: {tienda.nombre} "
-                        f"(ciudad receptor: {ciudad_receptor or 'N/A'}).")
-            return (None, "baja",
-                    f"NIT conocido → Responsable: Tiendas, pero no se identificó la tienda "
-                    f"para la ciudad '{ciudad_receptor or 'N/A'}'. Requiere asignación manual.")
-        area = _find_area_by_keyword(kw, areas)
-        if area:
-            return (area, "alta", f"NIT conocido → Área responsable: {area.nombre}.")
-        return (None, "baja",
-                f"NIT conocido → Responsable '{kw}', pero no se encontró el área en el sistema.")
-
-    # Múltiples opciones → siempre pendiente
-    best_area = None
-
-    # Prioridad: tiendas (más específico cuando hay ciudad)
-    if "tiendas" in responsables:
-        tienda = _find_tienda_by_location(areas, ciudad_receptor, direccion_receptor)
-        if tienda:
-            best_area = tienda
-            return (best_area, "media",
-                    f"NIT conocido → Múltiples responsables ({opciones_str}). "
-                    f"Tienda identificada: {tienda.nombre}. Requiere confirmación.")
-
-    # Fallback: primer keyword no-tiendas que exista en el sistema
-    for kw in responsables:
-        if kw == "tiendas":
-            continue
-        area = _find_area_by_keyword(kw, areas)
-        if area:
-            best_area = area
-            return (best_area, "media",
-                    f"NIT conocido → Múltiples responsables ({opciones_str}). "
-                    f"Asignado preliminarmente a {area.nombre}. Requiere confirmación.")
-
-    return (None, "baja",
-            f"NIT conocido → Múltiples responsables ({opciones_str}), "
-            "ningún área encontrada en el sistema. Requiere asignación manual.")
-
-
-async def _guardar_pdf_ingesta(
-    db: "AsyncSession",
-    factura_id: "uuid.UUID",
-    pdf_base64: str,
-    pdf_filename: str,
-) -> None:
-    """Guarda el PDF enviado por N8N como FacturaArchivo(doc_type='FACTURA_PDF').
-    Si ya existe un PDF para esta factura, no hace nada (idempotente).
+    Igual que /ingesta-xml pero sin esperar el procesamiento: guarda el payload
+    en la cola y responde 202 con el id. El parseo, el enrutamiento, el INSERT y
+    la subida del PDF los hacen los workers de la cola.
+    Consultar el resultado en `status_url`. Reenviar el mismo XML (o el mismo
+    Idempotency-Key) devuelve la misma ingesta en vez de encolar otra.
     """
-    import base64
-    import io
-    import asyncio
-    import uuid
-    from datetime import datetime, timezone
-    from pathlib import Path
-    from sqlalchemy import select
-    from db.models import FacturaArchivo
-    from core.config import settings
-
-    # Idempotente: si ya existe FACTURA_PDF no crear otro
-    existing = await db.execute(
-        select(FacturaArchivo).where(
-            FacturaArchivo.factura_id == factura_id,
-            FacturaArchivo.doc_type == "FACTURA_PDF",
-        )
+    from modules.facturas.ingesta import clave_idempotencia
+    from modules.facturas.ingesta_cola import encolar_ingesta
+
+    clave = clave_idempotencia(idempotency_key, payload.xml_content, bool(payload.pdf_base64))
+    fila = await encolar_ingesta(db, clave, payload)
+    return IngestaEncoladaOut(
+        ingesta_id=fila.id,
+        estado=fila.estado,
+        status_url=str(request.url_for("estado_ingesta_xml", ingesta_id=fila.id)),
     )
-    if existing.scalar_one_or_none():
-        return
 
-    try:
-        pdf_bytes = base64.b64decode(pdf_base64)
-    except Exception:
-        return  # base64 inválido, ignorar
-
-    safe_name = pdf_filename if pdf_filename else f"{factura_id}.pdf"
-    if not safe_name.lower().endswith(".pdf"):
-        safe_name += ".pdf"
-
-    timestamp = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
-    new_filename = f"{timestamp}_{safe_name}"
-
-    use_s3 = bool(settings.aws_access_key_id and settings.s3_bucket)
-
-    if use_s3:
-        from core.s3_service import s3_service
-        s3_key = f"dev/facturas/{factura_id}/FACTURA_PDF/{new_filename}"
-        await asyncio.to_thread(
-            s3_service.upload_fileobj,
-            io.BytesIO(pdf_bytes),
-            s3_key,
-            "application/pdf",
-        )
-        archivo = FacturaArchivo(
-            factura_id=factura_id,
-            doc_type="FACTURA_PDF",
-            storage_provider="s3",
-            storage_path=s3_key,
-            filename=new_filename,
-            content_type="application/pdf",
-            size_bytes=len(pdf_bytes),
-        )
-    else:
-        base_path = Path("storage/facturas") / str(factura_id) / "FACTURA_PDF"
-        base_path.mkdir(parents=True, exist_ok=True)
-        file_path = base_path / new_filename
-        file_path.write_bytes(pdf_bytes)
-        archivo = FacturaArchivo(
-            factura_id=factura_id,
-            doc_type="FACTURA_PDF",
-            storage_provider="local",
-            storage_path=str(file_path),
-            filename=new_filename,
-            content_type="application/pdf",
-            size_bytes=len(pdf_bytes),
-        )
 
-    db.add(archivo)
-    await db.commit()
+@router.get(
+    "/ingesta-xml/async/{ingesta_id}",
+    response_model=IngestaColaEstadoOut,
+    summary="Estado de una ingesta XML encolada",
+)
+async def estado_ingesta_xml(
+    ingesta_id: UUID,
+    db: AsyncSession = Depends(get_db),
+    _: str = Depends(require_api_key),
+):
+    """pendiente | procesando | completada (con `resultado`) | error (con `error`)."""
+    from db.models import IngestaCola
+
+    fila = await db.get(IngestaCola, ingesta_id)
+    if not fila:
+        raise HTTPException(status_code=404, detail="Ingesta no encontrada")
+    return IngestaColaEstadoOut(
+        ingesta_id=fila.id,
+        estado=fila.estado,
+        intentos=fila.intentos,
+        error=fila.error,
+        resultado=fila.resultado,
+        created_at=fila.created_at,
+        procesado_at=fila.procesado_at,
+    )
 
 
 @router.post(
@@ -387,6 +387,20 @@ class FacturasPaginatedResponse(BaseModel):
     per_page: int
 
 
+class FacturasCambiosOut(BaseModel):
+    """Feed de cambios de una bandeja (GET /facturas/changes).
+
+    El frontend aplica `cambiadas` como upsert por id y quita de su lista las
+    de `removidas` (eliminadas o que salieron del alcance de la bandeja). Con
+    `reset` debe recargar la lista completa. En cualquier caso guarda `cursor`
+    para la próxima consulta.
+    """
+    cursor: str
+    reset: bool = False
+    cambiadas: list[FacturaListItem] = []
+    removidas: list[UUID] = []
+
+
 # ========== Schemas de Inventarios ==========
 
 class InventarioCodigoIn(BaseModel):
@@ -745,6 +759,24 @@ class IngestaXMLResultOut(BaseModel):
     duplicado: bool = False
 
 
+class IngestaEncoladaOut(BaseModel):
+    """Respuesta 202 de la ingesta asíncrona: id para consultar el estado."""
+    ingesta_id: UUID
+    estado: str                     # pendiente | procesando | completada | error
+    status_url: str
+
+
+class IngestaColaEstadoOut(BaseModel):
+    """Estado de una ingesta encolada; `resultado` solo cuando está completada."""
+    ingesta_id: UUID
+    estado: str
+    intentos: int
+    error: Optional[str] = None
+    resultado: Optional[IngestaXMLResultOut] = None
+    created_at: datetime
+    procesado_at: Optional[datetime] = None
+
+
 # ========== Schemas Historial de Factura (vista Director) ==========
 
 class HistorialEventoOut(BaseModel):
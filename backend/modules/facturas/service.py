@@ -7,6 +7,7 @@ from modules.facturas.schemas import (
     FacturaUpdate,
     FacturaResponse,
     FacturasPaginatedResponse,
+    FacturasCambiosOut,
     FacturaListItem,
     FacturaBandejaItem,
     EstadoUpdateResponse,
@@ -115,6 +116,116 @@ class FacturaService:
         except (ValueError, AttributeError, TypeError):
             return None
 
+    @staticmethod
+    def _list_item(f) -> FacturaListItem:
+        """Item de listado/bandeja de una factura cargada con el perfil LIST."""
+        # Mapear files con uploaded_at desde created_at
+        from modules.files.schemas import FileMiniOut
+        files_out = [
+            FileMiniOut(
+                id=file.id,
+                doc_type=file.doc_type,
+                filename=file.filename,
+                content_type=file.content_type,
+                uploaded_at=file.created_at
+            )
+            for file in f.files
+        ]
+        
+        # Mapear códigos de inventario
+        from modules.facturas.schemas import InventarioCodigoOut, CarpetaEnFactura
+        inventarios_codigos_out = [
+            InventarioCodigoOut(
+                codigo=codigo.codigo,
+                valor=codigo.valor,
+                created_at=codigo.created_at
+            )
+            for codigo in f.inventario_codigos
+        ]
+        
+        # Mapear carpeta si existe
+        carpeta_out = None
+        if f.carpeta:
+            carpeta_out = CarpetaEnFactura(
+                id=f.carpeta.id,
+                nombre=f.carpeta.nombre,
+                parent_id=f.carpeta.parent_id
+            )
+        
+        # Mapear carpeta de tesorería si existe
+        carpeta_tesoreria_out = None
+        if f.carpeta_tesoreria:
+            carpeta_tesoreria_out = CarpetaEnFactura(
+                id=f.carpeta_tesoreria.id,
+                nombre=f.carpeta_tesoreria.nombre,
+                parent_id=f.carpeta_tesoreria.parent_id
+            )
+        
+        return FacturaListItem(
+            id=f.id,
+            proveedor=f.proveedor,
+            numero_factura=f.numero_factura,
+            fecha_emision=f.fecha_emision,
+            fecha_vencimiento=f.fecha_vencimiento,
+            area=f.area.nombre if f.area else "Sin área",
+            area_id=f.area_id,
+            area_origen_id=f.area_origen_id,
+            total=float(f.total),
+            estado=f.estado.label if f.estado else "Sin estado",
+            centro_costo=f.centro_costo.nombre if f.centro_costo else None,
+            centro_operacion=f.centro_operacion.nombre if f.centro_operacion else None,
+            centro_costo_id=f.centro_costo_id,
+            centro_operacion_id=f.centro_operacion_id,
+            requiere_entrada_inventarios=f.requiere_entrada_inventarios,
+            destino_inventarios=f.destino_inventarios,
+            presenta_novedad=f.presenta_novedad,
+            inventarios_codigos=inventarios_codigos_out,
+            tiene_anticipo=f.tiene_anticipo,
+            porcentaje_anticipo=float(f.porcentaje_anticipo) if f.porcentaje_anticipo is not None else None,
+            intervalo_entrega_contabilidad=f.intervalo_entrega_contabilidad,
+            es_gasto_adm=f.es_gasto_adm,
+            es_activo_fijo=f.es_activo_fijo,
+            sin_oc_os=f.sin_oc_os,
+            sin_ccco=f.sin_ccco,
+            motivo_devolucion=f.motivo_devolucion,
+            devuelta_por_nombre=f.devuelta_por_nombre,
+            fecha_rechazo_email=f.fecha_rechazo_email,
+            rechazado_por_nombre=f.rechazado_por_nombre,
+            motivo_rechazo_email=f.motivo_rechazo_email,
+            tipo_rechazo_email=f.tipo_rechazo_email,
+            files=files_out,
+            carpeta_id=f.carpeta_id,
+            carpeta=carpeta_out,
+            carpeta_tesoreria_id=f.carpeta_tesoreria_id,
+            carpeta_tesoreria=carpeta_tesoreria_out,
+            unidad_negocio_id=f.unidad_negocio_id,
+            unidad_negocio=f.unidad_negocio.codigo if f.unidad_negocio else None,
+            cuenta_auxiliar_id=f.cuenta_auxiliar_id,
+            cuenta_auxiliar=f.cuenta_auxiliar.codigo if f.cuenta_auxiliar else None,
+            fecha_envio_gerencia=f.fecha_envio_gerencia,
+            fecha_aprobacion_email=f.fecha_aprobacion_email,
+            aprobado_por_nombre=f.aprobado_por_nombre,
+            aprobado_por_email=f.aprobado_por_email,
+            fecha_envio_aprobacion_ops=f.fecha_envio_aprobacion_ops,
+            fecha_aprobacion_ops=f.fecha_aprobacion_ops,
+            aprobado_ops_nombre=f.aprobado_ops_nombre,
+            aprobado_ops_email=f.aprobado_ops_email,
+            fecha_envio_aprobacion_calidad=f.fecha_envio_aprobacion_calidad,
+            fecha_aprobacion_calidad=f.fecha_aprobacion_calidad,
+            aprobado_calidad_nombre=f.aprobado_calidad_nombre,
+            aprobado_calidad_email=f.aprobado_calidad_email,
+            fecha_envio_contabilidad=f.fecha_envio_contabilidad,
+            fecha_envio_tesoreria=f.fecha_envio_tesoreria,
+            fecha_cierre=f.fecha_cierre,
+            nit_proveedor=f.nit_proveedor,
+            pendiente_confirmacion=f.pendiente_confirmacion,
+            ai_area_confianza=f.ai_area_confianza,
+            ai_area_razonamiento=f.ai_area_razonamiento,
+            tipo_doc=f.tipo_doc,
+            numero_oc=f.numero_oc,
+            estado_oc=f.estado_oc,
+            enrutada_automaticamente=f.enrutada_automaticamente,
+        )
 
     async def list_facturas(
         self,
@@ -133,116 +244,8 @@ class FacturaService:
         logger.info(f"Listando facturas: skip={skip}, limit={limit}, area_id={area_id}, estado={estado}, search={search}, only_in_carpeta={only_in_carpeta}, solo_tiendas={solo_tiendas}, estado_code={estado_code}, factura_id={factura_id}")
         facturas, total = await self.repository.get_all(skip=skip, limit=limit, area_id=area_id, area_origen_id=area_origen_id, estado=estado, search=search, only_in_carpeta=only_in_carpeta, solo_tiendas=solo_tiendas, estado_code=estado_code, factura_id=factura_id)
         
-        items = []
-        for f in facturas:
-            # Mapear files con uploaded_at desde created_at
-            from modules.files.schemas import FileMiniOut
-            files_out = [
-                FileMiniOut(
-                    id=file.id,
-                    doc_type=file.doc_type,
-                    filename=file.filename,
-                    content_type=file.content_type,
-                    uploaded_at=file.created_at
-                )
-                for file in f.files
-            ]
-            
-            # Mapear códigos de inventario
-            from modules.facturas.schemas import InventarioCodigoOut, CarpetaEnFactura
-            inventarios_codigos_out = [
-                InventarioCodigoOut(
-                    codigo=codigo.codigo,
-                    valor=codigo.valor,
-                    created_at=codigo.created_at
-                )
-                for codigo in f.inventario_codigos
-            ]
-            
-            # Mapear carpeta si existe
-            carpeta_out = None
-            if f.carpeta:
-                carpeta_out = CarpetaEnFactura(
-                    id=f.carpeta.id,
-                    nombre=f.carpeta.nombre,
-                    parent_id=f.carpeta.parent_id
-                )
-            
-            # Mapear carpeta de tesorería si existe
-            carpeta_tesoreria_out = None
-            if f.carpeta_tesoreria:
-                carpeta_tesoreria_out = CarpetaEnFactura(
-                    id=f.carpeta_tesoreria.id,
-                    nombre=f.carpeta_tesoreria.nombre,
-                    parent_id=f.carpeta_tesoreria.parent_id
-                )
-            
-            items.append(FacturaListItem(
-                id=f.id,
-                proveedor=f.proveedor,
-                numero_factura=f.numero_factura,
-                fecha_emision=f.fecha_emision,
-                fecha_vencimiento=f.fecha_vencimiento,
-                area=f.area.nombre if f.area else "Sin área",
-                area_id=f.area_id,
-                area_origen_id=f.area_origen_id,
-                total=float(f.total),
-                estado=f.estado.label if f.estado else "Sin estado",
-                centro_costo=f.centro_costo.nombre if f.centro_costo else None,
-                centro_operacion=f.centro_operacion.nombre if f.centro_operacion else None,
-                centro_costo_id=f.centro_costo_id,
-                centro_operacion_id=f.centro_operacion_id,
-                requiere_entrada_inventarios=f.requiere_entrada_inventarios,
-                destino_inventarios=f.destino_inventarios,
-                presenta_novedad=f.presenta_novedad,
-                inventarios_codigos=inventarios_codigos_out,
-                tiene_anticipo=f.tiene_anticipo,
-                porcentaje_anticipo=float(f.porcentaje_anticipo) if f.porcentaje_anticipo is not None else None,
-                intervalo_entrega_contabilidad=f.intervalo_entrega_contabilidad,
-                es_gasto_adm=f.es_gasto_adm,
-                es_activo_fijo=f.es_activo_fijo,
-                sin_oc_os=f.sin_oc_os,
-                sin_ccco=f.sin_ccco,
-                motivo_devolucion=f.motivo_devolucion,
-                devuelta_por_nombre=f.devuelta_por_nombre,
-                fecha_rechazo_email=f.fecha_rechazo_email,
-                rechazado_por_nombre=f.rechazado_por_nombre,
-                motivo_rechazo_email=f.motivo_rechazo_email,
-                tipo_rechazo_email=f.tipo_rechazo_email,
-                files=files_out,
-                carpeta_id=f.carpeta_id,
-                carpeta=carpeta_out,
-                carpeta_tesoreria_id=f.carpeta_tesoreria_id,
-                carpeta_tesoreria=carpeta_tesoreria_out,
-                unidad_negocio_id=f.unidad_negocio_id,
-                unidad_negocio=f.unidad_negocio.codigo if f.unidad_negocio else None,
-                cuenta_auxiliar_id=f.cuenta_auxiliar_id,
-                cuenta_auxiliar=f.cuenta_auxiliar.codigo if f.cuenta_auxiliar else None,
-                fecha_envio_gerencia=f.fecha_envio_gerencia,
-                fecha_aprobacion_email=f.fecha_aprobacion_email,
-                aprobado_por_nombre=f.aprobado_por_nombre,
-                aprobado_por_email=f.aprobado_por_email,
-                fecha_envio_aprobacion_ops=f.fecha_envio_aprobacion_ops,
-                fecha_aprobacion_ops=f.fecha_aprobacion_ops,
-                aprobado_ops_nombre=f.aprobado_ops_nombre,
-                aprobado_ops_email=f.aprobado_ops_email,
-                fecha_envio_aprobacion_calidad=f.fecha_envio_aprobacion_calidad,
-                fecha_aprobacion_calidad=f.fecha_aprobacion_calidad,
-                aprobado_calidad_nombre=f.aprobado_calidad_nombre,
-                aprobado_calidad_email=f.aprobado_calidad_email,
-                fecha_envio_contabilidad=f.fecha_envio_contabilidad,
-                fecha_envio_tesoreria=f.fecha_envio_tesoreria,
-                fecha_cierre=f.fecha_cierre,
-                nit_proveedor=f.nit_proveedor,
-                pendiente_confirmacion=f.pendiente_confirmacion,
-                ai_area_confianza=f.ai_area_confianza,
-                ai_area_razonamiento=f.ai_area_razonamiento,
-                tipo_doc=f.tipo_doc,
-                numero_oc=f.numero_oc,
-                estado_oc=f.estado_oc,
-                enrutada_automaticamente=f.enrutada_automaticamente,
-            ))
-        
+        items = [self._list_item(f) for f in facturas]
+
         page = (skip // limit) + 1 if limit > 0 else 1
         
         return FacturasPaginatedResponse(
@@ -251,7 +254,60 @@ class FacturaService:
             page=page,
             per_page=limit
         )
-    
+
+    async def cambios_facturas(
+        self,
+        since: Optional[str] = None,
+        area_id: Optional[UUID] = None,
+        area_origen_id: Optional[UUID] = None,
+        estado: Optional[str] = None,
+        only_in_carpeta: bool = False,
+        solo_tiendas: bool = False,
+        estado_code: Optional[str] = None,
+    ) -> FacturasCambiosOut:
+        """Feed de cambios de una bandeja desde el cursor `since`.
+
+        Sin `since` solo entrega el cursor (el frontend lo pide ANTES de cargar
+        la lista completa, así no se pierde lo que cambie en medio). El cursor
+        es el instante de la consulta en UTC; la siguiente mira desde un margen
+        antes (cambios_margen_segundos), así que un item puede repetirse: el
+        upsert del frontend lo absorbe.
+        """
+        from datetime import timedelta, timezone
+        from core.config import settings
+
+        ahora = datetime.utcnow()
+        cursor = ahora.isoformat()
+        if not since:
+            return FacturasCambiosOut(cursor=cursor, reset=True)
+        try:
+            desde = datetime.fromisoformat(since)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor 'since' inválido")
+        if desde.tzinfo is not None:
+            desde = desde.astimezone(timezone.utc).replace(tzinfo=None)
+        if desde < ahora - timedelta(days=settings.cambios_retencion_dias):
+            # Las lápidas de borrados más viejas ya se purgaron
+            return FacturasCambiosOut(cursor=cursor, reset=True)
+
+        cambiadas, fuera, eliminadas = await self.repository.get_cambios(
+            desde - timedelta(seconds=settings.cambios_margen_segundos),
+            settings.cambios_max_items,
+            area_id=area_id,
+            area_origen_id=area_origen_id,
+            estado=estado,
+            only_in_carpeta=only_in_carpeta,
+            solo_tiendas=solo_tiendas,
+            estado_code=estado_code,
+        )
+        if len(cambiadas) > settings.cambios_max_items:
+            return FacturasCambiosOut(cursor=cursor, reset=True)
+        return FacturasCambiosOut(
+            cursor=cursor,
+            cambiadas=[self._list_item(f) for f in cambiadas],
+            removidas=[*fuera, *eliminadas],
+        )
+
     async def bandeja_tesoreria(self) -> List[FacturaBandejaItem]:
         """Bandeja de Tesorería: lista mínima de facturas en carpeta (query plana)."""
         rows = await self.repository.get_bandeja_tesoreria()
@@ -653,7 +709,7 @@ class FacturaService:
 
         # 2. Si no hay match de texto, llamar a Claude Haiku
         if area_asignada is None and settings.anthropic_api_key:
-            from anthropic import AsyncAnthropic
+            from core.instrumentacion import cliente_anthropic
             areas_lista = "\n".join(f"- code: {a.code}, nombre: {a.nombre}" for a in areas)
             contexto = (
                 f"Proveedor: {factura.proveedor}\n"
@@ -684,7 +740,7 @@ Responde ÚNICAMENTE con JSON válido:
 {{"area_code": "CODE_O_NULL", "confianza": "alta|media|baja|nula", "razonamiento": "explicación breve"}}"""
 
             try:
-                client = AsyncAnthropic(api_key=settings.anthropic_api_key)
+                client = cliente_anthropic()
                 message = await client.messages.create(
                     model="claude-haiku-4-5-20251001",
                     max_tokens=256,
@@ -1577,10 +1633,7 @@ Responde ÚNICAMENTE con JSON válido:
                     status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                     detail="Área CONTABILIDAD no encontrada"
                 )
-            estado_result = await self.db.execute(
-                select(Estado).where(Estado.id == 3)
-            )
-            estado_contabilidad = estado_result.scalar_one_or_none()
+            estado_contabilidad = await self.db.get(Estado, 3)
             area_previa = factura.area_id
             estado_previo = factura.estado_id
             factura.area_id = area_contabilidad.id
@@ -1803,10 +1856,7 @@ Responde ÚNICAMENTE con JSON válido:
         # NO usar ILIKE '%pendiente%': sin ORDER BY puede devolver id=4 ('Pendiente')
         # o id=7 ('Pendiente en Tesoreria'), dejando la factura en un estado que NO
         # es asignable a Tesorería (validate_factura_assignable_state exige 1,2,3).
-        estado_result = await self.db.execute(
-            select(Estado).where(Estado.id == 3)
-        )
-        estado_contabilidad = estado_result.scalar_one_or_none()
+        estado_contabilidad = await self.db.get(Estado, 3)
 
         if not estado_contabilidad:
             # Fallback: buscar por ID si existe un catálogo fijo
@@ -2149,10 +2199,7 @@ Responde ÚNICAMENTE con JSON válido:
             )
         
         # Obtener área Tesorería
-        area_result = await self.db.execute(
-            select(Area).where(Area.id == TESORERIA_AREA_ID)
-        )
-        area_tesoreria = area_result.scalar_one_or_none()
+        area_tesoreria = await self.db.get(Area, TESORERIA_AREA_ID)
         
         if not area_tesoreria:
             logger.error(f"Área Tesorería con ID {TESORERIA_AREA_ID} no encontrada")
@@ -2162,10 +2209,7 @@ Responde ÚNICAMENTE con JSON válido:
             )
         
         # Obtener estado
-        estado_result = await self.db.execute(
-            select(Estado).where(Estado.id == TESORERIA_ESTADO_ID)
-        )
-        estado_tesoreria = estado_result.scalar_one_or_none()
+        estado_tesoreria = await self.db.get(Estado, TESORERIA_ESTADO_ID)
         
         if not estado_tesoreria:
             logger.error(f"Estado con ID {TESORERIA_ESTADO_ID} no encontrado")
@@ -2279,13 +2323,11 @@ Responde ÚNICAMENTE con JSON válido:
         if factura.area_id != GADMIN_AREA_ID:
             raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="La factura no pertenece al área Gastos Fijos Café Quindío")
 
-        area_result = await self.db.execute(select(Area).where(Area.id == TESORERIA_AREA_ID))
-        area_tesoreria = area_result.scalar_one_or_none()
+        area_tesoreria = await self.db.get(Area, TESORERIA_AREA_ID)
         if not area_tesoreria:
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Área Tesorería no encontrada")
 
-        estado_result = await self.db.execute(select(Estado).where(Estado.id == TESORERIA_ESTADO_ID))
-        estado_tesoreria = estado_result.scalar_one_or_none()
+        estado_tesoreria = await self.db.get(Estado, TESORERIA_ESTADO_ID)
         if not estado_tesoreria:
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Estado Tesorería no encontrado")
 
@@ -2421,16 +2463,10 @@ Responde ÚNICAMENTE con JSON válido:
             )
         
         # Obtener área Tesorería
-        area_result = await self.db.execute(
-            select(Area).where(Area.id == TESORERIA_AREA_ID)
-        )
-        area_tesoreria = area_result.scalar_one_or_none()
+        area_tesoreria = await self.db.get(Area, TESORERIA_AREA_ID)
         
         # Obtener estado finalizado
-        estado_result = await self.db.execute(
-            select(Estado).where(Estado.id == ESTADO_FINALIZADO_ID)
-        )
-        estado_finalizado = estado_result.scalar_one_or_none()
+        estado_finalizado = await self.db.get(Estado, ESTADO_FINALIZADO_ID)
         
         if not estado_finalizado:
             logger.error(f"Estado con ID {ESTADO_FINALIZADO_ID} no encontrado")
@@ -2630,10 +2666,7 @@ Responde ÚNICAMENTE con JSON válido:
             or (factura.estado_id == 2 and factura.area_id == CONTABILIDAD_AREA_ID_RUTEO)
         )
         if not en_contabilidad:
-            result_estado = await self.db.execute(
-                select(Estado).where(Estado.id == factura.estado_id)
-            )
-            estado_actual = result_estado.scalar_one_or_none()
+            estado_actual = await self.db.get(Estado, factura.estado_id)
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"La factura debe estar en estado 'Contabilidad' para poder devolverla. Estado actual: {estado_actual.label if estado_actual else 'Desconocido'}"
@@ -2687,16 +2720,10 @@ Responde ÚNICAMENTE con JSON válido:
         await self.db.refresh(factura)
         
         # Obtener nombre del estado actual
-        result_estado = await self.db.execute(
-            select(Estado).where(Estado.id == factura.estado_id)
-        )
-        estado = result_estado.scalar_one_or_none()
+        estado = await self.db.get(Estado, factura.estado_id)
         
         # Obtener nombre del área
-        result_area = await self.db.execute(
-            select(Area).where(Area.id == factura.area_id)
-        )
-        area = result_area.scalar_one_or_none()
+        area = await self.db.get(Area, factura.area_id)
         
         logger.info(
             f"Factura {factura_id} devuelta exitosamente a {area.nombre if area else 'Área desconocida'}"
@@ -2744,10 +2771,7 @@ Responde ÚNICAMENTE con JSON válido:
         
         # Validar que esté en estado Responsable/Asignada (estado_id = 2)
         if factura.estado_id != 2:
-            result_estado = await self.db.execute(
-                select(Estado).where(Estado.id == factura.estado_id)
-            )
-            estado_actual = result_estado.scalar_one_or_none()
+            estado_actual = await self.db.get(Estado, factura.estado_id)
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"La factura debe estar en estado 'Asignada' (Responsable) para poder devolverla a Radicación. Estado actual: {estado_actual.label if estado_actual else 'Desconocido'}"
@@ -2807,10 +2831,7 @@ Responde ÚNICAMENTE con JSON válido:
         await self.db.refresh(factura)
         
         # Obtener nombre del estado actual
-        result_estado = await self.db.execute(
-            select(Estado).where(Estado.id == factura.estado_id)
-        )
-        estado = result_estado.scalar_one_or_none()
+        estado = await self.db.get(Estado, factura.estado_id)
         
         logger.info(
             f"Factura {factura_id} devuelta exitosamente a Radicación (Usuario: {user_facturacion.nombre})"
@@ -2851,10 +2872,7 @@ Responde ÚNICAMENTE con JSON válido:
             )
 
         if factura.estado_id != PAGADA_ESTADO_ID:
-            result_estado = await self.db.execute(
-                select(Estado).where(Estado.id == factura.estado_id)
-            )
-            estado_actual = result_estado.scalar_one_or_none()
+            estado_actual = await self.db.get(Estado, factura.estado_id)
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Solo se puede devolver una factura en estado Pagada. Estado actual: {estado_actual.label if estado_actual else 'Desconocido'}"
@@ -3238,6 +3256,7 @@ Responde ÚNICAMENTE con JSON válido:
         """
         from sqlalchemy import select
         from db.models import User, Factura
+        from db.perfiles_carga import PerfilCarga, opciones_factura
 
         # Estados "avanzados" (la factura ya salió del responsable hacia el flujo contable):
         # 3=Pendiente en contabilidad, 7=Pendiente en Tesorería, 5=Pagada.
@@ -3279,7 +3298,9 @@ Responde ÚNICAMENTE con JSON válido:
         factura_ids = list(fecha_por_factura.keys())
 
         facturas_result = await self.db.execute(
-            select(Factura).where(Factura.id.in_(factura_ids))
+            select(Factura)
+            .options(*opciones_factura(PerfilCarga.TRANSITION))
+            .where(Factura.id.in_(factura_ids))
         )
         facturas = facturas_result.scalars().all()
 
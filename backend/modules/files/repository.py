@@ -2,10 +2,11 @@
 Repositorio para operaciones de files.
 """
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
 from typing import List, Optional
 from uuid import UUID
-from db.models import File
+from datetime import datetime
+from db.models import Factura, File
 
 
 class FileRepository:
@@ -28,6 +29,7 @@ class FileRepository:
         self.db.add(file)
         await self.db.flush()
         await self.db.refresh(file)
+        await self._tocar_factura(file.factura_id)
         return file
     
     async def get_by_id(self, file_id: UUID) -> Optional[File]:
@@ -86,3 +88,12 @@ class FileRepository:
         if file:
             await self.db.delete(file)
             await self.db.flush()
+            await self._tocar_factura(file.factura_id)
+
+    async def _tocar_factura(self, factura_id: UUID) -> None:
+        """Marca la factura como modificada: sus archivos viajan en el item de
+        las bandejas y el feed de cambios (GET /facturas/changes) la busca por
+        updated_at."""
+        await self.db.execute(
+            update(Factura).where(Factura.id == factura_id).values(updated_at=datetime.utcnow())
+        )
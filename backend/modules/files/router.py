@@ -30,7 +30,7 @@ class ConfirmUploadIn(BaseModel):
     content_type: str
     size_bytes: int
 
-from db.session import get_db
+from db.session import con_sesion, get_db, get_read_db
 from modules.files.repository import FileRepository
 from modules.files.service import FileService
 from modules.files.schemas import FileResponse, FileCreateRequest, FileUploadResponse, ErrorResponse
@@ -119,7 +119,7 @@ async def register_file_metadata(
 @router.get("/facturas/{factura_id}/files/pdf")
 async def download_factura_pdf(
     factura_id: UUID,
-    service: FileService = Depends(get_file_service)
+    service: FileService = Depends(con_sesion(get_file_service, get_read_db))
 ):
     """Descarga el PDF asociado a una factura (streaming, no bloquea el worker)."""
     iterator, content_type, filename, content_length = await service.get_pdf_stream_by_factura(factura_id)
@@ -135,7 +135,7 @@ async def download_factura_pdf(
 async def list_factura_files(
     factura_id: UUID,
     doc_type: Optional[str] = Query(None, description="Filtrar por tipo de documento (OC, OS, OCT, etc.)"),
-    service: FileService = Depends(get_file_service)
+    service: FileService = Depends(con_sesion(get_file_service, get_read_db))
 ):
     """Lista todos los archivos asociados a una factura, opcionalmente filtrados por doc_type."""
     return await service.get_files_by_factura(factura_id, doc_type)
@@ -290,7 +290,7 @@ async def upload_factura_file(
 @router.get("/files/{file_id}")
 async def download_file(
     file_id: UUID,
-    service: FileService = Depends(get_file_service)
+    service: FileService = Depends(con_sesion(get_file_service, get_read_db))
 ):
     """Descarga un archivo específico por su ID (streaming, no bloquea el worker)."""
     iterator, content_type, filename, content_length = await service.get_file_stream(file_id)
@@ -305,7 +305,7 @@ async def download_file(
 @router.get("/files/{file_id}/preview")
 async def preview_file(
     file_id: UUID,
-    service: FileService = Depends(get_file_service)
+    service: FileService = Depends(con_sesion(get_file_service, get_read_db))
 ):
     """Muestra vista previa de un archivo por su ID (inline, streaming, no bloquea el worker)."""
     iterator, content_type, filename, content_length = await service.get_file_stream(file_id)
@@ -322,7 +322,7 @@ async def download_file_by_key(
     factura_id: UUID,
     key: str = Query(..., description="S3 key del archivo"),
     inline: bool = Query(False, description="Si es True, muestra inline en lugar de forzar descarga"),
-    service: FileService = Depends(get_file_service)
+    service: FileService = Depends(con_sesion(get_file_service, get_read_db))
 ):
     """
     Descarga un archivo directamente desde S3 usando su key.
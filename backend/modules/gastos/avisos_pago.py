@@ -0,0 +1,60 @@
+"""
+Correos de "paquete pagado" del pago masivo, fuera del request.
+
+GastosService.pagar_masivo registra el pago de todo el lote en una transacción
+y solo encola los ids; `ciclo_avisos_pago` (tarea de fondo del startup, una por
+worker de uvicorn) los toma por lotes de LOTE, carga los paquetes sin sus
+colecciones y envía un correo por paquete. Un correo que falla se loggea y no
+afecta a los demás ni al pago, que ya quedó registrado.
+
+La cola vive en memoria del worker: si se reinicia con avisos pendientes, esos
+correos no salen (el pago y su historial sí quedaron).
+"""
+import asyncio
+from typing import Iterable
+from uuid import UUID
+
+from core.email_service import email_service
+from core.logging import logger
+from modules.gastos.repository import PaqueteRepository
+
+LOTE = 50
+
+_cola: asyncio.Queue = asyncio.Queue()
+
+
+def encolar_avisos_pago(paquete_ids: Iterable[UUID]) -> None:
+    for paquete_id in paquete_ids:
+        _cola.put_nowait(paquete_id)
+
+
+async def enviar_avisos_pago(paquete_ids: list[UUID]) -> int:
+    """Envía el correo de pago al dueño de cada paquete. Devuelve cuántos salieron."""
+    from db.session import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as db:
+        paquetes = await PaqueteRepository(db).get_cabeceras(paquete_ids)
+    enviados = 0
+    for paquete in paquetes:
+        try:
+            await email_service.enviar_notificacion_pago_tecnico(paquete, paquete.tecnico.email)
+            enviados += 1
+        except Exception as e:
+            logger.error(f"Error enviando aviso de pago del paquete {paquete.id}: {e}")
+    return enviados
+
+
+async def ciclo_avisos_pago() -> None:
+    """Tarea de fondo: vacía la cola de avisos de pago por lotes."""
+    while True:
+        try:
+            lote = [await _cola.get()]
+            while len(lote) < LOTE and not _cola.empty():
+                lote.append(_cola.get_nowait())
+            await enviar_avisos_pago(lote)
+        except asyncio.CancelledError:
+            if not _cola.empty():
+                logger.warning(f"Cola de avisos de pago detenida con {_cola.qsize()} pendiente(s).")
+            raise
+        except Exception as e:
+            logger.error(f"Error en la cola de avisos de pago: {e}")
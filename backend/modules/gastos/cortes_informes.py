@@ -0,0 +1,103 @@
+"""
+Cortes semanales de los informes de gastos (informes_gastos_semanas/filas).
+
+Una semana se cierra cuando todos sus paquetes del alcance del informe
+terminaron (fecha_fin antes de hoy). guardar_semanas_cerradas guarda sus
+agregados con la misma consulta que el informe usa en vivo
+(informes.agregados_semanales), así que leerlos o recalcularlos da lo mismo.
+
+- Nocturno: ciclo_cortes_informes corre a la HORA_CORTE_LOCAL.
+- A demanda: scripts/cortes_informes_gastos.py (--rehacer borra y vuelve a
+  guardar todo, p. ej. tras cambiar el alcance de un informe).
+
+Si después cambia algo de una semana guardada, los triggers de la migración
+e8f9a0b1c2d3 la borran y el informe la vuelve a calcular en vivo hasta el
+próximo corte (el corte bloquea esas tablas en SHARE: ver guardar_cortes). Corren los dos workers de uvicorn: el INSERT … ON CONFLICT DO
+NOTHING de la semana deja que solo uno guarde cada una.
+"""
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy import delete, func, literal, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.tareas import TZ_BOGOTA, ciclo_diario
+from db.models import InformeGastosFila, InformeGastosSemana, PaqueteGasto
+from modules.gastos import informes
+from modules.gastos.informes import Informe
+
+HORA_CORTE_LOCAL = 2  # 2:00 a.m. hora Colombia, antes de la verificación de totales
+
+# Tablas con triggers que borran semanas guardadas (migración e8f9a0b1c2d3)
+TABLAS_INVALIDAN = ("paquetes_gastos", "users", "zonas_tecnicos", "areas")
+
+
+def _informes() -> tuple[Informe, ...]:
+    from modules.gastos.informe_cajas_menores import INFORME as CAJAS_MENORES
+    from modules.gastos.informe_zonas import INFORME as ZONAS
+
+    return ZONAS, CAJAS_MENORES
+
+
+async def guardar_semanas_cerradas(
+    db: AsyncSession, informe: Informe, hoy: date, rehacer: bool = False
+) -> list[str]:
+    """Guarda los agregados de las semanas cerradas que aún no están. Devuelve las semanas guardadas."""
+    S, F = InformeGastosSemana, InformeGastosFila
+    if rehacer:
+        await db.execute(delete(S).where(S.informe == informe.codigo))
+
+    cerradas = (
+        informes._base(informe, None, hoy, PaqueteGasto.semana)
+        .group_by(PaqueteGasto.semana)
+        .having(func.max(PaqueteGasto.fecha_fin) < hoy)
+    ).subquery()
+    semanas = (await db.execute(
+        insert(S)
+        .from_select(
+            [S.semana, S.informe, S.generado_en],
+            select(cerradas.c.semana, literal(informe.codigo), func.now()),
+        )
+        .on_conflict_do_nothing()
+        .returning(S.semana)
+    )).scalars().all()
+    if not semanas:
+        return []
+
+    a = informes.agregados_semanales(informe, None, hoy).where(PaqueteGasto.semana.in_(semanas)).subquery()
+    await db.execute(
+        insert(F).from_select(
+            [F.semana, F.informe, F.fecha_inicio, F.grupo, F.email, F.estado,
+             F.persona, F.paquetes, F.documentos, F.monto],
+            select(a.c.semana, literal(informe.codigo), a.c.fecha_inicio, a.c.grupo, a.c.email,
+                   a.c.estado, a.c.persona, a.c.paquetes, a.c.documentos, a.c.monto),
+        )
+    )
+    return sorted(semanas)
+
+
+async def guardar_cortes(db: AsyncSession, hoy: Optional[date] = None, rehacer: bool = False) -> dict[str, list[str]]:
+    """Corte de todos los informes en una transacción.
+
+    Toma en SHARE las tablas cuyos triggers invalidan cortes: un cambio que
+    confirma durante el corte borraría con su trigger una semana que aún no
+    ve (sin confirmar) y el corte guardaría agregados viejos. Así el corte
+    espera a las escrituras en curso y frena las nuevas hasta su commit.
+    """
+    await db.execute(text(f"LOCK TABLE {', '.join(TABLAS_INVALIDAN)} IN SHARE MODE"))
+    hoy = hoy or datetime.now(tz=TZ_BOGOTA).date()
+    guardadas = {}
+    for informe in _informes():
+        guardadas[informe.codigo] = await guardar_semanas_cerradas(db, informe, hoy, rehacer)
+    await db.commit()
+    return guardadas
+
+
+def _resumen(guardadas: dict[str, list[str]]) -> str:
+    return ", ".join(f"{codigo} {len(semanas)} semana(s) guardada(s)" for codigo, semanas in guardadas.items())
+
+
+async def ciclo_cortes_informes() -> None:
+    """Tarea de fondo: guarda cada noche las semanas que se cerraron."""
+    await ciclo_diario(HORA_CORTE_LOCAL, guardar_cortes, "corte de los informes de gastos", _resumen)
@@ -0,0 +1,354 @@
+# -*- coding: utf-8 -*-
+"""Motor de los informes Excel de gastos (informe_zonas.py, informe_cajas_menores.py).
+
+Cada informe se define con un `Informe`: la expresión SQL que agrupa (zona,
+caja menor…), los joins y filtros de su alcance y los rótulos. El motor saca:
+
+- Los resúmenes (por grupo, por persona y por semana) agregados en la base de
+  datos con GROUP BY / GROUPING SETS y FILTER: a Python solo llegan las filas
+  ya sumadas, incluida la de TOTAL GENERAL. Se suman sobre los "hechos": los
+  paquetes reportados agregados por semana, grupo, persona y estado. Las
+  semanas cerradas salen ya agregadas de informes_gastos_filas
+  (cortes_informes.py); solo la semana abierta y las invalidadas desde el
+  último corte se agregan en vivo. Un informe del año cuesta en resúmenes lo
+  mismo que uno de una semana.
+- Las hojas de detalle (Paquetes y Detalle Gastos), las únicas con datos fila
+  a fila, leídas por cursor (`db.stream`) ya ordenadas y con los valores con
+  el formato final (estado en texto, fechas en hora Colombia).
+
+El orden de los grupos en todas las hojas es por monto reportado descendente,
+como lo hacía el informe en Python.
+"""
+import io
+from datetime import date
+from typing import Callable, NamedTuple, Optional
+
+from sqlalchemy import case, func, select, tuple_, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import (
+    PaqueteGasto, GastoLegalizacion, User,
+    CuentaAuxiliar, CentroCosto, CentroOperacion,
+    InformeGastosSemana, InformeGastosFila,
+)
+
+EMAIL_PRUEBA = "tecnico@cafequindio.com"
+ESTADOS = {
+    "borrador": "Borrador", "en_validacion": "En validación",
+    "en_revision": "En revisión", "devuelto": "Devuelto",
+    "aprobado": "Aprobado", "en_tesoreria": "En Tesorería",
+    "pagado": "Pagado", "cruzado": "Cruzado",
+}
+# Columnas de conteo por estado del resumen por persona
+ESTADOS_CONTEO = ("en_revision", "devuelto", "aprobado", "en_tesoreria", "pagado", "cruzado")
+MESES = ["enero", "febrero", "marzo", "abril", "mayo", "junio", "julio",
+         "agosto", "septiembre", "octubre", "noviembre", "diciembre"]
+TOTAL_GENERAL = "TOTAL GENERAL"
+LOTE_DETALLE = 1000
+
+
+class Hoja(NamedTuple):
+    nombre: str
+    titulo: str
+    encabezados: list[str]
+    filas: list
+    columnas_dinero: set[int]
+    fila_total: bool = False
+
+
+class Informe(NamedTuple):
+    codigo: str                                  # clave en informes_gastos_semanas
+    titulo: str
+    grupo: str                                   # "Zona", "Caja menor"
+    persona: str                                 # "Técnico", "Usuario"
+    personas: str                                # "Técnicos", "Usuarios"
+    clave: Callable[[], object]                  # expresión SQL del grupo
+    alcance: Callable[[object], object]          # joins y filtros propios: q → q
+    extras_paquete: tuple = ()                   # ((encabezado, expresión), …) tras el folio
+
+
+def _texto_estado(col):
+    return case(ESTADOS, value=col, else_=col)
+
+
+def _fecha(col):
+    return func.to_char(col, "YYYY-MM-DD")
+
+
+def _fecha_hora(col):
+    return func.to_char(func.timezone("America/Bogota", col), "YYYY-MM-DD HH24:MI")
+
+
+def _base(informe: Informe, fecha_desde: Optional[date], fecha_hasta: date, *columnas):
+    """SELECT de `columnas` sobre los paquetes del alcance del informe."""
+    q = (
+        select(*columnas)
+        .select_from(PaqueteGasto)
+        .join(User, User.id == PaqueteGasto.user_id)
+        .where(User.email != EMAIL_PRUEBA)
+        .where(PaqueteGasto.fecha_inicio <= fecha_hasta)
+    )
+    if fecha_desde is not None:
+        q = q.where(PaqueteGasto.fecha_inicio >= fecha_desde)
+    return informe.alcance(q)
+
+
+def _paquetes(informe: Informe, fecha_desde: Optional[date], fecha_hasta: date):
+    return _base(
+        informe, fecha_desde, fecha_hasta,
+        informe.clave().label("grupo"), User.email.label("email"), User.nombre.label("persona"),
+        PaqueteGasto.id.label("paquete_id"), PaqueteGasto.folio, PaqueteGasto.semana,
+        PaqueteGasto.fecha_inicio, PaqueteGasto.fecha_fin, PaqueteGasto.estado,
+        PaqueteGasto.total_documentos, PaqueteGasto.monto_total, PaqueteGasto.monto_a_pagar,
+        PaqueteGasto.fecha_envio, PaqueteGasto.fecha_aprobacion,
+        PaqueteGasto.fecha_envio_tesoreria, PaqueteGasto.fecha_pago,
+        *[expr.label(f"extra_{i}") for i, (_, expr) in enumerate(informe.extras_paquete)],
+    ).subquery("p")
+
+
+def agregados_semanales(informe: Informe, fecha_desde: Optional[date], fecha_hasta: date):
+    """Paquetes reportados agregados por semana, grupo, persona y estado.
+
+    Es la forma de informes_gastos_filas: la misma consulta llena las semanas
+    cerradas (cortes_informes.py) y calcula en vivo las que no lo están.
+    """
+    # La misma etiqueta en SELECT y GROUP BY: Postgres exige la expresión
+    # idéntica, incluidos sus parámetros
+    grupo = informe.clave().label("grupo")
+    return (
+        _base(
+            informe, fecha_desde, fecha_hasta,
+            grupo, PaqueteGasto.semana, PaqueteGasto.fecha_inicio,
+            User.email, PaqueteGasto.estado,
+            func.min(User.nombre).label("persona"),
+            func.count().label("paquetes"),
+            func.sum(PaqueteGasto.total_documentos).label("documentos"),
+            func.sum(PaqueteGasto.monto_total).label("monto"),
+        )
+        .where(PaqueteGasto.estado != "borrador")
+        .group_by(grupo, PaqueteGasto.semana, PaqueteGasto.fecha_inicio, User.email, PaqueteGasto.estado)
+    )
+
+
+def _hechos(informe: Informe, fecha_desde: Optional[date], fecha_hasta: date):
+    """Semanas guardadas + semanas en vivo (las abiertas o invalidadas), con el monto del grupo."""
+    F = InformeGastosFila
+    guardadas = select(
+        F.grupo, F.semana, F.fecha_inicio, F.email, F.estado,
+        F.persona, F.paquetes, F.documentos, F.monto,
+    ).where(F.informe == informe.codigo, F.fecha_inicio <= fecha_hasta)
+    if fecha_desde is not None:
+        guardadas = guardadas.where(F.fecha_inicio >= fecha_desde)
+    en_vivo = agregados_semanales(informe, fecha_desde, fecha_hasta).where(
+        ~select(InformeGastosSemana.semana).where(
+            InformeGastosSemana.semana == PaqueteGasto.semana,
+            InformeGastosSemana.informe == informe.codigo,
+        ).exists()
+    )
+    u = union_all(guardadas, en_vivo).subquery("u")
+    return select(
+        u, func.sum(u.c.monto).over(partition_by=u.c.grupo).label("monto_grupo"),
+    ).subquery("h")
+
+
+def _montos(h):
+    """Columnas comunes de los resúmenes: documentos, reportado, pagado y en trámite."""
+    total = func.coalesce(func.sum(h.c.monto), 0)
+    pagado = func.coalesce(func.sum(h.c.monto).filter(h.c.estado.in_(("pagado", "cruzado"))), 0)
+    return [func.coalesce(func.sum(h.c.documentos), 0), total, pagado, total - pagado]
+
+
+def _consulta_resumen(h, dimension):
+    """Resumen por `dimension` más la fila TOTAL GENERAL, en una sola consulta."""
+    es_total = func.grouping(dimension) == 1
+    return (
+        select(
+            case((es_total, TOTAL_GENERAL), else_=dimension),
+            func.count(func.distinct(h.c.email)), func.coalesce(func.sum(h.c.paquetes), 0),
+            *_montos(h),
+        )
+        .group_by(func.grouping_sets(tuple_(dimension), tuple_()))
+    )
+
+
+def consulta_resumen_grupo(h):
+    return _consulta_resumen(h, h.c.grupo).order_by(
+        func.grouping(h.c.grupo), func.sum(h.c.monto).desc(), h.c.grupo,
+    )
+
+
+def consulta_resumen_semana(h):
+    return _consulta_resumen(h, h.c.semana).order_by(func.grouping(h.c.semana), h.c.semana)
+
+
+def consulta_resumen_persona(h):
+    return (
+        select(
+            h.c.grupo, func.min(h.c.persona), h.c.email, func.sum(h.c.paquetes),
+            func.sum(h.c.documentos), func.sum(h.c.monto),
+            func.min(h.c.semana), func.max(h.c.semana),
+            *[func.coalesce(func.sum(h.c.paquetes).filter(h.c.estado == e), 0) for e in ESTADOS_CONTEO],
+        )
+        .group_by(h.c.grupo, h.c.email)
+        .order_by(func.max(h.c.monto_grupo).desc(), h.c.grupo, func.sum(h.c.monto).desc())
+    )
+
+
+def _orden_grupos(h):
+    return select(h.c.grupo, func.sum(h.c.monto).label("monto")).group_by(h.c.grupo).subquery("o")
+
+
+def _con_orden(q, p, o):
+    """Une el detalle al orden de los grupos; los que solo tienen borradores van al final."""
+    return q.outerjoin(o, o.c.grupo == p.c.grupo).order_by(
+        o.c.monto.desc().nulls_last(), p.c.grupo, p.c.persona, p.c.semana, p.c.folio,
+    )
+
+
+def consulta_paquetes(p, o, n_extras: int = 0):
+    return _con_orden(
+        select(
+            p.c.grupo, p.c.persona, p.c.folio,
+            *[p.c[f"extra_{i}"] for i in range(n_extras)],
+            p.c.semana, _fecha(p.c.fecha_inicio), _fecha(p.c.fecha_fin),
+            _texto_estado(p.c.estado), p.c.total_documentos,
+            p.c.monto_total, p.c.monto_a_pagar,
+            _fecha_hora(p.c.fecha_envio), _fecha_hora(p.c.fecha_aprobacion),
+            _fecha_hora(p.c.fecha_envio_tesoreria), _fecha_hora(p.c.fecha_pago),
+        ).select_from(p),
+        p, o,
+    )
+
+
+def consulta_detalle(p, o):
+    G = GastoLegalizacion
+    return _con_orden(
+        select(
+            p.c.grupo, p.c.persona, p.c.folio, p.c.semana, _texto_estado(p.c.estado),
+            _fecha(G.fecha), G.no_identificacion, G.pagado_a, G.concepto, G.no_recibo,
+            G.valor_pagado, G.estado_gasto,
+            CuentaAuxiliar.codigo, CuentaAuxiliar.descripcion,
+            CentroCosto.nombre, CentroOperacion.nombre,
+        )
+        .select_from(G)
+        .join(p, p.c.paquete_id == G.paquete_id)
+        .outerjoin(CuentaAuxiliar, CuentaAuxiliar.id == G.cuenta_auxiliar_id)
+        .outerjoin(CentroCosto, CentroCosto.id == G.centro_costo_id)
+        .outerjoin(CentroOperacion, CentroOperacion.id == G.centro_operacion_id),
+        p, o,
+    ).order_by(G.orden)
+
+
+async def _leer_por_cursor(db: AsyncSession, q) -> list[tuple]:
+    resultado = await db.stream(q)
+    filas: list[tuple] = []
+    async for lote in resultado.partitions(LOTE_DETALLE):
+        filas.extend(tuple(f) for f in lote)
+    return filas
+
+
+async def consultar(
+    db: AsyncSession, informe: Informe, fecha_desde: Optional[date], fecha_hasta: date
+) -> list[Hoja]:
+    """Corre las consultas del informe y devuelve sus hojas listas para escribir."""
+    h = _hechos(informe, fecha_desde, fecha_hasta)
+    p = _paquetes(informe, fecha_desde, fecha_hasta)
+    o = _orden_grupos(h)
+    n_extras = len(informe.extras_paquete)
+
+    resumen_hdr = [informe.grupo, informe.personas, "Paquetes reportados", "Documentos",
+                   "Monto reportado", "Monto pagado", "Monto en trámite"]
+    semana_hdr = ["Semana"] + resumen_hdr[1:]
+    persona_hdr = [informe.grupo, informe.persona, "Email", "Paquetes", "Documentos",
+                   "Monto reportado", "Primera semana", "Última semana",
+                   *[ESTADOS[e] for e in ESTADOS_CONTEO]]
+    paq_hdr = [informe.grupo, informe.persona, "Folio",
+               *[hdr for hdr, _ in informe.extras_paquete],
+               "Semana", "Inicio", "Fin", "Estado", "Docs", "Monto total", "Monto a pagar",
+               "Fecha envío", "Fecha aprobación", "Envío tesorería", "Fecha pago"]
+    det_hdr = [informe.grupo, informe.persona, "Folio paquete", "Semana", "Estado paquete",
+               "Fecha gasto", "NIT/CC", "Pagado a", "Concepto", "No. recibo", "Valor pagado",
+               "Estado gasto", "Cód. cuenta auxiliar", "Cuenta auxiliar", "Centro de costo",
+               "Centro de operación"]
+
+    por_grupo = [tuple(f) for f in (await db.execute(consulta_resumen_grupo(h))).all()]
+    por_persona = [tuple(f) for f in (await db.execute(consulta_resumen_persona(h))).all()]
+    por_semana = [tuple(f) for f in (await db.execute(consulta_resumen_semana(h))).all()]
+    paquetes = await _leer_por_cursor(db, consulta_paquetes(p, o, n_extras))
+    detalle = await _leer_por_cursor(db, consulta_detalle(p, o))
+
+    return [
+        Hoja(f"Resumen por {informe.grupo.title()}", informe.titulo,
+             resumen_hdr, por_grupo, {5, 6, 7}, fila_total=True),
+        Hoja(f"Resumen por {informe.persona}",
+             f"Resumen por {informe.persona.lower()} (solo paquetes reportados, excluye borradores)",
+             persona_hdr, por_persona, {6}),
+        Hoja("Resumen por Semana",
+             "Resumen por semana (solo paquetes reportados, excluye borradores)",
+             semana_hdr, por_semana, {5, 6, 7}, fila_total=True),
+        Hoja("Paquetes", "Listado completo de paquetes (incluye borradores no enviados)",
+             paq_hdr, paquetes, {9 + n_extras, 10 + n_extras}),
+        Hoja("Detalle Gastos", "Detalle de todos los gastos legalizados línea a línea",
+             det_hdr, detalle, {11}),
+    ]
+
+
+def _texto_corte(fecha_desde: Optional[date], fecha_hasta: date) -> str:
+    desde_txt = (f"del {fecha_desde.day} de {MESES[fecha_desde.month - 1]} de {fecha_desde.year} "
+                 if fecha_desde else "desde el inicio ")
+    return (f"Corte: {desde_txt}al {fecha_hasta.day} de "
+            f"{MESES[fecha_hasta.month - 1]} de {fecha_hasta.year}"
+            " — Fuente: Docuflow (producción)")
+
+
+def construir_excel(hojas: list[Hoja], fecha_desde: Optional[date], fecha_hasta: date) -> bytes:
+    """Escribe las hojas con el formato de los informes. Síncrono: llamar con asyncio.to_thread."""
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+    from openpyxl.utils import get_column_letter
+
+    corte_txt = _texto_corte(fecha_desde, fecha_hasta)
+    AZUL = "1F4E5F"
+    GRIS = "F2F2F2"
+    thin = Border(bottom=Side(style="thin", color="D9D9D9"))
+
+    def hoja(ws, titulo, hdr, rows, money_cols, total_row=False):
+        ws.append([titulo]); ws.append([corte_txt]); ws.append([])
+        ws["A1"].font = Font(bold=True, size=13, color=AZUL)
+        ws["A2"].font = Font(italic=True, size=9, color="666666")
+        ws.append(hdr)
+        hr = ws.max_row
+        for c in range(1, len(hdr) + 1):
+            cell = ws.cell(row=hr, column=c)
+            cell.font = Font(bold=True, color="FFFFFF", size=10)
+            cell.fill = PatternFill("solid", fgColor=AZUL)
+            cell.alignment = Alignment(vertical="center", wrap_text=True)
+        for i, row in enumerate(rows):
+            ws.append(row)
+            r = ws.max_row
+            for c in range(1, len(hdr) + 1):
+                cell = ws.cell(row=r, column=c)
+                cell.border = thin
+                cell.font = Font(size=10)
+                if i % 2 == 1:
+                    cell.fill = PatternFill("solid", fgColor=GRIS)
+                if c in money_cols:
+                    cell.number_format = "#,##0"
+            if total_row and i == len(rows) - 1:
+                for c in range(1, len(hdr) + 1):
+                    ws.cell(row=r, column=c).font = Font(bold=True, size=10)
+        for c in range(1, len(hdr) + 1):
+            w = max([len(str(hdr[c - 1]))] +
+                    [len(str(row[c - 1])) for row in rows[:200] if row[c - 1] is not None])
+            ws.column_dimensions[get_column_letter(c)].width = min(max(w + 2, 10), 42)
+        ws.freeze_panes = ws.cell(row=hr + 1, column=1)
+
+    wb = Workbook()
+    for i, h in enumerate(hojas):
+        ws = wb.active if i == 0 else wb.create_sheet()
+        ws.title = h.nombre
+        hoja(ws, h.titulo, h.encabezados, h.filas, h.columnas_dinero, h.fila_total)
+
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
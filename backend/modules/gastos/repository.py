@@ -1,15 +1,24 @@
 """Repositorio para operaciones de base de datos del módulo gastos."""
 from sqlalchemy.ext.asyncio import AsyncSession
-import sqlalchemy as sa
-from sqlalchemy import select, func, update, delete, extract
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, func, update, delete, extract, insert
+from sqlalchemy.orm import lazyload, selectinload
 from typing import Optional, List, Tuple
 from uuid import UUID
 from datetime import datetime
 
 from db.models import (
-    PaqueteGasto, GastoLegalizacion, ArchivoGasto,
-    ComentarioPaquete, HistorialEstadoPaquete, TokenAprobacionPaquete
+    Anticipo, PaqueteGasto, GastoLegalizacion, ArchivoGasto,
+    ComentarioPaquete, HistorialEstadoPaquete, TokenAprobacionPaquete, SolicitudAprobacion,
+)
+
+# Carga del paquete sin sus colecciones (gastos, comentarios, historial, tokens);
+# Anticipo.paquetes es selectin y traería los demás paquetes del anticipo
+SIN_SECCIONES = (
+    lazyload(PaqueteGasto.gastos),
+    lazyload(PaqueteGasto.comentarios),
+    lazyload(PaqueteGasto.historial_estados),
+    lazyload(PaqueteGasto.tokens_aprobacion),
+    selectinload(PaqueteGasto.anticipo).lazyload(Anticipo.paquetes),
 )
 
 
@@ -37,6 +46,153 @@ class PaqueteRepository:
         )
         return result.scalar_one_or_none()
 
+    async def get_cabecera_detalle(self, paquete_id: UUID):
+        """El paquete sin sus colecciones + cuántos gastos, comentarios, historial y
+        solicitudes tiene, en una sola consulta (ver get_by_id para el detalle completo).
+
+        Devuelve la fila (PaqueteGasto, n_gastos, n_comentarios, n_historial, n_solicitudes).
+        """
+        def contar(modelo):
+            return (
+                select(func.count()).select_from(modelo)
+                .where(modelo.paquete_id == PaqueteGasto.id)
+                .scalar_subquery()
+            )
+
+        result = await self.db.execute(
+            select(
+                PaqueteGasto,
+                contar(GastoLegalizacion).label("n_gastos"),
+                contar(ComentarioPaquete).label("n_comentarios"),
+                contar(HistorialEstadoPaquete).label("n_historial"),
+                contar(SolicitudAprobacion).label("n_solicitudes"),
+            )
+            .options(*SIN_SECCIONES)
+            .where(PaqueteGasto.id == paquete_id)
+        )
+        return result.one_or_none()
+
+    async def get_cabeceras(self, paquete_ids: List[UUID]) -> List[PaqueteGasto]:
+        """Varios paquetes sin sus colecciones (correos, reportes)."""
+        result = await self.db.execute(
+            select(PaqueteGasto).options(*SIN_SECCIONES).where(PaqueteGasto.id.in_(paquete_ids))
+        )
+        return list(result.scalars().all())
+
+    async def get_estados(self, paquete_ids: List[UUID]) -> dict:
+        """{id: estado} de los paquetes que existen, en una consulta."""
+        result = await self.db.execute(
+            select(PaqueteGasto.id, PaqueteGasto.estado).where(PaqueteGasto.id.in_(paquete_ids))
+        )
+        return dict(result.all())
+
+    async def marcar_pagados(self, paquete_ids: List[UUID], fecha_pago: datetime) -> List[UUID]:
+        """Pasa a 'pagado' en un solo UPDATE los que sigan en_tesoreria. Devuelve los ids pagados.
+
+        El filtro por estado va en el mismo UPDATE: un paquete que otro usuario
+        pagó o devolvió después de validar queda fuera sin pisarlo.
+        """
+        result = await self.db.execute(
+            update(PaqueteGasto)
+            .where(PaqueteGasto.id.in_(paquete_ids), PaqueteGasto.estado == "en_tesoreria")
+            .values(estado="pagado", fecha_pago=fecha_pago)
+            .returning(PaqueteGasto.id)
+            .execution_options(synchronize_session=False)
+        )
+        return list(result.scalars().all())
+
+    async def cerrar_anticipos_pagados(self, paquete_ids: List[UUID]) -> List[str]:
+        """Cierra los anticipos desembolsados de estos paquetes que ya no tengan
+        paquetes abiertos (todos pagados o cruzados). Devuelve sus folios."""
+        abiertos = (
+            select(PaqueteGasto.id)
+            .where(
+                PaqueteGasto.anticipo_id == Anticipo.id,
+                PaqueteGasto.estado.notin_(("pagado", "cruzado")),
+            )
+            .exists()
+        )
+        result = await self.db.execute(
+            update(Anticipo)
+            .where(
+                Anticipo.estado == "desembolsado",
+                Anticipo.id.in_(
+                    select(PaqueteGasto.anticipo_id).where(PaqueteGasto.id.in_(paquete_ids))
+                ),
+                ~abiertos,
+            )
+            .values(estado="cerrado")
+            .returning(Anticipo.folio)
+            .execution_options(synchronize_session=False)
+        )
+        return list(result.scalars().all())
+
+    async def get_gastos_pagina(
+        self, paquete_id: UUID, skip: int = 0, limit: int = 50
+    ) -> Tuple[List[GastoLegalizacion], int]:
+        total = (await self.db.execute(
+            select(func.count(GastoLegalizacion.id)).where(GastoLegalizacion.paquete_id == paquete_id)
+        )).scalar()
+        result = await self.db.execute(
+            select(GastoLegalizacion)
+            .options(
+                selectinload(GastoLegalizacion.archivos),
+                selectinload(GastoLegalizacion.centro_costo),
+                selectinload(GastoLegalizacion.centro_operacion),
+                selectinload(GastoLegalizacion.cuenta_auxiliar),
+            )
+            .where(GastoLegalizacion.paquete_id == paquete_id)
+            .order_by(GastoLegalizacion.orden, GastoLegalizacion.created_at, GastoLegalizacion.id)
+            .offset(skip).limit(limit)
+        )
+        return list(result.scalars().all()), total
+
+    async def get_comentarios_pagina(
+        self, paquete_id: UUID, skip: int = 0, limit: int = 50
+    ) -> Tuple[List[ComentarioPaquete], int]:
+        """Más recientes primero."""
+        total = (await self.db.execute(
+            select(func.count(ComentarioPaquete.id)).where(ComentarioPaquete.paquete_id == paquete_id)
+        )).scalar()
+        result = await self.db.execute(
+            select(ComentarioPaquete)
+            .options(lazyload(ComentarioPaquete.paquete), selectinload(ComentarioPaquete.user))
+            .where(ComentarioPaquete.paquete_id == paquete_id)
+            .order_by(ComentarioPaquete.created_at.desc(), ComentarioPaquete.id)
+            .offset(skip).limit(limit)
+        )
+        return list(result.scalars().all()), total
+
+    async def get_historial_pagina(
+        self, paquete_id: UUID, skip: int = 0, limit: int = 50
+    ) -> Tuple[List[HistorialEstadoPaquete], int]:
+        """Más recientes primero."""
+        total = (await self.db.execute(
+            select(func.count(HistorialEstadoPaquete.id)).where(HistorialEstadoPaquete.paquete_id == paquete_id)
+        )).scalar()
+        result = await self.db.execute(
+            select(HistorialEstadoPaquete)
+            .options(lazyload(HistorialEstadoPaquete.paquete), selectinload(HistorialEstadoPaquete.user))
+            .where(HistorialEstadoPaquete.paquete_id == paquete_id)
+            .order_by(HistorialEstadoPaquete.created_at.desc(), HistorialEstadoPaquete.id)
+            .offset(skip).limit(limit)
+        )
+        return list(result.scalars().all()), total
+
+    async def get_solicitudes_pagina(
+        self, paquete_id: UUID, skip: int = 0, limit: int = 50
+    ) -> Tuple[List[SolicitudAprobacion], int]:
+        total = (await self.db.execute(
+            select(func.count(SolicitudAprobacion.id)).where(SolicitudAprobacion.paquete_id == paquete_id)
+        )).scalar()
+        result = await self.db.execute(
+            select(SolicitudAprobacion)
+            .where(SolicitudAprobacion.paquete_id == paquete_id)
+            .order_by(SolicitudAprobacion.created_at, SolicitudAprobacion.id)
+            .offset(skip).limit(limit)
+        )
+        return list(result.scalars().all()), total
+
     async def list_by_user(
         self, user_id: UUID, skip: int = 0, limit: int = 50
     ) -> Tuple[List[PaqueteGasto], int]:
@@ -124,37 +280,97 @@ class PaqueteRepository:
         await self.db.refresh(paquete)
         return paquete
 
-    async def max_folio_number_by_year(self, year: int) -> int:
-        """Retorna el número más alto de folio existente para el año dado."""
+    async def get_cabecera(self, paquete_id: UUID):
+        """Solo id, estado y dueño: lo que piden los chequeos de edición.
+
+        Cargar el PaqueteGasto completo trae (selectin) todos sus gastos y
+        archivos; para agregar/editar/borrar un gasto no hacen falta.
+        """
         result = await self.db.execute(
-            select(func.max(
-                func.cast(
-                    func.substr(PaqueteGasto.folio, len(f"PKG-{year}-") + 1),
-                    sa.Integer
-                )
-            )).where(
-                PaqueteGasto.folio.like(f"PKG-{year}-%")
+            select(PaqueteGasto.id, PaqueteGasto.estado, PaqueteGasto.user_id)
+            .where(PaqueteGasto.id == paquete_id)
+        )
+        return result.one_or_none()
+
+    async def aplicar_delta_totales(
+        self, paquete_id: UUID, monto: float = 0, documentos: int = 0
+    ) -> None:
+        """Suma ±monto a monto_total y ±documentos a total_documentos en un solo UPDATE.
+
+        Costo constante sin importar cuántos gastos tenga el paquete; el UPDATE
+        toma el lock de la fila, así que ediciones simultáneas no se pisan.
+        """
+        await self.db.execute(
+            update(PaqueteGasto)
+            .where(PaqueteGasto.id == paquete_id)
+            .values(
+                monto_total=PaqueteGasto.monto_total + monto,
+                total_documentos=PaqueteGasto.total_documentos + documentos,
             )
         )
-        return result.scalar() or 0
 
-    async def recalculate_totals(self, paquete_id: UUID) -> None:
-        """Actualiza monto_total y total_documentos sumando los gastos."""
-        monto_q = select(func.coalesce(func.sum(GastoLegalizacion.valor_pagado), 0)).where(
-            GastoLegalizacion.paquete_id == paquete_id
+    def _totales_reales(self, paquete_id: Optional[UUID] = None):
+        """Subquery (id, monto, docs) con los totales recalculados desde gastos y archivos."""
+        montos = (
+            select(
+                GastoLegalizacion.paquete_id,
+                func.sum(GastoLegalizacion.valor_pagado).label("monto"),
+            )
+            .group_by(GastoLegalizacion.paquete_id)
+            .subquery()
+        )
+        docs = (
+            select(ArchivoGasto.paquete_id, func.count(ArchivoGasto.id).label("docs"))
+            .group_by(ArchivoGasto.paquete_id)
+            .subquery()
+        )
+        q = (
+            select(
+                PaqueteGasto.id,
+                func.coalesce(montos.c.monto, 0).label("monto"),
+                func.coalesce(docs.c.docs, 0).label("docs"),
+            )
+            .outerjoin(montos, montos.c.paquete_id == PaqueteGasto.id)
+            .outerjoin(docs, docs.c.paquete_id == PaqueteGasto.id)
         )
-        monto = (await self.db.execute(monto_q)).scalar()
+        if paquete_id:
+            q = q.where(PaqueteGasto.id == paquete_id)
+        return q.subquery()
+
+    async def get_totales_desfasados(self, paquete_id: Optional[UUID] = None) -> list:
+        """Paquetes cuyo monto_total/total_documentos no cuadra con sus gastos y archivos.
 
-        docs_q = select(func.count(ArchivoGasto.id)).where(
-            ArchivoGasto.paquete_id == paquete_id
+        Filas (id, monto_total, total_documentos, monto, docs): guardado vs real.
+        """
+        reales = self._totales_reales(paquete_id)
+        result = await self.db.execute(
+            select(
+                PaqueteGasto.id, PaqueteGasto.monto_total, PaqueteGasto.total_documentos,
+                reales.c.monto, reales.c.docs,
+            )
+            .join(reales, reales.c.id == PaqueteGasto.id)
+            .where(
+                (PaqueteGasto.monto_total != reales.c.monto)
+                | (PaqueteGasto.total_documentos != reales.c.docs)
+            )
         )
-        docs = (await self.db.execute(docs_q)).scalar()
+        return list(result.all())
 
-        await self.db.execute(
+    async def reparar_totales(self, paquete_id: Optional[UUID] = None) -> List[UUID]:
+        """Recalcula y corrige, en un solo UPDATE, los paquetes desfasados. Devuelve sus ids."""
+        reales = self._totales_reales(paquete_id)
+        result = await self.db.execute(
             update(PaqueteGasto)
-            .where(PaqueteGasto.id == paquete_id)
-            .values(monto_total=monto, total_documentos=docs)
+            .where(
+                PaqueteGasto.id == reales.c.id,
+                (PaqueteGasto.monto_total != reales.c.monto)
+                | (PaqueteGasto.total_documentos != reales.c.docs),
+            )
+            .values(monto_total=reales.c.monto, total_documentos=reales.c.docs)
+            .returning(PaqueteGasto.id)
+            .execution_options(synchronize_session=False)
         )
+        return list(result.scalars().all())
 
 
 class GastoRepository:
@@ -230,6 +446,11 @@ class ComentarioPaqueteRepository:
         await self.db.refresh(comentario)
         return comentario
 
+    async def create_many(self, filas: List[dict]) -> None:
+        """Un INSERT multi-fila (pagos masivos)."""
+        if filas:
+            await self.db.execute(insert(ComentarioPaquete), filas)
+
 
 class HistorialRepository:
 
@@ -241,3 +462,8 @@ class HistorialRepository:
         await self.db.flush()
         await self.db.refresh(historial)
         return historial
+
+    async def create_many(self, filas: List[dict]) -> None:
+        """Un INSERT multi-fila (pagos masivos)."""
+        if filas:
+            await self.db.execute(insert(HistorialEstadoPaquete), filas)
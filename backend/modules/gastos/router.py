@@ -5,16 +5,17 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 from uuid import UUID
-from typing import Optional
+from typing import Literal, Optional
 from datetime import date as date_type
 from decimal import Decimal
 
-from db.session import get_db
+from db.session import con_sesion, get_db, get_read_db
 from core.auth import get_current_user
 from db.models import User, ComercialHijo
 from modules.gastos.service import GastosService
+from modules.users.repository import UserRepository
 from modules.gastos.schemas import (
-    PaqueteCreate, PaqueteOut, PaqueteListResponse, PaqueteEnviarRequest,
+    PaqueteCreate, PaqueteOut, PaqueteCabeceraOut, PaqueteListResponse, PaqueteEnviarRequest,
     PaqueteCambiarAprobadorRequest,
     GastoCreate, GastoUpdate, GastoOut, GastoCreateResponse,
     ArchivoGastoOut, PaqueteDevolver, GastoDevolverRequest,
@@ -22,6 +23,7 @@ from modules.gastos.schemas import (
     ExtraccionDatosOut, ComercialHijoBrief, ValidarMultipleRequest,
     ValorSinImpuestosUpdate, CruceUpdate, AnalisisImpuestoGastoOut, AnalisisImpuestosResponse,
     RechazoPaqueteIn, RechazoPaqueteOut,
+    GastoListResponse, ComentarioListResponse, HistorialListResponse, SolicitudListResponse,
 )
 
 router = APIRouter(tags=["Gastos"])
@@ -36,12 +38,7 @@ async def _get_user_db(
 ) -> User:
     """Obtiene el objeto User completo desde la BD usando el user_id del JWT."""
     user_id = UUID(current_user["user_id"])
-    result = await db.execute(
-        select(User)
-        .options(selectinload(User.role), selectinload(User.area))
-        .where(User.id == user_id)
-    )
-    user = result.scalar_one_or_none()
+    user = await UserRepository(db).get_con_permisos(user_id)
     if not user:
         raise HTTPException(status_code=401, detail="Usuario no encontrado.")
     return user
@@ -51,6 +48,18 @@ def _svc(db: AsyncSession = Depends(get_db)) -> GastosService:
     return GastosService(db)
 
 
+def _svc_mutacion(
+    vista: Literal["completa", "cabecera"] = Query(
+        "completa",
+        description="cabecera: responder solo los datos del paquete, sin recargar gastos, "
+                    "comentarios, historial ni solicitudes (se piden por sección)",
+    ),
+    db: AsyncSession = Depends(get_db),
+) -> GastosService:
+    """_svc para las transiciones del paquete, que pueden responder solo la cabecera."""
+    return GastosService(db, solo_cabecera=vista == "cabecera")
+
+
 # =============================================================================
 # HIJOS COMERCIALES
 # =============================================================================
@@ -61,8 +70,8 @@ def _svc(db: AsyncSession = Depends(get_db)) -> GastosService:
     summary="Listar los hijos comerciales del usuario actual (rol comercial)",
 )
 async def listar_mis_hijos_comerciales(
-    db: AsyncSession = Depends(get_db),
-    user: User = Depends(_get_user_db),
+    db: AsyncSession = Depends(get_read_db),
+    user: User = Depends(con_sesion(_get_user_db, get_read_db)),
 ):
     """Devuelve los vendedores (hijos) activos a cargo del comercial padre autenticado,
     para legalizar paquetes a su nombre. Si no tiene hijos, devuelve lista vacía."""
@@ -89,8 +98,8 @@ async def list_paquetes(
     limit: int = Query(50, ge=1, le=200),
     estado: Optional[str] = Query(None),
     solo_mis_anticipos: bool = Query(False, description="Solo paquetes con anticipo del usuario actual"),
-    svc: GastosService = Depends(_svc),
-    user: User = Depends(_get_user_db),
+    svc: GastosService = Depends(con_sesion(_svc, get_read_db)),
+    user: User = Depends(con_sesion(_get_user_db, get_read_db)),
 ):
     """
     - **Técnico**: devuelve solo sus propios paquetes.
@@ -174,27 +183,112 @@ async def rechazar_por_token_endpoint(
 )
 async def get_paquete(
     paquete_id: UUID,
-    svc: GastosService = Depends(_svc),
-    user: User = Depends(_get_user_db),
+    svc: GastosService = Depends(con_sesion(_svc, get_read_db)),
+    user: User = Depends(con_sesion(_get_user_db, get_read_db)),
 ):
     role = user.role.code.lower() if user.role else ""
     area = user.area.code.lower() if user.area else ""
     return await svc.get_paquete(paquete_id, user.id, role, area)
 
 
+@router.get(
+    "/gastos/paquetes/{paquete_id}/cabecera",
+    response_model=PaqueteCabeceraOut,
+    summary="Datos del paquete sin sus secciones, con el tamaño de cada una",
+)
+async def get_paquete_cabecera(
+    paquete_id: UUID,
+    svc: GastosService = Depends(con_sesion(_svc, get_read_db)),
+    user: User = Depends(con_sesion(_get_user_db, get_read_db)),
+):
+    """Para abrir paquetes grandes: los gastos, comentarios, historial y solicitudes
+    se piden paginados a sus propios endpoints."""
+    role = user.role.code.lower() if user.role else ""
+    area = user.area.code.lower() if user.area else ""
+    return await svc.get_paquete_cabecera(paquete_id, user.id, role, area)
+
+
+@router.get(
+    "/gastos/paquetes/{paquete_id}/gastos",
+    response_model=GastoListResponse,
+    summary="Gastos del paquete, paginados",
+)
+async def list_gastos_paquete(
+    paquete_id: UUID,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    svc: GastosService = Depends(con_sesion(_svc, get_read_db)),
+    user: User = Depends(con_sesion(_get_user_db, get_read_db)),
+):
+    role = user.role.code.lower() if user.role else ""
+    area = user.area.code.lower() if user.area else ""
+    return await svc.list_gastos_paquete(paquete_id, user.id, role, area, skip, limit)
+
+
+@router.get(
+    "/gastos/paquetes/{paquete_id}/comentarios",
+    response_model=ComentarioListResponse,
+    summary="Comentarios del paquete, paginados (más recientes primero)",
+)
+async def list_comentarios_paquete(
+    paquete_id: UUID,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    svc: GastosService = Depends(con_sesion(_svc, get_read_db)),
+    user: User = Depends(con_sesion(_get_user_db, get_read_db)),
+):
+    role = user.role.code.lower() if user.role else ""
+    area = user.area.code.lower() if user.area else ""
+    return await svc.list_comentarios_paquete(paquete_id, user.id, role, area, skip, limit)
+
+
+@router.get(
+    "/gastos/paquetes/{paquete_id}/historial",
+    response_model=HistorialListResponse,
+    summary="Historial de estados del paquete, paginado (más recientes primero)",
+)
+async def list_historial_paquete(
+    paquete_id: UUID,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    svc: GastosService = Depends(con_sesion(_svc, get_read_db)),
+    user: User = Depends(con_sesion(_get_user_db, get_read_db)),
+):
+    role = user.role.code.lower() if user.role else ""
+    area = user.area.code.lower() if user.area else ""
+    return await svc.list_historial_paquete(paquete_id, user.id, role, area, skip, limit)
+
+
+@router.get(
+    "/gastos/paquetes/{paquete_id}/solicitudes",
+    response_model=SolicitudListResponse,
+    summary="Solicitudes de aprobación del paquete, paginadas",
+)
+async def list_solicitudes_paquete(
+    paquete_id: UUID,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    svc: GastosService = Depends(con_sesion(_svc, get_read_db)),
+    user: User = Depends(con_sesion(_get_user_db, get_read_db)),
+):
+    role = user.role.code.lower() if user.role else ""
+    area = user.area.code.lower() if user.area else ""
+    return await svc.list_solicitudes_paquete(paquete_id, user.id, role, area, skip, limit)
+
+
 # =============================================================================
 # WORKFLOW
 # =============================================================================
 
 @router.post(
     "/gastos/paquetes/{paquete_id}/enviar",
-    response_model=PaqueteOut,
+    response_model=PaqueteCabeceraOut | PaqueteOut,
     summary="Enviar paquete para revisión / aprobación",
 )
 async def enviar_paquete(
     paquete_id: UUID,
     body: Optional[PaqueteEnviarRequest] = None,
-    svc: GastosService = Depends(_svc),
+    svc: GastosService = Depends(_svc_mutacion),
     user: User = Depends(_get_user_db),
 ):
     aprobador_id = body.aprobador_id if body else None
@@ -237,12 +331,12 @@ async def cambiar_aprobador_paquete(
 
 @router.post(
     "/gastos/paquetes/{paquete_id}/aprobar",
-    response_model=PaqueteOut,
+    response_model=PaqueteCabeceraOut | PaqueteOut,
     summary="Aprobar paquete (admin/contabilidad)",
 )
 async def aprobar_paquete(
     paquete_id: UUID,
-    svc: GastosService = Depends(_svc),
+    svc: GastosService = Depends(_svc_mutacion),
     user: User = Depends(_get_user_db),
 ):
     role = user.role.code.lower() if user.role else ""
@@ -254,12 +348,12 @@ async def aprobar_paquete(
 
 @router.post(
     "/gastos/paquetes/{paquete_id}/validar",
-    response_model=PaqueteOut,
+    response_model=PaqueteCabeceraOut | PaqueteOut,
     summary="Validar paquete comercial y enviarlo al gerente (responsable/admin)",
 )
 async def validar_paquete_comercial(
     paquete_id: UUID,
-    svc: GastosService = Depends(_svc),
+    svc: GastosService = Depends(_svc_mutacion),
     user: User = Depends(_get_user_db),
 ):
     """El Responsable (validador) valida un paquete de tarjeta comercial en 'en_validacion'
@@ -273,13 +367,13 @@ async def validar_paquete_comercial(
 
 @router.post(
     "/gastos/paquetes/{paquete_id}/validar-multiple",
-    response_model=PaqueteOut,
+    response_model=PaqueteCabeceraOut | PaqueteOut,
     summary="Validar paquete comercial con N solicitudes a distintos aprobadores (responsable/admin)",
 )
 async def validar_paquete_comercial_multiple(
     paquete_id: UUID,
     data: ValidarMultipleRequest,
-    svc: GastosService = Depends(_svc),
+    svc: GastosService = Depends(_svc_mutacion),
     user: User = Depends(_get_user_db),
 ):
     """El Responsable divide los gastos del paquete en varias solicitudes de aprobación,
@@ -295,13 +389,13 @@ async def validar_paquete_comercial_multiple(
 
 @router.post(
     "/gastos/paquetes/{paquete_id}/devolver-a-facturacion",
-    response_model=PaqueteOut,
+    response_model=PaqueteCabeceraOut | PaqueteOut,
     summary="Tesorería devuelve un paquete a Radicación",
 )
 async def devolver_paquete_a_facturacion(
     paquete_id: UUID,
     data: PaqueteDevolver,
-    svc: GastosService = Depends(_svc),
+    svc: GastosService = Depends(_svc_mutacion),
     user: User = Depends(_get_user_db),
 ):
     role = user.role.code.lower() if user.role else ""
@@ -313,13 +407,13 @@ async def devolver_paquete_a_facturacion(
 
 @router.post(
     "/gastos/paquetes/{paquete_id}/devolver-anticipo",
-    response_model=PaqueteOut,
+    response_model=PaqueteCabeceraOut | PaqueteOut,
     summary="Tesorería devuelve al empleado un paquete de anticipo con inconsistencias",
 )
 async def devolver_anticipo_paquete(
     paquete_id: UUID,
     data: PaqueteDevolver,
-    svc: GastosService = Depends(_svc),
+    svc: GastosService = Depends(_svc_mutacion),
     user: User = Depends(_get_user_db),
 ):
     role = user.role.code.lower() if user.role else ""
@@ -330,12 +424,12 @@ async def devolver_anticipo_paquete(
 
 @router.post(
     "/gastos/paquetes/{paquete_id}/enviar-tesoreria",
-    response_model=PaqueteOut,
+    response_model=PaqueteCabeceraOut | PaqueteOut,
     summary="Enviar paquete aprobado a Tesorería (radicación/admin)",
 )
 async def enviar_tesoreria(
     paquete_id: UUID,
-    svc: GastosService = Depends(_svc),
+    svc: GastosService = Depends(_svc_mutacion),
     user: User = Depends(_get_user_db),
 ):
     role = user.role.code.lower() if user.role else ""
@@ -347,12 +441,12 @@ async def enviar_tesoreria(
 
 @router.post(
     "/gastos/paquetes/{paquete_id}/cruzar",
-    response_model=PaqueteOut,
+    response_model=PaqueteCabeceraOut | PaqueteOut,
     summary="Marcar paquete como Cruzado: cierre sin pago (radicación/tesorería/admin)",
 )
 async def marcar_cruzado(
     paquete_id: UUID,
-    svc: GastosService = Depends(_svc),
+    svc: GastosService = Depends(_svc_mutacion),
     user: User = Depends(_get_user_db),
 ):
     role = user.role.code.lower() if user.role else ""
@@ -365,13 +459,13 @@ async def marcar_cruzado(
 
 @router.post(
     "/gastos/paquetes/{paquete_id}/devolver",
-    response_model=PaqueteOut,
+    response_model=PaqueteCabeceraOut | PaqueteOut,
     summary="Devolver paquete con observación (admin/contabilidad)",
 )
 async def devolver_paquete(
     paquete_id: UUID,
     data: PaqueteDevolver,
-    svc: GastosService = Depends(_svc),
+    svc: GastosService = Depends(_svc_mutacion),
     user: User = Depends(_get_user_db),
 ):
     role = user.role.code.lower() if user.role else ""
@@ -383,13 +477,13 @@ async def devolver_paquete(
 
 @router.post(
     "/gastos/paquetes/{paquete_id}/pagar",
-    response_model=PaqueteOut,
+    response_model=PaqueteCabeceraOut | PaqueteOut,
     summary="Marcar paquete como pagado (tesorería)",
 )
 async def pagar_paquete(
     paquete_id: UUID,
     body: PagarPaqueteIn = None,
-    svc: GastosService = Depends(_svc),
+    svc: GastosService = Depends(_svc_mutacion),
     user: User = Depends(_get_user_db),
 ):
     role = user.role.code.lower() if user.role else ""
@@ -402,13 +496,13 @@ async def pagar_paquete(
 
 @router.post(
     "/gastos/paquetes/{paquete_id}/revertir-pago",
-    response_model=PaqueteOut,
+    response_model=PaqueteCabeceraOut | PaqueteOut,
     summary="Revertir pago de un paquete (tesorería)",
 )
 async def revertir_pago(
     paquete_id: UUID,
     data: PaqueteDevolver,
-    svc: GastosService = Depends(_svc),
+    svc: GastosService = Depends(_svc_mutacion),
     user: User = Depends(_get_user_db),
 ):
     role = user.role.code.lower() if user.role else ""
@@ -432,7 +526,9 @@ async def pagar_paquetes_masivo(
     area = user.area.code.lower() if user.area else ""
     if role not in {"admin", "tesoreria", "tes"} and area not in {"admin", "tesoreria", "tes"}:
         raise HTTPException(status_code=403, detail="Solo Tesorería puede marcar como pagado.")
-    return await svc.pagar_masivo(body.paquete_ids, user.id, fecha_pago=body.fecha_pago)
+    return await svc.pagar_masivo(
+        body.paquete_ids, user.id, fecha_pago=body.fecha_pago, todo_o_nada=body.todo_o_nada
+    )
 
 
 # =============================================================================
@@ -445,7 +541,7 @@ async def pagar_paquetes_masivo(
 )
 async def check_buzon(
     no_recibo: str = Query(..., description="Número de recibo a verificar"),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     _: dict = Depends(get_current_user),
 ):
     from modules.facturas.repository import FacturaRepository
@@ -545,8 +641,8 @@ async def download_archivo(
     paquete_id: UUID,
     gasto_id: UUID,
     archivo_id: UUID,
-    svc: GastosService = Depends(_svc),
-    user: User = Depends(_get_user_db),
+    svc: GastosService = Depends(con_sesion(_svc, get_read_db)),
+    user: User = Depends(con_sesion(_get_user_db, get_read_db)),
 ):
     role = user.role.code.lower() if user.role else ""
     url = await svc.get_download_url(paquete_id, gasto_id, archivo_id, user.id, role)
@@ -561,8 +657,8 @@ async def proxy_download_archivo(
     paquete_id: UUID,
     gasto_id: UUID,
     archivo_id: UUID,
-    svc: GastosService = Depends(_svc),
-    user: User = Depends(_get_user_db),
+    svc: GastosService = Depends(con_sesion(_svc, get_read_db)),
+    user: User = Depends(con_sesion(_get_user_db, get_read_db)),
 ):
     from core.s3_service import s3_service
     role = user.role.code.lower() if user.role else ""
@@ -630,13 +726,13 @@ async def reenviar_gasto_individual(
 
 @router.post(
     "/gastos/paquetes/{paquete_id}/aprobacion",
-    response_model=PaqueteOut,
+    response_model=PaqueteCabeceraOut | PaqueteOut,
     summary="Subir aprobación de gerencia para un paquete",
 )
 async def subir_aprobacion_gerencia(
     paquete_id: UUID,
     file: UploadFile = File(...),
-    svc: GastosService = Depends(_svc),
+    svc: GastosService = Depends(_svc_mutacion),
     user: User = Depends(_get_user_db),
 ):
     role = user.role.code.lower() if user.role else ""
@@ -649,8 +745,8 @@ async def subir_aprobacion_gerencia(
 )
 async def download_aprobacion_gerencia(
     paquete_id: UUID,
-    svc: GastosService = Depends(_svc),
-    user: User = Depends(_get_user_db),
+    svc: GastosService = Depends(con_sesion(_svc, get_read_db)),
+    user: User = Depends(con_sesion(_get_user_db, get_read_db)),
 ):
     role = user.role.code.lower() if user.role else ""
     url = await svc.get_aprobacion_gerencia_download_url(paquete_id, user.id, role)
@@ -663,13 +759,13 @@ async def download_aprobacion_gerencia(
 
 @router.post(
     "/gastos/paquetes/{paquete_id}/doc-contable",
-    response_model=PaqueteOut,
+    response_model=PaqueteCabeceraOut | PaqueteOut,
     summary="Subir documento contable general para un paquete (Radicación)",
 )
 async def subir_doc_contable(
     paquete_id: UUID,
     file: UploadFile = File(...),
-    svc: GastosService = Depends(_svc),
+    svc: GastosService = Depends(_svc_mutacion),
     user: User = Depends(_get_user_db),
 ):
     role = user.role.code.lower() if user.role else ""
@@ -682,8 +778,8 @@ async def subir_doc_contable(
 )
 async def download_doc_contable(
     paquete_id: UUID,
-    svc: GastosService = Depends(_svc),
-    user: User = Depends(_get_user_db),
+    svc: GastosService = Depends(con_sesion(_svc, get_read_db)),
+    user: User = Depends(con_sesion(_get_user_db, get_read_db)),
 ):
     role = user.role.code.lower() if user.role else ""
     url = await svc.get_doc_contable_download_url(paquete_id, user.id, role)
@@ -692,12 +788,12 @@ async def download_doc_contable(
 
 @router.delete(
     "/gastos/paquetes/{paquete_id}/doc-contable",
-    response_model=PaqueteOut,
+    response_model=PaqueteCabeceraOut | PaqueteOut,
     summary="Eliminar el documento contable general de un paquete",
 )
 async def eliminar_doc_contable(
     paquete_id: UUID,
-    svc: GastosService = Depends(_svc),
+    svc: GastosService = Depends(_svc_mutacion),
     user: User = Depends(_get_user_db),
 ):
     role = user.role.code.lower() if user.role else ""
@@ -731,8 +827,8 @@ async def subir_cm_pdf_gasto(
 async def download_cm_pdf_gasto(
     paquete_id: UUID,
     gasto_id: UUID,
-    svc: GastosService = Depends(_svc),
-    user: User = Depends(_get_user_db),
+    svc: GastosService = Depends(con_sesion(_svc, get_read_db)),
+    user: User = Depends(con_sesion(_get_user_db, get_read_db)),
 ):
     role = user.role.code.lower() if user.role else ""
     url = await svc.get_cm_pdf_gasto_download_url(paquete_id, gasto_id, user.id, role)
@@ -776,7 +872,7 @@ async def extraer_datos_imagen(
     import base64
     import json
     import anthropic
-    from anthropic import AsyncAnthropic
+    from core.instrumentacion import cliente_anthropic
     from core.config import settings
 
     if not settings.anthropic_api_key:
@@ -862,7 +958,7 @@ Ejemplo 1 (tiquete de transporte):
 Ejemplo 2 (factura electrónica de ferretería):
 {"no_identificacion":"18496220-8","pagado_a":"DIEGO CORTES CARDONA","concepto":"Pintemos Every Barniz Brillante, Brocha Macro Azul","no_recibo":"POEL-4795","valor_pagado":"11000","fecha":"2026-04-13","confianza":"alta","campos_detectados":["no_identificacion","pagado_a","concepto","no_recibo","valor_pagado","fecha"]}"""
 
-    client = AsyncAnthropic(api_key=settings.anthropic_api_key)
+    client = cliente_anthropic()
 
     try:
         message = await client.messages.create(
@@ -1030,7 +1126,7 @@ async def analizar_impuestos_paquete(
     """
     import asyncio
     from decimal import Decimal
-    from anthropic import AsyncAnthropic
+    from core.instrumentacion import cliente_anthropic
     from core.config import settings
     from core.s3_service import s3_service
     from db.models import PaqueteGasto, GastoLegalizacion
@@ -1060,7 +1156,7 @@ async def analizar_impuestos_paquete(
         )
     ]
 
-    client = AsyncAnthropic(api_key=settings.anthropic_api_key)
+    client = cliente_anthropic()
     sem = asyncio.Semaphore(5)
 
     async def analizar(gasto) -> dict:
@@ -1300,8 +1396,8 @@ async def actualizar_cruce_gasto(
 )
 async def exportar_plano_paquete(
     paquete_id: UUID,
-    db: AsyncSession = Depends(get_db),
-    _user: User = Depends(_get_user_db),
+    db: AsyncSession = Depends(get_read_db),
+    _user: User = Depends(con_sesion(_get_user_db, get_read_db)),
 ):
     import io
     import openpyxl
@@ -1483,8 +1579,8 @@ async def exportar_plano_paquete(
 async def exportar_informe_tecnicos_zonas(
     fecha_hasta: date_type | None = Query(None, description="Corte: incluye paquetes cuya semana inicia en o antes de esta fecha (default hoy)"),
     fecha_desde: date_type | None = Query(None, description="Opcional: solo paquetes cuya semana inicia en o después de esta fecha"),
-    db: AsyncSession = Depends(get_db),
-    user: User = Depends(_get_user_db),
+    db: AsyncSession = Depends(get_read_db),
+    user: User = Depends(con_sesion(_get_user_db, get_read_db)),
 ):
     import asyncio
     import io
@@ -1501,8 +1597,8 @@ async def exportar_informe_tecnicos_zonas(
     if fecha_desde and fecha_desde > hasta:
         raise HTTPException(status_code=400, detail="fecha_desde no puede ser posterior a fecha_hasta.")
 
-    paq, det = await consultar_datos(db, fecha_desde, hasta)
-    contenido = await asyncio.to_thread(construir_excel, paq, det, fecha_desde, hasta)
+    hojas = await consultar_datos(db, fecha_desde, hasta)
+    contenido = await asyncio.to_thread(construir_excel, hojas, fecha_desde, hasta)
 
     headers = {
         "Content-Disposition": f'attachment; filename="Informe_Docuflow_Tecnicos_Zonas_{hasta.isoformat()}.xlsx"',
@@ -1526,8 +1622,8 @@ async def exportar_informe_tecnicos_zonas(
 async def exportar_informe_cajas_menores(
     fecha_hasta: date_type | None = Query(None, description="Corte: incluye paquetes cuya semana inicia en o antes de esta fecha (default hoy)"),
     fecha_desde: date_type | None = Query(None, description="Opcional: solo paquetes cuya semana inicia en o después de esta fecha"),
-    db: AsyncSession = Depends(get_db),
-    user: User = Depends(_get_user_db),
+    db: AsyncSession = Depends(get_read_db),
+    user: User = Depends(con_sesion(_get_user_db, get_read_db)),
 ):
     import asyncio
     import io
@@ -1544,8 +1640,8 @@ async def exportar_informe_cajas_menores(
     if fecha_desde and fecha_desde > hasta:
         raise HTTPException(status_code=400, detail="fecha_desde no puede ser posterior a fecha_hasta.")
 
-    paq, det = await consultar_datos(db, fecha_desde, hasta)
-    contenido = await asyncio.to_thread(construir_excel, paq, det, fecha_desde, hasta)
+    hojas = await consultar_datos(db, fecha_desde, hasta)
+    contenido = await asyncio.to_thread(construir_excel, hojas, fecha_desde, hasta)
 
     headers = {
         "Content-Disposition": f'attachment; filename="Informe_Docuflow_Cajas_Menores_{hasta.isoformat()}.xlsx"',
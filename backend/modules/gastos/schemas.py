@@ -284,7 +284,12 @@ class RechazoPaqueteOut(BaseModel):
     motivo_rechazo: str
 
 
-class PaqueteOut(BaseModel):
+class PaqueteCabeceraOut(BaseModel):
+    """Datos del paquete sin sus secciones (gastos, comentarios, historial, solicitudes).
+
+    GET /gastos/paquetes/{id}/cabecera trae además el tamaño de cada sección para
+    paginarlas por separado; en el detalle completo esos conteos van en null.
+    """
     id: UUID
     folio: Optional[str] = None
     semana: str
@@ -306,22 +311,49 @@ class PaqueteOut(BaseModel):
     aprobador: Optional[AprobadorBrief] = None
     anticipo: Optional[AnticipoBrief] = None
     comercial_hijo: Optional[ComercialHijoBrief] = None
-    solicitudes: List[SolicitudAprobacionOut] = []
-    # Solo en la respuesta de aprobar-por-token cuando el token es de una solicitud parcial
-    aprobacion_parcial: Optional[bool] = None
-    solicitudes_pendientes: Optional[int] = None
-    gastos: List[GastoOut] = []
-    comentarios: List[ComentarioPaqueteOut] = []
-    historial_estados: List[HistorialEstadoOut] = []
     created_at: datetime
     updated_at: datetime
     aprobacion_gerencia_filename: Optional[str] = None
     aprobacion_gerencia_s3_key: Optional[str] = None
     doc_contable_filename: Optional[str] = None
     doc_contable_s3_key: Optional[str] = None
+    n_gastos: Optional[int] = None
+    n_comentarios: Optional[int] = None
+    n_historial: Optional[int] = None
+    n_solicitudes: Optional[int] = None
     model_config = {"from_attributes": True}
 
 
+class PaqueteOut(PaqueteCabeceraOut):
+    solicitudes: List[SolicitudAprobacionOut] = []
+    # Solo en la respuesta de aprobar-por-token cuando el token es de una solicitud parcial
+    aprobacion_parcial: Optional[bool] = None
+    solicitudes_pendientes: Optional[int] = None
+    gastos: List[GastoOut] = []
+    comentarios: List[ComentarioPaqueteOut] = []
+    historial_estados: List[HistorialEstadoOut] = []
+
+
+class GastoListResponse(BaseModel):
+    gastos: List[GastoOut]
+    total: int
+
+
+class ComentarioListResponse(BaseModel):
+    comentarios: List[ComentarioPaqueteOut]
+    total: int
+
+
+class HistorialListResponse(BaseModel):
+    historial: List[HistorialEstadoOut]
+    total: int
+
+
+class SolicitudListResponse(BaseModel):
+    solicitudes: List[SolicitudAprobacionOut]
+    total: int
+
+
 class PaqueteListItem(BaseModel):
     id: UUID
     folio: Optional[str] = None
@@ -362,11 +394,20 @@ class PagarPaqueteIn(BaseModel):
 class PagarMasivoIn(BaseModel):
     paquete_ids: List[UUID]
     fecha_pago: Optional[datetime] = None
+    # True: si algún paquete no se puede pagar, no se paga ninguno
+    todo_o_nada: bool = False
+
+
+class PagoMasivoItem(BaseModel):
+    paquete_id: UUID
+    pagado: bool
+    motivo: Optional[str] = None
 
 
 class PagarMasivoOut(BaseModel):
     pagados: int
     errores: List[str] = []
+    resultados: List[PagoMasivoItem] = []
 
 
 # ---------------------------------------------------------------------------
@@ -18,6 +18,7 @@ from core.s3_service import s3_service
 from core.logging import logger
 from core.config import settings
 from core.email_service import email_service
+from core.folios import siguiente_folio
 from modules.gastos.repository import (
     PaqueteRepository, GastoRepository, ArchivoGastoRepository,
     ComentarioPaqueteRepository, HistorialRepository
@@ -26,7 +27,9 @@ from modules.gastos.token_repository import TokenAprobacionRepository
 from modules.gastos.schemas import (
     PaqueteCreate, GastoCreate, GastoUpdate, PaqueteDevolver,
     PaqueteOut, PaqueteListItem, GastoOut, GastoCreateResponse, ArchivoGastoOut, ComentarioPaqueteOut,
-    ValidarMultipleRequest,
+    ValidarMultipleRequest, PaqueteCabeceraOut, HistorialEstadoOut, SolicitudAprobacionOut,
+    GastoListResponse, ComentarioListResponse, HistorialListResponse, SolicitudListResponse,
+    PagarMasivoOut, PagoMasivoItem,
 )
 from modules.facturas.repository import FacturaRepository
 
@@ -60,8 +63,10 @@ def _s3_key(paquete_id: UUID, gasto_id: UUID, filename: str) -> str:
 
 class GastosService:
 
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, solo_cabecera: bool = False):
         self.db = db
+        # Las transiciones del paquete responden solo la cabecera (ver _respuesta)
+        self.solo_cabecera = solo_cabecera
         self.paquete_repo = PaqueteRepository(db)
         self.gasto_repo = GastoRepository(db)
         self.archivo_repo = ArchivoGastoRepository(db)
@@ -86,8 +91,7 @@ class GastosService:
         fecha_inicio, fecha_fin = _parse_semana(data.semana)
         year_str, _ = data.semana.split('-W')
         year = int(year_str)
-        max_num = await self.paquete_repo.max_folio_number_by_year(year)
-        folio = f"PKG-{year}-{max_num + 1:05d}"
+        folio = await siguiente_folio(self.db, "PKG", year)
 
         paquete = PaqueteGasto(
             user_id=user_id,
@@ -117,8 +121,7 @@ class GastosService:
         # Generar folio automático: PKG-{AÑO}-{N:05d}
         year_str, _ = data.semana.split('-W')
         year = int(year_str)
-        max_num = await self.paquete_repo.max_folio_number_by_year(year)
-        folio = f"PKG-{year}-{max_num + 1:05d}"
+        folio = await siguiente_folio(self.db, "PKG", year)
 
         if role_code == "tarjeta_cq":
             tipo_flujo = "tarjeta_cq"
@@ -181,6 +184,48 @@ class GastosService:
         self._check_access(paquete, user_id, user_role, user_area)
         return self._to_out(paquete)
 
+    async def get_paquete_cabecera(
+        self, paquete_id: UUID, user_id: UUID, user_role: str, user_area: str = ""
+    ) -> PaqueteCabeceraOut:
+        """Detalle sin secciones: abre rápido aunque el paquete tenga cientos de gastos."""
+        paquete = await self._get_cabecera_or_404(paquete_id)
+        self._check_access(paquete, user_id, user_role, user_area)
+        return await self._cabecera_out(paquete_id)
+
+    async def list_gastos_paquete(
+        self, paquete_id: UUID, user_id: UUID, user_role: str, user_area: str, skip: int, limit: int
+    ) -> GastoListResponse:
+        self._check_access(await self._get_cabecera_or_404(paquete_id), user_id, user_role, user_area)
+        gastos, total = await self.paquete_repo.get_gastos_pagina(paquete_id, skip, limit)
+        return GastoListResponse(gastos=[GastoOut.model_validate(g) for g in gastos], total=total)
+
+    async def list_comentarios_paquete(
+        self, paquete_id: UUID, user_id: UUID, user_role: str, user_area: str, skip: int, limit: int
+    ) -> ComentarioListResponse:
+        self._check_access(await self._get_cabecera_or_404(paquete_id), user_id, user_role, user_area)
+        comentarios, total = await self.paquete_repo.get_comentarios_pagina(paquete_id, skip, limit)
+        return ComentarioListResponse(
+            comentarios=[ComentarioPaqueteOut.model_validate(c) for c in comentarios], total=total
+        )
+
+    async def list_historial_paquete(
+        self, paquete_id: UUID, user_id: UUID, user_role: str, user_area: str, skip: int, limit: int
+    ) -> HistorialListResponse:
+        self._check_access(await self._get_cabecera_or_404(paquete_id), user_id, user_role, user_area)
+        historial, total = await self.paquete_repo.get_historial_pagina(paquete_id, skip, limit)
+        return HistorialListResponse(
+            historial=[HistorialEstadoOut.model_validate(h) for h in historial], total=total
+        )
+
+    async def list_solicitudes_paquete(
+        self, paquete_id: UUID, user_id: UUID, user_role: str, user_area: str, skip: int, limit: int
+    ) -> SolicitudListResponse:
+        self._check_access(await self._get_cabecera_or_404(paquete_id), user_id, user_role, user_area)
+        solicitudes, total = await self.paquete_repo.get_solicitudes_pagina(paquete_id, skip, limit)
+        return SolicitudListResponse(
+            solicitudes=[SolicitudAprobacionOut.model_validate(s) for s in solicitudes], total=total
+        )
+
     async def list_paquetes_tecnico(
         self, user_id: UUID, skip: int, limit: int
     ) -> Tuple[List[PaqueteListItem], int]:
@@ -257,7 +302,7 @@ class GastosService:
                 )
             except Exception as e:
                 logger.error(f"Error notificando a Radicación anticipo paquete: {e}")
-            return self._to_out(paquete_actualizado)
+            return await self._respuesta(paquete_id, paquete_actualizado)
 
         # Flujo tarjeta_comercial: pasa primero por el VALIDADOR (Responsable) antes del gerente.
         # El comercial selecciona aquí el gerente comercial (se guarda aprobador_id), pero el
@@ -301,7 +346,7 @@ class GastosService:
                 )
             except Exception as e:
                 logger.error(f"Error notificando al validador comercial paquete {paquete_id}: {e}")
-            return self._to_out(paquete_actualizado)
+            return await self._respuesta(paquete_id, paquete_actualizado)
 
         # Para flujo general y tarjeta_cq se requiere aprobador de gerencia
         if paquete.tipo_flujo in ("general", "tarjeta_cq"):
@@ -349,7 +394,7 @@ class GastosService:
                 paquete_actualizado, settings.email_responsable
             )
 
-        return self._to_out(paquete_actualizado)
+        return await self._respuesta(paquete_id, paquete_actualizado)
 
     async def validar_comercial(self, paquete_id: UUID, user_id: UUID) -> PaqueteOut:
         """El VALIDADOR (Responsable) valida un paquete comercial en 'en_validacion':
@@ -400,7 +445,7 @@ class GastosService:
             paquete_actualizado, token_str,
             email_override=aprobador.email,
         )
-        return self._to_out(paquete_actualizado)
+        return await self._respuesta(paquete_id, paquete_actualizado)
 
     async def validar_comercial_multiple(
         self, paquete_id: UUID, user_id: UUID, data: ValidarMultipleRequest
@@ -524,7 +569,7 @@ class GastosService:
                 )
             except Exception as e:
                 logger.error(f"Error enviando solicitud {solicitud.id} a {aprobador.email}: {e}")
-        return self._to_out(paquete_actualizado)
+        return await self._respuesta(paquete_id, paquete_actualizado)
 
     async def devolver_anticipo_paquete(
         self, paquete_id: UUID, user_id: UUID, motivo: str
@@ -549,7 +594,7 @@ class GastosService:
             estado_anterior="en_tesoreria", estado_nuevo="devuelto",
         ))
         await self.db.commit()
-        return self._to_out(await self.paquete_repo.get_by_id(paquete_id))
+        return await self._respuesta(paquete_id)
 
     async def reenviar_correo_aprobacion(
         self, paquete_id: UUID, user_id: UUID, solo_propietario: bool = False
@@ -712,7 +757,7 @@ class GastosService:
         paquete_aprobado = await self.paquete_repo.get_by_id(paquete_id)
         await email_service.enviar_notificacion_aprobado(paquete_aprobado, settings.email_responsable)
         await email_service.enviar_notificacion_paquete_aprobado_tecnico(paquete_aprobado, paquete_aprobado.tecnico.email)
-        return self._to_out(paquete_aprobado)
+        return await self._respuesta(paquete_id, paquete_aprobado)
 
     async def devolver(self, paquete_id: UUID, user_id: UUID, data: PaqueteDevolver) -> PaqueteOut:
         paquete = await self._get_paquete_or_404(paquete_id)
@@ -740,7 +785,7 @@ class GastosService:
             estado_anterior="en_revision", estado_nuevo="devuelto",
         ))
         await self.db.commit()
-        return self._to_out(await self.paquete_repo.get_by_id(paquete_id))
+        return await self._respuesta(paquete_id)
 
     async def devolver_a_facturacion(self, paquete_id: UUID, user_id: UUID, motivo: str) -> PaqueteOut:
         """Tesorería devuelve un paquete en_tesoreria a Radicación (estado aprobado)."""
@@ -761,7 +806,7 @@ class GastosService:
             estado_anterior="en_tesoreria", estado_nuevo="aprobado",
         ))
         await self.db.commit()
-        return self._to_out(await self.paquete_repo.get_by_id(paquete_id))
+        return await self._respuesta(paquete_id)
 
     async def enviar_tesoreria(self, paquete_id: UUID, user_id: UUID) -> PaqueteOut:
         paquete = await self._get_paquete_or_404(paquete_id)
@@ -814,7 +859,7 @@ class GastosService:
         except Exception as e:
             logger.error(f"Error enviando notificaciones de tesorería para paquete {paquete_id}: {e}")
 
-        return self._to_out(paquete_enviado)
+        return await self._respuesta(paquete_id, paquete_enviado)
 
     async def marcar_cruzado(self, paquete_id: UUID, user_id: UUID) -> PaqueteOut:
         """Facturación cierra un paquete aprobado por cruce, sin pasar por pago de Tesorería.
@@ -871,7 +916,7 @@ class GastosService:
                         f"Anticipo {anticipo.folio} cerrado automáticamente al quedar todos sus paquetes cerrados."
                     )
 
-        return self._to_out(paquete_cruzado)
+        return await self._respuesta(paquete_id, paquete_cruzado)
 
     async def pagar(self, paquete_id: UUID, user_id: UUID, fecha_pago: datetime | None = None) -> PaqueteOut:
         paquete = await self._get_paquete_or_404(paquete_id)
@@ -906,7 +951,7 @@ class GastosService:
                     )
 
         await email_service.enviar_notificacion_pago_tecnico(paquete_pagado, paquete_pagado.tecnico.email)
-        return self._to_out(paquete_pagado)
+        return await self._respuesta(paquete_id, paquete_pagado)
 
     async def revertir_pago(self, paquete_id: UUID, user_id: UUID, motivo: str) -> PaqueteOut:
         """Tesorería revierte un paquete pagado de vuelta a en_tesoreria."""
@@ -936,24 +981,81 @@ class GastosService:
                 anticipo.estado = "desembolsado"
 
         await self.db.commit()
-        return self._to_out(await self.paquete_repo.get_by_id(paquete_id))
+        return await self._respuesta(paquete_id)
 
     async def pagar_masivo(
         self,
         paquete_ids: List[UUID],
         user_id: UUID,
         fecha_pago: datetime | None = None,
-    ) -> dict:
-        pagados = 0
-        errores: List[str] = []
-        for pid in paquete_ids:
-            try:
-                await self.pagar(pid, user_id, fecha_pago=fecha_pago)
-                pagados += 1
-            except Exception as e:
-                detail = getattr(e, "detail", str(e))
-                errores.append(f"{pid}: {detail}")
-        return {"pagados": pagados, "errores": errores}
+        todo_o_nada: bool = False,
+    ) -> PagarMasivoOut:
+        """Paga un lote de paquetes en UNA transacción, sin recorrerlos uno a uno.
+
+        Valida todos con una consulta, los pasa a 'pagado' con un UPDATE, inserta
+        comentarios e historial con un INSERT multi-fila cada uno y cierra en otro
+        UPDATE los anticipos que quedaron sin paquetes abiertos. Los correos al
+        técnico se encolan (modules/gastos/avisos_pago.py) para después del commit.
+        Devuelve el resultado de cada paquete; con todo_o_nada, un solo paquete que
+        no se pueda pagar deja todo el lote sin pagar.
+        """
+        from modules.gastos.avisos_pago import encolar_avisos_pago
+
+        ids = list(dict.fromkeys(paquete_ids))
+        estados = await self.paquete_repo.get_estados(ids)
+        motivos: dict = {}
+        for pid in ids:
+            if pid not in estados:
+                motivos[pid] = "Paquete no encontrado."
+            elif estados[pid] != "en_tesoreria":
+                motivos[pid] = (
+                    f"Está en estado '{estados[pid]}'; solo paquetes enviados a tesorería pueden pagarse."
+                )
+        validos = [pid for pid in ids if pid not in motivos]
+
+        pagados: List[UUID] = []
+        if validos and not (todo_o_nada and motivos):
+            pagados = await self.paquete_repo.marcar_pagados(
+                validos, fecha_pago if fecha_pago is not None else datetime.utcnow()
+            )
+            for pid in set(validos) - set(pagados):
+                motivos[pid] = "Cambió de estado mientras se procesaba el pago."
+            if todo_o_nada and len(pagados) < len(validos):
+                await self.db.rollback()
+                pagados = []
+            else:
+                await self.comentario_repo.create_many([
+                    {"paquete_id": pid, "user_id": user_id, "texto": "Pago procesado y legalizado.", "tipo": "pago"}
+                    for pid in pagados
+                ])
+                await self.historial_repo.create_many([
+                    {"paquete_id": pid, "user_id": user_id,
+                     "estado_anterior": "en_tesoreria", "estado_nuevo": "pagado"}
+                    for pid in pagados
+                ])
+                cerrados = await self.paquete_repo.cerrar_anticipos_pagados(pagados)
+                await self.db.commit()
+                if cerrados:
+                    logger.info(
+                        f"Anticipos cerrados automáticamente al quedar todos sus paquetes pagados: "
+                        f"{', '.join(cerrados)}"
+                    )
+
+        if todo_o_nada and motivos:
+            for pid in validos:
+                motivos.setdefault(pid, "No se pagó: el lote es todo o nada y otros paquetes fallaron.")
+        encolar_avisos_pago(pagados)
+        logger.info(f"Pago masivo: {len(pagados)} de {len(ids)} paquetes pagados.")
+
+        pagados_set = set(pagados)
+        return PagarMasivoOut(
+            pagados=len(pagados),
+            errores=[f"{pid}: {motivos[pid]}" for pid in ids if pid in motivos],
+            resultados=[
+                PagoMasivoItem(paquete_id=pid, pagado=pid in pagados_set, motivo=motivos.get(pid))
+                for pid in ids
+            ],
+        )
 
     # ------------------------------------------------------------------
     # Gastos
@@ -984,7 +1086,7 @@ class GastosService:
     async def agregar_gasto(
         self, paquete_id: UUID, user_id: UUID, data: GastoCreate
     ) -> GastoCreateResponse:
-        paquete = await self._get_paquete_or_404(paquete_id)
+        paquete = await self._get_cabecera_or_404(paquete_id)
         self._check_editable(paquete, user_id)
 
         await self._check_no_recibo_duplicado(paquete_id, data.no_recibo)
@@ -1004,7 +1106,7 @@ class GastosService:
             observaciones=data.observaciones,
         )
         await self.gasto_repo.create(gasto)
-        await self.paquete_repo.recalculate_totals(paquete_id)
+        await self.paquete_repo.aplicar_delta_totales(paquete_id, monto=data.valor_pagado)
 
         aviso_buzon: Optional[str] = None
         if data.no_recibo:
@@ -1031,24 +1133,28 @@ class GastosService:
         self, paquete_id: UUID, gasto_id: UUID, user_id: UUID, data: GastoUpdate,
         user_role: str = "", user_area: str = ""
     ) -> GastoOut:
-        paquete = await self._get_paquete_or_404(paquete_id)
+        paquete = await self._get_cabecera_or_404(paquete_id)
         self._check_editable(paquete, user_id, user_role=user_role, user_area=user_area)
         gasto = await self._get_gasto_or_404(gasto_id, paquete_id)
 
         if data.no_recibo is not None:
             await self._check_no_recibo_duplicado(paquete_id, data.no_recibo, exclude_gasto_id=gasto_id)
 
+        valor_anterior = gasto.valor_pagado
         for field, value in data.model_dump(exclude_none=True).items():
             setattr(gasto, field, value)
         gasto.updated_at = datetime.utcnow()
 
         await self.gasto_repo.save(gasto)
-        await self.paquete_repo.recalculate_totals(paquete_id)
+        if gasto.valor_pagado != valor_anterior:
+            await self.paquete_repo.aplicar_delta_totales(
+                paquete_id, monto=gasto.valor_pagado - valor_anterior
+            )
         await self.db.commit()
         return GastoOut.model_validate(await self.gasto_repo.get_by_id(gasto_id))
 
     async def eliminar_gasto(self, paquete_id: UUID, gasto_id: UUID, user_id: UUID) -> None:
-        paquete = await self._get_paquete_or_404(paquete_id)
+        paquete = await self._get_cabecera_or_404(paquete_id)
         self._check_editable(paquete, user_id)
         gasto = await self._get_gasto_or_404(gasto_id, paquete_id)
 
@@ -1058,8 +1164,11 @@ class GastosService:
             except Exception:
                 logger.warning(f"No se pudo eliminar de S3: {archivo.s3_key}")
 
+        # Los archivos se borran en cascada con el gasto
+        await self.paquete_repo.aplicar_delta_totales(
+            paquete_id, monto=-gasto.valor_pagado, documentos=-len(gasto.archivos)
+        )
         await self.gasto_repo.delete(gasto)
-        await self.paquete_repo.recalculate_totals(paquete_id)
         await self.db.commit()
 
     # ------------------------------------------------------------------
@@ -1074,7 +1183,7 @@ class GastosService:
         categoria: str,
         file: UploadFile,
     ) -> ArchivoGastoOut:
-        paquete = await self._get_paquete_or_404(paquete_id)
+        paquete = await self._get_cabecera_or_404(paquete_id)
         self._check_editable(paquete, user_id)
         gasto = await self._get_gasto_or_404(gasto_id, paquete_id)
 
@@ -1123,7 +1232,7 @@ class GastosService:
             uploaded_by_user_id=user_id,
         )
         await self.archivo_repo.create(archivo)
-        await self.paquete_repo.recalculate_totals(paquete_id)
+        await self.paquete_repo.aplicar_delta_totales(paquete_id, documentos=1)
         await self.db.commit()
 
         download_url = s3_service.presign_get_url(s3_key)
@@ -1134,7 +1243,7 @@ class GastosService:
     async def eliminar_archivo(
         self, paquete_id: UUID, gasto_id: UUID, archivo_id: UUID, user_id: UUID
     ) -> None:
-        paquete = await self._get_paquete_or_404(paquete_id)
+        paquete = await self._get_cabecera_or_404(paquete_id)
         self._check_editable(paquete, user_id)
         gasto = await self._get_gasto_or_404(gasto_id, paquete_id)
 
@@ -1147,7 +1256,7 @@ class GastosService:
         except Exception:
             logger.warning(f"No se pudo eliminar de S3: {archivo.s3_key}")
         await self.archivo_repo.delete(archivo)
-        await self.paquete_repo.recalculate_totals(paquete_id)
+        await self.paquete_repo.aplicar_delta_totales(paquete_id, documentos=-1)
         await self.db.commit()
 
     async def get_archivo_or_404(
@@ -1206,7 +1315,7 @@ class GastosService:
         paquete.aprobacion_gerencia_filename = file.filename
         await self.paquete_repo.save(paquete)
         await self.db.commit()
-        return self._to_out(await self.paquete_repo.get_by_id(paquete_id))
+        return await self._respuesta(paquete_id)
 
     async def get_aprobacion_gerencia_download_url(
         self, paquete_id: UUID, user_id: UUID, user_role: str
@@ -1257,7 +1366,7 @@ class GastosService:
         paquete.doc_contable_filename = file.filename
         await self.paquete_repo.save(paquete)
         await self.db.commit()
-        return self._to_out(await self.paquete_repo.get_by_id(paquete_id))
+        return await self._respuesta(paquete_id)
 
     async def get_doc_contable_download_url(
         self, paquete_id: UUID, user_id: UUID, user_role: str
@@ -1287,7 +1396,7 @@ class GastosService:
         paquete.doc_contable_filename = None
         await self.paquete_repo.save(paquete)
         await self.db.commit()
-        return self._to_out(await self.paquete_repo.get_by_id(paquete_id))
+        return await self._respuesta(paquete_id)
 
     # ------------------------------------------------------------------
     # CM PDF por gasto individual — sube Radicación
@@ -1802,6 +1911,13 @@ class GastosService:
             raise HTTPException(status_code=404, detail=f"Paquete {paquete_id} no encontrado.")
         return paquete
 
+    async def _get_cabecera_or_404(self, paquete_id: UUID):
+        """Como _get_paquete_or_404 pero sin cargar gastos: para chequear estado y dueño."""
+        paquete = await self.paquete_repo.get_cabecera(paquete_id)
+        if not paquete:
+            raise HTTPException(status_code=404, detail=f"Paquete {paquete_id} no encontrado.")
+        return paquete
+
     async def _get_gasto_or_404(self, gasto_id: UUID, paquete_id: UUID) -> GastoLegalizacion:
         gasto = await self.gasto_repo.get_by_id(gasto_id)
         if not gasto or gasto.paquete_id != paquete_id:
@@ -1836,6 +1952,27 @@ class GastosService:
     def _to_out(self, paquete: PaqueteGasto) -> PaqueteOut:
         return PaqueteOut.model_validate(paquete)
 
+    async def _cabecera_out(self, paquete_id: UUID) -> PaqueteCabeceraOut:
+        fila = await self.paquete_repo.get_cabecera_detalle(paquete_id)
+        if not fila:
+            raise HTTPException(status_code=404, detail=f"Paquete {paquete_id} no encontrado.")
+        out = PaqueteCabeceraOut.model_validate(fila.PaqueteGasto)
+        out.n_gastos = fila.n_gastos
+        out.n_comentarios = fila.n_comentarios
+        out.n_historial = fila.n_historial
+        out.n_solicitudes = fila.n_solicitudes
+        return out
+
+    async def _respuesta(
+        self, paquete_id: UUID, paquete: Optional[PaqueteGasto] = None
+    ) -> PaqueteCabeceraOut | PaqueteOut:
+        """Respuesta de las mutaciones del paquete: solo la cabecera (lo que cambia una
+        transición; el historial/comentarios nuevos se piden por sección) si el cliente
+        la pidió con vista=cabecera, o el detalle completo de siempre."""
+        if self.solo_cabecera:
+            return await self._cabecera_out(paquete_id)
+        return self._to_out(paquete or await self.paquete_repo.get_by_id(paquete_id))
+
     def _to_list_item(self, paquete: PaqueteGasto) -> PaqueteListItem:
         comentario_devolucion = None
         for c in sorted(paquete.comentarios, key=lambda x: x.created_at, reverse=True):
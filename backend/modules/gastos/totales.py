@@ -0,0 +1,53 @@
+"""
+Verificación de los totales de los paquetes de gastos.
+
+monto_total y total_documentos se mantienen por deltas (±valor, ±1) en el mismo
+UPDATE de cada alta/edición/baja de gasto o archivo, en vez de re-sumar todo el
+paquete (PaqueteRepository.aplicar_delta_totales). Lo que se escriba por fuera
+de GastosService (SQL manual, scripts viejos) puede desfasarlos: este módulo
+los compara contra la suma real y repara los que no cuadran.
+
+- Nocturno: ciclo_reparacion_totales corre a la HORA_REPARACION_LOCAL.
+- A demanda: scripts/reparar_totales_paquetes.py (con --dry-run para solo ver).
+
+Corrigen los dos workers de uvicorn: el UPDATE solo toca filas desfasadas, así
+que el segundo no encuentra nada.
+"""
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.logging import logger
+from core.tareas import ciclo_diario
+from modules.gastos.repository import PaqueteRepository
+
+HORA_REPARACION_LOCAL = 3  # 3:00 a.m. hora Colombia, sin usuarios
+
+
+async def reparar_totales_paquetes(
+    db: AsyncSession, paquete_id: Optional[UUID] = None, dry_run: bool = False
+) -> list:
+    """Detecta (y salvo dry_run corrige) los paquetes con totales desfasados.
+
+    Devuelve las filas (id, monto_total, total_documentos, monto, docs) encontradas.
+    """
+    repo = PaqueteRepository(db)
+    desfasados = await repo.get_totales_desfasados(paquete_id)
+    for p in desfasados:
+        logger.warning(
+            f"Paquete {p.id} con totales desfasados: monto {p.monto_total} → {p.monto}, "
+            f"documentos {p.total_documentos} → {p.docs}"
+        )
+    if desfasados and not dry_run:
+        await repo.reparar_totales(paquete_id)
+        await db.commit()
+    return desfasados
+
+
+async def ciclo_reparacion_totales() -> None:
+    """Tarea de fondo: verifica y repara los totales de los paquetes cada noche."""
+    await ciclo_diario(
+        HORA_REPARACION_LOCAL, reparar_totales_paquetes, "verificación de totales de paquetes",
+        lambda desfasados: f"{len(desfasados)} reparado(s)",
+    )
@@ -0,0 +1 @@
+"""Módulo de enrutamiento NIT → responsable de la ingesta XML."""
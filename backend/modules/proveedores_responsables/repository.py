@@ -0,0 +1,109 @@
+"""
+Repositorio de la tabla de enrutamiento NIT → responsable.
+"""
+from typing import List, Optional
+
+from sqlalchemy import bindparam, literal_column, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import ProveedorResponsable
+
+# asyncpg admite como máximo 32767 parámetros por sentencia
+_LOTE_UPSERT = 1000
+
+
+class ProveedorResponsableRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_all(self, search: Optional[str] = None, activos_only: bool = False) -> List[ProveedorResponsable]:
+        query = select(ProveedorResponsable)
+        if activos_only:
+            query = query.where(ProveedorResponsable.activo.is_(True))
+        if search:
+            pattern = f"%{search}%"
+            query = query.where(or_(
+                ProveedorResponsable.nit.ilike(pattern),
+                ProveedorResponsable.razon_social.ilike(pattern),
+            ))
+        result = await self.db.execute(query.order_by(ProveedorResponsable.nit))
+        return result.scalars().all()
+
+    async def get_by_nit(self, nit: str) -> Optional[ProveedorResponsable]:
+        result = await self.db.execute(
+            select(ProveedorResponsable).where(ProveedorResponsable.nit == nit)
+        )
+        return result.scalar_one_or_none()
+
+    async def create(self, data: dict) -> ProveedorResponsable:
+        proveedor = ProveedorResponsable(**data)
+        self.db.add(proveedor)
+        await self.db.commit()
+        await self.db.refresh(proveedor)
+        return proveedor
+
+    async def update(self, proveedor: ProveedorResponsable, data: dict) -> ProveedorResponsable:
+        for key, value in data.items():
+            setattr(proveedor, key, value)
+        await self.db.commit()
+        await self.db.refresh(proveedor)
+        return proveedor
+
+    async def delete(self, proveedor: ProveedorResponsable) -> None:
+        await self.db.delete(proveedor)
+        await self.db.commit()
+
+    async def upsert_masivo(self, filas: list[dict]) -> tuple[int, int]:
+        """INSERT ... ON CONFLICT (nit) por lotes. Devuelve (creados, actualizados).
+
+        La razón social existente no se pisa con un vacío del CSV, y un NIT que
+        vuelve a venir en el import se reactiva.
+        """
+        creados = actualizados = 0
+        tabla = ProveedorResponsable.__table__
+        for i in range(0, len(filas), _LOTE_UPSERT):
+            stmt = insert(tabla).values(filas[i:i + _LOTE_UPSERT])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[tabla.c.nit],
+                set_={
+                    "responsables": stmt.excluded.responsables,
+                    "razon_social": literal_column(
+                        "COALESCE(excluded.razon_social, proveedores_responsables.razon_social)"
+                    ),
+                    "activo": True,
+                    "updated_at": literal_column("now()"),
+                },
+            ).returning(literal_column("(xmax = 0)").label("insertado"))
+            result = await self.db.execute(stmt)
+            for (insertado,) in result.all():
+                if insertado:
+                    creados += 1
+                else:
+                    actualizados += 1
+        return creados, actualizados
+
+    async def completar_razon_social(self, razones: dict[str, str]) -> int:
+        """Llena la razón social de los NITs que ya están en la tabla y no la tienen."""
+        if not razones:
+            return 0
+        result = await self.db.execute(
+            select(ProveedorResponsable.nit).where(
+                ProveedorResponsable.razon_social.is_(None),
+                ProveedorResponsable.nit.in_(list(razones.keys())),
+            )
+        )
+        nits = result.scalars().all()
+        if not nits:
+            return 0
+        tabla = ProveedorResponsable.__table__
+        await self.db.execute(
+            update(tabla)
+            .where(tabla.c.nit == bindparam("b_nit"))
+            .values(razon_social=bindparam("b_razon")),
+            [{"b_nit": nit, "b_razon": razones[nit]} for nit in nits],
+        )
+        return len(nits)
+
+    async def commit(self) -> None:
+        await self.db.commit()
@@ -0,0 +1,128 @@
+"""
+Router de FastAPI para la tabla de enrutamiento NIT → responsable (ingesta XML).
+
+Solo Radicación (fact) y admin la administran: un NIT mal enrutado manda
+facturas al buzón de otra área.
+"""
+from typing import List, Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.auth import get_current_user
+from db.models import User
+from db.session import con_sesion, get_db, get_read_db
+from modules.proveedores_responsables.repository import ProveedorResponsableRepository
+from modules.proveedores_responsables.schemas import (
+    ImportacionResultado,
+    ProveedorResponsableCreate,
+    ProveedorResponsableResponse,
+    ProveedorResponsableUpdate,
+)
+from modules.proveedores_responsables.service import ProveedorResponsableService
+from modules.users.repository import UserRepository
+
+
+router = APIRouter(prefix="/proveedores-responsables", tags=["Enrutamiento NIT"])
+
+ROLES_ENRUTAMIENTO = {"admin", "fact"}
+
+# La maestra del ERP pesa ~1 MB; el tope evita cargar en memoria un archivo equivocado
+MAX_CSV_BYTES = 10 * 1024 * 1024
+
+
+async def _exigir_rol(
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+) -> User:
+    user = await UserRepository(db).get_con_permisos(UUID(current_user["user_id"]))
+    if not user:
+        raise HTTPException(status_code=401, detail="Usuario no encontrado.")
+    role = user.role.code.lower() if user.role else ""
+    if role not in ROLES_ENRUTAMIENTO:
+        raise HTTPException(
+            status_code=403,
+            detail="Solo Radicación o un administrador pueden modificar el enrutamiento por NIT.",
+        )
+    return user
+
+
+def get_service(db: AsyncSession = Depends(get_db)) -> ProveedorResponsableService:
+    """Dependency para obtener el servicio de enrutamiento NIT."""
+    return ProveedorResponsableService(ProveedorResponsableRepository(db))
+
+
+@router.get("", response_model=List[ProveedorResponsableResponse])
+async def list_proveedores_responsables(
+    search: Optional[str] = Query(None, description="Buscar por NIT o razón social"),
+    activos_only: bool = False,
+    _: User = Depends(con_sesion(_exigir_rol, get_read_db)),
+    service: ProveedorResponsableService = Depends(con_sesion(get_service, get_read_db)),
+):
+    """Lista la tabla de enrutamiento NIT → responsable."""
+    return await service.get_all(search=search, activos_only=activos_only)
+
+
+@router.get("/{nit}", response_model=ProveedorResponsableResponse)
+async def get_proveedor_responsable(
+    nit: str,
+    _: User = Depends(con_sesion(_exigir_rol, get_read_db)),
+    service: ProveedorResponsableService = Depends(con_sesion(get_service, get_read_db)),
+):
+    """Obtiene el enrutamiento de un NIT (con o sin guiones)."""
+    return await service.get_by_nit(nit)
+
+
+@router.post("", response_model=ProveedorResponsableResponse, status_code=status.HTTP_201_CREATED)
+async def create_proveedor_responsable(
+    data: ProveedorResponsableCreate,
+    _: User = Depends(_exigir_rol),
+    service: ProveedorResponsableService = Depends(get_service),
+):
+    """Agrega un NIT a la tabla. Los workers lo ven sin reiniciar (LISTEN/NOTIFY)."""
+    return await service.create(data)
+
+
+@router.patch("/{nit}", response_model=ProveedorResponsableResponse)
+async def update_proveedor_responsable(
+    nit: str,
+    data: ProveedorResponsableUpdate,
+    _: User = Depends(_exigir_rol),
+    service: ProveedorResponsableService = Depends(get_service),
+):
+    """Cambia responsables, razón social o activo de un NIT."""
+    return await service.update(nit, data)
+
+
+@router.delete("/{nit}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_proveedor_responsable(
+    nit: str,
+    _: User = Depends(_exigir_rol),
+    service: ProveedorResponsableService = Depends(get_service),
+):
+    """Elimina un NIT de la tabla (para pausarlo sin perderlo, usar activo=false)."""
+    await service.delete(nit)
+
+
+@router.post("/importar", response_model=ImportacionResultado)
+async def importar_proveedores_responsables(
+    archivo: UploadFile = File(..., description="CSV con codigo_nit/nit, razon_social y responsables"),
+    _: User = Depends(_exigir_rol),
+    service: ProveedorResponsableService = Depends(get_service),
+):
+    """
+    Import masivo desde CSV (formato de retenciones/maestra_proveedores.csv).
+
+    Las filas con columna `responsables` (p. ej. `cedi|tiendas`) se crean o
+    actualizan en un solo INSERT ... ON CONFLICT por lote; las filas sin ella
+    solo completan la razón social de NITs ya existentes.
+    """
+    contenido = await archivo.read(MAX_CSV_BYTES + 1)
+    if len(contenido) > MAX_CSV_BYTES:
+        raise HTTPException(status_code=413, detail="El CSV supera el tamaño máximo (10 MB).")
+    try:
+        texto = contenido.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="El CSV debe estar en UTF-8.")
+    return await service.importar_csv(texto)
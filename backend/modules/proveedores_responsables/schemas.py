@@ -0,0 +1,76 @@
+"""
+Esquemas Pydantic para la tabla de enrutamiento NIT → responsable.
+"""
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+
+from core.nit_responsable import KEYWORDS_VALIDOS
+
+
+def _validar_keywords(valor: list[str]) -> list[str]:
+    limpios = [k.strip().lower() for k in valor if k and k.strip()]
+    invalidos = [k for k in limpios if k not in KEYWORDS_VALIDOS]
+    if invalidos:
+        raise ValueError(
+            f"Keywords no válidos: {', '.join(invalidos)}. "
+            f"Permitidos: {', '.join(sorted(KEYWORDS_VALIDOS))}"
+        )
+    # dict.fromkeys deduplica conservando el orden de preferencia
+    return list(dict.fromkeys(limpios))
+
+
+class ProveedorResponsableCreate(BaseModel):
+    nit: str = Field(..., min_length=1, max_length=30)
+    razon_social: Optional[str] = None
+    responsables: list[str] = Field(..., min_length=1)
+    activo: bool = True
+
+    @field_validator("responsables")
+    @classmethod
+    def _keywords(cls, valor):
+        return _validar_keywords(valor)
+
+
+class ProveedorResponsableUpdate(BaseModel):
+    razon_social: Optional[str] = None
+    responsables: Optional[list[str]] = Field(None, min_length=1)
+    activo: Optional[bool] = None
+
+    # Solo se aplica lo enviado: null borra razon_social, pero estas dos columnas son NOT NULL
+    @field_validator("responsables")
+    @classmethod
+    def _keywords(cls, valor):
+        if valor is None:
+            raise ValueError("responsables no puede ser null")
+        return _validar_keywords(valor)
+
+    @field_validator("activo")
+    @classmethod
+    def _activo(cls, valor):
+        if valor is None:
+            raise ValueError("activo no puede ser null")
+        return valor
+
+
+class ProveedorResponsableResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    id: UUID
+    nit: str
+    razon_social: Optional[str] = None
+    responsables: list[str]
+    activo: bool
+    created_at: datetime
+    updated_at: datetime
+
+
+class ImportacionResultado(BaseModel):
+    """Resumen de un import masivo desde CSV."""
+    filas_leidas: int
+    creados: int
+    actualizados: int
+    razon_social_completada: int
+    omitidas: int
+    errores: list[str] = []
@@ -0,0 +1,147 @@
+"""
+Servicio de la tabla de enrutamiento NIT → responsable.
+
+Cada escritura hace commit aquí mismo: el trigger de la tabla emite el NOTIFY
+al confirmar la transacción y los workers recargan su índice en memoria
+(core/nit_responsable.escuchar_cambios).
+"""
+import csv
+import io
+from typing import List, Optional
+
+from fastapi import HTTPException, status
+
+from core.logging import logger
+from core.nit_responsable import KEYWORDS_VALIDOS, normalizar_nit
+from modules.proveedores_responsables.repository import ProveedorResponsableRepository
+from modules.proveedores_responsables.schemas import (
+    ImportacionResultado,
+    ProveedorResponsableCreate,
+    ProveedorResponsableResponse,
+    ProveedorResponsableUpdate,
+)
+
+# Separadores admitidos en la columna `responsables` del CSV (la coma es la del CSV)
+_SEPARADORES_KEYWORDS = ("|", ";")
+
+
+def parsear_csv_responsables(texto: str) -> tuple[list[dict], dict[str, str], int, int, list[str]]:
+    """
+    Interpreta un CSV de proveedores para el import masivo.
+
+    Columnas: `codigo_nit` o `nit` (obligatoria), `razon_social` y `responsables`
+    (opcionales; keywords separados por `|` o `;`). Es el formato de
+    retenciones/maestra_proveedores.csv más la columna de responsables.
+
+    - Fila CON responsables → alta/actualización del enrutamiento.
+    - Fila SIN responsables → solo completa la razón social si el NIT ya está
+      en la tabla. La maestra del ERP no dice a qué área va cada proveedor, y
+      enrutar 7.000 NITs a ciegas mandaría facturas al área equivocada.
+
+    Devuelve (filas_upsert, razones_sociales, leidas, omitidas, errores).
+    """
+    lector = csv.DictReader(io.StringIO(texto.lstrip("\ufeff")))
+    columnas = {c.strip().lower() for c in (lector.fieldnames or [])}
+    col_nit = "codigo_nit" if "codigo_nit" in columnas else "nit" if "nit" in columnas else None
+    if col_nit is None:
+        raise ValueError("El CSV debe traer la columna 'codigo_nit' o 'nit'.")
+
+    upserts: dict[str, dict] = {}
+    razones: dict[str, str] = {}
+    leidas = omitidas = 0
+    errores: list[str] = []
+
+    for n, fila in enumerate(lector, start=2):  # línea 1 = encabezado
+        leidas += 1
+        fila = {(k or "").strip().lower(): (v or "").strip() for k, v in fila.items()}
+        nit = normalizar_nit(fila.get(col_nit, ""))
+        if not nit:
+            omitidas += 1
+            continue
+        razon = fila.get("razon_social") or None
+
+        crudo = fila.get("responsables", "")
+        for sep in _SEPARADORES_KEYWORDS:
+            crudo = crudo.replace(sep, " ")
+        keywords = list(dict.fromkeys(k.lower() for k in crudo.split()))
+
+        if not keywords:
+            if razon:
+                razones[nit] = razon
+            else:
+                omitidas += 1
+            continue
+
+        invalidos = [k for k in keywords if k not in KEYWORDS_VALIDOS]
+        if invalidos:
+            errores.append(f"Línea {n} (NIT {nit}): keywords no válidos {', '.join(invalidos)}")
+            continue
+        # Si el NIT se repite, manda la última fila (igual que un UPDATE posterior)
+        upserts[nit] = {"nit": nit, "razon_social": razon, "responsables": keywords}
+
+    # Un NIT con responsables ya recibe su razón social en el upsert
+    razones = {nit: r for nit, r in razones.items() if nit not in upserts}
+    return list(upserts.values()), razones, leidas, omitidas, errores
+
+
+class ProveedorResponsableService:
+    def __init__(self, repository: ProveedorResponsableRepository):
+        self.repository = repository
+
+    async def _get_or_404(self, nit: str):
+        proveedor = await self.repository.get_by_nit(normalizar_nit(nit))
+        if not proveedor:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                                detail=f"El NIT {nit} no está en la tabla de enrutamiento")
+        return proveedor
+
+    async def get_all(self, search: Optional[str] = None, activos_only: bool = False) -> List[ProveedorResponsableResponse]:
+        proveedores = await self.repository.get_all(search=search, activos_only=activos_only)
+        return [ProveedorResponsableResponse.model_validate(p) for p in proveedores]
+
+    async def get_by_nit(self, nit: str) -> ProveedorResponsableResponse:
+        return ProveedorResponsableResponse.model_validate(await self._get_or_404(nit))
+
+    async def create(self, data: ProveedorResponsableCreate) -> ProveedorResponsableResponse:
+        nit = normalizar_nit(data.nit)
+        if await self.repository.get_by_nit(nit):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                detail=f"El NIT {nit} ya está en la tabla de enrutamiento")
+        proveedor = await self.repository.create({**data.model_dump(), "nit": nit})
+        logger.info(f"Enrutamiento NIT creado: {nit} → {proveedor.responsables}")
+        return ProveedorResponsableResponse.model_validate(proveedor)
+
+    async def update(self, nit: str, data: ProveedorResponsableUpdate) -> ProveedorResponsableResponse:
+        proveedor = await self._get_or_404(nit)
+        cambios = data.model_dump(exclude_unset=True)
+        proveedor = await self.repository.update(proveedor, cambios)
+        logger.info(f"Enrutamiento NIT actualizado: {proveedor.nit} → {proveedor.responsables}")
+        return ProveedorResponsableResponse.model_validate(proveedor)
+
+    async def delete(self, nit: str) -> None:
+        proveedor = await self._get_or_404(nit)
+        await self.repository.delete(proveedor)
+        logger.info(f"Enrutamiento NIT eliminado: {proveedor.nit}")
+
+    async def importar_csv(self, texto: str) -> ImportacionResultado:
+        try:
+            upserts, razones, leidas, omitidas, errores = parsear_csv_responsables(texto)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+        creados, actualizados = await self.repository.upsert_masivo(upserts)
+        completadas = await self.repository.completar_razon_social(razones)
+        await self.repository.commit()
+
+        logger.info(
+            f"Import de enrutamiento NIT: {creados} creados, {actualizados} actualizados, "
+            f"{completadas} razones sociales completadas, {len(errores)} errores"
+        )
+        return ImportacionResultado(
+            filas_leidas=leidas,
+            creados=creados,
+            actualizados=actualizados,
+            razon_social_completada=completadas,
+            omitidas=omitidas,
+            errores=errores,
+        )
@@ -7,7 +7,7 @@ from uuid import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
 from core.auth import get_current_user
 from core.logging import logger
-from db.session import get_db
+from db.session import con_sesion, get_db, get_read_db
 from modules.roles.service import RoleService
 from modules.roles.schemas import (
     RoleCreate, RoleUpdate, RoleResponse, RolesListResponse
@@ -34,7 +34,7 @@ def get_role_service(db: AsyncSession = Depends(get_db)) -> RoleService:
 async def get_roles(
     is_active: Optional[bool] = Query(None, description="Filtrar por estado activo/inactivo"),
     current_user: dict = Depends(get_current_user),
-    service: RoleService = Depends(get_role_service)
+    service: RoleService = Depends(con_sesion(get_role_service, get_read_db))
 ):
     """
     Obtiene todos los roles disponibles.
@@ -80,7 +80,7 @@ async def create_role(
 )
 async def get_role_codes(
     current_user: dict = Depends(get_current_user),
-    service: RoleService = Depends(get_role_service)
+    service: RoleService = Depends(con_sesion(get_role_service, get_read_db))
 ):
     """
     Obtiene solo los códigos de roles activos.
@@ -102,7 +102,7 @@ async def get_role_codes(
 async def get_role(
     role_id: UUID,
     current_user: dict = Depends(get_current_user),
-    service: RoleService = Depends(get_role_service)
+    service: RoleService = Depends(con_sesion(get_role_service, get_read_db))
 ):
     """
     Obtiene un rol específico por su ID.
@@ -29,6 +29,7 @@ from typing import Any, Optional
 
 import httpx
 
+from core.instrumentacion import TransporteMedido
 from core.logging import logger
 
 
@@ -156,7 +157,9 @@ class SiesaConnektaClient:
         }
 
     def _client(self) -> httpx.AsyncClient:
-        return httpx.AsyncClient(timeout=self.timeout, transport=self._transport)
+        return httpx.AsyncClient(
+            timeout=self.timeout, transport=TransporteMedido("siesa", self._transport)
+        )
 
     async def importar_fsp(self, payload: dict) -> ResultadoImportacion:
         """
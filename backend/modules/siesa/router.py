@@ -10,16 +10,15 @@ El flujo del modal "Causar en Siesa":
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
 from core.auth import get_current_user
-from db.session import get_db
+from db.session import con_sesion, get_db, get_read_db
 from db.models import User
 from modules.siesa.builder import normalizar_nit
 from modules.siesa.constants import CENTROS_COSTO, CONDICIONES_PAGO, MOTIVOS, TIPOS_PROVEEDOR
 from modules.siesa.repository import SiesaRepository
+from modules.users.repository import UserRepository
 from modules.siesa.schemas import (
     CausacionOut,
     CausarIn,
@@ -43,12 +42,7 @@ async def _get_user_db(
 ) -> User:
     """Obtiene el objeto User completo desde la BD usando el user_id del JWT."""
     user_id = UUID(current_user["user_id"])
-    result = await db.execute(
-        select(User)
-        .options(selectinload(User.role), selectinload(User.area))
-        .where(User.id == user_id)
-    )
-    user = result.scalar_one_or_none()
+    user = await UserRepository(db).get_con_permisos(user_id)
     if not user:
         raise HTTPException(status_code=401, detail="Usuario no encontrado.")
     return user
@@ -72,7 +66,7 @@ def _svc(db: AsyncSession = Depends(get_db)) -> SiesaService:
 # =============================================================================
 
 @router.get("/maestros", response_model=MaestrosOut, summary="Maestros Siesa para los selects del modal")
-async def get_maestros(user: User = Depends(_get_user_db)):
+async def get_maestros(user: User = Depends(con_sesion(_get_user_db, get_read_db))):
     _exigir_rol_causacion(user)
     return MaestrosOut(
         motivos=MOTIVOS,
@@ -89,8 +83,8 @@ async def get_maestros(user: User = Depends(_get_user_db)):
 )
 async def get_config_proveedor(
     nit: str,
-    db: AsyncSession = Depends(get_db),
-    user: User = Depends(_get_user_db),
+    db: AsyncSession = Depends(get_read_db),
+    user: User = Depends(con_sesion(_get_user_db, get_read_db)),
 ):
     _exigir_rol_causacion(user)
     config = await SiesaRepository(db).get_config_por_nit(normalizar_nit(nit))
@@ -130,8 +124,8 @@ async def upsert_config_proveedor(
 )
 async def preparar_causacion(
     factura_id: UUID,
-    svc: SiesaService = Depends(_svc),
-    user: User = Depends(_get_user_db),
+    svc: SiesaService = Depends(con_sesion(_svc, get_read_db)),
+    user: User = Depends(con_sesion(_get_user_db, get_read_db)),
 ):
     _exigir_rol_causacion(user)
     return await svc.preparar(factura_id)
@@ -167,8 +161,8 @@ async def causar_factura(
 )
 async def historial_causaciones(
     factura_id: UUID,
-    db: AsyncSession = Depends(get_db),
-    user: User = Depends(_get_user_db),
+    db: AsyncSession = Depends(get_read_db),
+    user: User = Depends(con_sesion(_get_user_db, get_read_db)),
 ):
     _exigir_rol_causacion(user)
     return await SiesaRepository(db).get_causaciones_de_factura(factura_id)
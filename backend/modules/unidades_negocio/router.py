@@ -6,7 +6,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from uuid import UUID
 
-from db.session import get_db
+from db.session import get_db, get_read_db
+from core.versionado import respuesta_condicional
 from core.auth import get_current_user
 from db.models import User
 from .service import UnidadNegocioService
@@ -23,10 +24,14 @@ router = APIRouter(
 )
 
 
-@router.get("/unidades-negocio", response_model=List[UnidadNegocioList])
+@router.get(
+    "/unidades-negocio",
+    response_model=List[UnidadNegocioList],
+    dependencies=[Depends(respuesta_condicional("unidades_negocio"))],
+)
 async def get_unidades_negocio(
     activas_only: bool = Query(False, description="Filtrar solo unidades activas"),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -41,7 +46,7 @@ async def get_unidades_negocio(
 @router.get("/unidades-negocio/{unidad_id}", response_model=UnidadNegocioResponse)
 async def get_unidad_negocio(
     unidad_id: UUID,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Obtiene una unidad de negocio por su ID."""
@@ -2,13 +2,19 @@
 Repositorio para operaciones de usuarios en la base de datos.
 """
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import bindparam, select, func
 from sqlalchemy.orm import selectinload
 from typing import List, Optional, Tuple
 from uuid import UUID
 from db.models import User, Area, UnidadNegocio
 from core.logging import logger
 
+# Usuario con rol y área para validar permisos, en UN SELECT: role, area y
+# unidad_negocio ya son joined en el modelo (el selectinload que usaban los
+# routers los pisaba con dos queries más). La sentencia se arma una vez y se
+# reutiliza con el parámetro: SQLAlchemy no la reconstruye ni recalcula su
+# clave de cache en cada request.
+USUARIO_CON_PERMISOS = select(User).where(User.id == bindparam("user_id"))
 
 class UserRepository:
     """Repositorio para gestionar operaciones CRUD de usuarios."""
@@ -63,6 +69,11 @@ class UserRepository:
         )
         return result.scalar_one_or_none()
     
+    async def get_con_permisos(self, user_id: UUID) -> Optional[User]:
+        """Usuario con rol y área en una sola query (ver USUARIO_CON_PERMISOS)."""
+        result = await self.db.execute(USUARIO_CON_PERMISOS, {"user_id": user_id})
+        return result.scalar_one_or_none()
+
     async def get_by_email(self, email: str) -> Optional[User]:
         """Obtiene un usuario por email."""
         result = await self.db.execute(
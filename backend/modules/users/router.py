@@ -6,7 +6,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 from uuid import UUID
 
-from db.session import get_db
+from db.session import con_sesion, get_db, get_read_db
 from modules.users.repository import UserRepository
 from modules.users.service import UserService
 from modules.users.schemas import (
@@ -37,7 +37,7 @@ async def list_users(
     area_id: Optional[UUID] = Query(None, description="Filtrar por área"),
     role: Optional[str] = Query(None, description="Filtrar por rol"),
     is_active: Optional[bool] = Query(None, description="Filtrar por estado activo"),
-    service: UserService = Depends(get_user_service),
+    service: UserService = Depends(con_sesion(get_user_service, get_read_db)),
     current_user: dict = Depends(get_current_user)
 ):
     """
@@ -64,7 +64,7 @@ async def list_users(
 @router.get("/{user_id}", response_model=UserDetail)
 async def get_user(
     user_id: UUID,
-    service: UserService = Depends(get_user_service),
+    service: UserService = Depends(con_sesion(get_user_service, get_read_db)),
     current_user: dict = Depends(get_current_user)
 ):
     """
@@ -0,0 +1,144 @@
+"""
+Microbenchmark de las queries calientes: costo Python por llamada e idas y
+vueltas a la BD, antes (sentencia armada en cada llamada) y después (plantillas
+con bindparam de modules/facturas/repository.py y USUARIO_CON_PERMISOS).
+
+1. Overhead por llamada: armar el select con sus loader options y calcular su
+   clave del cache de compilación, que es lo que SQLAlchemy hace en cada
+   execute antes de mandar nada a Postgres. Con la plantilla la sentencia ya
+   existe y la clave queda memorizada en el objeto.
+2. Idas y vueltas: sentencias que emite cargar el usuario de un request y
+   leer su rol, sobre sqlite en memoria (el número no depende del motor).
+
+No toca la base de datos del .env.
+
+Uso (desde backend/, con el venv):
+    python scripts/bench_queries_calientes.py
+    python scripts/bench_queries_calientes.py --iteraciones 20000
+"""
+import argparse
+import sys
+import timeit
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from dotenv import load_dotenv
+load_dotenv(dotenv_path=Path(__file__).parent.parent / ".env")
+
+from sqlalchemy import CheckConstraint, MetaData, create_engine, event, func, or_, select
+from sqlalchemy.orm import Session, selectinload
+
+from db.base import Base
+from db.models import Area, Estado, Factura, Rol, User
+from db.perfiles_carga import PerfilCarga, opciones_factura
+from modules.facturas.repository import _plantilla_por_id, _plantillas_listado
+from modules.users.repository import USUARIO_CON_PERMISOS
+
+
+def _listado_dinamico(area_id, estado, search):
+    """get_all como se armaba antes: un select nuevo por llamada."""
+    query = select(Factura).options(*opciones_factura(PerfilCarga.LIST))
+    count_query = select(func.count(Factura.id))
+    query = query.where(Factura.area_id == area_id)
+    count_query = count_query.where(Factura.area_id == area_id)
+    query = query.join(Estado, Factura.estado_id == Estado.id).where(Estado.label == estado)
+    count_query = count_query.join(Estado, Factura.estado_id == Estado.id).where(Estado.label == estado)
+    filtro = or_(Factura.numero_factura.ilike(f"%{search}%"), Factura.proveedor.ilike(f"%{search}%"))
+    query = query.where(filtro).order_by(Factura.created_at.desc()).offset(0).limit(50)
+    return query, count_query.where(filtro)
+
+
+def _por_llamada(funcion, iteraciones: int) -> float:
+    """Microsegundos por llamada."""
+    return timeit.timeit(funcion, number=iteraciones) / iteraciones * 1e6
+
+
+def medir_overhead(iteraciones: int) -> None:
+    area_id = uuid.uuid4()
+    filtros = frozenset({"area_id", "estado", "patron"})
+
+    def detalle_antes():
+        stmt = select(Factura).options(*opciones_factura(PerfilCarga.DETAIL)).where(Factura.id == area_id)
+        stmt._generate_cache_key()
+
+    def detalle_despues():
+        _plantilla_por_id(PerfilCarga.DETAIL)._generate_cache_key()
+
+    def listado_antes():
+        for stmt in _listado_dinamico(area_id, "Asignada", "FE"):
+            stmt._generate_cache_key()
+
+    def listado_despues():
+        for stmt in _plantillas_listado(filtros, True):
+            stmt._generate_cache_key()
+
+    def usuario_antes():
+        stmt = (
+            select(User)
+            .options(selectinload(User.role), selectinload(User.area))
+            .where(User.id == area_id)
+        )
+        stmt._generate_cache_key()
+
+    def usuario_despues():
+        USUARIO_CON_PERMISOS._generate_cache_key()
+
+    print(f"\nOverhead Python por llamada (armar + clave de cache), {iteraciones} iteraciones:")
+    print(f"  {'query':<22}{'antes µs':>10}{'después µs':>12}")
+    for nombre, antes, despues in (
+        ("get_by_id (DETAIL)", detalle_antes, detalle_despues),
+        ("get_all + count", listado_antes, listado_despues),
+        ("usuario del request", usuario_antes, usuario_despues),
+    ):
+        print(f"  {nombre:<22}{_por_llamada(antes, iteraciones):>10.1f}{_por_llamada(despues, iteraciones):>12.1f}")
+
+
+def medir_idas_y_vueltas() -> None:
+    meta = MetaData()
+    for nombre in ("roles", "areas", "unidades_negocio", "users"):
+        tabla = Base.metadata.tables[nombre].to_metadata(meta)
+        tabla.constraints = {c for c in tabla.constraints if not isinstance(c, CheckConstraint)}
+    engine = create_engine("sqlite://")
+    meta.create_all(engine)
+    sentencias: list[str] = []
+    event.listen(engine, "before_cursor_execute", lambda c, cur, sql, *a: sentencias.append(sql))
+
+    with Session(engine) as sesion:
+        rol = Rol(code="responsable", nombre="Responsable")
+        area = Area(code="TIENDA1", nombre="Tienda 1")
+        sesion.add_all([rol, area])
+        sesion.flush()
+        usuario = User(nombre="U", email="u@cq.test", password_hash="x", role_id=rol.id, area_id=area.id)
+        sesion.add(usuario)
+        sesion.commit()
+        user_id = usuario.id
+
+    def contar(stmt, params=None) -> int:
+        with Session(engine) as sesion:
+            sentencias.clear()
+            usuario = sesion.execute(stmt, params).scalar_one()
+            usuario.role.code, usuario.area.nombre  # lo que leen los routers
+            return len(sentencias)
+
+    antes = contar(
+        select(User).options(selectinload(User.role), selectinload(User.area)).where(User.id == user_id)
+    )
+    despues = contar(USUARIO_CON_PERMISOS, {"user_id": user_id})
+    print("\nUsuario del request (rol + área):")
+    print(f"  antes:   {antes} sentencias")
+    print(f"  después: {despues} sentencias")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iteraciones", type=int, default=5000, help="Llamadas por medición (default: 5000)")
+    args = parser.parse_args()
+
+    medir_overhead(args.iteraciones)
+    medir_idas_y_vueltas()
+
+
+if __name__ == "__main__":
+    main()
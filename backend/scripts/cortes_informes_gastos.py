@@ -0,0 +1,31 @@
+"""
+Guarda los agregados de las semanas cerradas de los informes de gastos
+(modules/gastos/cortes_informes.py). Lo mismo corre cada noche dentro de la API.
+
+Uso (desde backend/, con el venv):
+    python scripts/cortes_informes_gastos.py
+    python scripts/cortes_informes_gastos.py --rehacer
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from dotenv import load_dotenv
+load_dotenv(dotenv_path=Path(__file__).parent.parent / ".env")
+
+from core.tareas import correr_script
+from modules.gastos.cortes_informes import guardar_cortes
+
+
+def _opciones(parser) -> None:
+    parser.add_argument("--rehacer", action="store_true", help="Borra los cortes guardados y los vuelve a generar")
+
+
+def _mostrar(guardadas, args) -> None:
+    for codigo, semanas in guardadas.items():
+        print(f"{codigo}: {len(semanas)} semana(s) guardada(s) {', '.join(semanas)}")
+
+
+if __name__ == "__main__":
+    correr_script(__doc__, lambda db, args: guardar_cortes(db, rehacer=args.rehacer), _mostrar, _opciones)
@@ -0,0 +1,65 @@
+"""
+Import masivo de la tabla de enrutamiento NIT → responsable de la ingesta XML.
+
+Por defecto lee retenciones/maestra_proveedores.csv (raíz del repo). Ese CSV
+del ERP no trae a qué área va cada proveedor, así que sus filas solo completan
+la razón social de los NITs que YA están en la tabla. Para dar de alta o
+cambiar enrutamientos, agregar una columna `responsables` con keywords
+separados por `|` (p. ej. `cedi|tiendas`).
+
+Es el mismo parser que usa POST /api/v1/proveedores-responsables/importar; el
+trigger de la tabla avisa a los workers y recargan su índice sin reiniciar.
+
+Uso (desde backend/, con el venv):
+    python scripts/importar_proveedores_responsables.py --dry-run
+    python scripts/importar_proveedores_responsables.py --csv ruta/al/archivo.csv
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from dotenv import load_dotenv
+load_dotenv(dotenv_path=Path(__file__).parent.parent / ".env")
+
+from db.session import AsyncSessionLocal
+from modules.proveedores_responsables.repository import ProveedorResponsableRepository
+from modules.proveedores_responsables.service import parsear_csv_responsables
+
+CSV_DEFECTO = Path(__file__).parent.parent.parent / "retenciones" / "maestra_proveedores.csv"
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dry-run", action="store_true", help="Reporta sin escribir")
+    parser.add_argument("--csv", default=str(CSV_DEFECTO), help="CSV a importar")
+    args = parser.parse_args()
+
+    texto = Path(args.csv).read_text(encoding="utf-8-sig")
+    upserts, razones, leidas, omitidas, errores = parsear_csv_responsables(texto)
+    print(f"Filas leídas:                    {leidas}")
+    print(f"  con responsables (upsert):     {len(upserts)}")
+    print(f"  solo razón social:             {len(razones)}")
+    print(f"  omitidas (sin NIT ni datos):   {omitidas}")
+    print(f"  con errores:                   {len(errores)}")
+    for err in errores:
+        print(f"    - {err}")
+
+    async with AsyncSessionLocal() as db:
+        repo = ProveedorResponsableRepository(db)
+        creados, actualizados = await repo.upsert_masivo(upserts)
+        completadas = await repo.completar_razon_social(razones)
+        print(f"\nCreados: {creados} | Actualizados: {actualizados} | "
+              f"Razón social completada: {completadas}")
+        if args.dry_run:
+            await db.rollback()
+            print("\nDRY RUN: no se escribió nada.")
+        else:
+            await db.commit()
+            print("\nCommit OK.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,31 @@
+"""
+Compara factura_counters contra facturas y, si no cuadran, los reescribe
+(modules/dashboard/contadores.py). Lo mismo corre cada noche dentro de la API.
+
+Uso (desde backend/, con el venv):
+    python scripts/reconciliar_factura_counters.py --dry-run
+    python scripts/reconciliar_factura_counters.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from dotenv import load_dotenv
+load_dotenv(dotenv_path=Path(__file__).parent.parent / ".env")
+
+from core.tareas import correr_script
+from modules.dashboard.contadores import reconciliar_contadores
+
+
+def _mostrar(desfasados, args) -> None:
+    for c in desfasados:
+        print(f"área {c.area_id} / estado {c.estado_id}: {c.n_facturas} → {c.n_real} facturas | "
+              f"total {c.total} → {c.total_real} | más antigua {c.mas_antigua} → {c.mas_antigua_real}")
+    print(f"\nClaves desfasadas: {len(desfasados)}")
+
+
+if __name__ == "__main__":
+    correr_script(
+        __doc__, lambda db, args: reconciliar_contadores(db, dry_run=args.dry_run), _mostrar, dry_run=True,
+    )
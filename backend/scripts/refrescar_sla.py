@@ -0,0 +1,30 @@
+"""
+Suma a los rollups de SLA los movimientos de factura nuevos y rehace el
+backlog (modules/dashboard/sla.py). Lo mismo corre cada pocos minutos dentro
+de la API.
+
+Uso (desde backend/, con el venv):
+    python scripts/refrescar_sla.py
+    python scripts/refrescar_sla.py --rehacer
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from dotenv import load_dotenv
+load_dotenv(dotenv_path=Path(__file__).parent.parent / ".env")
+
+from core.tareas import correr_script
+from modules.dashboard.sla import refrescar_sla
+
+
+def _opciones(parser) -> None:
+    parser.add_argument("--rehacer", action="store_true", help="Borra los rollups y suma toda la historia")
+
+
+if __name__ == "__main__":
+    correr_script(
+        __doc__, lambda db, args: refrescar_sla(db, rehacer=args.rehacer),
+        lambda sumados, args: print(f"Movimientos sumados: {sumados}"), _opciones,
+    )
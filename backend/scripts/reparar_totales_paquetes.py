@@ -0,0 +1,38 @@
+"""
+Verifica monto_total y total_documentos de los paquetes de gastos contra la
+suma real de sus gastos y archivos, y corrige los desfasados
+(modules/gastos/totales.py). Lo mismo corre cada noche dentro de la API.
+
+Uso (desde backend/, con el venv):
+    python scripts/reparar_totales_paquetes.py --dry-run
+    python scripts/reparar_totales_paquetes.py
+    python scripts/reparar_totales_paquetes.py --paquete <uuid>
+"""
+import sys
+from pathlib import Path
+from uuid import UUID
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from dotenv import load_dotenv
+load_dotenv(dotenv_path=Path(__file__).parent.parent / ".env")
+
+from core.tareas import correr_script
+from modules.gastos.totales import reparar_totales_paquetes
+
+
+def _opciones(parser) -> None:
+    parser.add_argument("--paquete", type=UUID, default=None, help="Solo este paquete (default: todos)")
+
+
+def _mostrar(desfasados, args) -> None:
+    for p in desfasados:
+        print(f"{p.id}: monto {p.monto_total} → {p.monto} | documentos {p.total_documentos} → {p.docs}")
+    print(f"\nPaquetes desfasados: {len(desfasados)}")
+
+
+if __name__ == "__main__":
+    correr_script(
+        __doc__, lambda db, args: reparar_totales_paquetes(db, args.paquete, dry_run=args.dry_run),
+        _mostrar, _opciones, dry_run=True,
+    )
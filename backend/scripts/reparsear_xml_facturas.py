@@ -0,0 +1,61 @@
+"""
+Re-extrae campos de las facturas desde su XML DIAN guardado (facturas_xml).
+
+Para cuando el parser aprende un campo nuevo: en vez de esperar a que N8N
+reenvíe cada XML, se re-parsea todo lo guardado en un pool de procesos y se
+aplican UPDATEs por tandas (modules/facturas/reparseo.py). Por defecto solo
+completa columnas vacías. Es reanudable: el checkpoint guarda el último
+factura_id aplicado; relanzar el mismo comando sigue desde ahí (borrar el
+archivo para empezar de cero).
+
+Solo cubre las facturas ingeridas desde que se guarda el XML.
+
+Uso (desde backend/, con el venv):
+    python scripts/reparsear_xml_facturas.py --dry-run
+    python scripts/reparsear_xml_facturas.py --campos base_gravable,valor_iva,retenciones_xml
+    python scripts/reparsear_xml_facturas.py --campos valor_iva --sobrescribir --procesos 4
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from dotenv import load_dotenv
+load_dotenv(dotenv_path=Path(__file__).parent.parent / ".env")
+
+from modules.facturas.reparseo import CAMPOS_REPARSEABLES, reparsear_facturas
+
+CHECKPOINT_DEFECTO = Path(__file__).parent / ".reparseo_xml_checkpoint.json"
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--campos", default=",".join(CAMPOS_REPARSEABLES),
+                        help=f"Columnas a re-extraer (default: {','.join(CAMPOS_REPARSEABLES)})")
+    parser.add_argument("--sobrescribir", action="store_true",
+                        help="Pisar valores existentes con lo que traiga el XML (default: solo completar vacíos)")
+    parser.add_argument("--lote", type=int, default=500, help="XML por lote (default: 500)")
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos del pool (default: núcleos)")
+    parser.add_argument("--checkpoint", default=str(CHECKPOINT_DEFECTO), help="Archivo de checkpoint")
+    parser.add_argument("--dry-run", action="store_true", help="Reporta sin escribir ni mover el checkpoint")
+    args = parser.parse_args()
+
+    campos = tuple(c.strip() for c in args.campos.split(",") if c.strip())
+    estado = await reparsear_facturas(
+        campos,
+        Path(args.checkpoint),
+        lote=args.lote,
+        procesos=args.procesos,
+        sobrescribir=args.sobrescribir,
+        dry_run=args.dry_run,
+    )
+    print(f"\nProcesadas: {estado['procesadas']} | Con cambios: {estado['con_cambios']} | "
+          f"Errores de parseo: {estado['errores']}")
+    if args.dry_run:
+        print("DRY RUN: no se escribió nada.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,10 +1,191 @@
 """
 Configuración compartida de pytest.
 """
+import asyncio
+
 import pytest
+from sqlalchemy import JSON, CheckConstraint, Column, MetaData, create_engine, event
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Session
+
+from db.base import Base
+from db.models import (
+    Area, Carpeta, CarpetaTesoreria, CentroCosto, CentroOperacion, CuentaAuxiliar, Estado, Factura,
+    FacturaDistribucionCCCO, FacturaInventarioCodigo, File, UnidadNegocio,
+)
 
 
 @pytest.fixture
 def anyio_backend():
     """Los tests async (@pytest.mark.anyio) corren solo sobre asyncio (no trio)."""
     return "asyncio"
+
+
+TABLAS = (
+    "roles", "areas", "users", "aprobadores_gerencia", "estados", "centros_costo", "centros_operacion", "unidades_negocio",
+    "cuentas_auxiliares", "carpetas", "carpetas_tesoreria", "carpeta_tesoreria_stats", "facturas", "files",
+    "factura_counters", "sla_cursor", "sla_permanencias", "sla_ciclos", "sla_flujo_diario", "sla_backlog",
+    "factura_inventario_codigos", "facturas_distribucion_ccco", "factura_movimientos",
+    "facturas_eliminadas", "factura_asignaciones", "comentarios_factura", "tokens_aprobacion_facturas",
+    "comerciales_hijos", "anticipos", "paquetes_gastos", "solicitudes_aprobacion", "gastos_legalizacion",
+    "archivos_gasto", "comentarios_paquete", "historial_estados_paquete", "tokens_aprobacion_paquetes",
+)
+N_FACTURAS = 5
+
+
+class SesionSync:
+    """Lo que los repositorios usan de AsyncSession, sobre una Session síncrona."""
+
+    def __init__(self, sesion: Session):
+        self.sesion = sesion
+
+    async def execute(self, stmt, *args, **kwargs):
+        return self.sesion.execute(stmt, *args, **kwargs)
+
+    async def get(self, *args, **kwargs):
+        return self.sesion.get(*args, **kwargs)
+
+    def add(self, objeto):
+        self.sesion.add(objeto)
+
+    async def delete(self, objeto):
+        self.sesion.delete(objeto)
+
+    async def flush(self):
+        self.sesion.flush()
+
+    async def refresh(self, objeto):
+        self.sesion.refresh(objeto)
+
+    async def commit(self):
+        self.sesion.commit()
+
+
+def _esquema_sqlite(engine) -> None:
+    """Copia de las tablas sin lo exclusivo de Postgres (JSONB, índices por expresión)."""
+    meta = MetaData()
+    for nombre in TABLAS:
+        tabla = Base.metadata.tables[nombre].to_metadata(meta)
+        tabla.constraints = {c for c in tabla.constraints if not isinstance(c, CheckConstraint)}
+        tabla.indexes = {i for i in tabla.indexes if all(isinstance(e, Column) for e in i.expressions)}
+        for columna in tabla.columns:
+            if isinstance(columna.type, JSONB):
+                columna.type = JSON()
+    meta.create_all(engine)
+
+
+@pytest.fixture
+def bd():
+    """sqlite en memoria con N_FACTURAS facturas y sus catálogos.
+
+    (sesión síncrona, sentencias ejecutadas, ids sembrados). Las cargas
+    selectin/joined ocurren dentro del mismo execute; envolver la sesión en
+    SesionSync para pasarla a un repositorio.
+    """
+    engine = create_engine("sqlite://")
+    _esquema_sqlite(engine)
+    sentencias: list[str] = []
+    event.listen(engine, "before_cursor_execute", lambda c, cur, sql, *a: sentencias.append(sql))
+
+    with Session(engine, expire_on_commit=False) as sesion:
+        area = Area(code="TIENDA1", nombre="Tienda 1")
+        cc = CentroCosto(codigo="CC1", nombre="Centro 1")
+        co = CentroOperacion(codigo="CO1", nombre="Operación 1")
+        un = UnidadNegocio(codigo="050", descripcion="Unidad")
+        cuenta = CuentaAuxiliar(codigo="5105", descripcion="Gastos")
+        carpeta = Carpeta(nombre="Junio")
+        carpeta_tesoreria = CarpetaTesoreria(nombre="Pagos junio")
+        sesion.add_all([
+            area, cc, co, un, cuenta, carpeta, carpeta_tesoreria,
+            Estado(id=2, code="asignada", label="Asignada", order=2),
+            Estado(id=3, code="pendiente", label="Pendiente", order=3),
+        ])
+        sesion.flush()
+        ids = []
+        for i in range(N_FACTURAS):
+            factura = Factura(
+                proveedor=f"Proveedor {i}", numero_factura=f"FE-{i}", total=100 + i, estado_id=2,
+                area_id=area.id, centro_costo_id=cc.id, centro_operacion_id=co.id,
+                unidad_negocio_id=un.id, cuenta_auxiliar_id=cuenta.id,
+                carpeta_id=carpeta.id, carpeta_tesoreria_id=carpeta_tesoreria.id,
+                # el server_default '1_SEMANA' va entre comillas para Postgres
+                intervalo_entrega_contabilidad="1_SEMANA",
+            )
+            sesion.add(factura)
+            sesion.flush()
+            sesion.add_all([
+                File(factura_id=factura.id, storage_provider="s3", storage_path=f"k/{i}.pdf",
+                     filename=f"{i}.pdf", content_type="application/pdf", size_bytes=10, doc_type="OC"),
+                FacturaInventarioCodigo(factura_id=factura.id, codigo="OCT", valor=str(i)),
+                FacturaDistribucionCCCO(factura_id=factura.id, centro_costo_id=cc.id,
+                                        centro_operacion_id=co.id, porcentaje=100),
+            ])
+            ids.append(factura.id)
+        sesion.commit()
+        sesion.expunge_all()
+        sentencias.clear()
+        yield sesion, sentencias, ids
+
+
+class ConexionListen:
+    """Lo que core/escucha_pg.py usa de una conexión asyncpg, con cortes simulados."""
+
+    def __init__(self):
+        self.al_notificar = []
+        self.al_terminar = []
+        self.cerrada = False
+        self.responde = True
+
+    async def add_listener(self, canal, callback):
+        self.al_notificar.append(callback)
+
+    def add_termination_listener(self, callback):
+        self.al_terminar.append(callback)
+
+    async def fetchval(self, sql):
+        if not self.responde:
+            raise ConnectionError("sin respuesta")
+        return 1
+
+    def is_closed(self):
+        return self.cerrada
+
+    def terminate(self):
+        self.cerrada = True
+
+    def notificar(self, payload):
+        for callback in self.al_notificar:
+            callback(self, 1, "canal", payload)
+
+    def cortar(self):
+        """El socket se cierra (failover de RDS): asyncpg avisa a los listeners."""
+        self.cerrada = True
+        for callback in self.al_terminar:
+            callback(self)
+
+
+@pytest.fixture
+def conexiones_listen(monkeypatch):
+    """asyncpg.connect devuelve ConexionListen; la lista acumula una por (re)conexión."""
+    import asyncpg
+
+    from core import escucha_pg
+
+    conexiones = []
+
+    async def _connect(dsn):
+        conexiones.append(ConexionListen())
+        return conexiones[-1]
+
+    monkeypatch.setattr(asyncpg, "connect", _connect)
+    monkeypatch.setattr(escucha_pg, "ESPERA_RECONEXION_S", 0)
+    return conexiones
+
+
+async def esperar_hasta(condicion, intentos: int = 200) -> None:
+    """Cede el loop hasta que `condicion()` se cumpla (tareas de fondo en tests)."""
+    for _ in range(intentos):
+        if condicion():
+            return
+        await asyncio.sleep(0.001)
+    raise AssertionError("la condición no se cumplió")
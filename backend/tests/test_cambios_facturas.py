@@ -0,0 +1,82 @@
+"""
+Tests del feed de cambios de las bandejas (GET /facturas/changes).
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import update
+
+from conftest import SesionSync
+from core.config import settings
+from db.models import Area, Factura, FacturaMovimiento
+from modules.facturas.repository import FacturaRepository
+from modules.facturas.service import FacturaService
+
+
+@pytest.fixture
+def feed(bd, monkeypatch):
+    """(sesión, servicio, ids, área de las facturas) con todo modificado hace una hora."""
+    sesion, _, ids = bd
+    monkeypatch.setattr(settings, "cambios_margen_segundos", 0)
+    sesion.execute(update(Factura).values(updated_at=datetime.utcnow() - timedelta(hours=1)))
+    sesion.commit()
+    area_id = sesion.get(Factura, ids[0]).area_id
+    return sesion, FacturaService(FacturaRepository(SesionSync(sesion))), ids, area_id
+
+
+def test_sin_cursor_solo_entrega_el_cursor(feed):
+    _, servicio, _, _ = feed
+    respuesta = asyncio.run(servicio.cambios_facturas())
+    assert respuesta.reset and respuesta.cambiadas == [] and respuesta.cursor
+
+
+def test_trae_solo_lo_cambiado_y_lo_que_salio_del_alcance(feed):
+    sesion, servicio, ids, area_id = feed
+    cursor = asyncio.run(servicio.cambios_facturas()).cursor
+
+    otra = Area(code="TIENDA2", nombre="Tienda 2")
+    sesion.add(otra)
+    sesion.flush()
+    sesion.get(Factura, ids[0]).proveedor = "Proveedor corregido"
+    # Pase de área: sale de la bandeja de TIENDA1
+    sesion.get(Factura, ids[1]).area_id = otra.id
+    # Movimiento sin cambio visible en la fila: también cuenta como tocada
+    sesion.add(FacturaMovimiento(factura_id=ids[2], tipo="asignacion", area_hasta_id=area_id))
+    sesion.commit()
+
+    respuesta = asyncio.run(servicio.cambios_facturas(since=cursor, area_id=area_id))
+    assert not respuesta.reset
+    cambiadas = {i.id: i for i in respuesta.cambiadas}
+    assert set(cambiadas) == {ids[0], ids[2]}
+    assert cambiadas[ids[0]].proveedor == "Proveedor corregido"
+    assert respuesta.removidas == [ids[1]]
+
+
+def test_eliminadas_llegan_como_lapidas(feed):
+    _, servicio, ids, area_id = feed
+    cursor = asyncio.run(servicio.cambios_facturas()).cursor
+    asyncio.run(servicio.delete_factura(ids[3]))
+
+    respuesta = asyncio.run(servicio.cambios_facturas(since=cursor, area_id=area_id))
+    assert respuesta.cambiadas == []
+    assert respuesta.removidas == [ids[3]]
+
+
+def test_reset_si_el_cursor_es_viejo_o_hay_demasiados_cambios(feed, monkeypatch):
+    _, servicio, _, _ = feed
+    viejo = (datetime.utcnow() - timedelta(days=settings.cambios_retencion_dias + 1)).isoformat()
+    assert asyncio.run(servicio.cambios_facturas(since=viejo)).reset
+
+    monkeypatch.setattr(settings, "cambios_max_items", 2)
+    hace_dos_horas = (datetime.utcnow() - timedelta(hours=2)).isoformat()
+    respuesta = asyncio.run(servicio.cambios_facturas(since=hace_dos_horas))
+    assert respuesta.reset and respuesta.cambiadas == []
+
+
+def test_cursor_invalido_es_400(feed):
+    _, servicio, _, _ = feed
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(servicio.cambios_facturas(since="ayer"))
+    assert error.value.status_code == 400
@@ -0,0 +1,105 @@
+"""
+Tests del árbol de carpetas por nodo (CTE recursiva de modules/carpetas/repository.py).
+"""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from conftest import SesionSync
+from db.models import Carpeta, Factura
+from modules.carpetas.repository import CarpetaRepository
+from modules.carpetas.schemas import CarpetaUpdate
+from modules.carpetas.service import CarpetaService
+
+
+@pytest.fixture
+def arbol(bd):
+    """Rama 2025 > Q1 > Enero > Semana 1 (más profunda que los tres niveles de antes)
+    con dos facturas: una en Q1 y otra en Semana 1. Las otras siguen en 'Junio'."""
+    sesion, _, ids = bd
+    anio = Carpeta(nombre="2025")
+    sesion.add(anio)
+    sesion.flush()
+    q1 = Carpeta(nombre="Q1", parent_id=anio.id)
+    sesion.add(q1)
+    sesion.flush()
+    enero = Carpeta(nombre="Enero", parent_id=q1.id)
+    sesion.add(enero)
+    sesion.flush()
+    semana = Carpeta(nombre="Semana 1", parent_id=enero.id)
+    sesion.add(semana)
+    sesion.flush()
+    sesion.get(Factura, ids[0]).carpeta_id = q1.id
+    sesion.get(Factura, ids[1]).carpeta_id = semana.id
+    sesion.commit()
+    ramas = {c.nombre: c.id for c in (anio, q1, enero, semana)}
+    return sesion, CarpetaService(CarpetaRepository(SesionSync(sesion))), ids, ramas
+
+
+def test_nodos_traen_los_agregados_de_todo_el_subarbol(arbol):
+    _, servicio, _, ramas = arbol
+    raices = {n.nombre: n for n in asyncio.run(servicio.list_nodos())}
+
+    assert set(raices) == {"2025", "Junio"}
+    assert (raices["2025"].n_hijas, raices["2025"].n_subcarpetas) == (1, 3)
+    # Facturas FE-0 (100) y FE-1 (101), en niveles distintos del subárbol
+    assert (raices["2025"].n_facturas, raices["2025"].total) == (2, 201)
+    assert (raices["Junio"].n_hijas, raices["Junio"].n_facturas) == (0, 3)
+
+    [enero] = asyncio.run(servicio.list_nodos(ramas["Q1"]))
+    assert (enero.nombre, enero.n_subcarpetas, enero.n_facturas) == ("Enero", 1, 1)
+
+
+def test_facturas_del_nodo_paginadas(arbol):
+    sesion, servicio, _, _ = arbol
+    junio = sesion.execute(select(Carpeta.id).where(Carpeta.nombre == "Junio")).scalar_one()
+
+    pagina = asyncio.run(servicio.get_facturas_pagina(junio, skip=1, limit=1))
+    assert pagina.total == 3 and len(pagina.facturas) == 1
+    assert pagina.facturas[0].carpeta_nombre == "Junio"
+
+
+def test_detalle_trae_el_subarbol_a_cualquier_profundidad(arbol):
+    _, servicio, _, ramas = arbol
+    anio = asyncio.run(servicio.get_carpeta_with_children(ramas["2025"]))
+    semana = anio.children[0].children[0].children[0]
+    assert semana.nombre == "Semana 1"
+    assert [f.numero_factura for f in semana.facturas] == ["FE-1"]
+
+
+def test_no_se_mueve_dentro_de_su_subarbol_y_se_borra_completo(arbol):
+    sesion, servicio, ids, ramas = arbol
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(servicio.update_carpeta(ramas["2025"], CarpetaUpdate(parent_id=ramas["Semana 1"])))
+    assert error.value.status_code == 400
+
+    asyncio.run(servicio.delete_carpeta(ramas["2025"]))
+    sesion.expire_all()
+    restantes = sesion.execute(select(Carpeta.nombre)).scalars().all()
+    assert restantes == ["Junio"]
+    assert sesion.get(Factura, ids[1]).carpeta_id is None
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(servicio.delete_carpeta(ramas["2025"]))
+    assert error.value.status_code == 404
+
+
+def test_respuestas_con_relaciones_a_cualquier_profundidad(arbol):
+    sesion, servicio, _, ramas = arbol
+    # Sin nada en el identity map: todo tiene que venir de las queries
+    sesion.expunge_all()
+
+    anio = asyncio.run(servicio.get_carpeta(ramas["2025"]))
+    semana = anio.children[0].children[0].children[0]
+    assert (semana.nombre, semana.parent.nombre) == ("Semana 1", "Enero")
+    assert [f.numero_factura for f in semana.facturas] == ["FE-1"]
+
+    sesion.expunge_all()
+    [q1] = asyncio.run(servicio.get_carpetas_by_parent(ramas["2025"]))
+    assert (q1.parent.nombre, q1.children[0].children[0].nombre) == ("2025", "Semana 1")
+
+    sesion.expunge_all()
+    q1 = asyncio.run(servicio.update_carpeta(ramas["Q1"], CarpetaUpdate(nombre="Primer trimestre")))
+    assert (q1.nombre, q1.parent.nombre, q1.children[0].children[0].nombre) == ("Primer trimestre", "2025", "Semana 1")
@@ -0,0 +1,60 @@
+"""
+Tests de las respuestas con subcarpetas de Tesorería: el árbol se arma desde
+datos planos (relaciones lazy="raise") y el borrado recorre el subárbol en SQL.
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import select
+
+from conftest import SesionSync
+from db.models import CarpetaTesoreria, Factura
+from modules.carpetas_tesoreria.schemas import CarpetaTesoreriaUpdate
+from modules.carpetas_tesoreria.service import CarpetaTesoreriaService
+
+
+@pytest.fixture
+def ramas(bd):
+    """Pagos junio > Semana 1 > Lunes, con una factura en Lunes (el resto sigue en 'Pagos junio')."""
+    sesion, _, ids = bd
+    pagos = sesion.execute(select(CarpetaTesoreria).where(CarpetaTesoreria.nombre == "Pagos junio")).scalar_one()
+    semana = CarpetaTesoreria(nombre="Semana 1", parent_id=pagos.id)
+    sesion.add(semana)
+    sesion.flush()
+    lunes = CarpetaTesoreria(nombre="Lunes", parent_id=semana.id)
+    sesion.add(lunes)
+    sesion.flush()
+    sesion.get(Factura, ids[0]).carpeta_tesoreria_id = lunes.id
+    sesion.commit()
+    sesion.expunge_all()
+    return sesion, CarpetaTesoreriaService(SesionSync(sesion)), ids, {
+        "Pagos junio": pagos.id, "Semana 1": semana.id, "Lunes": lunes.id,
+    }
+
+
+def test_detalle_y_actualizacion_con_subcarpetas(ramas):
+    sesion, servicio, _, ids = ramas
+
+    pagos = asyncio.run(servicio.get_carpeta(ids["Pagos junio"]))
+    lunes = pagos.children[0].children[0]
+    assert (pagos.parent, len(pagos.facturas)) == (None, 4)
+    assert (lunes.nombre, lunes.parent.nombre) == ("Lunes", "Semana 1")
+    assert [(f.numero_factura, f.carpeta_nombre) for f in lunes.facturas] == [("FE-0", "Lunes")]
+
+    sesion.expunge_all()
+    semana = asyncio.run(servicio.update_carpeta(ids["Semana 1"], CarpetaTesoreriaUpdate(nombre="Semana uno")))
+    assert (semana.nombre, semana.parent.nombre, semana.children[0].nombre) == ("Semana uno", "Pagos junio", "Lunes")
+
+    sesion.expunge_all()
+    [raiz] = asyncio.run(servicio.get_all_carpetas())
+    assert raiz.children[0].children[0].facturas[0].numero_factura == "FE-0"
+
+
+def test_borrado_del_subarbol_completo(ramas):
+    sesion, servicio, facturas, ids = ramas
+
+    assert asyncio.run(servicio.delete_carpeta(ids["Semana 1"]))
+    sesion.expire_all()
+    assert sesion.execute(select(CarpetaTesoreria.nombre)).scalars().all() == ["Pagos junio"]
+    assert sesion.get(Factura, facturas[0]).carpeta_tesoreria_id is None
+    assert not asyncio.run(servicio.delete_carpeta(ids["Semana 1"]))
@@ -0,0 +1,37 @@
+"""
+Tests de la grilla de carpetas de Tesorería (agregados de carpeta_tesoreria_stats).
+"""
+import asyncio
+from datetime import datetime
+
+from sqlalchemy import select
+
+from db.models import CarpetaTesoreria, CarpetaTesoreriaStats
+from modules.carpetas_tesoreria.service import CarpetaTesoreriaService
+from conftest import SesionSync
+
+
+def test_grilla_lee_los_agregados_sin_tocar_facturas(bd):
+    sesion, sentencias, _ = bd
+    pagos = sesion.execute(select(CarpetaTesoreria).where(CarpetaTesoreria.nombre == "Pagos junio")).scalar_one()
+    semana = CarpetaTesoreria(nombre="Semana 1", parent_id=pagos.id)
+    sesion.add_all([
+        semana,
+        # Lo que dejaría el trigger tras archivar las 5 facturas y pagar 2
+        CarpetaTesoreriaStats(
+            carpeta_tesoreria_id=pagos.id, n_facturas=5, total=510, n_pagadas=2, n_pendientes=3,
+            ultima_actividad=datetime(2026, 6, 30, 12, 0),
+        ),
+    ])
+    sesion.commit()
+    servicio = CarpetaTesoreriaService(SesionSync(sesion))
+    sentencias.clear()
+
+    [raiz] = asyncio.run(servicio.get_grid())
+    assert len(sentencias) == 1 and "FROM facturas" not in sentencias[0] and "JOIN facturas" not in sentencias[0]
+    assert (raiz.nombre, raiz.n_hijas, raiz.n_facturas, raiz.total) == ("Pagos junio", 1, 5, 510)
+    assert (raiz.n_pagadas, raiz.n_pendientes) == (2, 3)
+
+    [hija] = asyncio.run(servicio.get_grid(parent_id=pagos.id))
+    # Sin fila de stats (nunca tuvo facturas): ceros
+    assert (hija.nombre, hija.n_hijas, hija.n_facturas, hija.total, hija.ultima_actividad) == ("Semana 1", 0, 0, 0, None)
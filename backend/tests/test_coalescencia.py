@@ -0,0 +1,118 @@
+"""
+Tests de las lecturas coalescidas (core/coalescencia.py).
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import update
+
+from core import coalescencia
+from core.coalescencia import compartida
+from db.models import Area
+
+
+@pytest.fixture(autouse=True)
+def limpiar():
+    coalescencia.invalidar()
+    yield
+    coalescencia.invalidar()
+
+
+def test_pedidos_identicos_simultaneos_comparten_una_ejecucion():
+    ejecuciones = []
+
+    async def calcular(nombre):
+        ejecuciones.append(nombre)
+        await asyncio.sleep(0.01)
+        return nombre.encode()
+
+    async def escenario():
+        iguales = [compartida(("/facturas/", (("area_id", "a"),), None), lambda: calcular("a")) for _ in range(5)]
+        otra = compartida(("/facturas/", (("area_id", "b"),), None), lambda: calcular("b"))
+        resultados = await asyncio.gather(*iguales, otra)
+        # Dentro del TTL tampoco se vuelve a consultar
+        resultados.append(await compartida(("/facturas/", (("area_id", "a"),), None), lambda: calcular("a")))
+        return resultados
+
+    resultados = asyncio.run(escenario())
+    assert resultados == [b"a"] * 5 + [b"b", b"a"]
+    assert sorted(ejecuciones) == ["a", "b"]
+
+
+def test_si_cancelan_al_que_calcula_el_siguiente_relanza():
+    ejecuciones = []
+
+    async def calcular():
+        ejecuciones.append(1)
+        await asyncio.sleep(0.05)
+        return b"ok"
+
+    async def escenario():
+        lider = asyncio.create_task(compartida(("/x", (), None), calcular))
+        await asyncio.sleep(0)
+        seguidor = asyncio.create_task(compartida(("/x", (), None), calcular))
+        await asyncio.sleep(0.01)
+        lider.cancel()
+        return await seguidor
+
+    assert asyncio.run(escenario()) == b"ok"
+    assert len(ejecuciones) == 2
+
+
+def test_commit_con_escrituras_invalida(bd):
+    sesion, _, _ = bd
+
+    async def guardar(cuerpo):
+        return await compartida(("/areas", (), None), lambda: _devolver(cuerpo))
+
+    assert asyncio.run(guardar(b"viejo")) == b"viejo"
+    sesion.commit()  # sin escrituras: sigue valiendo
+    assert asyncio.run(guardar(b"nuevo")) == b"viejo"
+
+    sesion.execute(update(Area).values(nombre="Tienda renombrada"))
+    sesion.commit()
+    assert asyncio.run(guardar(b"nuevo")) == b"nuevo"
+
+
+async def _devolver(cuerpo):
+    return cuerpo
+
+
+def test_etag_nuevo_no_reutiliza_el_cuerpo_guardado():
+    from starlette.requests import Request
+    from starlette.responses import Response
+
+    from core.coalescencia import respuesta_compartida
+
+    def pedir(etag, cuerpo):
+        request = Request({"type": "http", "method": "GET", "path": "/facturas/counts-by-area",
+                           "query_string": b"", "headers": []})
+        response = Response(headers={"ETag": etag})
+        return respuesta_compartida(request, response, lambda: _devolver({"v": cuerpo}))
+
+    async def escenario():
+        viejo = await pedir('W/"v1"', "viejo")
+        # Otro worker escribió: la versión (y el ETag) subió sin invalidar este worker
+        nuevo = await pedir('W/"v2"', "nuevo")
+        return viejo, nuevo
+
+    viejo, nuevo = asyncio.run(escenario())
+    assert viejo.body == b'{"v":"viejo"}' and viejo.headers["etag"] == 'W/"v1"'
+    assert nuevo.body == b'{"v":"nuevo"}' and nuevo.headers["etag"] == 'W/"v2"'
+
+
+def test_recientes_descarta_vencidos_y_tiene_tope(monkeypatch):
+    monkeypatch.setattr(coalescencia, "MAX_RECIENTES", 3)
+
+    async def escenario():
+        for i in range(5):
+            await compartida(("/x", (("q", str(i)),), None), lambda: _devolver(b"x"))
+
+    asyncio.run(escenario())
+    assert [clave[1][0][1] for clave in coalescencia._recientes] == ["2", "3", "4"]
+
+    # Vencidos: la siguiente inserción los descarta aunque no se vuelvan a pedir
+    for clave, (cuerpo, _) in list(coalescencia._recientes.items()):
+        coalescencia._recientes[clave] = (cuerpo, 0.0)
+    asyncio.run(compartida(("/y", (), None), lambda: _devolver(b"y")))
+    assert list(coalescencia._recientes) == [("/y", (), None)]
@@ -0,0 +1,74 @@
+"""
+Tests de las lecturas sobre factura_counters (métricas del dashboard, conteo
+por área, represadas por tienda) y de su reconciliación contra facturas.
+"""
+import asyncio
+from datetime import datetime
+
+from sqlalchemy import select
+
+from conftest import N_FACTURAS, SesionSync
+from db.models import Area, Estado, Factura, FacturaCounter
+from modules.dashboard.contadores import reconciliar_contadores
+from modules.dashboard.repository import DashboardRepository
+from modules.facturas.repository import FacturaRepository
+
+
+def _sin_facturas(sentencias):
+    return all("FROM facturas" not in s and "JOIN facturas" not in s for s in sentencias)
+
+
+def test_lecturas_salen_de_los_contadores(bd):
+    sesion, sentencias, _ = bd
+    tienda = sesion.execute(select(Area)).scalar_one()
+    tienda.es_tienda = True
+    bodega = Area(code="BODEGA", nombre="Bodega")
+    sesion.add_all([
+        bodega,
+        Estado(id=1, code="recibida", label="Recibida", order=1),
+        Estado(id=5, code="pagada", label="Pagada", order=5),
+    ])
+    sesion.flush()
+    # Lo que dejaría el trigger con las 5 facturas de la tienda en 'asignada',
+    # 2 pagadas en la bodega y 1 recibida sin área
+    sesion.add_all([
+        FacturaCounter(id=1, area_id=tienda.id, estado_id=2, n_facturas=5, total=510,
+                       mas_antigua=datetime(2026, 6, 1, 8, 0)),
+        FacturaCounter(id=2, area_id=bodega.id, estado_id=5, n_facturas=2, total=300),
+        FacturaCounter(id=3, area_id=None, estado_id=1, n_facturas=1, total=50),
+        # Grupo que se vació: no cuenta como represada
+        FacturaCounter(id=4, area_id=tienda.id, estado_id=3, n_facturas=0, total=0),
+    ])
+    sesion.commit()
+    sentencias.clear()
+    db = SesionSync(sesion)
+
+    metricas = asyncio.run(DashboardRepository(db).get_facturas_metrics())
+    assert metricas == {"recibidas": 8, "asignadas": 7, "cerradas": 2, "pendientes": 1}
+
+    por_area = asyncio.run(FacturaRepository(db).get_counts_by_area())
+    assert [(a["nombre"], a["count"]) for a in por_area] == [("Bodega", 2), ("Tienda 1", 5)]
+
+    represadas = asyncio.run(FacturaRepository(db).get_represadas_tiendas())
+    assert (represadas["total_represadas"], represadas["monto_total"]) == (5, 510.0)
+    assert [a["nombre"] for a in represadas["areas"]] == ["Tienda 1"]
+    assert _sin_facturas(sentencias)
+
+
+def test_reconciliacion_reescribe_los_desfasados(bd):
+    sesion, _, _ = bd
+    area_id = sesion.execute(select(Area.id)).scalar_one()
+    creadas = sesion.execute(select(Factura.created_at)).scalars().all()
+    sesion.add_all([
+        # Le falta una factura y está de más un grupo que no existe
+        FacturaCounter(id=1, area_id=area_id, estado_id=2, n_facturas=N_FACTURAS - 1,
+                       total=410, mas_antigua=min(creadas)),
+        FacturaCounter(id=2, area_id=None, estado_id=3, n_facturas=1, total=10),
+    ])
+    sesion.commit()
+
+    desfasados = asyncio.run(DashboardRepository(SesionSync(sesion)).get_contadores_desfasados())
+    assert sorted((d.estado_id, d.n_facturas, d.n_real) for d in desfasados) == [
+        (2, N_FACTURAS - 1, N_FACTURAS), (3, 1, None),
+    ]
+    assert asyncio.run(reconciliar_contadores(SesionSync(sesion), dry_run=True)) == desfasados
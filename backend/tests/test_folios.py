@@ -0,0 +1,39 @@
+"""
+Tests del asignador de folios (core/folios.py).
+"""
+import asyncio
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from conftest import SesionSync
+from core.folios import siguiente_folio
+from db.models import FolioContador
+
+
+def _sesion() -> Session:
+    engine = create_engine("sqlite://")
+    FolioContador.__table__.create(engine)
+    return Session(engine)
+
+
+def test_folios_consecutivos_por_prefijo_y_anio():
+    with _sesion() as sesion:
+        db = SesionSync(sesion)
+        folios = [asyncio.run(siguiente_folio(db, "PKG", 2026)) for _ in range(3)]
+        assert folios == ["PKG-2026-00001", "PKG-2026-00002", "PKG-2026-00003"]
+        # Cada serie es independiente
+        assert asyncio.run(siguiente_folio(db, "ANT", 2026)) == "ANT-2026-00001"
+        assert asyncio.run(siguiente_folio(db, "PKG", 2027)) == "PKG-2027-00001"
+
+
+def test_continua_la_serie_sembrada_y_no_deja_huecos_al_revertir():
+    with _sesion() as sesion:
+        # Lo que deja la migración: último folio usado antes del contador
+        sesion.add(FolioContador(prefijo="ANT", anio=2026, ultimo=41))
+        sesion.commit()
+        db = SesionSync(sesion)
+
+        asyncio.run(siguiente_folio(db, "ANT", 2026))
+        sesion.rollback()  # la creación del anticipo falló
+        assert asyncio.run(siguiente_folio(db, "ANT", 2026)) == "ANT-2026-00042"
@@ -0,0 +1,80 @@
+"""
+Tests del motor de informes de gastos (modules/gastos/informes.py): los
+resúmenes se agregan en Postgres sobre los cortes semanales guardados más la
+parte en vivo, y solo las hojas de detalle traen filas.
+"""
+from datetime import date
+
+from sqlalchemy.dialects import postgresql
+
+from modules.gastos import informes
+from modules.gastos.informe_cajas_menores import INFORME as CAJAS
+from modules.gastos.informe_zonas import INFORME as ZONAS
+
+
+def _sql(q) -> str:
+    return str(q.compile(dialect=postgresql.dialect()))
+
+
+def test_resumenes_agregan_en_sql_con_el_total_general():
+    h = informes._hechos(ZONAS, None, date(2026, 10, 1))
+
+    grupo = _sql(informes.consulta_resumen_grupo(h))
+    assert "GROUPING SETS((h.grupo), ())" in grupo
+    assert "LEFT OUTER JOIN zonas_tecnicos" in grupo
+    assert "FILTER (WHERE h.estado IN" in grupo
+
+    persona = _sql(informes.consulta_resumen_persona(h))
+    assert "GROUP BY h.grupo, h.email" in persona
+    assert persona.count("sum(h.paquetes) FILTER") == len(informes.ESTADOS_CONTEO)
+
+    assert "GROUPING SETS((h.semana), ())" in _sql(informes.consulta_resumen_semana(h))
+
+
+def test_semanas_guardadas_mas_las_en_vivo():
+    sql = _sql(informes._hechos(ZONAS, date(2026, 1, 1), date(2026, 10, 1)))
+
+    guardadas, en_vivo = sql.split("UNION ALL")
+    assert "FROM informes_gastos_filas" in guardadas
+    # En vivo solo las semanas sin corte guardado de este informe
+    assert "NOT (EXISTS (SELECT informes_gastos_semanas.semana" in en_vivo
+    assert "informes_gastos_semanas.semana = paquetes_gastos.semana" in en_vivo
+    assert "GROUP BY coalesce(zonas_tecnicos.zona" in en_vivo
+
+
+def test_detalle_sin_agregar_y_con_las_columnas_del_informe():
+    desde, hasta = date(2026, 9, 1), date(2026, 10, 1)
+    p = informes._paquetes(CAJAS, desde, hasta)
+    o = informes._orden_grupos(informes._hechos(CAJAS, desde, hasta))
+
+    paquetes = informes.consulta_paquetes(p, o, len(CAJAS.extras_paquete))
+    detalle = informes.consulta_detalle(p, o)
+    for q in (paquetes, detalle):
+        assert "GROUP BY" not in _sql(q).split("LEFT OUTER JOIN (SELECT")[0]
+    # Caja, usuario, folio, flujo y las 11 columnas comunes del paquete
+    assert len(paquetes.selected_columns) == 15
+    assert len(detalle.selected_columns) == 16
+    assert "SUBSTRING(upper(users.nombre) FROM" in _sql(p.select())
+
+
+def test_corte_bloquea_las_tablas_que_lo_invalidan_antes_de_calcular():
+    import asyncio
+    from types import SimpleNamespace
+
+    from modules.gastos import cortes_informes
+
+    class _Sesion:
+        def __init__(self):
+            self.sql = []
+
+        async def execute(self, stmt):
+            self.sql.append(_sql(stmt))
+            return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: []))
+
+        async def commit(self):
+            self.sql.append("COMMIT")
+
+    sesion = _Sesion()
+    asyncio.run(cortes_informes.guardar_cortes(sesion, date(2026, 10, 1)))
+    assert sesion.sql[0] == "LOCK TABLE paquetes_gastos, users, zonas_tecnicos, areas IN SHARE MODE"
+    assert sesion.sql[-1] == "COMMIT"
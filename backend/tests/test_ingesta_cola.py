@@ -0,0 +1,113 @@
+"""
+Tests de la cola de ingesta XML asíncrona (modules/facturas/ingesta_cola.py):
+reclamo con SKIP LOCKED y estado final según el tipo de fallo.
+"""
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.dialects import postgresql
+
+import db.session
+from modules.facturas import ingesta_cola
+from modules.facturas.schemas import IngestaXMLResultOut
+
+
+class _Sesion:
+    def __init__(self):
+        self.sql = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, stmt):
+        self.sql.append(str(stmt.compile(dialect=postgresql.dialect())))
+        return SimpleNamespace(all=lambda: [])
+
+    async def commit(self):
+        pass
+
+    async def rollback(self):
+        pass
+
+
+@pytest.fixture
+def finales(monkeypatch):
+    """Captura (estado, kwargs) de _finalizar sin BD."""
+    capturados = []
+
+    async def _finalizar(db, ingesta_id, estado, **kwargs):
+        capturados.append((estado, kwargs))
+
+    async def _sin_respuesta_previa(db, clave):
+        return None
+
+    async def _guardar(db, clave, resultado):
+        pass
+
+    monkeypatch.setattr(db.session, "AsyncSessionLocal", _Sesion)
+    monkeypatch.setattr(ingesta_cola, "_finalizar", _finalizar)
+    monkeypatch.setattr(ingesta_cola, "buscar_respuesta_idempotente", _sin_respuesta_previa)
+    monkeypatch.setattr(ingesta_cola, "guardar_respuesta_idempotente", _guardar)
+    return capturados
+
+
+def _trabajo(intentos=1):
+    return SimpleNamespace(
+        id=uuid.uuid4(), clave="xml:abc", intentos=intentos,
+        payload={"xml_content": "<xml/>", "pdf_base64": "JVBERi0=", "pdf_filename": None, "nit": None},
+    )
+
+
+def test_reclamo_usa_skip_locked():
+    sesion = _Sesion()
+    asyncio.run(ingesta_cola._reclamar(sesion, 3))
+    assert "FOR UPDATE SKIP LOCKED" in sesion.sql[0]
+    assert "intentos=(ingesta_cola.intentos + %(intentos_1)s)" in sesion.sql[0]
+
+
+def test_completada_descarta_el_pdf_del_payload(monkeypatch, finales):
+    async def _procesar(db, payload):
+        return IngestaXMLResultOut(
+            factura_id=uuid.uuid4(), numero_factura="FE-1", proveedor="P",
+            ai_area_confianza="nula", pendiente_confirmacion=True, estado="sin_asignar",
+        )
+    monkeypatch.setattr(ingesta_cola, "procesar_ingesta_xml", _procesar)
+    asyncio.run(ingesta_cola.procesar_trabajo(_trabajo()))
+    estado, kwargs = finales[0]
+    assert estado == "completada"
+    assert "pdf_base64" not in kwargs["payload"]
+    assert kwargs["resultado"]["numero_factura"] == "FE-1"
+
+
+def test_xml_invalido_no_se_reintenta(monkeypatch, finales):
+    async def _procesar(db, payload):
+        raise HTTPException(status_code=422, detail="XML inválido: x")
+    monkeypatch.setattr(ingesta_cola, "procesar_ingesta_xml", _procesar)
+    asyncio.run(ingesta_cola.procesar_trabajo(_trabajo(intentos=1)))
+    assert finales == [("error", {"error": "XML inválido: x"})]
+
+
+@pytest.mark.parametrize("intentos,esperado", [(1, "pendiente"), (3, "error")])
+def test_fallo_transitorio_se_reintenta_hasta_el_maximo(monkeypatch, finales, intentos, esperado):
+    async def _procesar(db, payload):
+        raise ConnectionError("S3 no responde")
+    monkeypatch.setattr(ingesta_cola, "procesar_ingesta_xml", _procesar)
+    monkeypatch.setattr(ingesta_cola.settings, "ingesta_max_intentos", 3)
+    asyncio.run(ingesta_cola.procesar_trabajo(_trabajo(intentos=intentos)))
+    assert finales[0][0] == esperado
+
+
+@pytest.mark.parametrize("intentos,esperado", [(1, "pendiente"), (3, "error")])
+def test_http_5xx_se_reintenta_como_fallo_transitorio(monkeypatch, finales, intentos, esperado):
+    async def _procesar(db, payload):
+        raise HTTPException(status_code=500, detail="Error subiendo archivo a S3: timeout")
+    monkeypatch.setattr(ingesta_cola, "procesar_ingesta_xml", _procesar)
+    monkeypatch.setattr(ingesta_cola.settings, "ingesta_max_intentos", 3)
+    asyncio.run(ingesta_cola.procesar_trabajo(_trabajo(intentos=intentos)))
+    assert finales == [(esperado, {"error": "Error subiendo archivo a S3: timeout"})]
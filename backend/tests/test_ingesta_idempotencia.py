@@ -0,0 +1,105 @@
+"""
+Tests de la ingesta XML idempotente (modules/facturas/ingesta.py): clave de
+idempotencia y forma del INSERT ... ON CONFLICT.
+"""
+import asyncio
+from datetime import date
+
+from sqlalchemy import literal_column, select
+from sqlalchemy.dialects import postgresql
+
+from db.models import Factura
+from modules.facturas import ingesta
+from modules.facturas.ingesta import (
+    NIT_NORMALIZADO_SQL, NUMERO_NORMALIZADO_SQL, clave_idempotencia, fila_nueva, normalizar_nit,
+)
+
+
+class TestClaveIdempotencia:
+    def test_header_tiene_prioridad(self):
+        assert clave_idempotencia(" abc-123 ", "<xml/>", con_pdf=True) == "key:abc-123"
+
+    def test_hash_del_xml_estable(self):
+        a = clave_idempotencia(None, "<xml/>", con_pdf=False)
+        assert a == clave_idempotencia("", "<xml/>", con_pdf=False)
+        assert a.startswith("xml:") and len(a) == len("xml:") + 64
+
+    def test_reenvio_con_pdf_no_reproduce_el_anterior(self):
+        assert clave_idempotencia(None, "<xml/>", con_pdf=False) != clave_idempotencia(None, "<xml/>", con_pdf=True)
+
+
+class _DBQueCompila:
+    """Sesión falsa: compila el statement con el dialecto de Postgres y no devuelve fila."""
+    sql = ""
+
+    async def execute(self, stmt):
+        self.sql = str(stmt.compile(dialect=postgresql.dialect()))
+
+        class _Resultado:
+            def one_or_none(self):
+                return None
+        return _Resultado()
+
+
+def _valores(nit, numero="FE-1"):
+    return {
+        "proveedor": "PROV", "nit_proveedor": nit, "numero_factura": numero,
+        "fecha_emision": date(2026, 1, 1), "fecha_vencimiento": None, "total": 100,
+        "area_id": None, "estado_id": 1, "pendiente_confirmacion": True,
+        "ai_area_confianza": "nula", "ai_area_razonamiento": None,
+        "base_gravable": None, "valor_iva": None, "retenciones_xml": None,
+    }
+
+
+def _upsert_sql(nit):
+    db = _DBQueCompila()
+    asyncio.run(ingesta._upsert_factura(db, _valores(nit)))
+    return db.sql
+
+
+class TestUpsertFactura:
+    def test_on_conflict_sobre_el_indice_normalizado(self):
+        sql = _upsert_sql("900-080-634")
+        assert f"ON CONFLICT ({NIT_NORMALIZADO_SQL}, {NUMERO_NORMALIZADO_SQL}) WHERE nit_proveedor IS NOT NULL" in sql
+        assert "(xmax = 0) AS insertado" in sql
+
+    def test_backfill_solo_completa_vacios(self):
+        sql = _upsert_sql("900080634")
+        assert "base_gravable = coalesce(facturas.base_gravable, excluded.base_gravable)" in sql
+        assert "retenciones_xml = coalesce(facturas.retenciones_xml, excluded.retenciones_xml)" in sql
+
+    def test_guarda_contra_duplicado_sin_nit(self):
+        assert "facturas.nit_proveedor IS NULL" in _upsert_sql("900080634")
+        assert "facturas.nit_proveedor IS NULL" not in _upsert_sql(None)
+
+
+def test_normalizar_nit_sin_puntos_ni_dv():
+    for nit in ("900.080.634-1", " 900080634 ", "900 080 634-1", "900080634"):
+        assert normalizar_nit(nit) == "900080634"
+
+
+def test_factura_del_flujo_pdf_con_nit_con_puntos(bd):
+    """El XML (NIT sin DV) cae en el ON CONFLICT de la factura que el correo PDF
+    guardó con puntos y DV; con otro NIT o sin NIT va por el camino por número."""
+    sesion, _, ids = bd
+    # Funciones de Postgres que usa NIT_NORMALIZADO_SQL
+    crudo = sesion.connection().connection.driver_connection
+    crudo.create_function("btrim", 1, lambda v: v.strip() if v is not None else None)
+    crudo.create_function("split_part", 3, lambda v, sep, n: v.split(sep)[n - 1] if v is not None else None)
+    pdf = sesion.get(Factura, ids[0])
+    pdf.nit_proveedor, pdf.numero_factura = "900.080.634-1", "FE-PDF"
+    sesion.commit()
+
+    normalizado = sesion.execute(
+        select(literal_column(NIT_NORMALIZADO_SQL)).select_from(Factura).where(Factura.id == ids[0])
+    ).scalar_one()
+    assert normalizado == normalizar_nit("900080634")
+
+    def pasa(nit, numero):
+        return sesion.execute(fila_nueva(_valores(nit, numero))).first() is not None
+
+    assert pasa("900080634", "FE-PDF")
+    assert not pasa("800111222", "FE-PDF")
+    # Las del fixture no tienen NIT: el índice no las ve
+    assert not pasa("900080634", "FE-1")
+    assert pasa("900080634", "FE-NUEVA")
@@ -0,0 +1,74 @@
+"""
+Tests de la ingesta XML multipart (POST /facturas/ingesta-xml/multipart):
+el PDF llega como archivo, no como base64, y se corta por tamaño.
+"""
+import uuid
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from core.auth import require_api_key
+from core.config import settings
+from db.session import get_db
+from modules.facturas import ingesta
+from modules.facturas.router import router
+from modules.facturas.schemas import IngestaXMLResultOut
+
+URL = "/facturas/ingesta-xml/multipart"
+
+
+@pytest.fixture
+def llamadas(monkeypatch):
+    """App con solo el router de facturas, sin BD; registra qué recibe procesar_ingesta_xml."""
+    registro = []
+
+    async def _procesar(db, payload, pdf=None):
+        registro.append((payload, pdf.read() if pdf is not None else None))
+        return IngestaXMLResultOut(
+            factura_id=uuid.uuid4(), numero_factura="FE-1", proveedor="P",
+            ai_area_confianza="nula", pendiente_confirmacion=True, estado="sin_asignar",
+        )
+
+    async def _sin_previa(db, clave):
+        return None
+
+    async def _guardar(db, clave, resultado):
+        registro.append(clave)
+
+    monkeypatch.setattr(ingesta, "procesar_ingesta_xml", _procesar)
+    monkeypatch.setattr(ingesta, "buscar_respuesta_idempotente", _sin_previa)
+    monkeypatch.setattr(ingesta, "guardar_respuesta_idempotente", _guardar)
+
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_db] = lambda: None
+    app.dependency_overrides[require_api_key] = lambda: "ok"
+    return TestClient(app), registro
+
+
+def test_pdf_llega_como_archivo(llamadas):
+    client, registro = llamadas
+    resp = client.post(URL, data={"xml": "<xml/>", "nit": " 900080634 "},
+                       files={"pdf": ("fe-1.pdf", b"%PDF-1.4 contenido", "application/pdf")})
+    assert resp.status_code == 200
+    payload, pdf = registro[0]
+    assert pdf == b"%PDF-1.4 contenido"
+    assert payload.pdf_base64 is None
+    assert (payload.nit, payload.pdf_filename) == ("900080634", "fe-1.pdf")
+    assert registro[1].endswith(":pdf")
+
+
+def test_sin_xml_es_422(llamadas):
+    client, _ = llamadas
+    resp = client.post(URL, files={"pdf": ("fe.pdf", b"%PDF", "application/pdf")})
+    assert resp.status_code == 422
+
+
+def test_pdf_sobre_el_tope_es_413(llamadas, monkeypatch):
+    client, registro = llamadas
+    monkeypatch.setattr(settings, "ingesta_pdf_max_mb", 1)
+    grande = b"0" * (1024 * 1024 + 1)
+    resp = client.post(URL, data={"xml": "<xml/>"}, files={"pdf": ("fe.pdf", grande, "application/pdf")})
+    assert resp.status_code == 413
+    assert registro == []
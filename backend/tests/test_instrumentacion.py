@@ -0,0 +1,63 @@
+"""
+Tests de la instrumentación por request (core/instrumentacion.py).
+"""
+import asyncio
+
+import httpx
+from sqlalchemy import create_engine, text
+
+from core.instrumentacion import (
+    TransporteMedido, forma_sql, iniciar_medicion, instrumentar_engine, medicion_actual,
+    terminar_medicion,
+)
+
+
+def test_forma_ignora_valores_y_largo_de_listas():
+    assert forma_sql("SELECT * FROM f WHERE id = $1") == forma_sql("SELECT * FROM f WHERE id = $7")
+    assert forma_sql("SELECT * FROM f WHERE id IN ($1, $2, $3)") == "SELECT * FROM f WHERE id IN (?…)"
+
+
+def test_sentencias_se_cuentan_y_se_detecta_n_mas_uno():
+    engine = create_engine("sqlite://")
+    instrumentar_engine(engine)
+    medicion, token = iniciar_medicion()
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            for i in range(12):
+                conn.execute(text("SELECT :x + 1"), {"x": i})
+    finally:
+        terminar_medicion(token)
+
+    ms, queries = medicion.componentes["db"]
+    assert queries == 13
+    assert medicion.repetidas(10) == [("SELECT ? + 1", 12)]
+    assert medicion.repetidas(12) == []
+    assert medicion.sql_mas_lenta[1] in ("SELECT 1", "SELECT ? + 1")
+    assert 'db;dur=' in medicion.server_timing(50) and 'desc="13 queries"' in medicion.server_timing(50)
+
+
+def test_fuera_de_un_request_no_se_mide():
+    engine = create_engine("sqlite://")
+    instrumentar_engine(engine)
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    assert medicion_actual() is None
+
+
+def test_transporte_httpx_suma_al_componente():
+    transporte = TransporteMedido("siesa", httpx.MockTransport(lambda r: httpx.Response(200, json={})))
+
+    async def _llamar():
+        medicion, token = iniciar_medicion()
+        try:
+            async with httpx.AsyncClient(transport=transporte) as client:
+                await client.get("https://siesa.test/a")
+                await client.get("https://siesa.test/b")
+        finally:
+            terminar_medicion(token)
+        return medicion
+
+    medicion = asyncio.run(_llamar())
+    assert medicion.componentes["siesa"][1] == 2
+    assert medicion.resumen().startswith("siesa=")
@@ -0,0 +1,87 @@
+"""
+Tests de las métricas Prometheus (core/metricas.py).
+"""
+import asyncio
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from core import catalog_cache
+from core.config import settings
+from core.instrumentacion import TransporteMedido
+from core.metricas import PoolMedido, exportar
+
+
+def _valor(nombre: str, **labels) -> float:
+    return REGISTRY.get_sample_value(nombre, labels) or 0.0
+
+
+def test_dependencia_cuenta_latencia_y_errores_5xx():
+    antes = _valor("dependencia_duracion_seconds_count", dependencia="graph")
+    errores = _valor("dependencia_errores_total", dependencia="graph")
+    transporte = TransporteMedido("graph", httpx.MockTransport(lambda r: httpx.Response(503)))
+
+    async def _llamar():
+        async with httpx.AsyncClient(transport=transporte) as client:
+            await client.post("https://graph.test/sendMail")
+
+    asyncio.run(_llamar())
+    assert _valor("dependencia_duracion_seconds_count", dependencia="graph") == antes + 1
+    assert _valor("dependencia_errores_total", dependencia="graph") == errores + 1
+
+
+def test_cache_de_catalogos_cuenta_hits_y_misses():
+    hits = _valor("cache_consultas_total", cache="catalogos", resultado="hit")
+    misses = _valor("cache_consultas_total", cache="catalogos", resultado="miss")
+    catalog_cache.invalidate("test_estados")
+    assert catalog_cache.get_cached("test_estados") is None
+    catalog_cache.set_cached("test_estados", [1])
+    assert catalog_cache.get_cached("test_estados") == [1]
+    assert _valor("cache_consultas_total", cache="catalogos", resultado="hit") == hits + 1
+    assert _valor("cache_consultas_total", cache="catalogos", resultado="miss") == misses + 1
+
+
+def test_pool_publica_espera_y_uso():
+    pytest.importorskip("aiosqlite")
+    esperas = _valor("db_pool_espera_seconds_count", engine="test")
+
+    async def _usar_pool():
+        engine = create_async_engine(
+            "sqlite+aiosqlite://", poolclass=PoolMedido, pool_logging_name="test", pool_size=2, max_overflow=1,
+        )
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            en_uso = _valor("db_pool_conexiones_en_uso", engine="test")
+        await engine.dispose()
+        return en_uso
+
+    assert asyncio.run(_usar_pool()) == 1
+    assert _valor("db_pool_conexiones_en_uso", engine="test") == 0
+    assert _valor("db_pool_capacidad", engine="test") == 3
+    assert _valor("db_pool_espera_seconds_count", engine="test") == esperas + 1
+
+
+def test_exportar_sin_multiproceso_usa_el_registro_del_proceso(monkeypatch):
+    monkeypatch.delenv("PROMETHEUS_MULTIPROC_DIR", raising=False)
+    contenido, content_type = exportar()
+    assert b"db_pool_espera_seconds" in contenido
+    assert content_type.startswith("text/plain")
+
+
+@pytest.mark.parametrize("token,cabecera,esperado", [
+    ("", None, 404),
+    ("secreto", None, 401),
+    ("secreto", "Bearer otro", 401),
+    ("secreto", "Bearer secreto", 200),
+])
+def test_metrics_exige_token(monkeypatch, token, cabecera, esperado):
+    from main import app
+
+    monkeypatch.delenv("PROMETHEUS_MULTIPROC_DIR", raising=False)
+    monkeypatch.setattr(settings, "metrics_token", token)
+    headers = {"Authorization": cabecera} if cabecera else {}
+    assert TestClient(app).get("/metrics", headers=headers).status_code == esperado
@@ -0,0 +1,49 @@
+"""
+Tests del monitor del event loop (core/monitor_loop.py).
+"""
+import asyncio
+import logging
+import time
+
+from core.monitor_loop import ciclo_monitor_loop, percentiles, ruta_en_stack
+
+
+def test_percentiles_por_rango_mas_cercano():
+    muestras = [i / 100 for i in range(1, 101)]
+    assert percentiles(muestras) == {50: 0.5, 90: 0.9, 99: 0.99}
+    assert percentiles([]) == {50: 0.0, 90: 0.0, 99: 0.0}
+
+
+def test_ruta_sale_del_scope_asgi_del_stack():
+    import sys
+
+    def endpoint():
+        return ruta_en_stack(sys._getframe())
+
+    def app(scope):
+        return endpoint()
+
+    assert app({"type": "http", "method": "GET", "path": "/api/v1/facturas/x"}) == "GET /api/v1/facturas/x"
+    assert ruta_en_stack(sys._getframe()) is None
+
+
+def test_bloqueo_se_loggea_con_stack_y_ruta(caplog):
+    def exportar_bloqueante():
+        time.sleep(0.3)  # openpyxl/bcrypt en el loop
+
+    async def handler(scope):
+        exportar_bloqueante()
+
+    async def _correr():
+        monitor = asyncio.create_task(ciclo_monitor_loop(0.02, 0.05, detectar_bloqueos=True))
+        await asyncio.sleep(0.05)
+        await handler({"type": "http", "method": "POST", "path": "/api/v1/facturas/exportar-plano"})
+        await asyncio.sleep(0.05)
+        monitor.cancel()
+
+    with caplog.at_level(logging.WARNING, logger="contabilidadcq"):
+        asyncio.run(_correr())
+    avisos = [r.getMessage() for r in caplog.records if "Event loop bloqueado" in r.getMessage()]
+    assert len(avisos) == 1
+    assert "POST /api/v1/facturas/exportar-plano" in avisos[0]
+    assert "exportar_bloqueante" in avisos[0]
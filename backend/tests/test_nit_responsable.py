@@ -0,0 +1,165 @@
+"""
+Tests del índice en memoria NIT → responsable (core/nit_responsable.py) y del
+parser del import masivo (modules/proveedores_responsables/service.py).
+
+El índice se arma una vez por recarga; la ingesta solo hace dict.get, sin BD.
+"""
+import asyncio
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from pydantic import ValidationError
+
+from conftest import esperar_hasta
+from core import escucha_pg, nit_responsable
+from core.nit_responsable import construir_indice, get_responsables_por_nit, reemplazar_indice
+from modules.proveedores_responsables.schemas import ProveedorResponsableUpdate
+from modules.proveedores_responsables.service import ProveedorResponsableService, parsear_csv_responsables
+
+
+@pytest.fixture(autouse=True)
+def indice_de_prueba():
+    anterior = nit_responsable._indice
+    reemplazar_indice(construir_indice([
+        ("900080634", ["cedi", "marketing"]),
+        ("91440300ma5em", ["cedi"]),
+        ("", ["cedi"]),             # sin NIT → se ignora
+        ("800000001", []),          # sin responsables → se ignora
+    ]))
+    yield
+    reemplazar_indice(anterior)
+
+
+class TestIndice:
+    def test_nit_normalizado_al_cargar(self):
+        assert get_responsables_por_nit("91440300MA5EM") == ["cedi"]
+
+    def test_consulta_con_puntos_dv_y_espacios(self):
+        assert get_responsables_por_nit(" 900.080.634-1 ") == ["cedi", "marketing"]
+
+    def test_misma_normalizacion_que_la_ingesta(self):
+        from modules.facturas import ingesta
+        assert ingesta.normalizar_nit is nit_responsable.normalizar_nit
+
+    def test_ceros_a_la_izquierda(self):
+        assert get_responsables_por_nit("000900080634") == ["cedi", "marketing"]
+
+    def test_filas_invalidas_no_entran(self):
+        assert nit_responsable.nits_conocidos() == frozenset({"900080634", "91440300MA5EM"})
+
+    def test_nit_desconocido_o_vacio(self):
+        assert get_responsables_por_nit("123") is None
+        assert get_responsables_por_nit("") is None
+        assert nit_responsable.es_nit_conocido("900080634")
+
+    def test_recarga_reemplaza_completo(self):
+        reemplazar_indice(construir_indice([("123", ["tiendas"])]))
+        assert get_responsables_por_nit("123") == ["tiendas"]
+        assert get_responsables_por_nit("900080634") is None
+
+
+class TestEscucha:
+    def test_recarga_al_reconectar_tras_una_caida(self, monkeypatch, conexiones_listen):
+        cargas = []
+
+        async def _cargar():
+            cargas.append(len(conexiones_listen))
+
+        monkeypatch.setattr(nit_responsable, "cargar_indice", _cargar)
+
+        async def escenario():
+            tarea = asyncio.create_task(nit_responsable.escuchar_cambios())
+            await esperar_hasta(lambda: cargas == [1])
+            conexiones_listen[0].notificar("a")
+            conexiones_listen[0].notificar("b")
+            await esperar_hasta(lambda: cargas == [1, 1])  # dos NOTIFY seguidos, una recarga
+            conexiones_listen[0].cortar()
+            await esperar_hasta(lambda: cargas == [1, 1, 2])
+            tarea.cancel()
+
+        asyncio.run(escenario())
+        assert conexiones_listen[1].al_notificar
+
+    def test_ping_sin_respuesta_reconecta(self, monkeypatch, conexiones_listen):
+        cargas = []
+
+        async def _cargar():
+            cargas.append(len(conexiones_listen))
+
+        monkeypatch.setattr(nit_responsable, "cargar_indice", _cargar)
+        monkeypatch.setattr(escucha_pg, "INTERVALO_PING_S", 0.01)
+
+        async def escenario():
+            tarea = asyncio.create_task(nit_responsable.escuchar_cambios())
+            await esperar_hasta(lambda: cargas == [1])
+            conexiones_listen[0].responde = False  # corte silencioso: el socket sigue "abierto"
+            await esperar_hasta(lambda: cargas == [1, 2])
+            tarea.cancel()
+
+        asyncio.run(escenario())
+        assert conexiones_listen[0].is_closed()
+
+
+class TestActualizacion:
+    def test_null_borra_razon_social_y_lo_omitido_no_se_toca(self):
+        guardado = {}
+
+        class _Repo:
+            async def get_by_nit(self, nit):
+                return SimpleNamespace(nit=nit)
+
+            async def update(self, proveedor, cambios):
+                guardado.update(cambios)
+                return SimpleNamespace(
+                    id=uuid.uuid4(), nit=proveedor.nit, razon_social=None, responsables=["cedi"],
+                    activo=True, created_at=datetime.now(), updated_at=datetime.now(),
+                )
+
+        servicio = ProveedorResponsableService(_Repo())
+        asyncio.run(servicio.update("900.080.634-1", ProveedorResponsableUpdate(razon_social=None)))
+        assert guardado == {"razon_social": None}
+
+    def test_responsables_y_activo_no_admiten_null(self):
+        with pytest.raises(ValidationError):
+            ProveedorResponsableUpdate(responsables=None)
+        with pytest.raises(ValidationError):
+            ProveedorResponsableUpdate(activo=None)
+
+
+class TestParserCSV:
+    def test_maestra_del_erp_solo_completa_razon_social(self):
+        texto = (
+            "\ufeffcodigo_nit,razon_social,tipo_proveedor\n"
+            "901565711,11 Y 11 SAS,OTROS\n"
+            ",SIN NIT,OTROS\n"
+        )
+        upserts, razones, leidas, omitidas, errores = parsear_csv_responsables(texto)
+        assert upserts == []
+        assert razones == {"901565711": "11 Y 11 SAS"}
+        assert (leidas, omitidas, errores) == (2, 1, [])
+
+    def test_columna_responsables(self):
+        texto = (
+            "nit,razon_social,responsables\n"
+            "900.040.299-1,PROV A,tiendas|cedi\n"
+            "900813998,,Mantenimiento; compras\n"
+        )
+        upserts, razones, _, _, errores = parsear_csv_responsables(texto)
+        assert errores == []
+        assert razones == {}
+        assert upserts == [
+            {"nit": "900040299", "razon_social": "PROV A", "responsables": ["tiendas", "cedi"]},
+            {"nit": "900813998", "razon_social": None, "responsables": ["mantenimiento", "compras"]},
+        ]
+
+    def test_keyword_invalido_reporta_linea(self):
+        texto = "nit,responsables\n123,cedi|bodega\n"
+        upserts, _, _, _, errores = parsear_csv_responsables(texto)
+        assert upserts == []
+        assert errores == ["Línea 2 (NIT 123): keywords no válidos bodega"]
+
+    def test_sin_columna_nit(self):
+        with pytest.raises(ValueError):
+            parsear_csv_responsables("razon_social\nX\n")
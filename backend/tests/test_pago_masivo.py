@@ -0,0 +1,92 @@
+"""
+Tests del pago masivo de paquetes (GastosService.pagar_masivo).
+"""
+import asyncio
+import uuid
+from datetime import date
+
+import pytest
+from sqlalchemy import func, select
+
+from conftest import SesionSync
+from db.models import Anticipo, ComentarioPaquete, HistorialEstadoPaquete, PaqueteGasto
+from modules.gastos import avisos_pago
+from modules.gastos.service import GastosService
+
+
+@pytest.fixture
+def paquetes(bd):
+    """Anticipo desembolsado con un paquete ya cruzado y otro en tesorería,
+    un paquete suelto en tesorería y uno en borrador."""
+    sesion, sentencias, _ = bd
+    tecnico = uuid.uuid4()
+    anticipo = Anticipo(
+        folio="ANT-2026-00001", monto=500, estado="desembolsado",
+        created_by_user_id=tecnico, assigned_to_user_id=tecnico,
+    )
+    sesion.add(anticipo)
+    sesion.flush()
+
+    def paquete(semana, estado, anticipo_id=None):
+        p = PaqueteGasto(
+            user_id=tecnico, semana=semana, fecha_inicio=date(2026, 10, 12),
+            fecha_fin=date(2026, 10, 18), estado=estado, anticipo_id=anticipo_id,
+        )
+        sesion.add(p)
+        sesion.flush()
+        return p.id
+
+    ids = {
+        "cruzado": paquete("2026-W40", "cruzado", anticipo.id),
+        "anticipo": paquete("2026-W41", "en_tesoreria", anticipo.id),
+        "suelto": paquete("2026-W42", "en_tesoreria"),
+        "borrador": paquete("2026-W43", "borrador"),
+    }
+    sesion.commit()
+    sentencias.clear()
+    while not avisos_pago._cola.empty():
+        avisos_pago._cola.get_nowait()
+    return sesion, sentencias, ids, anticipo.id
+
+
+def _estado(sesion, modelo, id_):
+    return sesion.execute(select(modelo.estado).where(modelo.id == id_)).scalar_one()
+
+
+def test_paga_el_lote_en_una_transaccion_con_reporte_por_paquete(paquetes):
+    sesion, sentencias, ids, anticipo_id = paquetes
+    inexistente = uuid.uuid4()
+    pedido = [ids["anticipo"], ids["suelto"], ids["borrador"], inexistente, ids["suelto"]]
+
+    out = asyncio.run(GastosService(SesionSync(sesion)).pagar_masivo(pedido, uuid.uuid4()))
+
+    assert out.pagados == 2
+    assert [(r.paquete_id, r.pagado) for r in out.resultados] == [
+        (ids["anticipo"], True), (ids["suelto"], True), (ids["borrador"], False), (inexistente, False),
+    ]
+    assert "borrador" in out.resultados[2].motivo and "no encontrado" in out.resultados[3].motivo
+    assert len(out.errores) == 2
+
+    assert _estado(sesion, PaqueteGasto, ids["suelto"]) == "pagado"
+    assert _estado(sesion, Anticipo, anticipo_id) == "cerrado"
+    for modelo in (ComentarioPaquete, HistorialEstadoPaquete):
+        assert sesion.execute(select(func.count()).select_from(modelo)).scalar() == 2
+    # Set-based: un UPDATE de paquetes y un INSERT por tabla, no uno por paquete
+    inserts = [s for s in sentencias if s.startswith("INSERT")]
+    assert len(inserts) == 2
+    assert sum(s.startswith("UPDATE paquetes_gastos") for s in sentencias) == 1
+    assert sorted([avisos_pago._cola.get_nowait() for _ in range(2)]) == sorted([ids["anticipo"], ids["suelto"]])
+
+
+def test_todo_o_nada_no_paga_si_alguno_falla(paquetes):
+    sesion, _, ids, anticipo_id = paquetes
+
+    out = asyncio.run(GastosService(SesionSync(sesion)).pagar_masivo(
+        [ids["suelto"], ids["borrador"]], uuid.uuid4(), todo_o_nada=True,
+    ))
+
+    assert out.pagados == 0 and not any(r.pagado for r in out.resultados)
+    assert "todo o nada" in out.resultados[0].motivo
+    assert _estado(sesion, PaqueteGasto, ids["suelto"]) == "en_tesoreria"
+    assert _estado(sesion, Anticipo, anticipo_id) == "desembolsado"
+    assert avisos_pago._cola.empty()
@@ -0,0 +1,94 @@
+"""
+Tests del detalle del paquete por secciones (cabecera + gastos/comentarios/
+historial/solicitudes paginados) y de las transiciones con vista=cabecera.
+"""
+import asyncio
+import uuid
+from datetime import date, datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from conftest import SesionSync
+from db.models import ComentarioPaquete, GastoLegalizacion, HistorialEstadoPaquete, PaqueteGasto, User
+from modules.gastos.schemas import PaqueteCabeceraOut, PaqueteOut
+from modules.gastos.service import GastosService
+
+
+@pytest.fixture
+def paquete(bd):
+    sesion, sentencias, _ = bd
+    tecnico = User(nombre="Técnico", email="tecnico@cq.com", password_hash="x", role_id=uuid.uuid4())
+    sesion.add(tecnico)
+    sesion.flush()
+    paquete = PaqueteGasto(
+        user_id=tecnico.id, semana="2026-W42", fecha_inicio=date(2026, 10, 12),
+        fecha_fin=date(2026, 10, 18), estado="pagado", monto_total=60, total_documentos=0,
+    )
+    sesion.add(paquete)
+    sesion.flush()
+    for i in range(3):
+        sesion.add(GastoLegalizacion(
+            paquete_id=paquete.id, fecha=date(2026, 10, 13), no_identificacion="900123",
+            pagado_a=f"Proveedor {i}", concepto="Repuestos", valor_pagado=20, orden=i,
+        ))
+    inicio = datetime(2026, 10, 14, 8)
+    for i, texto in enumerate(("primero", "segundo")):
+        sesion.add(ComentarioPaquete(
+            paquete_id=paquete.id, user_id=tecnico.id, texto=texto, created_at=inicio + timedelta(hours=i),
+        ))
+    sesion.add(HistorialEstadoPaquete(
+        paquete_id=paquete.id, user_id=tecnico.id, estado_anterior="en_tesoreria", estado_nuevo="pagado",
+    ))
+    sesion.commit()
+    sesion.expunge_all()
+    sentencias.clear()
+    return sesion, sentencias, paquete.id, tecnico.id
+
+
+def test_cabecera_trae_los_tamanos_sin_cargar_las_secciones(paquete):
+    sesion, sentencias, paquete_id, tecnico_id = paquete
+    servicio = GastosService(SesionSync(sesion))
+
+    cabecera = asyncio.run(servicio.get_paquete_cabecera(paquete_id, tecnico_id, "tecnico"))
+    assert cabecera.tecnico.nombre == "Técnico"
+    assert (cabecera.n_gastos, cabecera.n_comentarios, cabecera.n_historial, cabecera.n_solicitudes) == (3, 2, 1, 0)
+
+    sql = " ".join(sentencias)
+    assert "gastos_legalizacion.pagado_a" not in sql and "comentarios_paquete.texto" not in sql
+
+
+def test_secciones_paginadas(paquete):
+    sesion, _, paquete_id, tecnico_id = paquete
+    servicio = GastosService(SesionSync(sesion))
+
+    gastos = asyncio.run(servicio.list_gastos_paquete(paquete_id, tecnico_id, "tecnico", "", 1, 1))
+    assert gastos.total == 3 and [g.pagado_a for g in gastos.gastos] == ["Proveedor 1"]
+
+    comentarios = asyncio.run(servicio.list_comentarios_paquete(paquete_id, tecnico_id, "tecnico", "", 0, 50))
+    assert [c.texto for c in comentarios.comentarios] == ["segundo", "primero"]
+
+    historial = asyncio.run(servicio.list_historial_paquete(paquete_id, tecnico_id, "tecnico", "", 0, 50))
+    assert historial.total == 1 and historial.historial[0].estado_nuevo == "pagado"
+
+
+def test_seccion_de_paquete_ajeno_da_403(paquete):
+    sesion, _, paquete_id, _ = paquete
+    servicio = GastosService(SesionSync(sesion))
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(servicio.list_gastos_paquete(paquete_id, uuid.uuid4(), "tecnico", "", 0, 50))
+    assert error.value.status_code == 403
+
+
+def test_transicion_con_vista_cabecera_no_devuelve_las_secciones(paquete):
+    sesion, _, paquete_id, tecnico_id = paquete
+
+    out = asyncio.run(GastosService(SesionSync(sesion), solo_cabecera=True).revertir_pago(
+        paquete_id, tecnico_id, "Pago duplicado",
+    ))
+    assert type(out) is PaqueteCabeceraOut
+    assert (out.estado, out.n_comentarios, out.n_historial) == ("en_tesoreria", 3, 2)
+
+    sesion.expunge_all()
+    completo = asyncio.run(GastosService(SesionSync(sesion)).get_paquete(paquete_id, tecnico_id, "tecnico"))
+    assert type(completo) is PaqueteOut and len(completo.gastos) == 3
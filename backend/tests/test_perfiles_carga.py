@@ -0,0 +1,97 @@
+"""
+Tests de los perfiles de carga de Factura (db/perfiles_carga.py): cuántas
+sentencias SQL cuesta cada endpoint y que el mapeo de su respuesta no toque una
+relación fuera del perfil (con lazy="raise" fallaría).
+
+Corre sobre la fixture `bd` de conftest.py (sqlite en memoria, Session
+síncrona detrás de una fachada async).
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import InvalidRequestError
+
+from conftest import N_FACTURAS, SesionSync
+from db.models import Factura, File
+from db.perfiles_carga import PerfilCarga, opciones_factura
+from modules.facturas.repository import FacturaRepository
+from modules.facturas.service import FacturaService
+
+def _servicio(sesion):
+    return FacturaService(FacturaRepository(SesionSync(sesion)))
+
+
+def test_listado_no_depende_del_tamano_de_pagina(bd):
+    sesion, sentencias, _ = bd
+    respuesta = asyncio.run(_servicio(sesion).list_facturas(limit=0))
+    assert respuesta.total == N_FACTURAS
+    item = respuesta.items[0]
+    assert (item.area, item.estado, item.centro_costo, item.unidad_negocio) == ("Tienda 1", "Asignada", "Centro 1", "050")
+    assert item.carpeta_tesoreria.nombre == "Pagos junio"
+    assert len(item.files) == 1 and len(item.inventarios_codigos) == 1
+    # count + SELECT con los catálogos + selectin files + selectin códigos
+    assert len(sentencias) == 4
+
+
+def test_bandeja_tesoreria_omite_archivos_y_centros(bd):
+    sesion, sentencias, _ = bd
+    respuesta = asyncio.run(_servicio(sesion).list_facturas(limit=0, only_in_carpeta=True))
+    assert respuesta.items[0].files == []
+    assert respuesta.items[0].centro_costo is None
+    assert len(sentencias) == 3
+
+
+def test_detalle_es_un_solo_select(bd):
+    sesion, sentencias, ids = bd
+    factura = asyncio.run(_servicio(sesion).get_factura(ids[0]))
+    assert (factura.area, factura.estado, factura.centro_operacion) == ("Tienda 1", "Asignada", "Operación 1")
+    assert len(sentencias) == 1
+
+
+def test_cambio_de_estado_relee_con_el_perfil_transition(bd):
+    sesion, sentencias, ids = bd
+    respuesta = asyncio.run(_servicio(sesion).update_estado(ids[0], 3))
+    assert respuesta.estado == "Pendiente"
+    # SELECT + UPDATE + relectura
+    assert len(sentencias) == 3
+
+
+def test_export_trae_la_distribucion_con_sus_catalogos(bd):
+    sesion, sentencias, _ = bd
+    facturas = sesion.execute(select(Factura).options(*opciones_factura(PerfilCarga.EXPORT))).scalars().all()
+    codigos = [d.centro_costo.codigo for f in facturas for d in f.distribucion_ccco]
+    assert codigos == ["CC1"] * N_FACTURAS
+    assert len(sentencias) == 2
+
+
+def test_relacion_fuera_del_perfil_lanza(bd):
+    sesion, sentencias, ids = bd
+    factura = asyncio.run(FacturaRepository(SesionSync(sesion)).get_by_id(ids[0], PerfilCarga.TRANSITION))
+    assert factura.estado.label == "Asignada"
+    with pytest.raises(InvalidRequestError):
+        factura.files
+    assert len(sentencias) == 1
+
+
+def test_select_plano_no_carga_relaciones(bd):
+    sesion, sentencias, _ = bd
+    sesion.execute(select(Factura)).scalars().all()
+    sesion.execute(select(File)).scalars().all()
+    assert len(sentencias) == 2
+
+
+def test_listado_reutiliza_la_plantilla_de_sus_filtros(bd):
+    from modules.facturas.repository import _plantillas_listado
+
+    sesion, sentencias, _ = bd
+    repo = FacturaRepository(SesionSync(sesion))
+    facturas, total = asyncio.run(repo.get_all(limit=2, search="FE-1", estado_code="asignada"))
+    assert total == 1 and facturas[0].numero_factura == "FE-1"
+    asyncio.run(repo.get_all(limit=2, search="FE-3", estado_code="asignada"))
+    # misma combinación de filtros → misma sentencia, otros valores
+    assert _plantillas_listado.cache_info().currsize >= 1
+    assert _plantillas_listado(frozenset({"patron", "estado_code"}), True) is _plantillas_listado(
+        frozenset({"estado_code", "patron"}), True
+    )
+    assert len(sentencias) == 2 * 4
@@ -0,0 +1,137 @@
+"""
+Tests del push de bandejas por SSE (modules/facturas/push_bandejas.py).
+"""
+import asyncio
+import json
+import uuid
+from types import SimpleNamespace
+
+from conftest import esperar_hasta
+from modules.facturas import push_bandejas
+from modules.facturas.push_bandejas import (
+    alcance_usuario, desuscribir, eventos, repartir, suscribir,
+)
+
+TIENDA, CONTABILIDAD, OTRA = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+
+
+class _Item(SimpleNamespace):
+    def model_dump_json(self):
+        return json.dumps({"id": str(self.id), "area_id": str(self.area_id)})
+
+
+def _payload(factura_id, desde=None, hasta=None):
+    return json.dumps({
+        "factura_id": str(factura_id), "tipo": "asignacion",
+        "area_desde_id": str(desde) if desde else None, "area_hasta_id": str(hasta) if hasta else None,
+    })
+
+
+def _recibidos(suscripcion):
+    eventos = []
+    while not suscripcion.cola.empty():
+        evento = suscripcion.cola.get_nowait()
+        eventos.append(next(linea for linea in evento.splitlines() if linea.startswith("event: "))[7:])
+    return eventos
+
+
+def test_pase_de_area_llega_a_destino_y_sale_del_origen():
+    factura_id = uuid.uuid4()
+    destino, origen, ajena, admin = (
+        suscribir(frozenset({CONTABILIDAD})), suscribir(frozenset({TIENDA})),
+        suscribir(frozenset({OTRA})), suscribir(None),
+    )
+    cargadas = []
+
+    async def cargar(fid):
+        cargadas.append(fid)
+        return _Item(id=fid, area_id=CONTABILIDAD)
+
+    try:
+        asyncio.run(repartir(_payload(factura_id, TIENDA, CONTABILIDAD), cargar))
+    finally:
+        for s in (destino, origen, ajena, admin):
+            desuscribir(s)
+
+    assert cargadas == [factura_id]  # una relectura por movimiento, no por cliente
+    assert _recibidos(destino) == ["factura"]
+    assert _recibidos(origen) == ["removida"]
+    assert _recibidos(ajena) == []
+    assert _recibidos(admin) == ["factura"]
+
+
+def test_factura_eliminada_se_quita_de_todas_y_sin_clientes_no_se_consulta():
+    async def no_existe(fid):
+        return None
+
+    suscripcion = suscribir(frozenset({OTRA}))
+    try:
+        asyncio.run(repartir(_payload(uuid.uuid4()), no_existe))
+    finally:
+        desuscribir(suscripcion)
+    assert _recibidos(suscripcion) == ["removida"]
+
+    async def no_llamar(fid):
+        raise AssertionError("sin suscriptores no se relee la factura")
+
+    asyncio.run(repartir(_payload(uuid.uuid4()), no_llamar))
+
+
+def test_cliente_lento_recibe_reset_y_se_cierra(monkeypatch):
+    monkeypatch.setattr(push_bandejas, "_COLA_MAX", 3)
+
+    async def escenario():
+        suscripcion = suscribir(frozenset({TIENDA}))
+        flujo = eventos(suscripcion)
+        assert "event: conectado" in await flujo.__anext__()
+        for _ in range(5):
+            suscripcion.enviar("event: factura\ndata: {}\n\n")
+        recibidos = [evento async for evento in flujo]
+        return suscripcion, recibidos
+
+    suscripcion, recibidos = asyncio.run(escenario())
+    assert len(recibidos) == 1 and "event: reset" in recibidos[0]
+    assert suscripcion not in push_bandejas._suscripciones
+
+
+def test_alcance_segun_rol():
+    tiendas = [uuid.uuid4(), uuid.uuid4()]
+
+    class _Db:
+        async def execute(self, stmt):
+            return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: tiendas))
+
+    def usuario(rol):
+        return SimpleNamespace(role=SimpleNamespace(code=rol), area_id=CONTABILIDAD)
+
+    assert asyncio.run(alcance_usuario(_Db(), usuario("admin"))) is None
+    assert asyncio.run(alcance_usuario(_Db(), usuario("contabilidad"))) == {CONTABILIDAD}
+    assert asyncio.run(alcance_usuario(_Db(), usuario("jefe_zona"))) == {CONTABILIDAD, *tiendas}
+
+
+def test_caida_de_la_escucha_reconecta_y_avisa_resync(monkeypatch, conexiones_listen):
+    repartidos = []
+
+    async def _repartir(payload):
+        repartidos.append(payload)
+
+    monkeypatch.setattr(push_bandejas, "repartir", _repartir)
+    suscripcion = suscribir(None)
+
+    async def escenario():
+        tarea = asyncio.create_task(push_bandejas.escuchar_movimientos())
+        await esperar_hasta(lambda: conexiones_listen and conexiones_listen[0].al_notificar)
+        conexiones_listen[0].notificar("antes")
+        await esperar_hasta(lambda: repartidos == ["antes"])
+        assert _recibidos(suscripcion) == []  # la primera conexión no es una reconexión
+        conexiones_listen[0].cortar()
+        await esperar_hasta(lambda: len(conexiones_listen) == 2 and conexiones_listen[1].al_notificar)
+        conexiones_listen[1].notificar("despues")
+        await esperar_hasta(lambda: repartidos == ["antes", "despues"])
+        tarea.cancel()
+
+    try:
+        asyncio.run(escenario())
+    finally:
+        desuscribir(suscripcion)
+    assert _recibidos(suscripcion) == ["resync"]
@@ -0,0 +1,66 @@
+"""
+Tests del re-parseo masivo del XML guardado (modules/facturas/reparseo.py).
+"""
+import uuid
+
+from sqlalchemy.dialects import postgresql
+
+from modules.facturas.ingesta import comprimir_xml, descomprimir_xml
+from modules.facturas.reparseo import leer_checkpoint, reparsear_lote, sentencia_update
+
+XML = """<?xml version="1.0" encoding="UTF-8"?>
+<AttachedDocument xmlns="urn:oasis:names:specification:ubl:schema:xsd:AttachedDocument-2"
+    xmlns:cac="urn:oasis:names:specification:ubl:schema:xsd:CommonAggregateComponents-2"
+    xmlns:cbc="urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2">
+  <cbc:ParentDocumentID>FE99001</cbc:ParentDocumentID>
+  <cac:SenderParty><cac:PartyTaxScheme>
+    <cbc:RegistrationName>PROVEEDOR PRUEBA SAS</cbc:RegistrationName>
+    <cbc:CompanyID>830026510</cbc:CompanyID>
+  </cac:PartyTaxScheme></cac:SenderParty>
+  <cac:Attachment><cac:ExternalReference><cbc:Description><![CDATA[<Invoice
+    xmlns:cac="urn:oasis:names:specification:ubl:schema:xsd:CommonAggregateComponents-2"
+    xmlns:cbc="urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2">
+  <cbc:ID>FE99001</cbc:ID>
+  <cac:TaxTotal><cbc:TaxAmount>19.00</cbc:TaxAmount><cac:TaxSubtotal>
+    <cbc:TaxableAmount>100.00</cbc:TaxableAmount><cbc:TaxAmount>19.00</cbc:TaxAmount>
+    <cac:TaxCategory><cac:TaxScheme><cbc:ID>01</cbc:ID><cbc:Name>IVA</cbc:Name></cac:TaxScheme></cac:TaxCategory>
+  </cac:TaxSubtotal></cac:TaxTotal>
+  <cac:LegalMonetaryTotal>
+    <cbc:TaxExclusiveAmount>100.00</cbc:TaxExclusiveAmount><cbc:PayableAmount>119.00</cbc:PayableAmount>
+  </cac:LegalMonetaryTotal>
+</Invoice>]]></cbc:Description></cac:ExternalReference></cac:Attachment>
+</AttachedDocument>"""
+
+
+def test_compresion_ida_y_vuelta():
+    comprimido = comprimir_xml(XML)
+    assert len(comprimido) < len(XML.encode())
+    assert descomprimir_xml(comprimido) == XML
+
+
+def test_lote_extrae_campos_y_cuenta_errores():
+    ok, roto = uuid.uuid4(), uuid.uuid4()
+    cambios, errores = reparsear_lote(
+        [(ok, comprimir_xml(XML)), (roto, b"no es zstd")],
+        ("base_gravable", "valor_iva", "retenciones_xml"),
+    )
+    assert errores == 1
+    assert cambios == [{"b_id": ok, "n_base_gravable": 100.0, "n_valor_iva": 19.0, "n_retenciones_xml": None}]
+
+
+def test_update_por_defecto_solo_completa_vacios():
+    sql = str(sentencia_update(("valor_iva",), sobrescribir=False).compile(dialect=postgresql.dialect()))
+    assert "valor_iva=coalesce(facturas.valor_iva, n.n_valor_iva)" in sql
+    sql = str(sentencia_update(("valor_iva",), sobrescribir=True).compile(dialect=postgresql.dialect()))
+    assert "valor_iva=coalesce(n.n_valor_iva, facturas.valor_iva)" in sql
+
+
+def test_update_devuelve_solo_las_filas_que_cambian():
+    sql = str(sentencia_update(("valor_iva",), sobrescribir=False).compile(dialect=postgresql.dialect()))
+    assert "FROM jsonb_to_recordset(CAST(%(cambios)s AS JSONB)) AS n(b_id UUID, n_valor_iva NUMERIC(14, 2))" in sql
+    assert "coalesce(facturas.valor_iva, n.n_valor_iva) IS DISTINCT FROM facturas.valor_iva" in sql
+    assert sql.endswith("RETURNING facturas.id")
+
+
+def test_checkpoint_inexistente_arranca_de_cero(tmp_path):
+    assert leer_checkpoint(tmp_path / "no.json")["ultimo_id"] is None
@@ -0,0 +1,91 @@
+"""
+Tests de la sesión de solo lectura (db/session.get_read_db) y de que los GET la usen.
+"""
+import asyncio
+
+from fastapi.routing import APIRoute
+
+import db.session as sesion_db
+from db.session import get_db, get_read_db
+
+# GET que escriben: enlaces de aprobación por correo y el sondeo de la ingesta
+# asíncrona (se consulta justo después del POST; no puede ir a una réplica atrasada)
+GET_QUE_ESCRIBEN = {"aprobar_por_token", "aprobar_por_token_endpoint", "aprobar_anticipo", "estado_ingesta_xml"}
+
+
+class _SesionFalsa:
+    def __init__(self, registro):
+        self.registro = registro
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.registro.append("close")
+
+    async def connection(self, execution_options=None):
+        self.registro.append(execution_options)
+
+    async def commit(self):
+        self.registro.append("commit")
+
+
+def _dependencias(dependant):
+    for dep in dependant.dependencies:
+        yield dep.call
+        yield from _dependencias(dep)
+
+
+def test_lectura_es_read_only_y_no_hace_commit(monkeypatch):
+    registro = []
+    monkeypatch.setattr(sesion_db, "AsyncSessionLocal", lambda: _SesionFalsa(registro))
+
+    async def _usar():
+        async for _ in get_read_db():
+            pass
+
+    asyncio.run(_usar())
+    assert registro == [{"postgresql_readonly": True}, "close"]
+
+
+def test_replica_atrasada_cae_a_la_primaria(monkeypatch):
+    primaria, replica = object(), object()
+    monkeypatch.setattr(sesion_db, "AsyncSessionLocal", primaria)
+    monkeypatch.setattr(sesion_db, "AsyncReadSessionLocal", replica)
+    monkeypatch.setattr(sesion_db, "_replica_sana", True)
+    assert sesion_db._fabrica_lectura() is replica
+    monkeypatch.setattr(sesion_db, "_replica_sana", False)
+    assert sesion_db._fabrica_lectura() is primaria
+
+
+def test_sin_replica_configurada_lee_de_la_primaria(monkeypatch):
+    monkeypatch.setattr(sesion_db, "AsyncReadSessionLocal", None)
+    assert sesion_db._fabrica_lectura() is sesion_db.AsyncSessionLocal
+
+
+def test_los_get_usan_la_sesion_de_lectura():
+    from main import app
+
+    rutas = [
+        r for r in app.routes
+        if isinstance(r, APIRoute) and "GET" in r.methods and r.endpoint.__name__ not in GET_QUE_ESCRIBEN
+    ]
+    con_primaria = [r.path for r in rutas if get_db in set(_dependencias(r.dependant))]
+    assert con_primaria == ["/health"]
+    assert sum(get_read_db in set(_dependencias(r.dependant)) for r in rutas) > 50
+
+
+def test_con_sesion_cambia_solo_la_sesion_de_la_dependencia():
+    import inspect
+
+    from fastapi import Depends
+
+    async def _usuario(current_user: dict = Depends(dict), db=Depends(get_db)):
+        return current_user, db
+
+    lectura = sesion_db.con_sesion(_usuario, get_read_db)
+    assert sesion_db.con_sesion(_usuario, get_read_db) is lectura  # una dependencia por pareja
+    parametros = inspect.signature(lectura).parameters
+    assert parametros["db"].default.dependency is get_read_db
+    assert parametros["current_user"].default.dependency is dict
+    assert asyncio.run(lectura({"id": 1}, "sesion")) == ({"id": 1}, "sesion")
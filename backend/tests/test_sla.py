@@ -0,0 +1,68 @@
+"""
+Tests de GET /dashboard/sla: las lecturas salen solo de los rollups de SLA
+(sin tocar factura_movimientos ni facturas) y los percentiles se ubican en el
+rango donde el acumulado cruza el cuantil.
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from conftest import SesionSync
+from db.models import (
+    Area, SlaBacklog, SlaCiclo, SlaCursor, SlaFlujoDiario, SlaPermanencia,
+)
+from modules.dashboard.repository import DashboardRepository
+from modules.dashboard.service import DashboardService
+from core.tareas import TZ_BOGOTA
+
+
+def test_sla_desde_los_rollups(bd):
+    sesion, sentencias, _ = bd
+    area_id = sesion.execute(select(Area.id)).scalar_one()
+    hoy = datetime.now(tz=TZ_BOGOTA).date()
+    ayer = hoy - timedelta(days=1)
+    hora = 3600
+    sesion.add_all([
+        SlaCursor(clave="factura_movimientos", actualizado_en=datetime(2026, 10, 19, 8, 0)),
+        # 10 permanencias en 'asignada': 4 de < 1 h, 5 entre 4 h y 8 h, 1 de más de 30 días
+        SlaPermanencia(dia=ayer, area_id=area_id, estado_id=2, rango=0, n=3, segundos=3 * 1800),
+        SlaPermanencia(dia=hoy, area_id=area_id, estado_id=2, rango=0, n=1, segundos=1800),
+        SlaPermanencia(dia=hoy, area_id=area_id, estado_id=2, rango=2, n=5, segundos=5 * 6 * hora),
+        SlaPermanencia(dia=hoy, area_id=area_id, estado_id=2, rango=10, n=1, segundos=1000 * hora),
+        # Fuera del período pedido
+        SlaPermanencia(dia=hoy - timedelta(days=40), area_id=area_id, estado_id=3, rango=0, n=7,
+                       segundos=7 * hora),
+        SlaCiclo(dia=hoy, rango=3, n=2, segundos=2 * 20 * hora),
+        SlaFlujoDiario(dia=ayer, area_id=area_id, entradas=4, salidas=1, cerradas=1),
+        SlaFlujoDiario(dia=hoy, area_id=area_id, entradas=6, salidas=9, cerradas=2),
+        SlaBacklog(id=1, area_id=area_id, estado_id=2, rango=0, n=3),
+        SlaBacklog(id=2, area_id=None, estado_id=3, rango=5, n=1),
+    ])
+    sesion.commit()
+    sentencias.clear()
+
+    sla = asyncio.run(DashboardService(DashboardRepository(SesionSync(sesion))).get_sla(30))
+
+    assert sla.desde == hoy - timedelta(days=29)
+    assert sla.actualizado_en == datetime(2026, 10, 19, 8, 0)
+    [p] = sla.permanencias
+    assert (p.area, p.estado, p.facturas) == ("Tienda 1", "Asignada", 10)
+    # p50 cae en el rango 4-8 h (acumulado 9 de 10), p90 también; solo la de 30+ días sube el promedio
+    assert (p.p50_horas, p.p90_horas) == (6.0, 6.0)
+    assert p.promedio_horas == round((4 * 1800 + 30 * hora + 1000 * hora) / 10 / hora, 2)
+    assert (sla.ciclo.facturas, sla.ciclo.p50_horas) == (2, 20.0)
+    assert [(f.dia, f.entradas, f.salidas, f.cerradas, f.cerradas_media_7d) for f in sla.flujo] == [
+        (ayer, 4, 1, 1, 1.0), (hoy, 6, 9, 2, 1.5),
+    ]
+    assert [(b.area, b.desde_dias, b.hasta_dias, b.facturas) for b in sla.backlog] == [
+        ("Tienda 1", 0, 1, 3), (None, 30, None, 1),
+    ]
+    assert all("factura_movimientos" not in s and "FROM facturas" not in s for s in sentencias)
+
+
+def test_sla_sin_datos(bd):
+    sesion, _, _ = bd
+    sla = asyncio.run(DashboardService(DashboardRepository(SesionSync(sesion))).get_sla(7))
+    assert (sla.ciclo.facturas, sla.ciclo.p50_horas, sla.ciclo.promedio_horas) == (0, None, None)
+    assert (sla.permanencias, sla.backlog, sla.flujo, sla.actualizado_en) == ([], [], [], None)
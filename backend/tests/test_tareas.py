@@ -0,0 +1,50 @@
+"""
+Tests de las tareas de fondo programadas (core/tareas.py).
+"""
+import asyncio
+from datetime import datetime
+
+import db.session
+from conftest import esperar_hasta
+from core import tareas
+from core.tareas import TZ_BOGOTA, ciclo_periodico, segundos_hasta
+
+
+class _Sesion:
+    def __init__(self, registro):
+        self.registro = registro
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def rollback(self):
+        self.registro.append("rollback")
+
+
+def test_segundos_hasta_la_proxima_hora_local():
+    ahora = datetime.now(tz=TZ_BOGOTA)
+    segundos = segundos_hasta((ahora.hour + 1) % 24)
+    assert 0 < segundos <= 3600
+
+
+def test_un_error_hace_rollback_y_el_ciclo_sigue(monkeypatch):
+    registro = []
+    monkeypatch.setattr(db.session, "AsyncSessionLocal", lambda: _Sesion(registro))
+    monkeypatch.setattr(tareas, "ESPERA_ERROR_S", 0)
+
+    async def trabajo(db):
+        registro.append("trabajo")
+        if registro.count("trabajo") == 1:
+            raise RuntimeError("BD caída")
+        return 3
+
+    async def escenario():
+        tarea = asyncio.create_task(ciclo_periodico(0, trabajo, "prueba", lambda n: f"{n} hechos"))
+        await esperar_hasta(lambda: registro.count("trabajo") >= 2)
+        tarea.cancel()
+
+    asyncio.run(escenario())
+    assert registro[:3] == ["trabajo", "rollback", "trabajo"]
@@ -0,0 +1,87 @@
+"""
+Tests de los totales incrementales de los paquetes de gastos
+(PaqueteRepository.aplicar_delta_totales y modules/gastos/totales.py).
+"""
+import asyncio
+import uuid
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select, update
+
+from conftest import SesionSync
+from db.models import ArchivoGasto, PaqueteGasto
+from modules.gastos.schemas import GastoCreate, GastoUpdate
+from modules.gastos.service import GastosService
+from modules.gastos.totales import reparar_totales_paquetes
+
+
+@pytest.fixture
+def paquete(bd):
+    sesion, sentencias, _ = bd
+    tecnico = uuid.uuid4()
+    paquete = PaqueteGasto(
+        user_id=tecnico, semana="2026-W42", fecha_inicio=date(2026, 10, 12),
+        fecha_fin=date(2026, 10, 18), estado="borrador",
+    )
+    sesion.add(paquete)
+    sesion.commit()
+    sentencias.clear()
+    return sesion, sentencias, paquete.id, tecnico
+
+
+def _totales(sesion, paquete_id):
+    return sesion.execute(
+        select(PaqueteGasto.monto_total, PaqueteGasto.total_documentos)
+        .where(PaqueteGasto.id == paquete_id)
+    ).one()
+
+
+def _gasto(valor) -> GastoCreate:
+    return GastoCreate(
+        fecha=date(2026, 10, 13), no_identificacion="900123", pagado_a="Ferretería",
+        concepto="Repuestos", valor_pagado=valor,
+    )
+
+
+def test_altas_ediciones_y_bajas_aplican_deltas_sin_re_sumar(paquete):
+    sesion, sentencias, paquete_id, tecnico = paquete
+    servicio = GastosService(SesionSync(sesion))
+
+    uno = asyncio.run(servicio.agregar_gasto(paquete_id, tecnico, _gasto(Decimal("100.50"))))
+    dos = asyncio.run(servicio.agregar_gasto(paquete_id, tecnico, _gasto(Decimal("40"))))
+    assert _totales(sesion, paquete_id) == (Decimal("140.50"), 0)
+
+    asyncio.run(servicio.editar_gasto(paquete_id, uno.id, tecnico, GastoUpdate(valor_pagado=Decimal("90"))))
+    asyncio.run(servicio.editar_gasto(paquete_id, dos.id, tecnico, GastoUpdate(concepto="Otro")))
+    assert _totales(sesion, paquete_id) == (Decimal("130.00"), 0)
+
+    asyncio.run(servicio.eliminar_gasto(paquete_id, dos.id, tecnico))
+    assert _totales(sesion, paquete_id) == (Decimal("90.00"), 0)
+
+    sql = " ".join(sentencias).lower()
+    assert "sum(" not in sql and "count(" not in sql
+    # Nunca se carga el paquete completo (que trae todos sus gastos por selectin)
+    assert "paquetes_gastos.semana" not in sql
+
+
+def test_verificacion_detecta_y_repara_el_desfase(paquete):
+    sesion, _, paquete_id, tecnico = paquete
+    servicio = GastosService(SesionSync(sesion))
+    gasto = asyncio.run(servicio.agregar_gasto(paquete_id, tecnico, _gasto(Decimal("75"))))
+    # Escritura por fuera del servicio: un archivo sin delta y un monto pisado a mano
+    sesion.add(ArchivoGasto(
+        paquete_id=paquete_id, gasto_id=gasto.id, filename="r.pdf", s3_key="k/r.pdf",
+        categoria="factura", content_type="application/pdf", size_bytes=10,
+    ))
+    sesion.execute(update(PaqueteGasto).values(monto_total=1))
+    sesion.commit()
+
+    [desfase] = asyncio.run(reparar_totales_paquetes(SesionSync(sesion), dry_run=True))
+    assert (desfase.id, desfase.monto, desfase.docs) == (paquete_id, Decimal("75"), 1)
+    assert _totales(sesion, paquete_id) == (Decimal("1"), 0)
+
+    assert len(asyncio.run(reparar_totales_paquetes(SesionSync(sesion)))) == 1
+    assert _totales(sesion, paquete_id) == (Decimal("75.00"), 1)
+    assert asyncio.run(reparar_totales_paquetes(SesionSync(sesion))) == []
@@ -0,0 +1,61 @@
+"""
+Tests de los GET condicionales (core/versionado.py).
+"""
+from types import SimpleNamespace
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from core.versionado import NoModificado, responder_no_modificado, respuesta_condicional
+from db.session import get_read_db
+
+
+def _cliente(versiones: dict, llamadas: list) -> TestClient:
+    class _Db:
+        async def execute(self, stmt, params):
+            filas = [(t, versiones[t]) for t in params["tablas"] if t in versiones]
+            return SimpleNamespace(all=lambda: filas)
+
+    async def _db():
+        yield _Db()
+
+    app = FastAPI()
+    app.dependency_overrides[get_read_db] = _db
+    app.add_exception_handler(NoModificado, lambda request, exc: responder_no_modificado(exc))
+
+    @app.get("/areas", dependencies=[Depends(respuesta_condicional("areas", "facturas"))])
+    async def areas(activas: bool = True):
+        llamadas.append(activas)
+        return [{"nombre": "Tienda 1"}]
+
+    return TestClient(app)
+
+
+def test_304_sin_correr_el_endpoint_mientras_no_cambien_las_tablas():
+    versiones, llamadas = {"areas": 3}, []
+    cliente = _cliente(versiones, llamadas)
+
+    primera = cliente.get("/areas")
+    etag = primera.headers["etag"]
+    assert primera.status_code == 200 and etag.startswith('W/"')
+    assert primera.headers["cache-control"] == "private, no-cache"
+
+    repetida = cliente.get("/areas", headers={"If-None-Match": etag})
+    assert repetida.status_code == 304 and repetida.content == b""
+    assert repetida.headers["etag"] == etag
+    assert llamadas == [True]
+
+    # Una escritura en cualquiera de las tablas del endpoint invalida el ETag
+    versiones["facturas"] = 1
+    cambiada = cliente.get("/areas", headers={"If-None-Match": etag})
+    assert cambiada.status_code == 200 and cambiada.headers["etag"] != etag
+    assert llamadas == [True, True]
+
+
+def test_el_etag_depende_de_los_parametros():
+    cliente = _cliente({"areas": 1}, [])
+    todas = cliente.get("/areas", params={"activas": "false"}).headers["etag"]
+    activas = cliente.get("/areas").headers["etag"]
+    assert todas != activas
+    assert cliente.get("/areas", headers={"If-None-Match": f'"otro", {todas}'}).status_code == 200
+    assert cliente.get("/areas", headers={"If-None-Match": f'"otro", {activas}'}).status_code == 304